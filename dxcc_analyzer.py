@@ -8,19 +8,32 @@ Provides whitelist recommendations and statistics.
 Compatible with the PHP version functionality.
 """
 
+import argparse
 import json
-import re
 import os
+import time
 from datetime import datetime
 from collections import defaultdict, Counter
 
+from ultron_bands import BAND_NAMES, CHALLENGE_BANDS, MODE_NAMES
+from ultron_recommend import Recommender
+from ultron_store import LogIndex, QSOTable, SlotMatrix, entity_id, file_signature
+from ultron_whitelist import entity_continents, load_whitelists
+
 class DXCCAnalyzer:
     def __init__(self):
         self.worked_entities = defaultdict(set)  # band -> set of dxcc_ids
         self.all_worked = set()  # all worked dxcc_ids across all bands
         self.dxcc_data = {}
+        self.dxcc_names = {}  # dxcc_id -> name
+        self.continents = {}  # dxcc_id -> continent (from the whitelist files)
+        self.whitelists = {}  # 'global' | band -> {dxcc_id: info}
+        self.table = QSOTable()  # columnar QSO store
+        self.matrix = SlotMatrix()  # entity x band / entity x mode counts
         self.log_file = "wsjtx_log.adi"
         self.dxcc_file = "base.json"
+        self.state_file = "dxcc_analyzer_state.bin"  # table + log offset
+        self.index = None
         
     def load_dxcc_data(self):
         """Load DXCC entity data from base.json"""
@@ -34,6 +47,17 @@ class DXCCAnalyzer:
         except json.JSONDecodeError as e:
             print(f"⚠ Error parsing {self.dxcc_file}: {e}")
             self.dxcc_data = {}
+        
+        self.whitelists = whitelists = load_whitelists()
+        self.continents = entity_continents(whitelists)
+        self.dxcc_names = {}
+        for info in self.dxcc_data.values():
+            dxcc_id = entity_id(info.get('dxcc_id'))
+            if dxcc_id:
+                self.dxcc_names.setdefault(dxcc_id, info.get('country', f"DXCC-{dxcc_id}"))
+        for entries in whitelists.values():
+            for dxcc_id, info in entries.items():
+                self.dxcc_names.setdefault(dxcc_id, info.get('name', f"DXCC-{dxcc_id}"))
     
     def extract_callsign_info(self, callsign):
         """Extract country/entity info from callsign using base.json data"""
@@ -54,66 +78,74 @@ class DXCCAnalyzer:
         
         return None, None
     
-    def parse_adif_line(self, line):
-        """Parse a single ADIF line and extract relevant data"""
-        line = line.strip()
-        if not line or line.startswith('<'):
-            return None
-            
-        # Extract callsign and band
-        callsign_match = re.search(r'<CALL:(\d+)>([^<]+)', line)
-        band_match = re.search(r'<BAND:(\d+)>([^<]+)', line)
-        
-        if not callsign_match:
-            return None
-            
-        callsign = callsign_match.group(2).strip()
-        band = band_match.group(2).strip() if band_match else "Unknown"
-        
-        return {
-            'callsign': callsign,
-            'band': band
-        }
-    
-    def analyze_log_file(self):
-        """Analyze the ADIF log file and extract worked entities"""
+    def analyze_log_file(self, save=True, verbose=True):
+        """Fold QSOs appended to the log since the last run into the analysis.
+
+        Returns the number of new QSOs.
+        """
         if not os.path.exists(self.log_file):
             print(f"⚠ Warning: {self.log_file} not found. Creating analysis without log data.")
-            return
+            return 0
         
         try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            # Columnar store persisted with the log offset it covers; each
+            # callsign is resolved once and only appended QSOs are parsed
+            if self.index is None:
+                self.index = LogIndex(self.log_file, self.state_file,
+                                      lambda call: self.extract_callsign_info(call)[0],
+                                      file_signature(self.dxcc_file))
+            added = self.index.refresh(save=save)
+            self.table = self.index.table
             
-            print(f"📊 Analyzing {len(lines)} lines from {self.log_file}")
+            if verbose:
+                print(f"📊 Analyzed {len(self.table)} QSOs from {self.log_file} ({added} new)")
             
-            for line_num, line in enumerate(lines, 1):
-                parsed = self.parse_adif_line(line)
-                if parsed:
-                    callsign = parsed['callsign']
-                    band = parsed['band']
-                    
-                    # Extract DXCC info
-                    dxcc_id, country = self.extract_callsign_info(callsign)
-                    
-                    if dxcc_id:
-                        self.worked_entities[band].add(dxcc_id)
-                        self.all_worked.add(dxcc_id)
+            # Single pass over the table; every report is a reduction of the matrix
+            self.matrix = SlotMatrix(self.table)
+            self.worked_entities.clear()
+            self.all_worked = set()
+            for bid, entities in self.matrix.entities_by_band().items():
+                self.worked_entities[BAND_NAMES[bid]] |= entities
+                self.all_worked |= entities
+            return added
                         
         except Exception as e:
             print(f"⚠ Error analyzing log file: {e}")
+            return 0
+    
+    def watch(self, interval=5.0, save_interval=60.0):
+        """Keep the cache and statistics live while the log grows"""
+        print(f"\n👀 Watching {self.log_file} (Ctrl+C to stop)")
+        last_size = -1
+        last_save = time.monotonic()
+        try:
+            while True:
+                try:
+                    size = os.path.getsize(self.log_file)
+                except OSError:
+                    size = -1
+                # Only a size change costs more than a stat() call
+                if size != last_size:
+                    last_size = size
+                    before = len(self.all_worked)
+                    if self.analyze_log_file(save=False, verbose=False):
+                        new = len(self.all_worked) - before
+                        print(f"   {datetime.now():%H:%M:%S} worked {len(self.all_worked)} entities"
+                              + (f" (+{new} new)" if new > 0 else ""))
+                        self.export_statistics()
+                if self.index and time.monotonic() - last_save >= save_interval:
+                    self.index.save()
+                    last_save = time.monotonic()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n✓ Watch stopped")
+        finally:
+            if self.index:
+                self.index.save()
     
     def get_dxcc_name(self, dxcc_id):
         """Get DXCC entity name from ID"""
-        if not self.dxcc_data:
-            return f"DXCC-{dxcc_id}"
-            
-        # Search through DXCC data to find entity name
-        for prefix, info in self.dxcc_data.items():
-            if info.get('dxcc_id') == dxcc_id:
-                return info.get('country', f"DXCC-{dxcc_id}")
-        
-        return f"DXCC-{dxcc_id}"
+        return self.dxcc_names.get(entity_id(dxcc_id), f"DXCC-{dxcc_id}")
     
     def generate_statistics(self):
         """Generate comprehensive DXCC statistics"""
@@ -121,28 +153,55 @@ class DXCCAnalyzer:
         print("📊 DXCC ANALYSIS REPORT")
         print("="*60)
         
+        matrix = self.matrix
+        
         # Overall statistics
+        available = {entity_id(info.get('dxcc_id')) for info in self.dxcc_data.values()} - {0}
         print(f"\n🔍 OVERALL STATISTICS:")
+        print(f"   Total QSOs: {len(self.table)}")
         print(f"   Total worked DXCC entities: {len(self.all_worked)}")
-        print(f"   Total available DXCC entities: {len(set(self.dxcc_data.get('dxcc_id', {}).keys())) if self.dxcc_data else 'Unknown'}")
+        print(f"   Total available DXCC entities: {len(available) if self.dxcc_data else 'Unknown'}")
         
         # Band-specific statistics
         print(f"\n📡 BAND-SPECIFIC STATISTICS:")
+        qso_counts = matrix.band_totals()
         for band in sorted(self.worked_entities.keys()):
             count = len(self.worked_entities[band])
-            print(f"   {band}: {count} entities")
+            print(f"   {band}: {count} entities ({qso_counts[BAND_NAMES.index(band)]} QSOs)")
+        
+        # DXCC Challenge band slots (160m-6m)
+        print(f"\n🏅 DXCC CHALLENGE BAND SLOTS: {matrix.slot_count(CHALLENGE_BANDS)}")
+        print("   " + "  ".join(f"{BAND_NAMES[bid]}:{matrix.slot_count((bid,))}" for bid in CHALLENGE_BANDS))
+        
+        # Per-continent coverage
+        if self.continents:
+            print(f"\n🌍 CONTINENT COVERAGE:")
+            known = Counter(self.continents.values())
+            worked = Counter(self.continents[dxcc_id] for dxcc_id in self.all_worked if dxcc_id in self.continents)
+            for continent, total in sorted(known.items()):
+                print(f"   {continent}: {worked[continent]}/{total} entities")
+        
+        # Most-needed slots: entities already worked elsewhere, missing on a challenge band
+        missing = matrix.missing_slots(CHALLENGE_BANDS)
+        if missing:
+            print(f"\n🎯 MOST-NEEDED BAND SLOTS:")
+            for dxcc_id, bid, bands in missing[:10]:
+                print(f"   {self.get_dxcc_name(dxcc_id)} (ID: {dxcc_id}) on {BAND_NAMES[bid]}"
+                      f" - worked on {bands}/{len(CHALLENGE_BANDS)} bands")
+        
+        # Per-mode breakdown
+        print(f"\n📻 MODE BREAKDOWN:")
+        for mid, (qsos, entities) in enumerate(matrix.mode_totals()):
+            if qsos:
+                print(f"   {MODE_NAMES[mid]}: {qsos} QSOs, {entities} entities")
         
         # Top entities worked
         if self.dxcc_data:
             print(f"\n🏆 TOP DXCC ENTITIES WORKED:")
-            entity_counts = Counter()
-            for band, entities in self.worked_entities.items():
-                for entity in entities:
-                    entity_counts[entity] += 1
-            
-            for entity_id, count in entity_counts.most_common(10):
-                name = self.get_dxcc_name(entity_id)
-                print(f"   {name} (ID: {entity_id}): {count} bands")
+            band_counts = Counter({dxcc_id: len(matrix.worked_bands(dxcc_id)) for dxcc_id in self.all_worked})
+            for dxcc_id, count in band_counts.most_common(10):
+                name = self.get_dxcc_name(dxcc_id)
+                print(f"   {name} (ID: {dxcc_id}): {count} bands")
     
     def generate_whitelist_recommendations(self):
         """Generate whitelist recommendations based on analysis"""
@@ -156,7 +215,8 @@ class DXCCAnalyzer:
         all_entities = set()
         for prefix, info in self.dxcc_data.items():
             if 'dxcc_id' in info:
-                all_entities.add(info['dxcc_id'])
+                all_entities.add(entity_id(info['dxcc_id']))
+        all_entities.discard(0)
         
         # Find unworked entities
         unworked = all_entities - self.all_worked
@@ -165,24 +225,21 @@ class DXCCAnalyzer:
         
         if unworked:
             print(f"\n   🔍 TOP UNWORKED ENTITIES TO TARGET:")
-            # Get entity names and sort
-            unworked_with_names = []
-            for entity_id in unworked:
-                name = self.get_dxcc_name(entity_id)
-                unworked_with_names.append((name, entity_id))
-            
-            unworked_with_names.sort()
+            # Rank by whitelist score/priority and rarity
+            recommender = Recommender(self.whitelists, self.matrix, entities=unworked)
+            unworked_with_names = [(self.get_dxcc_name(dxcc_id), dxcc_id)
+                                   for dxcc_id, _ in recommender.top_new(15)]
             
             print("   PHP Format:")
             print("   $dxcc_whitelist = array(")
-            for name, entity_id in unworked_with_names[:15]:  # Top 15
-                print(f"       \"{entity_id}\" => \"{name}\",")
+            for name, dxcc_id in unworked_with_names[:15]:  # Top 15
+                print(f"       \"{dxcc_id}\" => \"{name}\",")
             print("   );")
             
             print("\n   Python Format:")
             print("   dxcc_whitelist = {")
-            for name, entity_id in unworked_with_names[:15]:  # Top 15
-                print(f"       \"{entity_id}\": \"{name}\",")
+            for name, dxcc_id in unworked_with_names[:15]:  # Top 15
+                print(f"       \"{dxcc_id}\": \"{name}\",")
             print("   }")
     
     def export_statistics(self):
@@ -204,10 +261,20 @@ class DXCCAnalyzer:
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='ULTRON DXCC Analyzer')
+    parser.add_argument('--log', default='wsjtx_log.adi', help='ADIF log file')
+    parser.add_argument('--rebuild', action='store_true', help='ignore saved state and re-read the whole log')
+    parser.add_argument('--watch', action='store_true', help='keep the cache updated as the log grows')
+    parser.add_argument('--interval', type=float, default=5.0, help='watch polling interval in seconds')
+    args = parser.parse_args()
+    
     print("🚀 ULTRON DXCC Analyzer - Python Version")
     print("="*50)
     
     analyzer = DXCCAnalyzer()
+    analyzer.log_file = args.log
+    if args.rebuild and os.path.exists(analyzer.state_file):
+        os.remove(analyzer.state_file)
     
     # Load DXCC data
     analyzer.load_dxcc_data()
@@ -226,6 +293,9 @@ def main():
     
     print(f"\n✓ Analysis complete!")
     print(f"📁 Check worked_dxcc_cache.json for detailed statistics")
+    
+    if args.watch:
+        analyzer.watch(args.interval)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -142,8 +142,8 @@ class JTDXWebInterface {
         // 获取配置数据
         await this.getConfiguration();
         
-        // 开始定期获取解码数据
-        this.startDataPolling();
+        // 优先使用RDMA推送的解码流，不可用时回退到定期获取
+        this.startDecodeStream();
     }
     
     stopListening() {
@@ -161,6 +161,12 @@ class JTDXWebInterface {
             this.pollingInterval = null;
         }
         
+        // 关闭解码流
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+        
         this.logMessage('停止监听JTDX数据');
     }
     
@@ -288,6 +294,77 @@ class JTDXWebInterface {
         return this.decodes.filter(d => d.priority_reason === 'NEW DXCC').length;
     }
     
+    startDecodeStream() {
+        // RDMA HTTP协议的SSE解码流（/api/stream/ham），断线后浏览器用Last-Event-ID自动续传
+        const streamUrl = document.body.dataset.streamUrl ||
+            `${location.protocol}//${location.hostname}:8080/api/stream/ham`;
+        if (!window.EventSource) {
+            this.startDataPolling();
+            return;
+        }
+        
+        let opened = false;
+        this.eventSource = new EventSource(streamUrl);
+        
+        this.eventSource.onopen = () => {
+            if (!opened) {
+                opened = true;
+                this.logMessage(`已连接解码流: ${streamUrl}`);
+            }
+        };
+        
+        this.eventSource.onerror = () => {
+            // 从未连上时回退到轮询；连上过则由浏览器自动重连
+            if (!opened && this.eventSource) {
+                this.eventSource.close();
+                this.eventSource = null;
+                this.logMessage('解码流不可用，改为定期获取数据');
+                this.startDataPolling();
+            }
+        };
+        
+        // 续传位置已被覆盖或首次连接：清空后重新显示缓冲中的解码
+        this.eventSource.addEventListener('reset', (event) => {
+            const snapshot = JSON.parse(event.data);
+            this.decodesBody.innerHTML = '';
+            this.decodes = [];
+            this.applyStatus(snapshot.status);
+        });
+        
+        this.eventSource.addEventListener('decode', (event) => {
+            this.addDecodeRowFromAPI(JSON.parse(event.data));
+            if (this.decodes.length > 100) {
+                this.decodes.splice(0, this.decodes.length - 100);
+            }
+        });
+        
+        this.eventSource.addEventListener('status', (event) => {
+            this.applyStatus(JSON.parse(event.data));
+        });
+    }
+    
+    applyStatus(status) {
+        // 只更新变化的字段
+        if ('cq_active' in status) {
+            this.isCQActive = status.cq_active;
+            this.cqStatus.textContent = status.cq_active ? '发送中' : '停止';
+            this.cqStatus.style.color = status.cq_active ? '#64DD17' : '#f44336';
+            this.sendCqBtn.disabled = status.cq_active;
+            this.stopCqBtn.disabled = !status.cq_active;
+        }
+        if ('current_target' in status) {
+            this.currentCq.textContent = status.current_target || '-';
+        }
+        if (status.software) {
+            this.software = status.software;
+            this.softwareName.textContent = this.software;
+        }
+        if (status.mode) {
+            this.mode = status.mode;
+            this.modeElement.textContent = this.mode;
+        }
+    }
+    
     startDataPolling() {
         // 定期从API获取JTDX数据（与JTDX解码间隔保持一致，通常为15秒左右）
         this.pollingInterval = setInterval(async () => {
@@ -349,24 +426,7 @@ class JTDXWebInterface {
         try {
             const response = await fetch('./jtdx_api.php?action=get_status');
             const status = await response.json();
-            
-            // 更新CQ状态显示
-            this.cqStatus.textContent = status.cq_active ? '发送中' : '停止';
-            this.cqStatus.style.color = status.cq_active ? '#64DD17' : '#f44336';
-            
-            // 更新当前目标
-            this.currentCq.textContent = status.current_target || '-';
-            
-            // 根据状态更新按钮
-            this.isCQActive = status.cq_active;
-            if (status.cq_active) {
-                this.sendCqBtn.disabled = true;
-                this.stopCqBtn.disabled = false;
-            } else {
-                this.sendCqBtn.disabled = false;
-                this.stopCqBtn.disabled = true;
-            }
-            
+            this.applyStatus(Object.assign({cq_active: false, current_target: ''}, status));
         } catch (error) {
             console.error('获取状态失败:', error);
         }
@@ -9,6 +9,7 @@ import signal
 import sys
 from typing import Dict, Any, Optional, List
 from pathlib import Path
+from dataclasses import asdict
 import json
 import time
 from datetime import datetime
@@ -20,6 +21,7 @@ from .logging import RDMALogger
 from .exceptions import RDMAException, ConfigurationError
 from .tasks import TaskManager
 from .security import SecurityManager
+from .ham_radio import HamRadioProtocol
 
 
 class RDMAgent:
@@ -46,12 +48,20 @@ class RDMAgent:
         
         # Initialize core components
         self.logger = RDMALogger(self.config.logging)
-        self.protocol_manager = ProtocolManager(self.config.protocols, self.logger)
+        self.protocol_manager = ProtocolManager(
+            {name: asdict(protocol) for name, protocol in self.config.protocols.items()}, self.logger
+        )
         self.monitor = Monitor(self.config.monitoring, self.logger)
-        self.metrics_collector = MetricsCollector(self.config.metrics, self.logger)
+        self.metrics_collector = MetricsCollector(self.config.monitoring, self.logger)
         self.task_manager = TaskManager(self.config.tasks, self.logger)
         self.security_manager = SecurityManager(self.config.security, self.logger)
         
+        # Amateur radio integration; its decodes are served by the HTTP protocols
+        self.ham_radio: Optional[HamRadioProtocol] = None
+        if self.config.ham_radio.enabled:
+            self.ham_radio = HamRadioProtocol(asdict(self.config.ham_radio), self.logger)
+            self.ham_radio.attach_streams(self.protocol_manager)
+        
         # Runtime state
         self.is_running = False
         self.start_time = None
@@ -130,6 +140,10 @@ class RDMAgent:
         # Start task manager
         await self.task_manager.start()
         
+        # Start amateur radio integration
+        if self.ham_radio is not None:
+            await self.ham_radio.start()
+        
         self.logger.info("All RDMA components started successfully")
     
     async def _stop_components(self) -> None:
@@ -137,6 +151,8 @@ class RDMAgent:
         self.logger.info("Stopping RDMA components...")
         
         # Stop components in reverse order
+        if self.ham_radio is not None:
+            await self.ham_radio.stop()
         await self.task_manager.stop()
         await self.metrics_collector.stop()
         await self.monitor.stop()
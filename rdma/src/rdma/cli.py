@@ -8,20 +8,22 @@ import asyncio
 import sys
 import json
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 import click
-from rich.console import Console
+from rich.console import Console, Group, JustifyMethod
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 from rich.prompt import Prompt, Confirm
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.columns import Columns
+from rich.live import Live
 
 from .agent import RDMAgent
 from .config import ConfigManager
 from .logging import RDMALogger
 from .exceptions import RDMAException
+from .ham_monitor import MONITOR_SOCKET, DashboardState, read_frames, read_section
 from ._version import __version__
 
 
@@ -244,40 +246,124 @@ def status(ctx: click.Context) -> None:
 
 
 @ham.command()
+@click.option("--socket", "socket_path", default=MONITOR_SOCKET, show_default=True,
+              help="Monitor socket of the running agent")
 @click.pass_context
-def monitor(ctx: click.Context) -> None:
+def latency(ctx: click.Context, socket_path: str) -> None:
+    """Show decision latency histograms and slot deadline misses"""
+
+    async def _show_latency() -> None:
+        # The histograms live in the running agent; read them from its monitor feed
+        summary = await read_section("latency", socket_path)
+        if not summary:
+            console.print("[yellow]Agent closed the monitor connection[/yellow]")
+            return
+
+        table = Table(title="Decision Latency (ms since packet receipt)")
+        table.add_column("Stage", style="cyan")
+        for column in ("Count", "Mean", "p50", "p90", "p99", "Max"):
+            table.add_column(column, justify="right")
+        for stage, stats in summary["stages"].items():
+            table.add_row(stage, str(stats["count"]), f"{stats['mean_ms']:.2f}", f"{stats['p50_ms']:.2f}",
+                          f"{stats['p90_ms']:.2f}", f"{stats['p99_ms']:.2f}", f"{stats['max_ms']:.2f}")
+        console.print(table)
+
+        misses = summary["deadline_misses"]
+        color = "red" if misses else "green"
+        console.print(f"[cyan]Replies:[/cyan] {summary['replies']}")
+        console.print(f"[cyan]Slot Deadline Misses:[/cyan] [{color}]{misses}[/{color}] "
+                      f"(> {summary['deadline_s']:.1f}s into TX slot, worst {summary['worst_miss_s']:.2f}s)")
+
+    try:
+        asyncio.run(_show_latency())
+    except (FileNotFoundError, ConnectionRefusedError):
+        console.print(f"[red]No running agent at {socket_path}[/red] "
+                      "(start one with 'rdma ham start'; the monitor socket is enabled by ham_radio.monitor)")
+        sys.exit(1)
+
+
+def _render_dashboard(state: DashboardState, path: str) -> Group:
+    """Build the monitor dashboard from the current state (bounded by state.max_rows)."""
+    qso = state.qso
+    rates = state.rates
+    header = Text.assemble(
+        ("Slot ", "cyan"), (state.slot_time, "bold"),
+        ("   Packets/s ", "cyan"), (f"{rates.get('packets_per_s', 0.0):.1f}", "bold"),
+        ("   Decodes ", "cyan"), (str(rates.get("decodes", 0)), "bold"),
+        ("   TX ", "cyan"), (str(qso.get("tx_count", 0)), "bold"),
+        ("   Excluded ", "cyan"), (str(qso.get("excluded_count", 0)), "bold"),
+    )
+    
+    decodes = Table(title=f"Current Slot ({len(state.decodes)} decodes)", expand=True)
+    columns: Tuple[Tuple[str, JustifyMethod], ...] = (
+        ("SNR", "right"), ("DF", "right"), ("Mode", "left"), ("", "left"), ("Message", "left"),
+        ("DXCC", "left"))
+    for column, justify in columns:
+        decodes.add_column(column, justify=justify)
+    styles = {">>": "green", "XX": "blue", "Lo": "yellow", "--": "red"}
+    for row in state.rows():
+        decodes.add_row(str(row["snr"]), str(row["df"]), row["mode"], row["status"], row["message"],
+                        row["dxcc"], style=styles.get(row["status"]))
+    
+    calling = qso.get("current_call") or "-"
+    qso_panel = Panel(Text.assemble(
+        ("Calling: ", "cyan"), (calling, "bold green" if qso.get("sendcq") else "dim"),
+        ("  RX ", "cyan"), (str(qso.get("rx_count", 0)), ""),
+        ("  Worked ", "cyan"), (str(qso.get("worked_count", 0)), ""),
+        ("\nCandidates:", "cyan"),
+        *((f"\n  {row['snr']:>3} {row['message']}", "green") for row in state.candidates()[:8]),
+    ), title="QSO")
+    
+    latency = Table(title="Latency (ms since receipt)", expand=True)
+    latency.add_column("Stage", style="cyan")
+    for column in ("Count", "p50", "p99", "Max"):
+        latency.add_column(column, justify="right")
+    for stage, stats in state.latency.get("stages", {}).items():
+        latency.add_row(stage, str(stats["count"]), f"{stats['p50_ms']:.2f}", f"{stats['p99_ms']:.2f}",
+                        f"{stats['max_ms']:.2f}")
+    misses = state.latency.get("deadline_misses", 0)
+    footer = Text(f"Slot deadline misses: {misses}   ({path}, Ctrl+C to stop)",
+                  style="red" if misses else "dim")
+    return Group(header, decodes, Columns([qso_panel, latency], expand=True), footer)
+
+
+@ham.command()
+@click.option("--socket", "socket_path", default=MONITOR_SOCKET, show_default=True,
+              help="Monitor socket of the running agent")
+@click.option("--rows", type=int, default=30, help="Decode rows to show")
+@click.option("--fps", type=float, default=4.0, help="Dashboard redraws per second")
+@click.pass_context
+def monitor(ctx: click.Context, socket_path: str, rows: int, fps: float) -> None:
     """Monitor real-time amateur radio activity"""
     
-    console.print(Panel.fit(
-        Text("Amateur Radio Monitor", style="bold cyan"),
-        subtitle="Real-time Activity"
-    ))
+    state = DashboardState(max_rows=rows)
+    
+    async def _receive() -> None:
+        async for frame in read_frames(socket_path):
+            state.apply(frame)
     
-    console.print("[yellow]Monitoring amateur radio activity...[/yellow]")
-    console.print("[dim]Press Ctrl+C to stop[/dim]\n")
+    async def _monitor() -> None:
+        receiver = asyncio.create_task(_receive())
+        try:
+            # Redraw at a fixed rate, only when frames changed the state
+            with Live(_render_dashboard(state, socket_path), console=console, auto_refresh=False,
+                      screen=False) as live:
+                while not receiver.done():
+                    if state.dirty:
+                        state.dirty = False
+                        live.update(_render_dashboard(state, socket_path), refresh=True)
+                    await asyncio.sleep(1.0 / fps)
+            receiver.result()
+            console.print("[yellow]Agent closed the monitor connection[/yellow]")
+        finally:
+            receiver.cancel()
     
     try:
-        # This would connect to the running agent and display real-time data
-        # For now, show a placeholder
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-        ) as progress:
-            task = progress.add_task("Monitoring...", total=None)
-            
-            try:
-                while True:
-                    # Simulate monitoring
-                    progress.update(task, description="Listening for decodes...")
-                    time.sleep(2)
-                    
-                    # In a real implementation, this would show actual decodes
-                    console.print("[dim]Waiting for radio activity...[/dim]")
-                    
-            except KeyboardInterrupt:
-                progress.update(task, description="Stopping monitor...")
-                
+        asyncio.run(_monitor())
+    except (FileNotFoundError, ConnectionRefusedError):
+        console.print(f"[red]No running agent at {socket_path}[/red] "
+                      "(start one with 'rdma ham start'; the monitor socket is enabled by ham_radio.monitor)")
+        sys.exit(1)
     except KeyboardInterrupt:
         console.print("\n[yellow]Monitor stopped[/yellow]")
 
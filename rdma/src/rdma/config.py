@@ -69,6 +69,10 @@ class HamRadioConfig:
     udp_forward_port: int = 2277
     signal_threshold: int = -20  # dB
     timeout_seconds: int = 90
+    exclusion_ttl: int = 1800  # seconds a non-answering call stays excluded
+    monitor: bool = True  # serve live state to `rdma ham monitor`
+    monitor_socket: str = ""  # Unix socket path ("" = rdma-ham-monitor.sock in the temp dir)
+    stream_buffer: int = 1000  # decode/status events kept for resuming stream clients
     log_file: str = "wsjtx_log.adi"
     base_file: str = "base.json"
     auto_cq: bool = True
@@ -403,6 +407,10 @@ class ConfigManager:
                 "udp_forward_port": 2277,
                 "signal_threshold": -20,
                 "timeout_seconds": 90,
+                "exclusion_ttl": 1800,
+                "monitor": True,
+                "monitor_socket": "",
+                "stream_buffer": 1000,
                 "log_file": "wsjtx_log.adi",
                 "base_file": "base.json",
                 "auto_cq": True,
@@ -0,0 +1,274 @@
+"""
+RDMA Ham Radio Monitor Feed
+
+Publishes the amateur radio manager's live state to `rdma ham monitor`
+over a local Unix socket as newline-delimited JSON. A client first gets
+a full snapshot, then one frame per FRAME_INTERVAL carrying only what
+changed since its previous frame: decodes recorded since its cursor,
+and the QSO, counter and latency sections when their content differs.
+A burst of 200 decodes costs one frame, not 200 messages, and the
+dashboard redraws at a fixed rate whatever the decode volume.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, List, Optional, Set
+
+from .logging import RDMALogger
+
+# Default socket path shared by the agent and the monitor command
+MONITOR_SOCKET = os.path.join(tempfile.gettempdir(), "rdma-ham-monitor.sock")
+
+# Seconds between frames sent to each client
+FRAME_INTERVAL = 0.25
+
+# Decodes kept for the current slot
+MAX_SLOT_DECODES = 500
+
+
+class MonitorFeed:
+    """Decodes of the current slot plus packet counters, written by the manager."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self.seq = 0  # sequence number of the last recorded decode
+        # Decode time (ms since midnight) of the current slot
+        self.slot: Optional[int] = None
+        self.slot_seq = 0  # seq of the first decode of the current slot
+        self.decodes: Deque[Dict[str, Any]] = deque(maxlen=MAX_SLOT_DECODES)
+        self.packets = 0
+        self.decode_count = 0
+
+    def packet(self) -> None:
+        """Count a received datagram."""
+        self.packets += 1
+
+    def decode(
+        self,
+        slot: int,
+        snr: int,
+        delta_f: int,
+        mode: str,
+        message: str,
+        status: str,
+        dxcc: str,
+    ) -> None:
+        """Record a decode; a new slot time starts a new decode list."""
+        if slot != self.slot:
+            self.slot = slot
+            self.slot_seq = self.seq + 1
+            self.decodes.clear()
+        self.seq += 1
+        self.decode_count += 1
+        self.decodes.append(
+            {
+                "seq": self.seq,
+                "snr": snr,
+                "df": delta_f,
+                "mode": mode,
+                "message": message,
+                "status": status,
+                "dxcc": dxcc,
+            }
+        )
+
+
+class MonitorCursor:
+    """Per-client position in the feed and the last sent section contents."""
+
+    def __init__(self, now: float, packets: int) -> None:
+        self.seq = 0
+        self.slot: Optional[int] = None
+        self.sections: Dict[str, str] = {}
+        self.time = now
+        self.packets = packets
+
+
+def build_frame(
+    feed: MonitorFeed, cursor: MonitorCursor, sections: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Next frame for a client, or None when nothing changed."""
+    frame: Dict[str, Any] = {}
+    if cursor.slot != feed.slot:
+        # New slot (or first frame): send the whole current slot
+        frame["slot"] = feed.slot
+        frame["decodes"] = list(feed.decodes)
+        cursor.slot = feed.slot
+    elif feed.seq > cursor.seq:
+        # Decodes are appended in seq order; skip the ones already sent
+        skip = max(0, len(feed.decodes) - (feed.seq - cursor.seq))
+        frame["decodes"] = [row for i, row in enumerate(feed.decodes) if i >= skip]
+    cursor.seq = feed.seq
+
+    now = feed.clock()
+    elapsed = now - cursor.time
+    if elapsed >= 1.0:
+        sections = dict(
+            sections,
+            rates={
+                "packets_per_s": round((feed.packets - cursor.packets) / elapsed, 1),
+                "packets": feed.packets,
+                "decodes": feed.decode_count,
+            },
+        )
+        cursor.time = now
+        cursor.packets = feed.packets
+    for name, value in sections.items():
+        encoded = json.dumps(value, sort_keys=True)
+        if cursor.sections.get(name) != encoded:
+            cursor.sections[name] = encoded
+            frame[name] = value
+    return frame or None
+
+
+class MonitorServer:
+    """Serves monitor frames to local clients over a Unix socket."""
+
+    def __init__(
+        self,
+        feed: MonitorFeed,
+        sections: Callable[[], Dict[str, Any]],
+        path: str = MONITOR_SOCKET,
+        interval: float = FRAME_INTERVAL,
+        logger: Optional[RDMALogger] = None,
+    ) -> None:
+        self.feed = feed
+        self.sections = sections  # returns the qso / latency sections
+        self.path = path
+        self.interval = interval
+        self.logger = logger
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.clients: Set["asyncio.Task[None]"] = set()  # handlers of connected clients
+
+    async def start(self) -> None:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix sockets are not available on this platform")
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous run
+        self.server = await asyncio.start_unix_server(self._serve, path=self.path)
+        os.chmod(self.path, 0o600)
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            # Client handlers loop until cancelled, and wait_closed() waits for them
+            clients = list(self.clients)
+            for task in clients:
+                task.cancel()
+            await asyncio.gather(*clients, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        if task is not None:
+            self.clients.add(task)
+        cursor = MonitorCursor(self.feed.clock(), self.feed.packets)
+        try:
+            writer.write(self._encode({"type": "hello", "interval": self.interval}))
+            while True:
+                frame = build_frame(self.feed, cursor, self.sections())
+                if frame is not None:
+                    writer.write(self._encode(frame))
+                    await writer.drain()
+                await asyncio.sleep(self.interval)
+        except ConnectionError:
+            if self.logger:
+                self.logger.debug("Monitor client disconnected")
+        except asyncio.CancelledError:
+            # stop() cancels connected clients; nothing awaits this connection task,
+            # so end it normally instead of leaving a cancelled task to the server
+            pass
+        finally:
+            if task is not None:
+                self.clients.discard(task)
+            writer.close()
+
+    @staticmethod
+    def _encode(frame: Dict[str, Any]) -> bytes:
+        return (json.dumps(frame, separators=(",", ":")) + "\n").encode()
+
+
+class DashboardState:
+    """Client-side state rebuilt from monitor frames."""
+
+    def __init__(self, max_rows: int = 30) -> None:
+        self.max_rows = max_rows
+        self.slot: Optional[int] = None
+        self.decodes: List[Dict[str, Any]] = []
+        self.qso: Dict[str, Any] = {}
+        self.latency: Dict[str, Any] = {}
+        self.rates: Dict[str, Any] = {}
+        self.frames = 0
+        self.dirty = True
+
+    def apply(self, frame: Dict[str, Any]) -> None:
+        if frame.get("type") == "hello":
+            return
+        self.frames += 1
+        if "slot" in frame:
+            self.slot = frame["slot"]
+            self.decodes = []
+        if frame.get("decodes"):
+            self.decodes.extend(frame["decodes"])
+            del self.decodes[:-MAX_SLOT_DECODES]
+        for name in ("qso", "latency", "rates"):
+            if name in frame:
+                setattr(self, name, frame[name])
+        self.dirty = True
+
+    @property
+    def slot_time(self) -> str:
+        if self.slot is None:
+            return "--:--:--"
+        ms = self.slot
+        return f"{ms // 3600000 % 24:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}"
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Decodes to display (strongest first, at most max_rows)."""
+        return sorted(self.decodes, key=lambda row: -row["snr"])[: self.max_rows]
+
+    def candidates(self) -> List[Dict[str, Any]]:
+        """Stations of the current slot the manager could answer."""
+        return sorted(
+            (row for row in self.decodes if row["status"] == ">>"),
+            key=lambda row: -row["snr"],
+        )
+
+
+async def read_frames(
+    path: str = MONITOR_SOCKET,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Connect to a running agent and yield its monitor frames."""
+    reader, writer = await asyncio.open_unix_connection(path, limit=1 << 22)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            yield json.loads(line)
+    finally:
+        writer.close()
+
+
+async def read_section(name: str, path: str = MONITOR_SOCKET) -> Dict[str, Any]:
+    """Read one section (e.g. "latency") of a running agent's live state."""
+    frames = read_frames(path)
+    try:
+        async for frame in frames:
+            if frame.get("type") != "hello":
+                # The first frame carries every section in full
+                section: Dict[str, Any] = frame.get(name, {})
+                return section
+    finally:
+        await frames.aclose()
+    return {}
@@ -11,7 +11,7 @@ import socket
 import re
 import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Set
+from typing import TYPE_CHECKING, Dict, List, Optional, Any, Set, Union
 from dataclasses import dataclass, field
 from pathlib import Path
 from enum import Enum
@@ -19,6 +19,13 @@ import struct
 
 from .logging import RDMALogger
 from .exceptions import RDMAException, ProtocolError
+from .timer import EXCLUSION_TTL, ExpiringSet, Timer, TimingWheel
+from .latency import LatencyTracker, slot_start
+from .ham_monitor import MONITOR_SOCKET, MonitorFeed, MonitorServer
+from .stream import STREAM_BUFFER, EventRing
+
+if TYPE_CHECKING:
+    from .protocols import ProtocolManager
 
 
 # Constants from ULTRON
@@ -46,12 +53,11 @@ class QSOState:
     """QSO state management for amateur radio operations."""
     sendcq: bool = False
     current_call: str = ""
-    tempo: int = 0
-    tempu: int = 0
     rx_count: int = 0
     tx_count: int = 0
     mega: int = 0
-    excluded_calls: Set[str] = field(default_factory=set)
+    # The manager replaces this with an ExpiringSet so each exclusion expires on its own
+    excluded_calls: Union[Set[str], ExpiringSet] = field(default_factory=set)
     worked_calls: Set[str] = field(default_factory=set)
 
 
@@ -115,13 +121,16 @@ class ADIFProcessor:
         """Generate ADIF format data."""
         adif_entries = []
         for qso in qsos:
-            adif_entry = ""
+            parts = []
             for field, content in qso.items():
+                if field.lower() == 'eor':
+                    continue
                 content = str(content).strip()
-                field_length = len(content)
-                adif_entry += f"<{field.upper()}:{field_length}>{content} "
-            adif_entry += "<eor>"
-            adif_entries.append(adif_entry)
+                # ADIF field lengths are counted in bytes, not characters
+                field_length = len(content.encode('utf-8'))
+                parts.append(f"<{field.upper()}:{field_length}>{content} ")
+            parts.append("<eor>")
+            adif_entries.append("".join(parts))
         return adif_entries
 
 
@@ -205,8 +214,8 @@ class WSJTXProtocol:
         if packet_type != 1:  # Status packet
             raise ProtocolError(f"Not a status packet: {packet_type}")
         
-        # Parse status fields
-        offset = 32
+        # Parse status fields (id follows the 12-byte header)
+        offset = 24
         id_length = int(hex_data[offset:offset+8], 16) * 2
         offset += 8
         
@@ -236,46 +245,45 @@ class WSJTXProtocol:
         )
     
     def parse_decode_packet(self, data: bytes) -> DecodePacket:
-        """Parse decode data packet from WSJT-X."""
-        hex_data = data.hex()
-        
-        magic = int(hex_data[0:8], 16)
-        version = int(hex_data[8:16], 16)
-        packet_type = int(hex_data[16:24], 16)
+        """Parse decode data packet (type 2) from WSJT-X."""
+        if len(data) < 12:
+            raise ProtocolError("Truncated packet")
+        _magic, _schema, packet_type = struct.unpack_from('>III', data)
         
         if packet_type != 2:  # Decode packet
             raise ProtocolError(f"Not a decode packet: {packet_type}")
         
-        offset = 32
-        new_decode = int(hex_data[offset:offset+2], 16)
-        offset += 2
-        
-        # Parse decode fields
-        time_ms = int(hex_data[offset:offset+8], 16)
-        offset += 8
-        
-        snr = int.from_bytes(bytes.fromhex(hex_data[offset:offset+8]), byteorder='big', signed=True)
-        offset += 8
-        
-        mode_length = int(hex_data[offset:offset+8], 16) * 2
-        offset += 8
-        mode = bytes.fromhex(hex_data[offset:offset+mode_length]).decode('utf-8')
-        offset += mode_length
-        
-        msg_length = int(hex_data[offset:offset+8], 16) * 2
-        offset += 8
-        message = bytes.fromhex(hex_data[offset:offset+msg_length]).decode('utf-8')
+        try:
+            # Id, New, Time, SNR, Delta time, Delta frequency, Mode, Message
+            _software_id, offset = self._read_utf8(data, 12)
+            new_decode = data[offset]
+            time_ms, snr, delta_time, delta_frequency = struct.unpack_from('>IidI', data, offset + 1)
+            mode, offset = self._read_utf8(data, offset + 21)
+            message, offset = self._read_utf8(data, offset)
+        except (IndexError, struct.error) as e:
+            raise ProtocolError(f"Malformed decode packet: {e}")
         
         return DecodePacket(
             timestamp=time_ms,
             snr=snr,
-            delta_time=0.0,  # Simplified
-            delta_frequency=0,  # Simplified
+            delta_time=delta_time,
+            delta_frequency=delta_frequency,
             mode=mode,
             message=message.strip(),
             is_new=bool(new_decode)
         )
     
+    @staticmethod
+    def _read_utf8(data: bytes, offset: int) -> tuple:
+        """Read a Qt utf8 field (32-bit length, 0xffffffff = null); return (text, new offset)."""
+        length = struct.unpack_from('>I', data, offset)[0]
+        offset += 4
+        if length == 0xffffffff:
+            return "", offset
+        if offset + length > len(data):
+            raise IndexError("utf8 field past end of packet")
+        return data[offset:offset + length].decode('utf-8', errors='replace'), offset + length
+    
     def decode_mode_symbol(self, mode_symbol: str) -> str:
         """Decode mode symbol to full mode name."""
         mode_map = {
@@ -308,8 +316,26 @@ class HamRadioManager:
         self.udp_forward_port = config.get('udp_forward_port', UDP_FORWARD_PORT)
         self.signal_threshold = config.get('signal_threshold', SIGNAL_THRESHOLD)
         self.timeout_seconds = config.get('timeout_seconds', TIMEOUT_SECONDS)
+        self.exclusion_ttl = config.get('exclusion_ttl', EXCLUSION_TTL)
         self.log_file = Path(config.get('log_file', 'wsjtx_log.adi'))
         
+        # Per-call exclusion TTLs and the QSO timeout live on one timing wheel
+        self.timers = TimingWheel()
+        self.qso_state.excluded_calls = ExpiringSet(self.timers, self.exclusion_ttl)
+        self.qso_timer: Optional[Timer] = None
+        
+        # Receive -> parse/lookup/decision/send latency per decode
+        self.latency = LatencyTracker()
+        
+        # Live state for `rdma ham monitor` (served over a local Unix socket)
+        self.feed = MonitorFeed()
+        self.monitor_enabled = config.get('monitor', True)
+        self.monitor_socket = config.get('monitor_socket') or MONITOR_SOCKET
+        self.monitor_server: Optional[MonitorServer] = None
+        
+        # Decode and status deltas pushed to the web interface by the HTTP protocol
+        self.stream = EventRing(config.get('stream_buffer', STREAM_BUFFER))
+        
         # Runtime state
         self.is_running = False
         self.socket = None
@@ -357,6 +383,9 @@ class HamRadioManager:
             
             self.logger.info(f"HamRadioManager started on UDP port {self.udp_port}")
             
+            if self.monitor_enabled:
+                await self._start_monitor()
+            
         except Exception as e:
             self.logger.error(f"Failed to start HamRadioManager: {e}")
             await self.stop()
@@ -378,6 +407,10 @@ class HamRadioManager:
         if self._running_tasks:
             await asyncio.gather(*self._running_tasks, return_exceptions=True)
         
+        if self.monitor_server is not None:
+            await self.monitor_server.stop()
+            self.monitor_server = None
+        
         # Close sockets
         if self.socket:
             self.socket.close()
@@ -386,21 +419,35 @@ class HamRadioManager:
         
         self.logger.info("HamRadioManager stopped successfully")
     
+    async def _start_monitor(self) -> None:
+        """Serve live state to `rdma ham monitor`; the manager runs without it if this fails."""
+        server = MonitorServer(self.feed, self.monitor_sections, self.monitor_socket, logger=self.logger)
+        try:
+            await server.start()
+        except Exception as e:
+            self.logger.warning(f"Monitor socket unavailable ({self.monitor_socket}): {e}")
+            return
+        self.monitor_server = server
+        self.logger.info(f"Monitor socket listening on {self.monitor_socket}")
+    
     async def _main_loop(self) -> None:
         """Main processing loop for UDP packets."""
         self.logger.info("Entering main processing loop...")
+        loop = asyncio.get_running_loop()
         
         try:
             while self.is_running:
                 try:
-                    # Receive UDP packet
-                    data, addr = self.socket.recvfrom(512)
+                    # Receive UDP packet (in a worker thread so the event loop keeps serving)
+                    data, addr = await loop.run_in_executor(None, self.socket.recvfrom, 512)
+                    received = time.monotonic()
                     
                     # Forward packet
                     self.forward_socket.sendto(data, ('127.0.0.1', self.udp_forward_port))
                     
                     # Process packet
-                    await self._process_packet(data, addr)
+                    await self._process_packet(data, addr, received)
+                    await self._check_timeouts()
                     
                 except socket.timeout:
                     # Check timeouts
@@ -415,26 +462,28 @@ class HamRadioManager:
         finally:
             self.logger.info("Exiting main processing loop")
     
-    async def _process_packet(self, data: bytes, addr: tuple) -> None:
-        """Process a received UDP packet."""
+    async def _process_packet(self, data: bytes, addr: tuple, received: Optional[float] = None) -> None:
+        """Process a received UDP packet (received is the monotonic receive time)."""
         try:
+            self.feed.packet()
             hex_data = data.hex()
             packet_type = hex_data[16:24]
             
             if packet_type == "00000002":  # Decode packet
-                await self._handle_decode_packet(data, addr)
-            elif packet_type == "00000000":  # Status packet
-                await self._handle_status_packet(data, addr)
-            elif packet_type == "00000001":  # Status packet (alternative)
+                await self._handle_decode_packet(data, addr, received)
+            elif packet_type == "00000000":  # Heartbeat packet
+                await self._handle_heartbeat_packet(addr)
+            elif packet_type == "00000001":  # Status packet
                 await self._handle_status_packet(data, addr)
                 
         except Exception as e:
             self.logger.error(f"Error processing packet: {e}")
     
-    async def _handle_decode_packet(self, data: bytes, addr: tuple) -> None:
+    async def _handle_decode_packet(self, data: bytes, addr: tuple, received: Optional[float] = None) -> None:
         """Handle decode packet from radio software."""
         try:
             decode_packet = self.wsjtx_protocol.parse_decode_packet(data)
+            self.latency.record('parse', received, time.monotonic())
             
             # Update RX count
             self.qso_state.rx_count += 1
@@ -452,30 +501,36 @@ class HamRadioManager:
             
             # Get DXCC info
             dxcc_info = self.dxcc_db.locate_call(parts[1])
+            self.latency.record('lookup', received, time.monotonic())
             
             # Determine QSO status
             status = self._determine_qso_status(parts, decode_packet.snr, dxcc_info)
             
             # Log the decode
             self._log_decode(decode_packet, parts, dxcc_info, status)
+            self.feed.decode(decode_packet.timestamp, decode_packet.snr, decode_packet.delta_frequency,
+                             decode_packet.mode, message, status["status"], dxcc_info.get('name', 'Unknown'))
+            self._publish_decode(decode_packet, parts, dxcc_info, status)
             
             # Handle response logic
-            await self._handle_response_logic(parts, status, dxcc_info)
+            await self._handle_response_logic(parts, status, dxcc_info, received)
+            self._publish_status()
             
         except Exception as e:
             self.logger.error(f"Error handling decode packet: {e}")
     
+    async def _handle_heartbeat_packet(self, addr: tuple) -> None:
+        """Handle heartbeat packet (sent every 15 s; it carries no status)."""
+        self.logger.debug(f"Received heartbeat packet from {addr}")
+    
     async def _handle_status_packet(self, data: bytes, addr: tuple) -> None:
         """Handle status packet from radio software."""
         try:
             # Parse status (simplified for now)
             self.logger.debug(f"Received status packet from {addr}")
-            
-            # Check for transmission state changes
-            current_minute = datetime.utcnow().minute
-            if current_minute in [0, 30]:
-                # Clear exclusion list every 30 minutes
-                self.qso_state.excluded_calls.clear()
+            status_packet = self.wsjtx_protocol.parse_status_packet(data)
+            self.stream.update_status(software=status_packet.software, mode=status_packet.mode,
+                                      frequency=status_packet.frequency)
                 
         except Exception as e:
             self.logger.error(f"Error handling status packet: {e}")
@@ -516,8 +571,31 @@ class HamRadioManager:
         log_message = f"{time_str} {snr_str} {df_str} {mode_str} {status_str} {message_str} - {dxcc_name}"
         self.logger.info(f"DECODE: {log_message}")
     
+    def _publish_decode(self, decode_packet: DecodePacket, parts: List[str],
+                        dxcc_info: Dict[str, str], status: Dict[str, str]) -> None:
+        """Push a decode to stream clients (fields as used by the web interface)."""
+        ms = decode_packet.timestamp
+        self.stream.publish("decode", {
+            "time": f"{ms // 3600000 % 24:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}",
+            "snr": decode_packet.snr,
+            "deltaF": decode_packet.delta_frequency,
+            "mode": decode_packet.mode,
+            "status": status["status"],
+            "message": decode_packet.message.strip(),
+            "call": parts[1],
+            "dxcc": dxcc_info.get('name', 'Unknown'),
+            "priority_reason": status["description"] if status["status"] == ">>" else "",
+        })
+    
+    def _publish_status(self) -> None:
+        """Push changed QSO state fields to stream clients."""
+        self.stream.update_status(
+            cq_active=self.qso_state.sendcq,
+            current_target=self.qso_state.current_call,
+        )
+    
     async def _handle_response_logic(self, parts: List[str], status: Dict[str, str], 
-                                   dxcc_info: Dict[str, str]) -> None:
+                                   dxcc_info: Dict[str, str], received: Optional[float] = None) -> None:
         """Handle automatic response logic."""
         call = parts[1]
         
@@ -525,18 +603,20 @@ class HamRadioManager:
         if status["status"] == ">>" and not self.qso_state.sendcq:
             self.qso_state.current_call = call
             self.qso_state.sendcq = True
-            self.qso_state.tempo = int(time.time())
-            self.qso_state.tempu = self.qso_state.tempo + self.timeout_seconds
+            if self.qso_timer is not None:
+                self.qso_timer.cancel()
+            self.qso_timer = self.timers.schedule(self.timeout_seconds, self._qso_timeout)
+            self.latency.record('decision', received, time.monotonic())
             
             self.logger.info(f"Auto-responding to {call} ({dxcc_info.get('name', 'Unknown')})")
-            await self._send_reply(call, self._generate_reply_message(call))
+            await self._send_reply(call, self._generate_reply_message(call), received)
     
     def _generate_reply_message(self, call: str) -> str:
         """Generate reply message for a callsign."""
         # Simplified reply generation
         return f"{call} <my_call> <my_grid>"
     
-    async def _send_reply(self, call: str, message: str) -> None:
+    async def _send_reply(self, call: str, message: str, received: Optional[float] = None) -> None:
         """Send reply message via UDP."""
         try:
             # This would need proper WSJT-X protocol implementation
@@ -544,18 +624,28 @@ class HamRadioManager:
             # Implementation would create proper WSJT-X packet here
         except Exception as e:
             self.logger.error(f"Error sending reply: {e}")
+            return
+        sent = time.monotonic()
+        self.latency.record('send', received, sent)
+        late = self.latency.reply_sent(sent, slot_start(received) if received is not None else None)
+        if late is not None:
+            self.logger.warning(f"Reply to {call} missed the TX slot by {late:.2f}s "
+                                f"({self.latency.deadline_misses} misses)")
     
     async def _check_timeouts(self) -> None:
-        """Check for QSO timeouts."""
-        if self.qso_state.sendcq and self.qso_state.tempu:
-            current_time = int(time.time())
-            if current_time > self.qso_state.tempu:
-                self.logger.info(f"QSO timeout for {self.qso_state.current_call}")
-                self.qso_state.excluded_calls.add(self.qso_state.current_call)
-                self.qso_state.sendcq = False
-                self.qso_state.current_call = ""
-                self.qso_state.tempo = 0
-                self.qso_state.tempu = 0
+        """Run expired timers (QSO timeout, exclusion expiry)."""
+        self.timers.advance()
+    
+    def _qso_timeout(self) -> None:
+        """The called station did not answer in time; exclude it for exclusion_ttl."""
+        self.qso_timer = None
+        if not self.qso_state.sendcq:
+            return
+        self.logger.info(f"QSO timeout for {self.qso_state.current_call}")
+        self.qso_state.excluded_calls.add(self.qso_state.current_call)
+        self.qso_state.sendcq = False
+        self.qso_state.current_call = ""
+        self._publish_status()
     
     def get_status(self) -> Dict[str, Any]:
         """Get amateur radio manager status."""
@@ -565,6 +655,7 @@ class HamRadioManager:
             "udp_forward_port": self.udp_forward_port,
             "signal_threshold": self.signal_threshold,
             "timeout_seconds": self.timeout_seconds,
+            "exclusion_ttl": self.exclusion_ttl,
             "qso_state": {
                 "sendcq": self.qso_state.sendcq,
                 "current_call": self.qso_state.current_call,
@@ -573,9 +664,28 @@ class HamRadioManager:
                 "excluded_count": len(self.qso_state.excluded_calls),
                 "worked_count": len(self.qso_state.worked_calls)
             },
-            "log_file": str(self.log_file)
+            "log_file": str(self.log_file),
+            "latency": self.latency.summary()
         }
     
+    def monitor_sections(self) -> Dict[str, Any]:
+        """QSO and latency sections of the monitor feed."""
+        return {
+            "qso": {
+                "sendcq": self.qso_state.sendcq,
+                "current_call": self.qso_state.current_call,
+                "rx_count": self.qso_state.rx_count,
+                "tx_count": self.qso_state.tx_count,
+                "excluded_count": len(self.qso_state.excluded_calls),
+                "worked_count": len(self.qso_state.worked_calls),
+            },
+            "latency": self.latency.summary(),
+        }
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get decision latency metrics."""
+        return {"latency": self.latency.summary()}
+    
     def get_dxcc_info(self, call: str) -> Dict[str, str]:
         """Get DXCC information for a callsign."""
         return self.dxcc_db.locate_call(call)
@@ -623,6 +733,10 @@ class HamRadioProtocol:
         """Stop the amateur radio protocol handler."""
         await self.manager.stop()
     
+    def attach_streams(self, protocol_manager: "ProtocolManager") -> None:
+        """Publish decodes and status at /api/stream/ham and /api/ws/ham."""
+        protocol_manager.attach_stream("ham", self.manager.stream)
+    
     def get_status(self) -> Dict[str, Any]:
         """Get protocol status."""
         return {
@@ -650,6 +764,9 @@ class HamRadioProtocol:
         elif command == "get_status":
             return self.manager.get_status()
         
+        elif command == "get_metrics":
+            return self.manager.get_metrics()
+        
         else:
             raise RDMAException(f"Unknown ham radio command: {command}")
     
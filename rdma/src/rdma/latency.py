@@ -0,0 +1,209 @@
+"""
+RDMA Decision Latency
+
+Measures how long each decode takes from datagram arrival to the reply
+decision and send. Monotonic timestamps taken at receive, parse, lookup,
+decision and send feed one HDR-style histogram per stage (log-linear
+buckets, ~3% relative error, O(1) record, fixed memory). Replies sent
+more than SLOT_DEADLINE seconds into the TX slot are counted as misses.
+"""
+
+import math
+import time
+from array import array
+from typing import Dict, List, Optional, TypedDict
+
+# Stages, each measured from packet receipt
+STAGES = ("parse", "lookup", "decision", "send")
+
+# A reply is only useful if sent within this many seconds of the TX slot start
+SLOT_DEADLINE = 1.5
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS  # linear sub-buckets per power of two
+LINEAR = SUB_BUCKETS * 2  # one bucket per microsecond below 64 us
+MAX_MICROS = (1 << 30) - 1  # ~17.9 minutes; larger values are clamped
+BUCKETS = LINEAR + SUB_BUCKETS * (MAX_MICROS.bit_length() - SUB_BUCKET_BITS - 1)
+
+
+class StageSummary(TypedDict):
+    """Latency of one stage in milliseconds."""
+
+    count: int
+    mean_ms: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class LatencySummary(TypedDict):
+    """Per-stage latency and slot deadline misses."""
+
+    stages: Dict[str, StageSummary]
+    replies: int
+    deadline_misses: int
+    deadline_s: float
+    worst_miss_s: float
+
+
+def slot_start(
+    received: float,
+    period: float = 15.0,
+    deadline: float = SLOT_DEADLINE,
+    clock_offset: Optional[float] = None,
+) -> float:
+    """Monotonic start of the TX slot that a decode received at received answers in.
+
+    Decodes arrive near the end of their RX slot (or shortly after it), so the
+    target is the first slot boundary no earlier than received - deadline.
+    """
+    offset = time.time() - time.monotonic() if clock_offset is None else clock_offset
+    utc = received - deadline + offset
+    return math.ceil(utc / period - 1e-9) * period - offset
+
+
+def bucket_index(micros: int) -> int:
+    """Bucket index for a value in microseconds."""
+    if micros < LINEAR:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    return LINEAR + (shift - 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+
+def bucket_high(index: int) -> int:
+    """Highest value (microseconds) that maps to the bucket."""
+    if index < LINEAR:
+        return index
+    shift, sub = divmod(index - LINEAR, SUB_BUCKETS)
+    return ((sub + SUB_BUCKETS + 1) << (shift + 1)) - 1
+
+
+class LatencyHistogram:
+    """HDR-style latency histogram.
+
+    Records and reports seconds with microsecond resolution.
+    """
+
+    def __init__(self) -> None:
+        self.counts = array("Q", bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0  # microseconds
+        self.min = 0
+        self.max = 0
+
+    def record(self, seconds: float) -> None:
+        micros = min(MAX_MICROS, max(0, int(seconds * 1e6)))
+        self.counts[bucket_index(micros)] += 1
+        if not self.count or micros < self.min:
+            self.min = micros
+        if micros > self.max:
+            self.max = micros
+        self.count += 1
+        self.total += micros
+
+    def percentile(self, p: float) -> float:
+        """The p-th percentile (0-100) in seconds.
+
+        Reports the bucket high so it never underestimates.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(self.count * p / 100.0 + 0.999999))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= rank:
+                    return min(bucket_high(index), self.max) / 1e6
+        return self.max / 1e6
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count / 1e6 if self.count else 0.0
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if not other.count:
+            return
+        for index, n in enumerate(other.counts):
+            if n:
+                self.counts[index] += n
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def reset(self) -> None:
+        self.counts = array("Q", bytes(8 * BUCKETS))
+        self.count = self.total = self.min = self.max = 0
+
+    def summary(self) -> StageSummary:
+        """Count and percentiles in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.mean * 1e3, 3),
+            "p50_ms": round(self.percentile(50) * 1e3, 3),
+            "p90_ms": round(self.percentile(90) * 1e3, 3),
+            "p99_ms": round(self.percentile(99) * 1e3, 3),
+            "max_ms": round(self.max / 1e3, 3),
+        }
+
+
+class LatencyTracker:
+    """Per-stage latency histograms and slot deadline miss counter."""
+
+    def __init__(self, deadline: float = SLOT_DEADLINE):
+        self.deadline = deadline
+        self.stages: Dict[str, LatencyHistogram] = {
+            stage: LatencyHistogram() for stage in STAGES
+        }
+        self.replies = 0
+        self.deadline_misses = 0
+        self.worst_miss = 0.0  # seconds past the slot start of the worst miss
+
+    def record(self, stage: str, received: Optional[float], now: float) -> None:
+        """Record the time from received to now for stage (None received is ignored)."""
+        if received is not None:
+            self.stages[stage].record(now - received)
+
+    def reply_sent(self, sent: float, slot_start: Optional[float]) -> Optional[float]:
+        """Count a sent reply.
+
+        Returns the seconds past the TX slot start if it missed the deadline.
+        """
+        self.replies += 1
+        if slot_start is None:
+            return None
+        late = sent - slot_start
+        if late <= self.deadline:
+            return None
+        self.deadline_misses += 1
+        self.worst_miss = max(self.worst_miss, late)
+        return late
+
+    def summary(self) -> LatencySummary:
+        return {
+            "stages": {stage: hist.summary() for stage, hist in self.stages.items()},
+            "replies": self.replies,
+            "deadline_misses": self.deadline_misses,
+            "deadline_s": self.deadline,
+            "worst_miss_s": round(self.worst_miss, 3),
+        }
+
+    def report_lines(self) -> List[str]:
+        """Summary table for terminal output."""
+        lines = [
+            f"{'stage':<10}{'count':>8}{'mean':>10}{'p50':>10}"
+            f"{'p90':>10}{'p99':>10}{'max':>10}  (ms)"
+        ]
+        for stage, hist in self.stages.items():
+            s = hist.summary()
+            lines.append(
+                f"{stage:<10}{s['count']:>8}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}"
+                f"{s['p90_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}"
+            )
+        lines.append(
+            f"replies {self.replies}, slot deadline misses {self.deadline_misses} "
+            f"(> {self.deadline:.1f}s into TX slot)"
+        )
+        return lines
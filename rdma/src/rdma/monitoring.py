@@ -48,7 +48,7 @@ class MetricsCollector:
     def __init__(self, config: MonitoringConfig, logger: RDMALogger):
         self.config = config
         self.logger = logger
-        self.metrics_logger = MetricsLogger(config)
+        self.metrics_logger = MetricsLogger(logger.config)
         self.metrics_history: List[Dict[str, Any]] = []
         self.max_history_size = 1000
         self.is_collecting = False
@@ -118,8 +118,8 @@ class MetricsCollector:
         """Collect current system metrics."""
         timestamp = time.time()
         
-        # CPU usage
-        cpu_percent = psutil.cpu_percent(interval=1)
+        # CPU usage since the previous call (a sampling interval would block the event loop)
+        cpu_percent = psutil.cpu_percent(interval=None)
         
         # Memory usage
         memory = psutil.virtual_memory()
@@ -328,7 +328,7 @@ class Monitor:
     
     async def _check_cpu(self) -> Dict[str, Any]:
         """Check CPU usage."""
-        cpu_percent = psutil.cpu_percent(interval=1)
+        cpu_percent = psutil.cpu_percent(interval=None)  # non-blocking, since the previous call
         threshold = self.config.thresholds.get("cpu_percent", 80.0)
         
         status = "healthy"
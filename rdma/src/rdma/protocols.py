@@ -8,7 +8,7 @@ import asyncio
 import json
 import ssl
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, Callable, List, Union
+from typing import Dict, Any, Optional, Callable, List, Set, Tuple, Union
 from dataclasses import dataclass
 import aiohttp
 import aiofiles
@@ -20,6 +20,7 @@ from websockets.exceptions import WebSocketException
 
 from .exceptions import ProtocolError, ConnectionError, AuthenticationError
 from .logging import RDMALogger
+from .stream import KEEPALIVE_INTERVAL, EventRing, format_sse
 
 
 @dataclass
@@ -220,6 +221,15 @@ class HTTPProtocol(ProtocolBase):
         self.runner: Optional[web.AppRunner] = None
         self.site: Optional[web.TCPSite] = None
         self._session: Optional[aiohttp.ClientSession] = None
+        self.streams: Dict[str, EventRing] = {}
+        self._stream_clients: Set["asyncio.Task[Any]"] = set()
+    
+    def attach_stream(self, name: str, ring: EventRing) -> None:
+        """Serve an event ring over SSE and WebSocket.
+
+        The endpoints are /api/stream/{name} and /api/ws/{name}.
+        """
+        self.streams[name] = ring
     
     async def connect(self) -> None:
         """Start HTTP server."""
@@ -261,6 +271,9 @@ class HTTPProtocol(ProtocolBase):
     async def disconnect(self) -> None:
         """Stop HTTP server."""
         try:
+            # Stream handlers would otherwise only notice the shutdown at their next keepalive
+            for task in self._stream_clients:
+                task.cancel()
             if self.site:
                 await self.site.stop()
             if self.runner:
@@ -296,17 +309,24 @@ class HTTPProtocol(ProtocolBase):
     
     def _setup_routes(self) -> None:
         """Set up HTTP routes."""
+        assert self.app is not None, "connect() creates the application first"
+        router = self.app.router
+        
         # Health check endpoint
-        self.app.router.add_get('/health', self._health_handler)
+        router.add_get('/health', self._health_handler)
         
         # Message endpoint
-        self.app.router.add_post('/api/message', self._message_handler)
+        router.add_post('/api/message', self._message_handler)
         
         # Status endpoint
-        self.app.router.add_get('/api/status', self._status_handler)
+        router.add_get('/api/status', self._status_handler)
         
         # Metrics endpoint
-        self.app.router.add_get('/api/metrics', self._metrics_handler)
+        router.add_get('/api/metrics', self._metrics_handler)
+        
+        # Event stream endpoints
+        router.add_get('/api/stream/{name}', self._stream_handler)
+        router.add_get('/api/ws/{name}', self._websocket_handler)
     
     async def _health_handler(self, request: web.Request) -> web.Response:
         """Health check handler."""
@@ -333,6 +353,76 @@ class HTTPProtocol(ProtocolBase):
         # This would integrate with metrics collector
         return web.json_response({"metrics": "available"})
     
+    def _stream_request(self, request: web.Request) -> Tuple[EventRing, int]:
+        """Event ring and resume position of a stream request."""
+        ring = self.streams.get(request.match_info["name"])
+        if ring is None:
+            raise web.HTTPNotFound(text="Unknown stream")
+        since = request.query.get("since") or request.headers.get("Last-Event-ID")
+        try:
+            return ring, int(since) if since is not None else -1
+        except ValueError:
+            raise web.HTTPBadRequest(text="Invalid sequence number")
+    
+    async def _stream_handler(self, request: web.Request) -> web.StreamResponse:
+        """Server-Sent Events stream; resumes after Last-Event-ID or ?since=."""
+        ring, seq = self._stream_request(request)
+        options = self.config.options or {}
+        response = web.StreamResponse(
+            headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+                "Access-Control-Allow-Origin": options.get("cors_origin", "*"),
+            }
+        )
+        await response.prepare(request)
+        task = self._track_stream_client()
+        try:
+            await response.write(b"retry: 2000\n\n")
+            while True:
+                events = ring.batch(seq)
+                if events:
+                    seq = events[-1]["seq"]
+                    await response.write(format_sse(events))
+                elif not await ring.wait(seq, KEEPALIVE_INTERVAL):
+                    await response.write(b": keepalive\n\n")
+        except ConnectionResetError:
+            # Client went away; cancellation (server shutdown) propagates
+            pass
+        finally:
+            self._stream_clients.discard(task)
+        return response
+    
+    async def _websocket_handler(self, request: web.Request) -> web.WebSocketResponse:
+        """WebSocket stream; each message is a JSON list of events."""
+        ring, seq = self._stream_request(request)
+        ws = web.WebSocketResponse(heartbeat=KEEPALIVE_INTERVAL)
+        await ws.prepare(request)
+        task = self._track_stream_client()
+        try:
+            while not ws.closed:
+                events = ring.batch(seq)
+                if events:
+                    seq = events[-1]["seq"]
+                    await ws.send_str(json.dumps(events, separators=(",", ":")))
+                else:
+                    await ring.wait(seq, KEEPALIVE_INTERVAL)
+        except ConnectionResetError:
+            pass
+        except asyncio.CancelledError:
+            await ws.close()
+            raise
+        finally:
+            self._stream_clients.discard(task)
+        return ws
+    
+    def _track_stream_client(self) -> "asyncio.Task[Any]":
+        """Register the running stream handler so disconnect() can end it."""
+        task = asyncio.current_task()
+        assert task is not None, "stream handlers run in a task"
+        self._stream_clients.add(task)
+        return task
+    
     def _create_ssl_context(self) -> ssl.SSLContext:
         """Create SSL context for HTTPS."""
         context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
@@ -491,6 +581,14 @@ class ProtocolManager:
         self.logger = logger
         self.protocols: Dict[str, ProtocolBase] = {}
         self._running_protocols: List[str] = []
+        self.streams: Dict[str, EventRing] = {}
+    
+    def attach_stream(self, name: str, ring: EventRing) -> None:
+        """Serve an event ring from every HTTP protocol, including later ones."""
+        self.streams[name] = ring
+        for protocol in self.protocols.values():
+            if isinstance(protocol, HTTPProtocol):
+                protocol.attach_stream(name, ring)
     
     async def start(self) -> None:
         """Start all configured protocols."""
@@ -528,10 +626,14 @@ class ProtocolManager:
         )
         
         # Create protocol instance based on type
+        protocol: ProtocolBase
         if protocol_type == "mqtt":
             protocol = MQTTProtocol(protocol_config, self.logger)
         elif protocol_type == "http":
-            protocol = HTTPProtocol(protocol_config, self.logger)
+            http = HTTPProtocol(protocol_config, self.logger)
+            for stream_name, ring in self.streams.items():
+                http.attach_stream(stream_name, ring)
+            protocol = http
         elif protocol_type == "websocket":
             protocol = WebSocketProtocol(protocol_config, self.logger)
         else:
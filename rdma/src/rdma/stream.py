@@ -0,0 +1,98 @@
+"""
+RDMA Event Stream
+
+In-memory ring buffer of sequenced events (decodes, status deltas) that the
+HTTP protocol pushes to browsers over Server-Sent Events or WebSocket.
+Every event gets the next sequence number; a client that reconnects with
+its last seen sequence (SSE Last-Event-ID or ?since=) gets exactly the
+events it missed. When those have already been overwritten it receives a
+"reset" event with the current status and everything still buffered.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Events kept for resuming clients
+STREAM_BUFFER = 1000
+
+# Seconds between SSE keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15.0
+
+
+class EventRing:
+    """Sequenced event ring buffer with the latest status kept aside."""
+
+    def __init__(self, size: int = STREAM_BUFFER):
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self.seq = 0
+        self.status: Dict[str, Any] = {}
+        self._changed: Optional[asyncio.Event] = None
+
+    def publish(self, kind: str, data: Dict[str, Any]) -> int:
+        """Append an event and wake waiting clients; returns its sequence number."""
+        self.seq += 1
+        self.events.append({"seq": self.seq, "type": kind, "data": data})
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+        return self.seq
+
+    def update_status(self, **fields: Any) -> Optional[int]:
+        """Publish a status event with only the fields that changed."""
+        delta = {
+            key: value
+            for key, value in fields.items()
+            if self.status.get(key, object()) != value
+        }
+        if not delta:
+            return None
+        self.status.update(delta)
+        return self.publish("status", delta)
+
+    def since(self, seq: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Events after seq, and False when some of them were already overwritten."""
+        if seq >= self.seq:
+            return [], True
+        missed = self.seq - seq
+        if missed > len(self.events):
+            return list(self.events), False
+        start = len(self.events) - missed
+        return [self.events[i] for i in range(start, len(self.events))], True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Reset event data: current status and the oldest buffered sequence."""
+        return {
+            "status": dict(self.status),
+            "first_seq": self.events[0]["seq"] if self.events else self.seq + 1,
+        }
+
+    def batch(self, seq: int) -> List[Dict[str, Any]]:
+        """Events to send a client positioned at seq (prefixed by a reset on a gap)."""
+        events, complete = self.since(seq)
+        if not complete or seq < 0:
+            first = events[0]["seq"] - 1 if events else self.seq
+            return [{"seq": first, "type": "reset", "data": self.snapshot()}] + events
+        return events
+
+    async def wait(self, seq: int, timeout: float) -> bool:
+        """Wait until an event after seq is published; False on timeout."""
+        if self.seq > seq:
+            return True
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+def format_sse(events: List[Dict[str, Any]]) -> bytes:
+    """Encode events as one Server-Sent Events chunk."""
+    return "".join(
+        f"id: {event['seq']}\nevent: {event['type']}\n"
+        f"data: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+        for event in events
+    ).encode()
@@ -0,0 +1,203 @@
+"""
+RDMA Timing Wheel
+
+Hierarchical timing wheel (4 levels x 64 slots, 0.1 s ticks) with O(1)
+insert and cancel. Used for per-callsign exclusion TTLs, QSO timeouts
+and periodic jobs instead of clearing state on a wall-clock minute.
+"""
+
+import math
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Set
+
+TICK = 0.1
+WHEEL_BITS = 6
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+LEVELS = 4
+
+# Stations that did not answer are excluded for 30 minutes by default
+EXCLUSION_TTL = 1800.0
+
+
+class Timer:
+    """A scheduled callback (created by TimingWheel.schedule)."""
+
+    __slots__ = ("wheel", "expires", "callback", "args", "interval", "bucket")
+
+    def __init__(
+        self,
+        wheel: "TimingWheel",
+        expires: int,
+        callback: Callable,
+        args: tuple,
+        interval: int,
+    ):
+        self.wheel = wheel
+        self.expires = expires  # expiry tick
+        self.callback = callback
+        self.args = args
+        self.interval = interval  # period in ticks, 0 for one-shot
+        self.bucket: Optional[Set["Timer"]] = None
+
+    @property
+    def active(self) -> bool:
+        return self.bucket is not None
+
+    def cancel(self) -> None:
+        """Cancel the timer in O(1)."""
+        if self.bucket is not None:
+            self.bucket.discard(self)
+            self.bucket = None
+            self.wheel.count -= 1
+
+
+class TimingWheel:
+    """Hierarchical timing wheel driven by a monotonic clock by default."""
+
+    def __init__(self, tick: float = TICK, clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self.wheels: List[List[Set[Timer]]] = [
+            [set() for _ in range(WHEEL_SIZE)] for _ in range(LEVELS)
+        ]
+        self.overflow: Set[Timer] = set()  # beyond the top level
+        self.current = self._ticks(clock())
+        self.count = 0
+
+    def _ticks(self, when: float) -> int:
+        return int(when / self.tick)
+
+    def _expiry(self, when: float) -> int:
+        """Expiry tick, rounded up so a timer never fires early."""
+        return math.ceil(when / self.tick - 1e-9)
+
+    def _place(self, timer: Timer) -> None:
+        delta = timer.expires - self.current
+        for level in range(LEVELS):
+            if delta < 1 << (WHEEL_BITS * (level + 1)):
+                bucket = self.wheels[level][
+                    (timer.expires >> (WHEEL_BITS * level)) & WHEEL_MASK
+                ]
+                break
+        else:
+            bucket = self.overflow
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def _add(
+        self, expires: int, callback: Callable, args: tuple, interval: int = 0
+    ) -> Timer:
+        # The current tick has already been processed; fire on the next one at the
+        # earliest
+        timer = Timer(self, max(expires, self.current + 1), callback, args, interval)
+        self._place(timer)
+        self.count += 1
+        return timer
+
+    def schedule_at(self, when: float, callback: Callable, *args: Any) -> Timer:
+        """Call callback(*args) once the clock reaches when."""
+        return self._add(self._expiry(when), callback, args)
+
+    def schedule(self, delay: float, callback: Callable, *args: Any) -> Timer:
+        """Call callback(*args) after delay seconds."""
+        return self._add(self._expiry(self.clock() + delay), callback, args)
+
+    def every(self, interval: float, callback: Callable, *args: Any) -> Timer:
+        """Call callback(*args) every interval seconds."""
+        ticks = max(1, int(round(interval / self.tick)))
+        return self._add(self._ticks(self.clock()) + ticks, callback, args, ticks)
+
+    def _cascade(self, level: int) -> None:
+        """Move the timers in the current slot of level down to lower levels."""
+        index = (self.current >> (WHEEL_BITS * level)) & WHEEL_MASK
+        bucket = self.wheels[level][index]
+        if bucket:
+            self.wheels[level][index] = set()
+            for timer in bucket:
+                self._place(timer)
+        if index == 0:
+            if level + 1 < LEVELS:
+                self._cascade(level + 1)
+            elif self.overflow:
+                overflow, self.overflow = self.overflow, set()
+                for timer in overflow:
+                    self._place(timer)
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Advance to now (default: the clock) and run expired timers.
+
+        Returns how many timers fired.
+        """
+        target = self._ticks(self.clock() if now is None else now)
+        fired = 0
+        while self.current < target:
+            if not self.count:
+                self.current = target  # nothing scheduled, jump straight ahead
+                break
+            self.current += 1
+            index = self.current & WHEEL_MASK
+            if index == 0:
+                self._cascade(1)
+            # Pop timers one at a time: a callback may cancel others in the bucket
+            bucket = self.wheels[0][index]
+            while bucket:
+                timer = bucket.pop()
+                timer.bucket = None
+                if timer.interval:
+                    timer.expires += timer.interval
+                    self._place(timer)
+                else:
+                    self.count -= 1
+                try:
+                    timer.callback(*timer.args)
+                except BaseException:
+                    # Leave the rest of the bucket in place and process this tick
+                    # again on the next advance
+                    self.current -= 1
+                    raise
+                fired += 1
+        return fired
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class ExpiringSet:
+    """Set whose members expire individually (e.g. per-callsign exclusions)."""
+
+    def __init__(self, wheel: TimingWheel, ttl: float = EXCLUSION_TTL):
+        self.wheel = wheel
+        self.ttl = ttl
+        self.timers: Dict[Hashable, Timer] = {}
+
+    def add(self, item: Hashable, ttl: Optional[float] = None) -> None:
+        """Add item, restarting its TTL if it is already present."""
+        timer = self.timers.get(item)
+        if timer is not None:
+            timer.cancel()
+        self.timers[item] = self.wheel.schedule(
+            self.ttl if ttl is None else ttl, self._expire, item
+        )
+
+    def _expire(self, item: Hashable) -> None:
+        self.timers.pop(item, None)
+
+    def discard(self, item: Hashable) -> None:
+        timer = self.timers.pop(item, None)
+        if timer is not None:
+            timer.cancel()
+
+    def clear(self) -> None:
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+
+    def __contains__(self, item: object) -> bool:
+        return item in self.timers
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self.timers))
+
+    def __len__(self) -> int:
+        return len(self.timers)
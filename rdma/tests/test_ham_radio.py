@@ -6,15 +6,22 @@ import pytest
 import asyncio
 import tempfile
 import json
+import socket
+import struct
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 
+import aiohttp
+
 from rdma.ham_radio import (
     ADIFProcessor, CallsignValidator, DXCCDatabase, WSJTXProtocol,
     HamRadioManager, HamRadioProtocol, QSOState, DecodePacket
 )
+from rdma.ham_monitor import MonitorFeed, MonitorCursor, MonitorServer, DashboardState, build_frame, read_frames, read_section
+from rdma.stream import EventRing, format_sse
 from rdma.logging import RDMALogger
 from rdma.config import LoggingConfig
+from rdma.agent import RDMAgent
 
 
 class TestADIFProcessor:
@@ -69,6 +76,15 @@ class TestADIFProcessor:
         assert 'FN42' in result[0]
         assert '<eor>' in result[0]
 
+    def test_generate_adif_byte_length(self):
+        """Test ADIF field lengths are counted in bytes."""
+        processor = ADIFProcessor()
+
+        result = processor.generate_adif([{'call': 'BG1SB', 'comment': '北京', 'eor': ''}])
+
+        assert '<COMMENT:6>北京' in result[0]
+        assert '<EOR:' not in result[0]
+
 
 class TestCallsignValidator:
     """Test callsign validation functionality."""
@@ -300,6 +316,27 @@ class TestHamRadioManager:
         status = manager._determine_qso_status(['CQ', 'JA1XYZ', '73'], -15, {'id': '339'})
         assert status['status'] == '>>'
     
+    @pytest.mark.asyncio
+    async def test_qso_timeout_excludes_call(self, manager):
+        """Test that a timed-out call is excluded for exclusion_ttl only."""
+        now = [0.0]
+        manager.timers.clock = lambda: now[0]
+        manager.timers.current = 0
+        await manager._handle_response_logic(['CQ', 'K1ABC', 'FN42'], {'status': '>>'}, {'name': 'USA'})
+        assert manager.qso_state.sendcq
+        
+        now[0] = 90.05
+        manager.timers.advance()
+        assert not manager.qso_state.sendcq
+        assert 'K1ABC' in manager.qso_state.excluded_calls
+        
+        now[0] = 1880.0
+        manager.timers.advance()
+        assert 'K1ABC' in manager.qso_state.excluded_calls
+        now[0] = 1890.2
+        manager.timers.advance()
+        assert 'K1ABC' not in manager.qso_state.excluded_calls
+    
     def test_get_status(self, manager):
         """Test status reporting."""
         status = manager.get_status()
@@ -309,6 +346,21 @@ class TestHamRadioManager:
         assert 'qso_state' in status
         assert status['qso_state']['sendcq'] is False
     
+    @pytest.mark.asyncio
+    async def test_decision_latency(self, manager):
+        """Test per-stage latency recording and metrics."""
+        import time
+        received = time.monotonic()
+        await manager._handle_response_logic(['CQ', 'K1ABC', 'FN42'], {'status': '>>'},
+                                             {'name': 'USA'}, received)
+        
+        latency = manager.get_metrics()['latency']
+        assert latency['stages']['decision']['count'] == 1
+        assert latency['stages']['send']['count'] == 1
+        assert latency['replies'] == 1
+        assert latency['deadline_misses'] == 0
+        assert 'latency' in manager.get_status()
+    
     def test_is_worked(self, manager):
         """Test worked callsign checking."""
         manager.qso_state.worked_calls.add('K1ABC')
@@ -414,6 +466,177 @@ class TestHamRadioProtocol:
             await protocol.execute_command('unknown_command', {})
 
 
+class TestHamMonitor:
+    """Test the monitor feed and dashboard state."""
+    
+    def test_frames_carry_only_changes(self):
+        """Test that frames are delta-based."""
+        now = [100.0]
+        feed = MonitorFeed(clock=lambda: now[0])
+        cursor = MonitorCursor(now[0], 0)
+        sections = {"qso": {"current_call": None}}
+        
+        frame = build_frame(feed, cursor, sections)
+        assert frame == {"qso": {"current_call": None}}
+        assert build_frame(feed, cursor, sections) is None
+        
+        for i in range(200):
+            feed.packet()
+            feed.decode(45000, -10 - i % 10, 1000 + i, "FT8", f"CQ K{i}AB FN42", ">>", "United States")
+        frame = build_frame(feed, cursor, sections)
+        assert frame["slot"] == 45000 and len(frame["decodes"]) == 200
+        
+        feed.decode(45000, 5, 500, "FT8", "CQ JA1XYZ PM95", ">>", "Japan")
+        frame = build_frame(feed, cursor, {"qso": {"current_call": "JA1XYZ"}})
+        assert [row["message"] for row in frame["decodes"]] == ["CQ JA1XYZ PM95"]
+        assert "slot" not in frame and frame["qso"] == {"current_call": "JA1XYZ"}
+        
+        now[0] += 2.0
+        frame = build_frame(feed, cursor, {"qso": {"current_call": "JA1XYZ"}})
+        assert frame == {"rates": {"packets_per_s": 100.0, "packets": 200, "decodes": 201}}
+        
+        feed.decode(60000, -3, 700, "FT8", "CQ DL1AB JO62", "XX", "Germany")
+        frame = build_frame(feed, cursor, sections)
+        assert frame["slot"] == 60000 and len(frame["decodes"]) == 1
+    
+    def test_dashboard_state(self):
+        """Test rebuilding the dashboard from frames."""
+        state = DashboardState(max_rows=2)
+        state.apply({"type": "hello", "interval": 0.25})
+        assert state.frames == 0 and state.slot_time == "--:--:--"
+        
+        state.apply({"slot": 45000, "decodes": [
+            {"seq": 1, "snr": -15, "df": 900, "mode": "FT8", "message": "CQ K1ABC FN42", "status": ">>", "dxcc": ""},
+            {"seq": 2, "snr": 3, "df": 300, "mode": "FT8", "message": "CQ DL1AB JO62", "status": "XX", "dxcc": ""},
+        ]})
+        state.apply({"decodes": [
+            {"seq": 3, "snr": -2, "df": 2100, "mode": "FT8", "message": "CQ JA1XYZ PM95", "status": ">>", "dxcc": ""},
+        ], "qso": {"current_call": "JA1XYZ"}})
+        assert state.slot_time == "00:00:45" and state.qso["current_call"] == "JA1XYZ"
+        assert [row["seq"] for row in state.rows()] == [2, 3]
+        assert [row["seq"] for row in state.candidates()] == [3, 1]
+        
+        state.apply({"slot": 60000, "decodes": []})
+        assert state.decodes == [] and state.dirty
+    
+    @pytest.mark.asyncio
+    async def test_unix_socket_stream(self, tmp_path):
+        """Test streaming frames to a client."""
+        feed = MonitorFeed()
+        server = MonitorServer(feed, lambda: {"qso": {"rx_count": 1}}, str(tmp_path / "monitor.sock"), interval=0.01)
+        await server.start()
+        try:
+            feed.decode(45000, -7, 1234, "FT8", "CQ JA1XYZ PM95", ">>", "Japan")
+            frames = read_frames(server.path)
+            assert (await frames.__anext__())["type"] == "hello"
+            frame = await frames.__anext__()
+            assert frame["slot"] == 45000 and frame["qso"] == {"rx_count": 1}
+            await frames.aclose()
+        finally:
+            await server.stop()
+    
+    @pytest.mark.asyncio
+    async def test_stop_with_client_connected(self, tmp_path):
+        """Test that stop() ends the handlers of connected clients."""
+        server = MonitorServer(MonitorFeed(), lambda: {}, str(tmp_path / "monitor.sock"), interval=0.01)
+        await server.start()
+        frames = read_frames(server.path)
+        assert (await frames.__anext__())["type"] == "hello"
+        handlers = list(server.clients)
+        assert len(handlers) == 1
+        
+        await asyncio.wait_for(server.stop(), timeout=2.0)
+        assert not server.clients and all(task.done() for task in handlers)
+        with pytest.raises(StopAsyncIteration):
+            await asyncio.wait_for(frames.__anext__(), timeout=2.0)
+    
+    @pytest.mark.asyncio
+    async def test_read_latency_section(self, tmp_path):
+        """Test that `rdma ham latency` reads the running manager's histograms."""
+        logger = RDMALogger(LoggingConfig(level="DEBUG"), "test")
+        manager = HamRadioManager({'log_file': str(tmp_path / 'test.adi')}, logger)
+        manager.latency.record("decision", 100.0, 100.25)
+        manager.latency.reply_sent(107.0, slot_start=105.0)
+        server = MonitorServer(manager.feed, manager.monitor_sections, str(tmp_path / "monitor.sock"))
+        await server.start()
+        try:
+            summary = await read_section("latency", server.path)
+            assert summary == manager.latency.summary()
+            assert summary["stages"]["decision"]["count"] == 1 and summary["deadline_misses"] == 1
+        finally:
+            await server.stop()
+
+
+class TestEventStream:
+    """Test the decode/status event ring served over SSE and WebSocket."""
+    
+    def test_resume_from_sequence(self):
+        """Test resuming and gap handling."""
+        ring = EventRing(size=3)
+        assert [event["type"] for event in ring.batch(-1)] == ["reset"]
+        
+        ring.update_status(cq_active=False, current_target="")
+        assert ring.update_status(cq_active=False) is None
+        ring.publish("decode", {"call": "K1ABC"})
+        ring.update_status(cq_active=True, current_target="K1ABC")
+        assert [event["data"] for event in ring.batch(2)] == [{"cq_active": True, "current_target": "K1ABC"}]
+        assert ring.batch(3) == []
+        
+        ring.publish("decode", {"call": "JA1XYZ"})
+        ring.publish("decode", {"call": "DL1AB"})
+        events = ring.batch(1)              # events 2 was overwritten
+        assert events[0]["type"] == "reset"
+        assert events[0]["data"] == {"status": {"cq_active": True, "current_target": "K1ABC"}, "first_seq": 3}
+        assert [event["seq"] for event in events[1:]] == [3, 4, 5]
+        
+        chunk = format_sse(ring.batch(4)).decode()
+        assert chunk == 'id: 5\nevent: decode\ndata: {"call":"DL1AB"}\n\n'
+    
+    @pytest.mark.asyncio
+    async def test_wait_wakes_on_publish(self):
+        """Test that waiting clients wake up on new events."""
+        ring = EventRing()
+        assert await ring.wait(0, 0.01) is False
+        waiter = asyncio.ensure_future(ring.wait(0, 1.0))
+        await asyncio.sleep(0)
+        ring.publish("decode", {"call": "K1ABC"})
+        assert await waiter is True
+    
+    @pytest.mark.asyncio
+    async def test_heartbeat_is_not_a_status(self):
+        """Test that heartbeats are ignored and status packets still update the stream."""
+        logger = Mock()
+        manager = HamRadioManager({'log_file': 'test.adi'}, logger)
+        header = struct.pack('>III', 0xadbccb00, 2, 0) + struct.pack('>I', 6) + b'WSJT-X'
+        await manager._process_packet(header + struct.pack('>III', 3, 6, 0), ('127.0.0.1', 2237))
+        logger.error.assert_not_called()
+        assert manager.stream.status == {}
+        
+        status = (struct.pack('>III', 0xadbccb00, 2, 1) + struct.pack('>I', 6) + b'WSJT-X'
+                  + struct.pack('>Q', 14074000) + struct.pack('>I', 3) + b'FT8')
+        await manager._process_packet(status, ('127.0.0.1', 2237))
+        logger.error.assert_not_called()
+        assert manager.stream.status == {"software": "WSJT-X", "mode": "FT8", "frequency": 14074000}
+    
+    def test_manager_publishes_decodes(self):
+        """Test decode and status events from the manager."""
+        config = LoggingConfig(level="DEBUG")
+        manager = HamRadioManager({'log_file': 'test.adi'}, RDMALogger(config, "test"))
+        packet = DecodePacket(timestamp=45000, snr=-7, delta_time=0.3, delta_frequency=1234,
+                              mode="FT8", message="CQ JA1XYZ PM95")
+        manager._publish_decode(packet, packet.message.split(), {'name': 'Japan'},
+                                {"status": ">>", "description": "New target"})
+        manager.qso_state.sendcq = True
+        manager.qso_state.current_call = "JA1XYZ"
+        manager._publish_status()
+        manager._publish_status()
+        
+        decode, status = manager.stream.batch(0)
+        assert decode["data"]["time"] == "00:00:45" and decode["data"]["call"] == "JA1XYZ"
+        assert decode["data"]["deltaF"] == 1234 and decode["data"]["priority_reason"] == "New target"
+        assert status["data"] == {"cq_active": True, "current_target": "JA1XYZ"}
+
+
 class TestIntegration:
     """Integration tests for amateur radio functionality."""
     
@@ -423,6 +646,57 @@ class TestIntegration:
         config = LoggingConfig(level="DEBUG")
         return RDMALogger(config, "test")
     
+    @pytest.mark.asyncio
+    async def test_agent_serves_ham_stream(self, tmp_path, monkeypatch):
+        """Test that a decode received by a running agent reaches /api/stream/ham."""
+        def free_port(kind):
+            with socket.socket(socket.AF_INET, kind) as sock:
+                sock.bind(('127.0.0.1', 0))
+                return sock.getsockname()[1]
+        
+        http_port, udp_port = free_port(socket.SOCK_STREAM), free_port(socket.SOCK_DGRAM)
+        config_file = tmp_path / "rdma.json"
+        config_file.write_text(json.dumps({
+            "logging": {"level": "WARNING"},
+            "protocols": {"http": {"type": "http", "host": "127.0.0.1", "port": http_port}},
+            "ham_radio": {"enabled": True, "udp_port": udp_port, "udp_forward_port": free_port(socket.SOCK_DGRAM),
+                          "monitor": False, "log_file": str(tmp_path / "test.adi")},
+        }))
+        agent = RDMAgent(str(config_file))
+        monkeypatch.setattr(agent, "_setup_signal_handlers", lambda: None)
+        running = asyncio.ensure_future(agent.start())
+        try:
+            url = f"http://127.0.0.1:{http_port}/api/stream/ham"
+            async with aiohttp.ClientSession() as session:
+                for _ in range(100):
+                    try:
+                        response = await session.get(url)
+                        break
+                    except aiohttp.ClientConnectionError:
+                        await asyncio.sleep(0.05)
+                assert response.status == 200
+                
+                packet = (struct.pack('>III', 0xadbccb00, 2, 2) + struct.pack('>I', 6) + b'WSJT-X' + b'\x01'
+                          + struct.pack('>IidI', 45000, -7, 0.3, 1234)
+                          + struct.pack('>I', 1) + b'~' + struct.pack('>I', 14) + b'CQ JA1XYZ PM95')
+                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+                    sender.sendto(packet, ('127.0.0.1', udp_port))
+                
+                async def next_decode():
+                    event = None
+                    async for line in response.content:
+                        if line.startswith(b"event: "):
+                            event = line[7:].strip()
+                        elif line.startswith(b"data: ") and event == b"decode":
+                            return json.loads(line[6:])
+                
+                decode = await asyncio.wait_for(next_decode(), timeout=5.0)
+                assert decode["call"] == "JA1XYZ" and decode["snr"] == -7
+                response.close()
+        finally:
+            await agent.stop()
+            await asyncio.wait_for(running, timeout=5.0)
+    
     @pytest.mark.asyncio
     async def test_full_qso_flow(self, logger):
         """Test complete QSO flow."""
@@ -0,0 +1,79 @@
+"""
+Tests for the RDMA decision latency histograms
+"""
+
+import random
+
+from rdma.latency import (
+    BUCKETS,
+    LatencyHistogram,
+    LatencyTracker,
+    bucket_high,
+    bucket_index,
+    slot_start,
+)
+
+
+class TestLatencyHistogram:
+    """Test LatencyHistogram buckets and percentiles."""
+
+    def test_bucket_bounds(self):
+        """Test that each value lands in the lowest bucket covering it."""
+        for micros in list(range(2000)) + [1 << 20, (1 << 20) + 12345, (1 << 30) - 1]:
+            index = bucket_index(micros)
+            assert index < BUCKETS and bucket_high(index) >= micros
+            assert index == 0 or bucket_high(index - 1) < micros
+
+    def test_percentiles_within_error(self):
+        """Test that percentiles never underestimate and stay within 4%."""
+        rng = random.Random(3)
+        values = sorted(rng.expovariate(1 / 0.02) for _ in range(20000))
+        hist = LatencyHistogram()
+        for value in values:
+            hist.record(value)
+        assert hist.count == 20000
+        for p in (50, 90, 99):
+            exact = values[int(len(values) * p / 100) - 1]
+            assert exact <= hist.percentile(p) <= exact * 1.04 + 1e-6
+        assert abs(hist.percentile(100) - values[-1]) < 1e-6
+
+    def test_merge(self):
+        """Test merging counts and the maximum."""
+        hist = LatencyHistogram()
+        hist.record(0.01)
+        other = LatencyHistogram()
+        other.record(5.0)
+        hist.merge(other)
+        assert hist.count == 2 and hist.max == 5000000
+        assert hist.summary()["max_ms"] == 5000.0
+
+
+class TestLatencyTracker:
+    """Test per-stage recording and slot deadline misses."""
+
+    def test_stages_and_deadline_misses(self):
+        """Test that late replies are counted as deadline misses."""
+        tracker = LatencyTracker(deadline=1.5)
+        tracker.record("parse", 100.0, 100.0004)
+        tracker.record("decision", 100.0, 100.52)
+        tracker.record("lookup", None, 101.0)  # not received from the network
+        assert tracker.stages["parse"].count == 1
+        assert tracker.stages["lookup"].count == 0
+        assert abs(tracker.stages["decision"].percentile(50) - 0.52) < 0.52 * 0.04
+
+        assert tracker.reply_sent(104.5, slot_start=105.0) is None
+        assert tracker.reply_sent(106.4, slot_start=105.0) is None
+        late = tracker.reply_sent(107.0, slot_start=105.0)
+        assert late is not None and abs(late - 2.0) < 1e-9
+
+        summary = tracker.summary()
+        assert summary["replies"] == 3 and summary["deadline_misses"] == 1
+        assert summary["stages"]["decision"]["count"] == 1
+        assert summary["worst_miss_s"] == 2.0
+        assert len(tracker.report_lines()) == len(tracker.stages) + 2
+
+    def test_slot_start(self):
+        """Test that a decode answers the first slot not long past."""
+        assert slot_start(29.0, period=15.0, clock_offset=0.0) == 30.0
+        assert slot_start(31.0, period=15.0, clock_offset=0.0) == 30.0
+        assert slot_start(32.0, period=15.0, clock_offset=0.0) == 45.0
@@ -0,0 +1,136 @@
+"""
+Tests for the RDMA timing wheel
+"""
+
+import random
+
+import pytest
+
+from rdma.timer import ExpiringSet, TimingWheel
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTimingWheel:
+    """Test TimingWheel scheduling."""
+
+    def test_fire_on_expiry_tick(self):
+        """Test that timers on every level fire on their expiry tick."""
+        clock = FakeClock(1000.0)
+        wheel = TimingWheel(tick=0.1, clock=clock)
+        fired = []
+        rng = random.Random(7)
+        delays = [0.05, 0.1, 6.4, 6.5, 409.6, 1800.0, 7000.0]
+        delays += [rng.uniform(0, 5000) for _ in range(200)]
+        expected = {}
+        for i, delay in enumerate(delays):
+            wheel.schedule(delay, fired.append, i)
+            expected[i] = max(wheel._expiry(clock.now + delay), wheel.current + 1)
+        assert len(wheel) == len(delays)
+
+        step = 0
+        while len(wheel):
+            step += 1
+            clock.now = 1000.0 + step * 0.1 + 1e-6
+            before = len(fired)
+            wheel.advance()
+            for i in fired[before:]:
+                assert expected[i] == wheel.current
+        assert sorted(fired) == list(range(len(delays)))
+
+    def test_cancel_and_periodic(self):
+        """Test cancelling a timer and a periodic job."""
+        wheel = TimingWheel(tick=0.1, clock=FakeClock())
+        calls = []
+        timer = wheel.schedule(1.0, calls.append, "once")
+        job = wheel.every(2.0, calls.append, "tick")
+        timer.cancel()
+        assert not timer.active and len(wheel) == 1
+
+        assert wheel.advance(7.05) == 3
+        assert calls == ["tick"] * 3
+        job.cancel()
+        assert len(wheel) == 0 and wheel.advance(100.0) == 0
+
+    def test_callback_cancels_sibling(self):
+        """Test that a callback can cancel another timer due on the same tick."""
+        wheel = TimingWheel(clock=FakeClock())
+        calls = []
+        timers = []
+
+        def first(name):
+            calls.append(name)
+            for timer in timers:
+                timer.cancel()
+
+        timers.append(wheel.schedule(1.0, first, "a"))
+        timers.append(wheel.schedule(1.0, first, "b"))
+        assert wheel.advance(1.05) == 1
+        assert len(calls) == 1 and len(wheel) == 0
+
+    def test_failing_callback_keeps_bucket(self):
+        """Test that timers due with a failing callback still fire later."""
+        wheel = TimingWheel(clock=FakeClock())
+        excluded = ExpiringSet(wheel, ttl=1.0)
+        calls = []
+
+        def fail():
+            calls.append("fail")
+            raise ValueError("callback failed")
+
+        wheel.schedule(1.0, fail)
+        for call in ("K1ABC", "JA1XYZ", "VP8LP"):
+            excluded.add(call)
+        wheel.schedule(1.0, calls.append, "later")
+        with pytest.raises(ValueError):
+            wheel.advance(1.05)
+        wheel.advance(1.05)
+        assert len(excluded) == 0 and len(wheel) == 0
+        assert sorted(calls) == ["fail", "later"]
+
+
+class TestExpiringSet:
+    """Test per-member expiry."""
+
+    def test_members_expire_individually(self):
+        """Test that each call expires ttl after it was last added."""
+        clock = FakeClock()
+        wheel = TimingWheel(clock=clock)
+        excluded = ExpiringSet(wheel, ttl=1800.0)
+        excluded.add("K1ABC")
+        clock.now = 600.0
+        excluded.add("JA1XYZ")
+        excluded.add("VP8LP", ttl=60.0)
+        assert "K1ABC" in excluded and len(excluded) == 3
+
+        clock.now = 700.0
+        wheel.advance()
+        assert "VP8LP" not in excluded
+        clock.now = 1800.05
+        wheel.advance()
+        assert "K1ABC" not in excluded and "JA1XYZ" in excluded
+
+        excluded.add("JA1XYZ")  # re-adding restarts the TTL
+        clock.now = 2400.5
+        wheel.advance()
+        assert "JA1XYZ" in excluded and list(excluded) == ["JA1XYZ"]
+
+    def test_discard_and_clear(self):
+        """Test that removed members cancel their timers."""
+        wheel = TimingWheel(clock=FakeClock())
+        excluded = ExpiringSet(wheel)
+        excluded.add("K1ABC")
+        excluded.add("W2DEF")
+        excluded.discard("K1ABC")
+        excluded.discard("N0CALL")
+        assert "K1ABC" not in excluded and len(wheel) == 1
+        excluded.clear()
+        assert len(excluded) == 0 and len(wheel) == 0
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+测试波段活动热图
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_activity import ActivityHeatmap
+from ultron_bands import band_id
+
+HOUR = 3600
+DAY = 24 * HOUR
+B15 = band_id('15m')
+B20 = band_id('20m')
+# 某天 UTC 14:00
+START = 20000 * DAY + 14 * HOUR
+
+
+def test_probability_by_hour():
+    """按钟点统计听到的天数比例（只计算有解码的时段）"""
+    heatmap = ActivityHeatmap(days=4)
+    for day in range(3):
+        heatmap.record(141, B15, START + day * DAY + 60)
+    heatmap.record(339, B20, START + 3 * DAY)
+    heatmap.record(141, B15, START + 3 * DAY + 2 * HOUR)
+
+    now = START + 3 * DAY + 2 * HOUR
+    # 14点的4个桶里有3个听到过
+    assert heatmap.probability(141, B15, now - 2 * HOUR) == 3 / 4
+    assert heatmap.is_workable(141, B15, now - 2 * HOUR)
+    assert not heatmap.is_workable(141, B20, now - 2 * HOUR)
+    assert heatmap.hourly(141, B15)[14] == 3
+    assert heatmap.hourly(141, B15)[16] == 1
+
+
+def test_ring_wraparound():
+    """超过保留天数的桶被清空"""
+    heatmap = ActivityHeatmap(days=2)
+    heatmap.record(339, B20, START)
+    heatmap.record(339, B20, START + DAY)
+    assert heatmap.hourly(339, B20)[14] == 2
+
+    heatmap.record(1, B20, START + 2 * DAY)  # 复用第一天的桶
+    assert heatmap.hourly(339, B20)[14] == 1
+
+    heatmap.record(339, B20, START)  # 已超出保留范围，忽略
+    assert heatmap.hourly(339, B20)[14] == 1
+
+
+def test_save_and_load():
+    """保存后载入结果相同"""
+    heatmap = ActivityHeatmap(days=3)
+    heatmap.record_slot([(141, B15), (339, B20), (339, B20)], START)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'activity.bin'
+        heatmap.save(path)
+        loaded = ActivityHeatmap.load(path, days=3)
+        assert loaded.hourly(339, B20) == heatmap.hourly(339, B20)
+        assert loaded.probability(141, B15, START) == heatmap.probability(141, B15, START)
+
+        # 天数不同或文件损坏时返回空热图
+        assert not ActivityHeatmap.load(path, days=7).rows
+        path.write_bytes(b'UAH1\x00')
+        assert not ActivityHeatmap.load(path, days=3).rows
+        assert not ActivityHeatmap.load(Path(tmp) / 'missing.bin').rows
+
+
+if __name__ == "__main__":
+    test_probability_by_hour()
+    test_ring_wraparound()
+    test_save_and_load()
+    print("✓ 所有测试通过")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+测试流式ADIF读写工具
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_adif import (MAX_MEMORY_RECORDS, ADIFReader, ADIFWriter, QSOFilter, export_adif, encode_record,
+                         merge_logs)
+
+
+def test_encode_record_byte_length():
+    """非ASCII字段长度按字节计算"""
+    record = encode_record({'call': 'BG1SB', 'comment': '北京'})
+    assert b'<CALL:5>BG1SB ' in record
+    assert b'<COMMENT:6>' in record
+    assert record.endswith(b'<EOR>\n')
+
+
+def test_write_and_read_roundtrip():
+    """写入后可流式读回"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'log.adi'
+        qsos = [
+            {'call': 'JA1XYZ', 'band': '20m', 'qso_date': '20240105', 'comment': '东京 <test>'},
+            {'call': 'K1ABC', 'band': '40m', 'qso_date': '20240210'},
+        ]
+        with ADIFWriter(path) as writer:
+            writer.write_many(qsos)
+
+        # 文件头只写一次
+        data = path.read_bytes()
+        assert data.count(b'<EOH>') == 1
+
+        result = list(ADIFReader(path, chunk_size=16))
+        assert result == qsos
+
+
+def test_append_skips_header():
+    """追加写入不重复写文件头"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'log.adi'
+        with ADIFWriter(path) as writer:
+            writer.write({'call': 'K1ABC'})
+        with ADIFWriter(path, append=True) as writer:
+            writer.write({'call': 'W2DEF'})
+
+        assert path.read_bytes().count(b'<EOH>') == 1
+        assert [q['call'] for q in ADIFReader(path)] == ['K1ABC', 'W2DEF']
+
+
+def test_records_resume_from_offset():
+    """从记录偏移处继续读取"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'log.adi'
+        path.write_text('<call:5>K1ABC <eor>\n<call:5>W2DEF <eor>\n')
+
+        first, offset = next(ADIFReader(path).records())
+        assert first['call'] == 'K1ABC'
+        rest = [q['call'] for q, _ in ADIFReader(path).records(offset)]
+        assert rest == ['W2DEF']
+
+
+def test_filtered_export():
+    """按波段、日期和实体过滤导出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / 'log.adi'
+        out = Path(tmp) / 'out.adi'
+        with ADIFWriter(src) as writer:
+            writer.write({'call': 'JA1XYZ', 'band': '20m', 'qso_date': '20240105', 'dxcc': '339'})
+            writer.write({'call': 'JA2ABC', 'band': '15m', 'qso_date': '20240106', 'dxcc': '339'})
+            writer.write({'call': 'K1ABC', 'band': '20m', 'qso_date': '20230101', 'dxcc': '291'})
+
+        count = export_adif(src, out, QSOFilter(bands=['20M'], start_date='20240101', entities=['339']))
+        assert count == 1
+        assert [q['call'] for q in ADIFReader(out)] == ['JA1XYZ']
+
+
+def write_logs(tmp):
+    """生成两台电脑上的重叠日志"""
+    jtdx = Path(tmp) / 'jtdx.adi'
+    wsjtx = Path(tmp) / 'wsjtx.adi'
+    with ADIFWriter(jtdx) as writer:
+        writer.write({'call': 'JA1XYZ', 'band': '20m', 'mode': 'FT8', 'qso_date': '20240105', 'time_on': '120015'})
+        writer.write({'call': 'K1ABC', 'band': '40m', 'mode': 'FT8', 'qso_date': '20240105', 'time_on': '130000'})
+        writer.write({'call': 'VP8XX', 'band': '10m', 'mode': 'FT8', 'qso_date': '20240106', 'time_on': '090000'})
+    with ADIFWriter(wsjtx) as writer:
+        # 同一QSO，时间相差几秒
+        writer.write({'call': 'JA1XYZ', 'band': '20m', 'mode': 'FT8', 'qso_date': '20240105', 'time_on': '120030'})
+        # 同一呼号不同模式
+        writer.write({'call': 'K1ABC', 'band': '40m', 'mode': 'MFSK', 'submode': 'FT4', 'qso_date': '20240105', 'time_on': '130000'})
+        writer.write({'call': 'VP8XX', 'band': '10m', 'mode': 'FT8', 'qso_date': '20240106', 'time_on': '090000'})
+    return [jtdx, wsjtx]
+
+
+def test_merge_in_memory():
+    """哈希集合去重"""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / 'merged.adi'
+        fed = []
+        stats = merge_logs(write_logs(tmp), out, on_record=fed.append)
+        assert stats['read'] == 6
+        assert stats['written'] == 4
+        assert stats['duplicates'] == 2
+        assert stats['runs'] == 0
+        assert [q['call'] for q in ADIFReader(out)] == ['JA1XYZ', 'K1ABC', 'VP8XX', 'K1ABC']
+        assert len(fed) == 4
+
+
+def test_merge_external_sort():
+    """超过内存上限时使用外部排序，结果一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / 'merged.adi'
+        stats = merge_logs(write_logs(tmp), out, max_memory=2, tmp_dir=tmp)
+        assert stats['runs'] > 0
+        assert stats['written'] == 4
+        assert stats['duplicates'] == 2
+        assert sorted(q['call'] for q in ADIFReader(out)) == ['JA1XYZ', 'K1ABC', 'K1ABC', 'VP8XX']
+        # 临时文件已清理
+        assert not list(Path(tmp).glob('*.run'))
+
+
+def test_merge_across_bucket_edge():
+    """相差两秒但跨过旧的时间取整边界（12:01:00）的副本也被去掉"""
+    with tempfile.TemporaryDirectory() as tmp:
+        a = Path(tmp) / 'a.adi'
+        b = Path(tmp) / 'b.adi'
+        with ADIFWriter(a) as writer:
+            writer.write({'call': 'JA1XYZ', 'band': '20m', 'mode': 'FT8', 'qso_date': '20240105', 'time_on': '120059'})
+            writer.write({'call': 'JA1XYZ', 'band': '20m', 'mode': 'FT8', 'qso_date': '20240105', 'time_on': '121500'})
+        with ADIFWriter(b) as writer:
+            writer.write({'call': 'JA1XYZ', 'band': '20m', 'mode': 'FT8', 'qso_date': '20240105', 'time_on': '120101'})
+        for max_memory in (MAX_MEMORY_RECORDS, 1):
+            out = Path(tmp) / 'merged.adi'
+            stats = merge_logs([a, b], out, max_memory=max_memory, tmp_dir=tmp)
+            assert stats['written'] == 2 and stats['duplicates'] == 1, max_memory
+            assert sorted(q['time_on'] for q in ADIFReader(out)) == ['120059', '121500']
+
+
+def test_merge_into_source():
+    """可以直接合并到其中一个源文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = write_logs(tmp)
+        merge_logs(sources, sources[0])
+        assert len(list(ADIFReader(sources[0]))) == 4
+
+
+if __name__ == "__main__":
+    test_encode_record_byte_length()
+    test_write_and_read_roundtrip()
+    test_append_skips_header()
+    test_records_resume_from_offset()
+    test_filtered_export()
+    test_merge_in_memory()
+    test_merge_external_sort()
+    test_merge_across_bucket_edge()
+    test_merge_into_source()
+    print("✓ 所有测试通过")
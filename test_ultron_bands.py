@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+测试波段计划
+"""
+
+import sys
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_bands import BAND_NAMES, BandPlan, band_id
+
+
+def test_ft8_dial_frequencies():
+    """常用FT8拨号频率"""
+    plan = BandPlan()
+    dials = {
+        1840000: '160m', 3573000: '80m', 5357000: '60m', 7074000: '40m',
+        10136000: '30m', 14074000: '20m', 18100000: '17m', 21074000: '15m',
+        24915000: '12m', 28074000: '10m', 50313000: '6m', 144174000: '2m',
+        474200: '630m', 136000: '2190m',
+    }
+    for freq, band in dials.items():
+        assert plan.band(freq) == band, (freq, plan.band(freq))
+    assert plan.resolve(14074000) == (band_id('20m'), 'narrow')
+    assert plan.resolve(14200000) == (band_id('20m'), 'all')
+    assert plan.resolve(14025000) == (band_id('20m'), 'cw')
+
+
+def test_band_edges_and_gaps():
+    """波段边界和波段之间的频率"""
+    plan = BandPlan()
+    assert plan.band_id(14000000) == band_id('20m')
+    assert plan.band_id(14350000) == band_id('20m')
+    assert plan.band_id(14350001) == 0
+    assert plan.band_id(12000000) == 0
+    assert plan.band_id(0) == 0
+    assert plan.resolve(12000000) == (0, '')
+    assert BAND_NAMES[plan.band_id(12000000)] == 'unknown'
+    # VHF/UHF 没有子波段表
+    assert plan.resolve(432065000) == (band_id('70cm'), 'all')
+
+
+def test_regions():
+    """IARU分区差异"""
+    assert BandPlan(1).band_id(3900000) == 0
+    assert BandPlan(2).band(3900000) == '80m'
+    assert BandPlan(2).band(70200000) == 'unknown'
+    assert BandPlan(1).band(70200000) == '4m'
+    assert BandPlan(1).band(223500000) == 'unknown'
+    assert BandPlan().band(223500000) == '1.25m'
+
+
+if __name__ == "__main__":
+    test_ft8_dial_frequencies()
+    test_band_edges_and_gaps()
+    test_regions()
+    print("✓ 所有测试通过")
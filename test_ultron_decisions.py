@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+测试预先计算的决定
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron import WSJTXProtocol
+from ultron_decisions import Decision, DecisionCache
+from ultron_scheduler import CandidateScheduler
+
+
+def raises_runtime_error(func):
+    """func 抛出 RuntimeError 时返回 True"""
+    try:
+        func()
+    except RuntimeError:
+        return True
+    return False
+
+
+def test_cache_generations():
+    """作废后不再命中；作废期间算完的结果不会被当作有效；波段/网格不同时不命中"""
+    cache = DecisionCache(max_entries=2)
+    cache.put(Decision('JA1XYZ', 3, 0, 'PM95', need=2), cache.generation)
+    assert cache.get('JA1XYZ', 3, 0, 'PM95').need == 2
+    assert cache.get('JA1XYZ', 4, 0, 'PM95') is None and cache.get('JA1XYZ', 3, 0, '') is None
+
+    generation = cache.generation
+    cache.invalidate()
+    assert cache.get('JA1XYZ', 3, 0, 'PM95') is None and list(cache.todo) == ['JA1XYZ']
+    cache.put(Decision('JA1XYZ', 3, 0, 'PM95'), generation)     # 开始计算时的代数已过期
+    assert cache.get('JA1XYZ', 3, 0, 'PM95') is None
+    cache.put(Decision('JA1XYZ', 3, 0, 'PM95'), cache.generation)
+    assert cache.get('JA1XYZ', 3, 0, 'PM95') is not None
+
+    # 其他线程不能作废（条目正在被主循环修改）
+    errors = []
+    worker = threading.Thread(target=lambda: errors.append(raises_runtime_error(cache.invalidate)))
+    worker.start()
+    worker.join()
+    assert errors == [True] and cache.generation == generation + 1
+
+    # 容量上限：去掉最久没有更新的
+    cache.put(Decision('K1ABC', 3, 0), cache.generation)
+    cache.put(Decision('DL1AB', 3, 0), cache.generation)
+    assert 'JA1XYZ' not in cache.entries and len(cache) == 2
+    assert cache.summary()['hits'] == 2
+
+    # 预先算好的静态得分加上信噪比和直接计算的一样
+    scheduler = CandidateScheduler('OM89')
+    direct = scheduler.offer('JA1XYZ', 'CQ JA1XYZ PM95', 339, 3, 2, -7, 'PM95', 5.0, 100.0)
+    static = scheduler.static_score(2, 5.0, 'PM95')
+    cached = scheduler.offer('JA1XYZ', 'CQ JA1XYZ PM95', 339, 3, 2, -7, 'PM95', 5.0, 100.0, static=static)
+    assert abs(direct.score - cached.score) < 1e-9
+
+
+def test_ultron_prepares_while_idle():
+    """空闲时重新计算作废的决定并生成 Reply 模板；下一次解码直接命中"""
+    from ultron import Ultron
+
+    protocol = WSJTXProtocol()
+    decode = {'id': 'WSJT-X', 'time': 45000, 'snr': -12, 'delta_time': 0.3, 'delta_f': 1234,
+              'mode': '~', 'message': 'CQ JA1XYZ PM95', 'low_confidence': False}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                ultron = Ultron()
+                ultron.state.current_mode = 'FT8'
+                ultron.process_decode(dict(decode))
+                assert ultron.decisions.misses == 1 and 'JA1XYZ' in ultron.decisions.entries
+                ultron.scheduler.deadline = None
+                assert ultron.prepare_decisions() == 1          # 生成 Reply 模板
+
+                hit = dict(decode, snr=-5, time=60000)
+                ultron.process_decode(hit)
+                assert ultron.decisions.hits == 1 and 'reply' in hit
+                assert protocol.build_reply_packet(hit) == \
+                    protocol.build_reply_packet(dict(decode, snr=-5, time=60000))
+
+                ultron.decisions.invalidate()                   # 例如日志新增了QSO
+                ultron.scheduler.deadline = None
+                assert ultron.prepare_decisions() == 1
+                ultron.process_decode(dict(decode))
+                assert ultron.decisions.hits == 2
+                ultron.history.close()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_cache_generations()
+    test_ultron_prepares_while_idle()
+    print("✓ 所有测试通过")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+测试解码历史
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_bands import band_id, mode_id
+from ultron_history import INDEX_SUFFIX, SEGMENT_SUFFIX, Decode, DecodeHistory
+
+DAY = 86400
+START = 20000 * DAY + 12 * 3600
+B10 = band_id('10m')
+B20 = band_id('20m')
+FT8 = mode_id('FT8')
+
+
+def decode(offset, call, entity, band, snr=-10):
+    return Decode(START + offset, snr, 1500, band, FT8, entity, call, f"CQ {call} GC08")
+
+
+def test_append_and_query():
+    """按呼号/实体/波段查询，从新到旧"""
+    with tempfile.TemporaryDirectory() as tmp:
+        history = DecodeHistory(tmp)
+        history.append(decode(0, 'VP8LP', 141, B10))
+        history.append(decode(60, 'JA1XYZ', 339, B20))
+        history.append(decode(DAY, 'VP8NO', 141, B20))
+        history.append(decode(DAY + 60, 'VP8LP', 141, B20))
+        history.close()
+
+        assert len(list(Path(tmp).glob('*' + SEGMENT_SUFFIX))) == 2
+        last = history.last_heard(entity=141, band=B10)
+        assert last.call == 'VP8LP' and last.time == START and last.message == 'CQ VP8LP GC08'
+        assert history.last_heard(entity=141).call == 'VP8LP'
+        assert history.last_heard(call='JA1XYZ').band == B20
+        assert history.last_heard(entity=339, band=B10) is None
+        assert history.count(entity=141) == 3
+        assert history.count(band=B20, since=START + DAY) == 2
+        assert [d.call for d in history.query(band=B20, until=START + DAY)] == ['VP8NO', 'JA1XYZ']
+
+
+def test_reopen_and_torn_record():
+    """重新打开后索引重建，末尾不完整的记录被截掉"""
+    with tempfile.TemporaryDirectory() as tmp:
+        history = DecodeHistory(tmp)
+        assert history.extend(decode(i, f"K{i}AA", 291, B20) for i in range(100)) == 100
+        history.close()
+
+        segment = next(Path(tmp).glob('*' + SEGMENT_SUFFIX))
+        with open(segment, 'ab') as f:
+            f.write(b'\x01\x02\x03')  # 写到一半的记录
+
+        reopened = DecodeHistory(tmp)
+        assert reopened.count(entity=291) == 100
+        reopened.append(decode(200, 'K1ABC', 291, B20))
+        reopened.close()
+
+        again = DecodeHistory(tmp)
+        assert again.count() == 101
+        assert again.last_heard(entity=291).call == 'K1ABC'
+
+
+def test_persisted_index_and_segment_limit():
+    """关闭时保存索引，再次载入时映射数据；载入的分段数有上限"""
+    import mmap
+    import ultron_history
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = DecodeHistory(tmp)
+        history.extend(decode(day * DAY + i, f"K{i}AA", 291 if i % 2 else 339, B20)
+                       for day in range(5) for i in range(50))
+        history.close()
+        assert len(list(Path(tmp).glob('*' + INDEX_SUFFIX))) == 5
+
+        limit = ultron_history.MAX_SEGMENTS
+        ultron_history.MAX_SEGMENTS = 2
+        try:
+            reopened = DecodeHistory(tmp)
+            name = reopened.segment_names()[-1]
+            assert isinstance(reopened.segment(name).data, mmap.mmap)
+            assert reopened.count(entity=291) == 125 and reopened.count(call='K0AA') == 5
+            assert reopened.last_heard(call='K3AA').time == START + 4 * DAY + 3
+            assert len(reopened.segments) == 2
+            reopened.append(decode(4 * DAY + 100, 'K1ABC', 291, B20))
+        finally:
+            ultron_history.MAX_SEGMENTS = limit
+        reopened.close()
+        assert DecodeHistory(tmp).last_heard(entity=291).call == 'K1ABC'
+
+
+def test_unrecognized_segment_kept():
+    """无法识别的分段文件改名保留，不被覆盖"""
+    with tempfile.TemporaryDirectory() as tmp:
+        history = DecodeHistory(tmp)
+        history.append(decode(0, 'VP8LP', 141, B10))
+        history.close()
+        segment = next(Path(tmp).glob('*' + SEGMENT_SUFFIX))
+        segment.write_bytes(b'UDH9 newer format')
+        segment.with_suffix(INDEX_SUFFIX).unlink()
+
+        history = DecodeHistory(tmp)
+        history.append(decode(60, 'JA1XYZ', 339, B20))
+        history.close()
+        kept, = Path(tmp).glob('*.unrecognized-*')
+        assert kept.read_bytes() == b'UDH9 newer format'
+        assert [d.call for d in DecodeHistory(tmp).query()] == ['JA1XYZ']
+
+
+if __name__ == "__main__":
+    test_append_and_query()
+    test_reopen_and_torn_record()
+    test_persisted_index_and_segment_limit()
+    test_unrecognized_segment_kept()
+    print("✓ 所有测试通过")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+测试控制台日志导入
+"""
+
+import calendar
+import datetime
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_activity import ActivityHeatmap
+from ultron_bands import band_id, mode_id
+from ultron_history import DecodeHistory
+from ultron_import import ConsoleImporter, import_console_log
+
+SAMPLE = (
+    "\x1b[90m⏹ DXCC\x1b[0m\n"
+    "\r -----< ULTRON : 192.168.1.64 port udp 2237\n"
+    "\r\x1b[37m -----< ULTRON : JTDX = 0-0000-0000-3293-0\x1b[0m\n"
+    "\r\x1b[90m235945  -7   1316  FT8     ## NU6V BA5AW 73        - CHINA                [10m]\x1b[0m\n"
+    "\r\x1b[90m235945  -3   1095  FT8     ## AH6WN JA1RPQ PM95    - JAPAN                [10m] [WL]\x1b[0m\n"
+    "\r\x1b[36m -----< ULTRON : 2025-11-21 00:00:14 --------------- 0002 Decodeds -----------\x1b[0m\n"
+    "\r\x1b[90m000015  -13  725   FT8     FL AP2HA E27CLF -18     - THAILAND             [10m] [WL]\x1b[0m\n"
+    "\r\x1b[36m -----< ULTRON : 2025-11-21 00:00:29 --------------- 0001 Decodeds -----------\x1b[0m\n"
+    "\r -----< ULTRON : Status from JTDX - 7074.0kHz 40m narrow FT8\n"
+    "\x1b[32m000030 -12 0    FT8    >> CQ VP8LP GD18        - FALKLAND ISLANDS     [NEW DXCC]\x1b[0m\n"
+)
+
+NAMES = {'CHINA': 318, 'JAPAN': 339, 'THAILAND': 387, 'FALKLAND ISLANDS': 141}
+
+
+def ts(*fields):
+    return calendar.timegm(fields + (0, 0, 0))
+
+
+def parse(text, chunk_size=64):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'nohup.out'
+        path.write_text(text, encoding='utf-8')
+        importer = ConsoleImporter(NAMES)
+        return list(importer.read(path, chunk_size)), importer.stats
+
+
+def test_parse_lines():
+    """解码行、状态行和时隙汇总行"""
+    decodes, stats = parse(SAMPLE)
+    assert stats['decodes'] == 4 and stats['slots'] == 2 and stats['status'] == 2
+    first, second, third, last = decodes
+    assert first.call == 'BA5AW' and first.message == 'NU6V BA5AW 73'
+    assert first.snr == -7 and first.freq == 1316 and first.mode == mode_id('FT8')
+    assert first.band == band_id('10m') and first.entity == 318
+    # 23:59:45 的解码在 00:00:14 的汇总之前，属于前一天
+    assert first.time == ts(2025, 11, 20, 23, 59, 45)
+    assert second.entity == 339
+    assert third.call == 'E27CLF' and third.time == ts(2025, 11, 21, 0, 0, 15)
+    # 没有波段标记时使用状态行的波段；文件末尾没有汇总行时沿用上一个日期
+    assert last.call == 'VP8LP' and last.band == band_id('40m') and last.entity == 141
+    assert last.time == ts(2025, 11, 21, 0, 0, 30)
+
+
+def test_default_date_and_chunks():
+    """没有汇总行时使用默认日期；块大小不影响结果"""
+    lines = "\n".join(SAMPLE.split("\n")[3:5]) + "\n"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'nohup.out'
+        path.write_text(lines, encoding='utf-8')
+        assert list(ConsoleImporter(NAMES).read(path)) == []
+        importer = ConsoleImporter(NAMES, default_date=datetime.date(2025, 1, 2))
+        decodes = list(importer.read(path, 7))
+        assert [d.time for d in decodes] == [ts(2025, 1, 2, 23, 59, 45)] * 2
+    assert parse(SAMPLE, 1 << 20)[0] == parse(SAMPLE, 5)[0]
+
+
+def test_import_into_history_and_heatmap():
+    """导入到解码历史和活动热图"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'nohup.out'
+        path.write_text(SAMPLE, encoding='utf-8')
+        history = DecodeHistory(Path(tmp) / 'history')
+        heatmap = ActivityHeatmap()
+        stats = import_console_log(path, history, heatmap, ConsoleImporter(NAMES))
+        history.close()
+        assert stats['decodes'] == 4
+        assert history.last_heard(entity=141).call == 'VP8LP'
+        assert history.count(band=band_id('10m')) == 3
+        assert heatmap.hourly(339, band_id('10m'))[23] == 1
+
+
+if __name__ == "__main__":
+    test_parse_lines()
+    test_default_date_and_chunks()
+    test_import_into_history_and_heatmap()
+    print("✓ 所有测试通过")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+测试决策延迟直方图
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_latency import BUCKETS, LatencyHistogram, LatencyTracker, bucket_high, bucket_index
+
+
+def test_histogram_percentiles():
+    """分位数误差在3%以内，且不低估"""
+    for micros in list(range(2000)) + [1 << 20, (1 << 20) + 12345, (1 << 30) - 1]:
+        index = bucket_index(micros)
+        assert index < BUCKETS and bucket_high(index) >= micros
+        assert index == 0 or bucket_high(index - 1) < micros
+
+    rng = random.Random(3)
+    values = sorted(rng.expovariate(1 / 0.02) for _ in range(20000))
+    hist = LatencyHistogram()
+    for value in values:
+        hist.record(value)
+    assert hist.count == 20000
+    for p in (50, 90, 99):
+        exact = values[int(len(values) * p / 100) - 1]
+        assert exact <= hist.percentile(p) <= exact * 1.04 + 1e-6, p
+    assert abs(hist.percentile(100) - values[-1]) < 1e-6
+
+    other = LatencyHistogram()
+    other.record(5.0)
+    hist.merge(other)
+    assert hist.count == 20001 and hist.max == 5000000
+
+
+def test_tracker_deadline_misses():
+    """各阶段相对接收时间记录；超过时隙截止时间的 Reply 计为超时"""
+    tracker = LatencyTracker(deadline=1.5)
+    tracker.record('parse', 100.0, 100.0004)
+    tracker.record('decision', 100.0, 100.52)
+    tracker.record('lookup', None, 101.0)           # 没有接收时间（不是从网络收到的）
+    assert tracker.stages['parse'].count == 1 and tracker.stages['lookup'].count == 0
+    assert abs(tracker.stages['decision'].percentile(50) - 0.52) < 0.52 * 0.04
+
+    assert tracker.reply_sent(104.5, slot_start=105.0) is None     # 时隙开始前发出
+    assert tracker.reply_sent(106.4, slot_start=105.0) is None
+    assert abs(tracker.reply_sent(107.0, slot_start=105.0) - 2.0) < 1e-9
+    summary = tracker.summary()
+    assert summary['replies'] == 3 and summary['deadline_misses'] == 1
+    assert summary['stages']['decision']['count'] == 1
+    assert len(tracker.report_lines()) == 6
+
+
+def test_runner_up_not_counted_as_decision_latency():
+    """候补在之后的时隙才响应：不计入决策和发送延迟"""
+    import contextlib
+    import io
+    import os
+    import tempfile
+    import time
+    import ultron
+    from ultron_bands import band_id
+    from ultron_needed import NEW_CALL, NEW_DXCC
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                station = ultron.Ultron()
+                station.state.current_mode = 'FT8'
+                now, mono = time.time(), time.monotonic()
+                station.scheduler.offer('VP8LP', 'CQ VP8LP GD18', 141, band_id('20m'), NEW_DXCC, -18,
+                                        now=now, decode={'received': mono - 0.5})
+                station.scheduler.offer('K1ABC', 'CQ K1ABC FN42', 291, band_id('20m'), NEW_CALL, -5,
+                                        now=now, decode={'received': mono - 5 * 15.0})
+                station.fill_slots(now)
+                assert station.latency.stages['decision'].count == 1
+
+                done, = station.qso.poll(station.qso.get('VP8LP').deadline)
+                station.handle_qso_event(done)
+                assert 'K1ABC' in station.qso
+                assert station.latency.stages['decision'].count == 1
+                stale = {reply['received'] is None for reply in station.replies.take()}
+                assert stale == {False, True}
+                station.ring.close()
+                station.history.close()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_histogram_percentiles()
+    test_tracker_deadline_misses()
+    test_runner_up_not_counted_as_decision_latency()
+    print("✓ 所有测试通过")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+测试消息分类
+"""
+
+import sys
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_message import (CALL, CQ, CQ_MODIFIED, FREE_TEXT, R_REPORT, REPORT, RR73, RRR,
+                            SEVENTY_THREE, parse_message)
+
+
+def test_cq_variants():
+    """CQ、带修饰的CQ（DX/POTA/编号）和只有两个字段的CQ"""
+    msg = parse_message('CQ K1ABC FN42')
+    assert (msg.kind, msg.from_call, msg.grid, msg.to_call) == (CQ, 'K1ABC', 'FN42', '')
+    msg = parse_message('CQ DX K1ABC FN42')
+    assert (msg.kind, msg.modifier, msg.from_call, msg.grid) == (CQ_MODIFIED, 'DX', 'K1ABC', 'FN42')
+    assert parse_message('CQ POTA W1XYZ FN31').from_call == 'W1XYZ'
+    assert parse_message('CQ 290 K1ABC').modifier == '290'
+    msg = parse_message('CQ VK9/W1ABC')
+    assert msg.kind == CQ and msg.from_call == 'VK9/W1ABC' and msg.grid == ''
+    assert msg.is_cq and msg.is_open
+    assert parse_message('CQ').kind == FREE_TEXT
+
+
+def test_qso_messages():
+    """呼叫应答、报告、R+报告和结束语；RR73 不是网格"""
+    cases = {
+        'BA1ABC JA1XYZ PM95': (CALL, 'PM95', None),
+        'BA1ABC JA1XYZ': (CALL, '', None),
+        'BA1ABC JA1XYZ -07': (REPORT, '', -7),
+        'BA1ABC JA1XYZ R+05': (R_REPORT, '', 5),
+        'BA1ABC JA1XYZ RRR': (RRR, '', None),
+        'BA1ABC JA1XYZ RR73': (RR73, '', None),
+        'BA1ABC JA1XYZ 73': (SEVENTY_THREE, '', None),
+    }
+    for text, (kind, grid, report) in cases.items():
+        msg = parse_message(text)
+        assert (msg.kind, msg.grid, msg.report) == (kind, grid, report), text
+        assert (msg.to_call, msg.from_call) == ('BA1ABC', 'JA1XYZ'), text
+    assert parse_message('BA1ABC JA1XYZ RR73').is_open
+    assert not parse_message('BA1ABC JA1XYZ -07').is_open
+
+    # 哈希呼号
+    msg = parse_message('<PJ4/K1ABC> W9XYZ RRR')
+    assert msg.to_call == 'PJ4/K1ABC' and msg.kind == RRR
+    assert parse_message('<...> VK3HAG QF22').from_call == 'VK3HAG'
+
+
+def test_free_text_and_cache():
+    """自由文本没有发送方；相同文本返回同一个对象，呼号被驻留"""
+    for text in ('TNX QSO 73 GL', 'ARIGATOU OM73', '', 'HOPE FOR PEAC'):
+        assert parse_message(text).kind == FREE_TEXT and not parse_message(text).from_call
+    first = parse_message('CQ JA1XYZ PM95')
+    assert parse_message('CQ JA1XYZ PM95') is first
+    other = parse_message('BA1ABC ' + 'JA1' + 'XYZ' + ' -10')
+    assert other.from_call is first.from_call
+
+
+if __name__ == "__main__":
+    test_cq_variants()
+    test_qso_messages()
+    test_free_text_and_cache()
+    print("✓ 所有测试通过")
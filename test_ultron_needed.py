@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+测试需要状态判断
+"""
+
+import sys
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_bands import band_id, mode_id
+from ultron_needed import DUPE, NEW_BAND, NEW_CALL, NEW_DXCC, NEW_GRID, NEW_MODE, NeedEvaluator
+from ultron_store import QSOTable
+
+FT8 = mode_id('FT8')
+FT4 = mode_id('FT4')
+B20 = band_id('20m')
+B15 = band_id('15m')
+
+
+def build_table():
+    table = QSOTable()
+    table.extend([
+        {'call': 'JA1XYZ', 'band': '20m', 'mode': 'FT8', 'dxcc': '339', 'gridsquare': 'PM95ux', 'lotw_qsl_rcvd': 'Y'},
+        {'call': 'JA2ABC', 'band': '15m', 'mode': 'FT8', 'dxcc': '339', 'gridsquare': 'PM84'},
+    ])
+    return table
+
+
+def test_need_classes():
+    """各个需要等级"""
+    needed = NeedEvaluator()
+    needed.sync(build_table())
+    assert needed.evaluate('VP8ABC', 141, B20, FT8) == NEW_DXCC
+    assert needed.evaluate('JA3AAA', 339, band_id('40m'), FT8) == NEW_BAND
+    assert needed.evaluate('JA3AAA', 339, B20, FT4) == NEW_MODE
+    assert needed.evaluate('JA3AAA', 339, B20, FT8, 'PM74') == NEW_GRID
+    assert needed.evaluate('JA3AAA', 339, B20, FT8, 'PM95') == NEW_CALL
+    assert needed.evaluate('JA1XYZ', 339, B20, FT8) == DUPE
+    # 同一呼号在另一个波段
+    assert needed.evaluate('JA1XYZ', 339, B15, FT8) == NEW_CALL
+    # 未知实体只判断网格和呼号
+    assert needed.evaluate('XX1XX', 0, B20, FT8) == NEW_CALL
+    assert needed.worked_call('JA2ABC')
+
+
+def test_require_confirmed():
+    """只有确认的QSO才算完成"""
+    needed = NeedEvaluator(require_confirmed=True)
+    needed.sync(build_table())
+    assert needed.evaluate('JA3AAA', 339, B20, FT8, 'PM95') == NEW_CALL
+    assert needed.evaluate('JA3AAA', 339, B15, FT8) == NEW_BAND
+
+
+def test_incremental_sync():
+    """只同步新增的行，表被替换时重建"""
+    table = build_table()
+    needed = NeedEvaluator()
+    assert needed.sync(table) == 2
+    assert needed.sync(table) == 0
+    table.append({'call': 'VP8ABC', 'band': '20m', 'mode': 'FT8', 'dxcc': '141'})
+    assert needed.sync(table) == 1
+    assert needed.evaluate('VP8ABC', 141, B20, FT8) == DUPE
+
+    assert needed.sync(QSOTable()) == 0
+    assert needed.evaluate('VP8ABC', 141, B20, FT8) == NEW_DXCC
+
+
+if __name__ == "__main__":
+    test_need_classes()
+    test_require_confirmed()
+    test_incremental_sync()
+    print("✓ 所有测试通过")
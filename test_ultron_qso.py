@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+测试QSO状态机
+"""
+
+import contextlib
+import io
+import os
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron import WSJTXProtocol
+from ultron_qso import ABANDONED, LOGGED, R_REPORT, REPORT, SIGNOFF, QSOMachine, ReplyQueue
+
+
+def phase(qso):
+    return qso.phase if qso is not None else None
+
+
+def test_full_qso():
+    """呼叫 -> 报告 -> RR73 -> 完成"""
+    machine = QSOMachine('BA1ABC', clock_offset=0.0)
+    qso = machine.start('JA1XYZ', 'FT8', snr=-12, mono=1003.0)
+    assert qso.deadline == 1005.0 + 4 * 15.0      # 对齐到时隙边界
+    assert machine.next_message('JA1XYZ', 'OM89') == 'JA1XYZ BA1ABC OM89'
+
+    # 对方和别人通联，不影响
+    assert machine.on_decode('K1ABC JA1XYZ -05', mono=1020.0) is None
+    assert phase(machine.on_decode('BA1ABC JA1XYZ -07', snr=-10, mono=1020.0)) == REPORT
+    assert machine.next_message('JA1XYZ') == 'JA1XYZ BA1ABC R-10'
+    assert qso.report_received == '-07'
+    # 重复的报告不是新的状态
+    assert machine.on_decode('BA1ABC JA1XYZ -07', mono=1035.0) is None
+    assert phase(machine.on_decode('BA1ABC JA1XYZ RR73', mono=1050.0)) == SIGNOFF
+    # 发送73的时隙结束后完成
+    assert machine.poll(1064.0) == []
+    assert [q.phase for q in machine.poll(1065.0)] == [LOGGED]
+    assert not machine.busy
+
+
+def test_r_report_and_73():
+    """收到 R+报告 后发送 RR73，收到 73 直接完成"""
+    machine = QSOMachine('BA1ABC', clock_offset=0.0)
+    machine.start('VP8LP', 'FT8', mono=0.0)
+    assert phase(machine.on_decode('BA1ABC VP8LP R-15', mono=15.0)) == R_REPORT
+    assert machine.next_message('VP8LP') == 'VP8LP BA1ABC RR73'
+    assert phase(machine.on_decode('BA1ABC VP8LP 73', mono=30.0)) == LOGGED
+    assert not machine.busy
+
+
+def test_abandon_after_n_slots():
+    """没有进展的QSO正好在N个时隙后放弃（FT4 时隙 7.5 秒）"""
+    machine = QSOMachine('BA1ABC', max_idle_slots=3, clock_offset=0.0)
+    machine.start('K1ABC', 'FT4', mono=100.0)
+    assert machine.time_left(100.0) == 105.0 + 3 * 7.5 - 100.0
+    assert machine.poll(127.4) == []
+    assert [q.phase for q in machine.poll(127.5)] == [ABANDONED]
+    assert machine.poll(200.0) == []
+
+    assert machine.start('K1ABC', 'FST4', mono=0.0, period=120.0).deadline == 360.0
+
+
+def test_abandon_fills_slot_with_runner_up():
+    """ULTRON 放弃所选电台后，空出的位置直接给同一时隙的候补（JT65 时隙 60 秒）"""
+    import ultron
+    from ultron_bands import band_id
+    from ultron_needed import NEW_CALL, NEW_DXCC
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                station = ultron.Ultron()
+                station.state.current_mode = 'JT65'
+                # 候选在放弃前约五个时隙收到（最坏情况下的年龄）
+                offered = time.time() - 5 * 60.0
+                station.scheduler.offer('VP8LP', 'CQ VP8LP GD18', 141, band_id('20m'), NEW_DXCC, -18, now=offered)
+                station.scheduler.offer('K1ABC', 'CQ K1ABC FN42', 291, band_id('20m'), NEW_CALL, -5, now=offered)
+                station.fill_slots(offered + 0.5)
+                qso = station.qso.get('VP8LP')
+                assert qso is not None and station.scheduler.ttl > time.time() - offered
+
+                done, = station.qso.poll(qso.deadline)
+                station.handle_qso_event(done)
+                assert 'VP8LP' in station.state.excluded_calls
+                assert 'K1ABC' in station.qso and station.state.current_call == 'K1ABC'
+                station.ring.close()
+                station.history.close()
+        finally:
+            os.chdir(cwd)
+
+
+def test_concurrent_qsos():
+    """多个QSO同时进行，各自推进和超时"""
+    machine = QSOMachine('BA1ABC', max_idle_slots=2, clock_offset=0.0, max_concurrent=2)
+    machine.start('JA1XYZ', mono=0.0)
+    assert not machine.busy and machine.free_slots == 1
+    machine.start('K1ABC', mono=1.0)
+    assert machine.busy and machine.start('VP8LP', mono=2.0) is None
+    assert 'K1ABC' in machine and len(machine) == 2
+
+    assert phase(machine.on_decode('BA1ABC K1ABC -03', mono=14.0)) == REPORT
+    assert machine.next_message('K1ABC') == 'K1ABC BA1ABC R+00'
+    assert machine.time_left(14.0) == 30.0 - 14.0
+    # JA1XYZ 没有回应，K1ABC 的截止时间已延长
+    assert [q.call for q in machine.poll(30.0)] == ['JA1XYZ']
+    assert not machine.busy and 'K1ABC' in machine
+    assert machine.abandon('K1ABC').phase == ABANDONED and len(machine) == 0
+
+
+def test_reply_queue_coalesces_per_period():
+    """同一发射周期的 Reply 合并成一批，同一呼号只保留最新的一条"""
+    queue = ReplyQueue(lead=0.5)
+    assert queue.add('JA1XYZ', 'CQ JA1XYZ PM95', boundary=15.0, now=13.2)
+    assert queue.flush_at == 14.5
+    assert not queue.add('K1ABC', 'CQ K1ABC FN42', boundary=15.0, now=13.4)
+    assert not queue.add('JA1XYZ', 'CQ DX JA1XYZ PM95', boundary=15.0, now=13.6)
+    assert queue.take() == ['CQ K1ABC FN42', 'CQ DX JA1XYZ PM95']
+    assert len(queue) == 0 and queue.flush_at is None
+    # 来不及在边界前发出时立即发出
+    assert queue.add('VP8LP', 'CQ VP8LP', boundary=30.0, now=29.8) and queue.flush_at == 29.8
+
+
+def test_status_packet_fields():
+    """状态包中的 DE call/grid 和 T/R 周期"""
+    def utf8(text):
+        data = text.encode()
+        return struct.pack('>I', len(data)) + data
+
+    packet = (struct.pack('>III', 0xadbccbda, 2, 1) + utf8('WSJT-X') + struct.pack('>Q', 14074000)
+              + utf8('FT8') + utf8('JA1XYZ') + utf8('-10') + utf8('FT8') + bytes([1, 0, 1])
+              + struct.pack('>II', 1500, 1500) + utf8('BA1ABC') + utf8('OM89') + utf8('PM95')
+              + bytes([0]) + utf8('') + bytes([0, 0]) + struct.pack('>II', 0, 15))
+    status = WSJTXProtocol().parse_status_packet(packet)
+    assert status['frequency'] == 14074000 and status['dx_call'] == 'JA1XYZ'
+    assert status['de_call'] == 'BA1ABC' and status['de_grid'] == 'OM89'
+    assert status['tx_enabled'] and not status['transmitting'] and status['decoding']
+    assert status['tr_period'] == 15
+
+    # 截短的旧格式状态包只有基本字段
+    short = WSJTXProtocol().parse_status_packet(packet[:60])
+    assert short['frequency'] == 14074000 and short['de_call'] == ''
+
+
+def test_reply_packet():
+    """Reply 包（类型4）字段顺序"""
+    protocol = WSJTXProtocol()
+    packet = protocol.build_reply_packet({'id': 'WSJT-X', 'time': 3723000, 'snr': -12, 'delta_time': 0.2,
+                                          'delta_f': 1500, 'mode': '~', 'message': 'CQ JA1XYZ PM95'})
+    assert struct.unpack('>III', packet[:12]) == (0xadbccbda, 2, 4)
+    client, pos = protocol.read_utf8(packet, 12)
+    assert client == 'WSJT-X'
+    assert struct.unpack('>IidI', packet[pos:pos + 20]) == (3723000, -12, 0.2, 1500)
+    mode, pos = protocol.read_utf8(packet, pos + 20)
+    message, pos = protocol.read_utf8(packet, pos)
+    assert (mode, message, packet[pos:]) == ('~', 'CQ JA1XYZ PM95', bytes([0, 0]))
+
+
+if __name__ == "__main__":
+    test_full_qso()
+    test_r_report_and_73()
+    test_abandon_after_n_slots()
+    test_abandon_fills_slot_with_runner_up()
+    test_concurrent_qsos()
+    test_reply_queue_coalesces_per_period()
+    test_status_packet_fields()
+    test_reply_packet()
+    print("✓ 所有测试通过")
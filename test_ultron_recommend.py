@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+测试白名单推荐引擎
+"""
+
+import sys
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_bands import band_id
+from ultron_recommend import ActivityTracker, Recommender
+from ultron_store import QSOTable, SlotMatrix
+
+WHITELISTS = {
+    'global': {
+        246: {'name': 'SOV MILITARY ORDER OF MALTA', 'priority': 'high', 'score': 10},
+        24: {'name': 'BOUVET', 'priority': 'high', 'score': 10},
+    },
+    '20m': {
+        339: {'name': 'JAPAN', 'priority': 'low', 'score': 2},
+        291: {'name': 'UNITED STATES', 'priority': 'low', 'score': 1},
+    },
+}
+
+
+def build_matrix():
+    table = QSOTable()
+    table.extend([
+        {'call': 'JA1XYZ', 'band': '15m', 'mode': 'FT8', 'dxcc': '339'},
+        {'call': 'K1ABC', 'band': '20m', 'mode': 'FT8', 'dxcc': '291'},
+        {'call': 'K2ABC', 'band': '40m', 'mode': 'FT8', 'dxcc': '291'},
+    ])
+    return SlotMatrix(table)
+
+
+def test_worked_slots_excluded():
+    """已通联的 实体×波段 不推荐"""
+    recommender = Recommender(WHITELISTS, build_matrix())
+    top = [eid for eid, _ in recommender.top('20m', 10)]
+    assert 291 not in top
+    assert 339 in top
+    # 高优先级的未通联实体排在前面
+    assert set(top[:2]) == {24, 246}
+
+
+def test_activity_boost():
+    """波段上最近的活跃度提升排名"""
+    activity = ActivityTracker(half_life=60)
+    for _ in range(20):
+        activity.record(246, band_id('20m'), now=1000)
+    recommender = Recommender(WHITELISTS, build_matrix(), activity)
+    assert recommender.top('20m', 1, now=1000)[0][0] == 246
+    # 解码到的非白名单实体也成为候选
+    activity.record(150, band_id('20m'), now=1000)
+    assert 150 in [eid for eid, _ in recommender.top('20m', 10, now=1000)]
+    # 活跃度随时间衰减
+    assert activity.level(246, band_id('20m'), now=1060) < activity.level(246, band_id('20m'), now=1000) / 1.9
+
+
+def test_top_k_and_new_entities():
+    """前K名和未通联实体推荐"""
+    recommender = Recommender(WHITELISTS, build_matrix(), entities=[1, 2, 3])
+    assert len(recommender.top('20m', 2)) == 2
+    new = [eid for eid, _ in recommender.top_new(10)]
+    assert 339 not in new and 291 not in new
+    assert new[:2] in ([24, 246], [246, 24])
+    result = recommender.recommend(['20m', '15m', 'bogus'], 3)
+    assert sorted(result) == ['15m', '20m']
+
+
+if __name__ == "__main__":
+    test_worked_slots_excluded()
+    test_activity_boost()
+    test_top_k_and_new_entities()
+    print("✓ 所有测试通过")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+测试按时隙缓冲的终端输出
+"""
+
+import io
+import sys
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron import COLOR_CODES, Colors, TerminalUI, set_color
+from ultron_render import SlotRenderer
+
+
+class CountingStream(io.StringIO):
+    """记录 write 次数"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def write(self, text):
+        self.calls += 1
+        return super().write(text)
+
+
+def test_slot_sorted_single_write():
+    """一个时隙的行按信噪比/需要等级/频率排序，时隙变化时一次写出"""
+    stream = CountingStream()
+    renderer = SlotRenderer({'green': '<g>', 'reset': '</>'}, 'snr', stream)
+    renderer.add('A', 'green', snr=-15, need=2, delta_f=900, slot=1000)
+    renderer.add('B', 'white', snr=3, need=5, delta_f=300, slot=1000)
+    renderer.add('C', 'green', snr=-2, need=0, delta_f=2100, slot=1000)
+    assert stream.getvalue() == '' and len(renderer) == 3
+    renderer.add('D', slot=16000)               # 下一个时隙
+    assert stream.getvalue() == 'B\n<g>C</>\n<g>A</>\n' and stream.calls == 1
+    assert renderer.flush() == 1 and renderer.flush() == 0
+
+    for order, expected in (('need', 'CAB'), ('freq', 'BAC'), ('arrival', 'ABC')):
+        stream = io.StringIO()
+        renderer = SlotRenderer({}, order, stream)
+        renderer.add('A', snr=-15, need=2, delta_f=900)
+        renderer.add('B', snr=3, need=5, delta_f=300)
+        renderer.add('C', snr=-2, need=0, delta_f=2100)
+        renderer.flush()
+        assert stream.getvalue().split() == list(expected), order
+    try:
+        SlotRenderer({}, 'callsign')
+        assert False, "应拒绝未知的排序方式"
+    except ValueError:
+        pass
+
+
+def test_no_color_mode():
+    """关闭颜色后不输出任何转义码"""
+    line = TerminalUI.format_qso_line('120015', '-7', '1234', 'FT8', '>>', 'CQ JA1XYZ PM95', 'Japan', 'NEW DXCC')
+    assert line.startswith('120015 -7  1234 FT8') and line.endswith('[NEW DXCC]')
+    assert TerminalUI.colorize('x', 'green') == '\033[32mx\033[0m'
+    try:
+        set_color(False)
+        assert TerminalUI.colorize('x', 'green') == 'x' and Colors.RED == ''
+        stream = io.StringIO()
+        renderer = SlotRenderer(COLOR_CODES, 'snr', stream)
+        renderer.add(line, 'green')
+        renderer.flush()
+        assert '\033' not in stream.getvalue()
+    finally:
+        set_color(True)
+    assert Colors.RED == '\033[31m' and COLOR_CODES['bright_green'] == '\033[92m'
+
+
+if __name__ == "__main__":
+    test_slot_sorted_single_write()
+    test_no_color_mode()
+    print("✓ 所有测试通过")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+测试候选调度器
+"""
+
+import sys
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_bands import band_id
+from ultron_needed import NEW_BAND, NEW_CALL, NEW_DXCC
+from ultron_qso import ABANDONED, QSOMachine
+from ultron_scheduler import CandidateScheduler, candidate_ttl, grid_distance
+
+B20 = band_id('20m')
+
+
+def test_grid_distance():
+    """网格距离"""
+    assert grid_distance('FN42', 'FN42') == 0.0
+    assert 5000 < grid_distance('FN42', 'JO01') < 5500
+    assert grid_distance('FN42', '') == 0.0
+
+
+def test_pick_best_of_slot():
+    """到决策时间选得分最高的候选，而不是第一个"""
+    scheduler = CandidateScheduler(decision_window=0.5)
+    scheduler.offer('K1ABC', 'CQ K1ABC FN42', 291, B20, NEW_CALL, -5, 'FN42', now=100.0)
+    scheduler.offer('VP8LP', 'CQ VP8LP GD18', 141, B20, NEW_DXCC, -18, 'GD18', now=100.05)
+    scheduler.offer('JA1XYZ', 'CQ JA1XYZ PM95', 339, B20, NEW_CALL, 0, 'PM95', priority=10.0, now=100.1)
+
+    assert not scheduler.due(100.2)
+    assert abs(scheduler.wait_time(100.2, 1.0) - 0.3) < 1e-9
+    assert scheduler.due(100.5)
+    assert scheduler.pick(100.5).call == 'VP8LP'
+    # 白名单优先级高于普通新呼号
+    assert scheduler.pick(100.6).call == 'JA1XYZ'
+    assert len(scheduler) == 1
+
+
+def test_runner_up_retry():
+    """所选电台不回应时换候补；过期或被排除的候补被跳过"""
+    scheduler = CandidateScheduler(ttl=60.0)
+    scheduler.offer('OLD1AA', 'CQ OLD1AA', 1, B20, NEW_DXCC, 0, now=0.0)
+    scheduler.offer('K1ABC', 'CQ K1ABC', 291, B20, NEW_BAND, -10, now=50.0)
+    scheduler.offer('W1XYZ', 'CQ W1XYZ', 291, B20, NEW_BAND, -12, now=50.0)
+    scheduler.offer('N1ABC', 'CQ N1ABC', 291, B20, NEW_CALL, 0, now=50.0)
+
+    assert scheduler.pick(50.5).call == 'OLD1AA'
+    assert scheduler.pick(70.0, excluded={'K1ABC'}).call == 'W1XYZ'
+    # 再次解码时刷新
+    scheduler.offer('N1ABC', 'CQ N1ABC', 291, B20, NEW_CALL, 0, now=200.0)
+    assert scheduler.pick(200.5).call == 'N1ABC'
+    assert scheduler.pick(201.0) is None
+
+
+def test_runner_up_after_abandon():
+    """所选电台超时放弃时（忙的时候不再收候选），同一时隙的候补还有效"""
+    for mode, period in (('FT8', 15.0), ('FT4', 7.5)):
+        machine = QSOMachine('BA1ABC', clock_offset=0.0)
+        scheduler = CandidateScheduler(ttl=candidate_ttl(period, machine.max_idle_slots))
+        scheduler.offer('VP8LP', 'CQ VP8LP GD18', 141, B20, NEW_DXCC, -18, now=1000.1)
+        scheduler.offer('K1ABC', 'CQ K1ABC FN42', 291, B20, NEW_CALL, -5, now=1000.2)
+
+        chosen = scheduler.pick(1000.7)
+        qso = machine.start(chosen.call, mode, mono=1000.7)
+        assert machine.busy and machine.poll(qso.deadline - 0.1) == []
+        done, = machine.poll(qso.deadline)
+        assert done.phase == ABANDONED and not machine.busy
+        # 定时器稍晚触发也赶得上
+        assert scheduler.pick(qso.deadline + 1.0, excluded={chosen.call}).call == 'K1ABC'
+
+
+if __name__ == "__main__":
+    test_grid_distance()
+    test_pick_best_of_slot()
+    test_runner_up_retry()
+    test_runner_up_after_abandon()
+    print("✓ 所有测试通过")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+测试共享解码环形缓冲
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_shm import (HEADER_SIZE, RECORD, DecodeRing, DecodeRingReader, materialize_shared_data,
+                        shared_data_decode)
+
+
+def test_ring_readers():
+    """读取方按序号读出新解码；被追上时计入 lost；写入方重启后序号继续"""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = Path(workdir) / 'decodes.ring'
+        ring = DecodeRing(path, capacity=8)
+        ring.append(45000, -7, 1234, 0.3, 8, 1, 0, '>>', 'JA1XYZ', 'CQ JA1XYZ PM95', 'Japan', timestamp=1700000000)
+        early = DecodeRingReader(path, start=0)
+        late = DecodeRingReader(path)
+        assert late.poll() == []
+
+        decode, = early.poll()
+        assert decode.seq == 1 and decode.call == 'JA1XYZ' and decode.delta_t == 0.3
+        assert shared_data_decode(decode) == {
+            'time': '00:00:45', 'snr': -7, 'deltaF': 1234, 'mode': 'FT8', 'status': '>>',
+            'message': 'CQ JA1XYZ PM95', 'call': 'JA1XYZ', 'dxcc': 'Japan', 'band': '20m',
+            'priority_reason': 'NEW DXCC', 'timestamp': 1700000000}
+
+        for i in range(20):
+            ring.append(60000, -10, 500 + i, 0.0, 8, 1, 5, '--', f'K{i}ABC', f'CQ K{i}ABC FN42', 'United States')
+        assert [d.seq for d in late.poll(limit=3)] == [14, 15, 16] and late.lost == 12
+        assert [d.seq for d in early.poll()] == list(range(14, 22)) and early.lost == 12
+
+        # 正在被覆盖的记录（首尾序号不一致）被跳过
+        ring.append(75000, 0, 700, 0.0, 8, 1, 4, '', 'DL1AB', 'CQ DL1AB JO62', 'Germany')
+        offset = HEADER_SIZE + (22 % 8) * RECORD.size
+        ring.map[offset + RECORD.size - 8:offset + RECORD.size] = b'\0' * 8
+        assert early.poll() == [] and early.lost == 13
+        ring.close()
+
+        ring = DecodeRing(path, capacity=8)
+        assert ring.append(90000, 0, 800, 0.0, 8, 1, 4, '', 'G4ABC', 'CQ G4ABC IO91', 'England') == 23
+        assert [d.call for d in early.poll()] == ['G4ABC']
+        ring.close()
+
+        ring = DecodeRing(path, capacity=16)    # 容量不同：重建文件，读取方重新映射
+        ring.append(105000, 0, 900, 0.0, 8, 1, 4, '', 'VK2ABC', 'CQ VK2ABC QF56', 'Australia')
+        assert early.reopened() and [d.call for d in early.poll()] == ['VK2ABC']
+        ring.close()
+        for reader in (early, late):
+            reader.close()
+
+
+def test_shared_data_materialized_lazily():
+    """只在有新解码时重写 jtdx_shared_data.json，保留状态和配置，最新的在前"""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = Path(workdir) / 'decodes.ring'
+        output = Path(workdir) / 'jtdx_shared_data.json'
+        output.write_text(json.dumps({'decodes': [{'call': 'OLD1'}], 'status': {'cq_active': True},
+                                      'config': {'decall': 'BG1SB'}}), encoding='utf-8')
+        ring = DecodeRing(path)
+        reader = DecodeRingReader(path)
+        assert materialize_shared_data(reader, output) == 0
+        ring.append(45000, -7, 1234, 0.3, 8, 1, 0, '>>', 'JA1XYZ', 'CQ JA1XYZ PM95', 'Japan')
+        ring.append(45000, -12, 900, 0.1, 8, 1, 4, '', 'K1ABC', 'CQ K1ABC FN42', 'United States')
+        assert materialize_shared_data(reader, output, limit=2) == 2
+        data = json.loads(output.read_text(encoding='utf-8'))
+        assert [d['call'] for d in data['decodes']] == ['K1ABC', 'JA1XYZ']
+        assert data['status'] == {'cq_active': True, 'decoded_count': 2} and data['config'] == {'decall': 'BG1SB'}
+        mtime = output.stat().st_mtime_ns
+        assert materialize_shared_data(reader, output) == 0 and output.stat().st_mtime_ns == mtime
+        ring.close()
+        reader.close()
+
+
+def test_ultron_writes_ring():
+    """ULTRON 把显示的解码写进环形缓冲"""
+    import contextlib
+    import io
+    import os
+    import ultron
+
+    decode = {'id': 'WSJT-X', 'time': 45000, 'snr': -12, 'delta_time': 0.3, 'delta_f': 1234,
+              'mode': '~', 'message': 'CQ JA1XYZ PM95', 'low_confidence': False}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                station = ultron.Ultron()
+                reader = DecodeRingReader(ultron.DECODE_RING)
+                station.process_decode(dict(decode))
+                decode, = reader.poll()
+                assert decode.call == 'JA1XYZ' and decode.delta_f == 1234 and decode.status == '>>'
+                reader.close()
+                station.ring.close()
+                station.history.close()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_ring_readers()
+    test_shared_data_materialized_lazily()
+    test_ultron_writes_ring()
+    print("✓ 所有测试通过")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+测试波段模拟器
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron import DXCCDatabase, WSJTXProtocol
+from ultron_message import parse_message
+from ultron_simulator import (BandSimulator, Population, Throughput, build_decode_packet,
+                              build_status_packet, builtin_database, drive_ultron, parse_reply_packet)
+
+
+def test_population_and_packets():
+    """生成的呼号能查回所属实体；解码包、状态包和 Reply 包与 ULTRON 的解析一致"""
+    db = DXCCDatabase("missing.json")
+    db.database = builtin_database()
+    population = Population(random.Random(1), 300)
+    assert len(population) == 300 and len(population.by_call) == 300
+    for station in population.stations[:100]:
+        assert db.locate_call(station.call)['id'] == station.eid, station.call
+
+    protocol = WSJTXProtocol()
+    decode = protocol.parse_decode_packet(build_decode_packet('CQ DX JA1XYZ PM95', -12, 0.3, 1234, 45000))
+    assert (decode['message'], decode['snr'], decode['delta_f'], decode['time']) == ('CQ DX JA1XYZ PM95', -12, 1234, 45000)
+    assert abs(decode['delta_time'] - 0.3) < 1e-9 and decode['mode'] == '~' and decode['id'] == 'WSJT-X'
+
+    status = protocol.parse_status_packet(build_status_packet(14074000, 'FT8', 'BG1SIM', 'OM89', 3))
+    assert (status['frequency'], status['de_call'], status['de_grid'], status['tr_period']) == \
+        (14074000, 'BG1SIM', 'OM89', 3)
+
+    reply = parse_reply_packet(protocol.build_reply_packet(decode))
+    assert (reply['message'], reply['snr'], reply['delta_f'], reply['mode']) == ('CQ DX JA1XYZ PM95', -12, 1234, '~')
+
+
+def test_simulator_answers_reply():
+    """每个时隙约200条解码；收到 Reply 的电台下一个时隙回应报告，再下一个时隙发 RR73"""
+    simulator = BandSimulator(Population(random.Random(2), 1000), 'BG1SIM', decodes=200,
+                              answer_prob=1.0, rr73_prob=1.0, seed=2)
+    messages = [text for _station, text in simulator.slot_messages()]
+    assert len(messages) >= 180
+    kinds = [parse_message(text) for text in messages]
+    assert sum(msg.is_cq for msg in kinds) > 60 and sum(not msg.is_cq for msg in kinds) > 40
+    assert len(simulator.slot(0.0)) >= 180 and simulator.stats['decodes'] >= 180
+
+    cq = next(text for text in messages if parse_message(text).is_cq)
+    call = parse_message(cq).from_call
+    assert simulator.on_reply(cq) and simulator.stats['answered'] == 1
+    answer = [text for _station, text in simulator.slot_messages() if text.startswith('BG1SIM ')]
+    assert len(answer) == 1 and parse_message(answer[0]).report is not None
+    assert parse_message(answer[0]).from_call == call
+    signoff = [text for _station, text in simulator.slot_messages() if text.startswith('BG1SIM ')]
+    assert signoff == [f'BG1SIM {call} RR73'] and simulator.stats['rr73'] == 1
+    assert not simulator.on_reply('CQ NOSUCH1 FN42') and simulator.stats['unknown_replies'] == 1
+
+
+def test_drive_ultron_accelerated():
+    """加速运行（1秒时隙）：ULTRON 通过回环UDP发出 Reply，对方回应后完成QSO"""
+    from ultron import Ultron
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                target = Ultron()
+                target.dxcc_db.database = builtin_database()
+                simulator = BandSimulator(Population(random.Random(3), 500), 'BG1SIM', 'OM89',
+                                          decodes=50, answer_prob=1.0, rr73_prob=1.0, period=1, seed=3)
+                throughput = Throughput()
+                drive_ultron(simulator, target, 6, throughput)
+                target.history.close()
+        finally:
+            os.chdir(cwd)
+    assert throughput.decodes == simulator.stats['decodes'] >= 250
+    assert target.state.tx_count >= 1 and simulator.stats['replies'] == target.state.tx_count
+    assert simulator.stats['answered'] >= 1 and target.state.logged_count >= 1
+    assert target.latency.stages['parse'].count == throughput.decodes
+
+
+if __name__ == "__main__":
+    test_population_and_packets()
+    test_simulator_answers_reply()
+    test_drive_ultron_accelerated()
+    print("✓ 所有测试通过")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+测试列式QSO存储
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_adif import ADIFWriter
+from ultron_bands import CHALLENGE_BANDS, band_id, mode_id
+from ultron_store import LogIndex, QSOTable, SlotMatrix
+
+QSOS = [
+    {'call': 'JA1XYZ', 'band': '20m', 'mode': 'FT8', 'qso_date': '20240105', 'dxcc': '339'},
+    {'call': 'JA1XYZ', 'band': '15m', 'mode': 'MFSK', 'submode': 'FT4', 'qso_date': '20240106', 'dxcc': '339'},
+    {'call': 'K1ABC', 'band': '20m', 'mode': 'FT8', 'qso_date': '20230101'},
+    {'call': 'BG1SB', 'band': '40m', 'mode': 'FT8', 'qso_date': '20240301'},
+]
+
+
+def build_table():
+    lookups = []
+
+    def resolve(call):
+        lookups.append(call)
+        return {'K1ABC': '291', 'BG1SB': '318'}.get(call, 'unknown')
+
+    table = QSOTable(resolve)
+    table.extend(QSOS)
+    return table, lookups
+
+
+def test_columns_and_call_pool():
+    """呼号驻留，实体每个呼号只解析一次"""
+    table, lookups = build_table()
+    assert len(table) == 4
+    assert len(table.pool) == 3
+    assert lookups == ['JA1XYZ', 'K1ABC', 'BG1SB']
+    assert table.call(1) == 'JA1XYZ'
+    assert list(table.entities) == [339, 339, 291, 318]
+    assert table.modes[1] == mode_id('FT4')
+
+
+def test_mask_and_select():
+    """组合过滤条件"""
+    table, _ = build_table()
+    mask = table.mask(bands=['20m'], start_date=20240101)
+    assert table.select(table.entities, mask) == [339]
+    mask = table.mask(entities=[339, 318])
+    assert table.select(table.dates, mask) == [20240105, 20240106, 20240301]
+
+
+def test_group_by_band():
+    """按波段分组统计"""
+    table, _ = build_table()
+    counts = table.count_by_band()
+    assert counts[band_id('20m')] == 2
+    assert counts[band_id('40m')] == 1
+    by_band = table.unique_entities_by_band()
+    assert by_band[band_id('20m')] == {339, 291}
+    assert by_band[band_id('15m')] == {339}
+    assert table.unique_entities() == {339, 291, 318}
+
+
+def test_slot_matrix_reports():
+    """实体 × 波段矩阵上的各种归约"""
+    table, _ = build_table()
+    matrix = SlotMatrix(table)
+    assert matrix.qsos(339, band_id('20m')) == 1
+    assert matrix.worked_bands(339) == [band_id('20m'), band_id('15m')]
+    assert matrix.entities_by_band() == table.unique_entities_by_band()
+    assert matrix.band_totals() == table.count_by_band()
+    # 339: 20m 15m, 291: 20m, 318: 40m
+    assert matrix.slot_count(CHALLENGE_BANDS) == 4
+    assert matrix.mode_totals()[mode_id('FT8')] == (3, 3)
+    assert matrix.mode_totals()[mode_id('FT4')] == (1, 1)
+    assert matrix.entity_totals()[339] == 2
+    missing = matrix.missing_slots(CHALLENGE_BANDS)
+    assert missing[0][:1] == (339,) and missing[0][2] == 2
+    assert (291, band_id('40m'), 1) in missing
+    assert (339, band_id('20m'), 2) not in missing
+
+    # 带行掩码
+    masked = SlotMatrix(table, table.mask(start_date=20240101))
+    assert masked.slot_count(CHALLENGE_BANDS) == 3
+
+
+def test_save_and_load():
+    """保存后载入内容一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        table, _ = build_table()
+        path = Path(tmp) / 'table.bin'
+        table.save(path, {'offset': 42})
+        loaded, meta = QSOTable.load(path)
+        assert meta == {'offset': 42}
+        assert len(loaded) == len(table)
+        assert [loaded.call(i) for i in range(len(loaded))] == [table.call(i) for i in range(len(table))]
+        assert loaded.unique_entities_by_band() == table.unique_entities_by_band()
+        assert loaded.pool.intern('K1ABC') == table.pool.index['K1ABC']
+
+
+def test_log_index_incremental():
+    """只解析新增的QSO，日志被重写时重建"""
+    resolved = []
+
+    def resolve(call):
+        resolved.append(call)
+        return {'JA1XYZ': 339, 'K1ABC': 291}.get(call)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / 'log.adi'
+        state = Path(tmp) / 'state.bin'
+        with ADIFWriter(log) as writer:
+            writer.write_many(QSOS[:2])
+
+        assert LogIndex(log, state, resolve).refresh() == 2
+
+        # 追加一条完整记录和一条未写完的记录
+        with ADIFWriter(log, append=True) as writer:
+            writer.write(QSOS[2])
+        with open(log, 'ab') as f:
+            f.write(b'<call:5>BG1SB <band:3>40m')
+
+        index = LogIndex(log, state, resolve)
+        assert index.refresh() == 1
+        assert len(index.table) == 3
+        assert index.table.unique_entities() == {339, 291}
+        assert resolved == ['JA1XYZ', 'K1ABC']
+
+        # 写完后被读入
+        with open(log, 'ab') as f:
+            f.write(b' <eor>\n')
+        assert LogIndex(log, state, resolve).refresh() == 1
+
+        # 日志被重写
+        with ADIFWriter(log) as writer:
+            writer.write(QSOS[3])
+        index = LogIndex(log, state, resolve)
+        assert index.refresh() == 1
+        assert len(index.table) == 1
+
+        # 解析数据库变化时重建
+        index = LogIndex(log, state, resolve, signature='new')
+        assert index.refresh() == 1
+
+
+def test_log_index_after_merge():
+    """合并到日志后用合并时建好的表更新索引，下次启动不必重新解析"""
+    from ultron_adif import merge_logs
+
+    resolve = {'JA1XYZ': 339, 'K1ABC': 291}.get
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / 'log.adi'
+        other = Path(tmp) / 'other.adi'
+        state = Path(tmp) / 'state.bin'
+        with ADIFWriter(log) as writer:
+            writer.write_many(QSOS[:2])
+        with ADIFWriter(other) as writer:
+            writer.write_many(QSOS[1:])
+        assert LogIndex(log, state, resolve).refresh() == 2
+
+        table = QSOTable(resolve)
+        merge_logs([log, other], log, on_record=table.append)
+        index = LogIndex(log, state, resolve)
+        index.replace(table)
+        index.save()
+
+        index = LogIndex(log, state, resolve)
+        assert index.refresh() == 0
+        assert len(index.table) == 4 and index.table.unique_entities() == {339, 291}
+
+
+if __name__ == "__main__":
+    test_columns_and_call_pool()
+    test_mask_and_select()
+    test_group_by_band()
+    test_slot_matrix_reports()
+    test_save_and_load()
+    test_log_index_incremental()
+    test_log_index_after_merge()
+    print("✓ 所有测试通过")
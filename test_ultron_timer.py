@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+测试分层时间轮
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_timer import ExpiringSet, TimingWheel
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_fire_order_across_levels():
+    """不同层的定时器都在到期的刻度触发"""
+    clock = FakeClock()
+    wheel = TimingWheel(tick=0.1, clock=clock)
+    fired = []
+    delays = [0.05, 0.1, 3.0, 6.4, 6.5, 60.0, 409.6, 500.0, 1800.0, 7000.0]
+    rng = random.Random(7)
+    delays += [rng.uniform(0, 5000) for _ in range(300)]
+    expected = {}
+    for i, delay in enumerate(delays):
+        wheel.schedule(delay, fired.append, i)
+        expected[i] = max(wheel._expiry(clock.now + delay), wheel.current + 1)
+    assert len(wheel) == len(delays)
+
+    step = 0
+    while len(wheel):
+        step += 1
+        clock.now = 1000.0 + step * 0.1 + 1e-6
+        before = len(fired)
+        wheel.advance()
+        for i in fired[before:]:
+            assert expected[i] == wheel.current, (i, delays[i])
+    assert sorted(fired) == list(range(len(delays)))
+
+
+def test_cancel_and_periodic():
+    """取消和周期性任务"""
+    clock = FakeClock(0.0)
+    wheel = TimingWheel(tick=0.1, clock=clock)
+    calls = []
+    timer = wheel.schedule(1.0, calls.append, 'once')
+    job = wheel.every(2.0, calls.append, 'tick')
+    timer.cancel()
+    assert not timer.active and len(wheel) == 1
+
+    assert wheel.advance(7.05) == 3
+    assert calls == ['tick'] * 3
+    job.cancel()
+    assert len(wheel) == 0
+    assert wheel.advance(100.0) == 0
+
+
+def test_expiring_set():
+    """每个呼号各自的排除期限"""
+    clock = FakeClock(0.0)
+    wheel = TimingWheel(clock=clock)
+    excluded = ExpiringSet(wheel, ttl=1800.0)
+    excluded.add('K1ABC')
+    clock.now = 600.0
+    excluded.add('JA1XYZ')
+    excluded.add('VP8LP', ttl=60.0)
+    assert 'K1ABC' in excluded and len(excluded) == 3
+
+    clock.now = 700.0
+    wheel.advance()
+    assert 'VP8LP' not in excluded
+    clock.now = 1800.05
+    wheel.advance()
+    assert 'K1ABC' not in excluded and 'JA1XYZ' in excluded
+    excluded.add('JA1XYZ')  # 再次失败时重新计时
+    clock.now = 2400.5
+    wheel.advance()
+    assert 'JA1XYZ' in excluded
+    excluded.clear()
+    assert len(excluded) == 0 and len(wheel) == 0
+
+
+def test_failing_callback_keeps_bucket():
+    """回调出错时同一格其余的定时器不丢失，排除期限照常到期"""
+    clock = FakeClock(0.0)
+    wheel = TimingWheel(clock=clock)
+    excluded = ExpiringSet(wheel, ttl=1.0)
+    calls = []
+
+    def fail():
+        calls.append('fail')
+        raise ValueError('callback failed')
+
+    wheel.schedule(1.0, fail)
+    for call in ('K1ABC', 'JA1XYZ', 'VP8LP'):
+        excluded.add(call)
+    wheel.schedule(1.0, calls.append, 'later')
+    try:
+        wheel.advance(1.05)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('callback error was swallowed')
+    wheel.advance(1.05)
+    assert len(excluded) == 0 and len(wheel) == 0
+    assert sorted(calls) == ['fail', 'later']
+
+
+if __name__ == "__main__":
+    test_fire_order_across_levels()
+    test_cancel_and_periodic()
+    test_expiring_set()
+    test_failing_callback_keeps_bucket()
+    print("✓ 所有测试通过")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+测试配置文件监视
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_watch import FileWatcher
+
+
+def wait_for(event, timeout=5.0):
+    return event.wait(timeout)
+
+
+def check_watcher(use_inotify):
+    with tempfile.TemporaryDirectory() as tmp:
+        watched = Path(tmp) / 'dxcc_whitelist_20m.json'
+        other = Path(tmp) / 'other.txt'
+        watched.write_text('{}')
+        batches = []
+        fired = threading.Event()
+
+        def callback(changed):
+            batches.append(changed)
+            fired.set()
+
+        watcher = FileWatcher([watched], callback, debounce=0.2, poll_interval=0.05, use_inotify=use_inotify)
+        watcher.start()
+        try:
+            time.sleep(0.1)
+            other.write_text('x')
+            # 连续多次写入只触发一次
+            for i in range(5):
+                watched.write_text('{"%d": {}}' % i)
+                time.sleep(0.02)
+            assert wait_for(fired)
+            time.sleep(0.4)
+            assert batches == [{watched.resolve()}]
+
+            # 写临时文件再改名也能检测到
+            fired.clear()
+            tmp_file = Path(tmp) / 'tmp.json'
+            tmp_file.write_text('{"1": {}, "2": {}}')
+            tmp_file.replace(watched)
+            assert wait_for(fired)
+        finally:
+            watcher.stop()
+        return watcher.backend
+
+
+def test_poll_backend():
+    """轮询mtime"""
+    assert check_watcher(use_inotify=False) == 'poll'
+
+
+def test_default_backend():
+    """默认后端（Linux上为inotify）"""
+    backend = check_watcher(use_inotify=True)
+    if sys.platform.startswith('linux'):
+        assert backend == 'inotify'
+
+
+def test_reload_applied_on_main_loop():
+    """监视线程只编译配置；替换配置和作废决定在主循环的 tick() 中进行"""
+    import contextlib
+    import io
+    import os
+    from ultron_dxcc import UltronDXCC
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                station = UltronDXCC()
+                old_config = station.dxcc_config
+                generation = station.decisions.generation
+                Path('dxcc_config.py').write_text('dxcc_whitelist_only = 1\n')
+                watcher = threading.Thread(target=station.config_changed, args=({Path('dxcc_config.py')},))
+                watcher.start()
+                watcher.join()
+                assert station.pending_config is not None
+                assert station.dxcc_config is old_config and station.decisions.generation == generation
+
+                station.tick(time.time())
+                assert station.pending_config is None and station.dxcc_config.whitelist_only
+                assert station.decisions.generation == generation + 1
+                assert station.reload_status['reloads'] == 1
+
+                # 编译失败时保留原配置
+                Path('dxcc_config.py').write_text('dxcc_whitelist_only = (\n')
+                station.config_changed()
+                station.tick(time.time())
+                assert station.dxcc_config.whitelist_only and station.reload_status['failures'] == 1
+                station.history.close()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_poll_backend()
+    test_default_backend()
+    test_reload_applied_on_main_loop()
+    print("✓ 所有测试通过")
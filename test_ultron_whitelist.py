@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+测试DXCC白名单
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ultron_bands import band_id
+from ultron_whitelist import CompiledWhitelist, entity_continents, load_whitelists, whitelist_files
+
+
+def write_whitelists(tmp):
+    """生成白名单配置和文件"""
+    tmp = Path(tmp)
+    (tmp / 'dxcc_whitelist_config.json').write_text(json.dumps({
+        'files': ['dxcc_whitelist_global.json', 'dxcc_whitelist_20m.json', 'dxcc_worked_cache.json'],
+    }))
+    (tmp / 'dxcc_whitelist_global.json').write_text(json.dumps({
+        '246': {'name': 'SOV MILITARY ORDER OF MALTA', 'priority': 'high', 'score': 10, 'continent': 'europe'},
+        '24': {'name': 'BOUVET', 'priority': 'high', 'score': 10, 'continent': 'unknown'},
+    }))
+    (tmp / 'dxcc_whitelist_20m.json').write_text(json.dumps({
+        '24': {'name': 'BOUVET', 'priority': 'high', 'score': 10, 'continent': 'antarctica'},
+        '339': {'name': 'JAPAN', 'priority': 'low', 'score': 2, 'continent': 'asia'},
+        'bad': {'name': 'ignored'},
+    }))
+    return tmp
+
+
+def test_load_whitelists():
+    """按配置读取白名单文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_whitelists(tmp)
+        assert sorted(whitelist_files(tmp)) == ['20m', 'global']
+        whitelists = load_whitelists(tmp)
+        assert sorted(whitelists['global']) == [24, 246]
+        assert sorted(whitelists['20m']) == [24, 339]
+        assert entity_continents(whitelists) == {246: 'europe', 24: 'antarctica', 339: 'asia'}
+
+
+def test_compiled_whitelist():
+    """白名单文件和配置字典编译成位掩码"""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_whitelists(tmp)
+        compiled = CompiledWhitelist.load(tmp, {'260': 'MONACO'}, {'40m': {'474': 'TUNISIA'}})
+
+    # 全局白名单覆盖所有波段（包括未知波段）
+    assert compiled.contains(246, band_id('20m'))
+    assert compiled.contains(246, 0)
+    assert compiled.contains(260, band_id('160m'))
+    # 波段白名单只在该波段
+    assert compiled.contains(339, band_id('20m'))
+    assert not compiled.contains(339, band_id('40m'))
+    assert not compiled.contains(339, 0)
+    assert compiled.contains(474, band_id('40m'))
+    assert not compiled.contains(474, band_id('20m'))
+    # 优先级和得分
+    assert compiled.is_high(24, band_id('15m'))
+    assert not compiled.is_high(339, band_id('20m'))
+    assert compiled.score[24] == 10
+    assert compiled.score[339] == 2
+    assert compiled.count == 5
+    # 未知实体
+    assert not compiled.contains(0, band_id('20m'))
+
+
+def test_strict_loading():
+    """strict模式下损坏的白名单文件抛出异常"""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_whitelists(tmp)
+        (Path(tmp) / 'dxcc_whitelist_20m.json').write_text('{"339": {"name": "JA')
+        assert 339 not in load_whitelists(tmp)['20m']
+        try:
+            CompiledWhitelist.load(tmp, strict=True)
+        except ValueError as e:
+            assert 'dxcc_whitelist_20m.json' in str(e)
+        else:
+            raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    test_load_whitelists()
+    test_compiled_whitelist()
+    test_strict_loading()
+    print("✓ 所有测试通过")
@@ -21,20 +21,41 @@ import datetime
 import re
 import os
 import sys
+import struct
 import threading
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 
+from ultron_bands import BAND_NAMES, BandPlan, mode_id
+from ultron_decisions import PREPARE_BUDGET, Decision, DecisionCache
+from ultron_history import Decode, DecodeHistory
+from ultron_latency import LatencyTracker
+from ultron_message import Message, parse_message
+from ultron_needed import DUPE, NEED_LABELS, NEW_CALL, NeedEvaluator
+from ultron_qso import ABANDONED, DEFAULT_PERIOD, LOGGED, PHASE_NAMES, QSO, QSOMachine, ReplyQueue
+from ultron_render import SlotRenderer
+from ultron_scheduler import Candidate, CandidateScheduler, candidate_ttl
+from ultron_shm import RING_FILE, DecodeRing
+from ultron_store import LogIndex, entity_id, file_signature, grid4
+from ultron_timer import EXCLUSION_TTL, ExpiringSet, Timer, TimingWheel
+
 # Configuration
 UDP_PORT = 2237
 UDP_FORWARD_PORT = 2277
 UDP_LISTEN_IP = "0.0.0.0"
 UDP_FORWARD_IP = "127.0.0.1"
-TIMEOUT_SECONDS = 90
 SIGNAL_THRESHOLD = -20  # dB
+MY_CALL = ""  # 本台呼号（留空时使用状态包中的 DE call）
+MY_GRID = ""  # 本台网格（用于按距离排序候选，留空时使用状态包中的 DE grid）
+MAX_CONCURRENT_QSOS = 1  # 同时进行的QSO数（JTDX 多重应答、WSJT-X Fox 模式可以大于1）
+DISPLAY_SORT = "snr"  # 每个时隙解码行的排序：arrival / snr / need / freq
+DECODE_RING = RING_FILE  # 本机其他程序读取的共享解码环形缓冲（留空时不写）
 VERSION = "PY-20241115"
 
+# Reply 包头（WSJT-X magic, schema 2, 类型 4）
+REPLY_HEADER = struct.pack('>III', 0xadbccbda, 2, 4)
+
 # ANSI Color Codes
 class Colors:
     BLACK = '\033[30m'
@@ -50,18 +71,33 @@ class Colors:
     BLINK_RED = '\033[5;31m'
     RESET = '\033[0m'
 
+# ANSI 转义码（Colors 的原始值）
+_ESCAPES = {name: code for name, code in vars(Colors).items() if name.isupper()}
+
+# 颜色名 -> 转义码（只建一次，关闭颜色时清空）
+COLOR_CODES: Dict[str, str] = {name.lower(): code for name, code in _ESCAPES.items()}
+
+
+def set_color(enabled: bool) -> None:
+    """开启/关闭 ANSI 颜色（输出不是终端时关闭，nohup 日志里不会有转义码）"""
+    for name, code in _ESCAPES.items():
+        setattr(Colors, name, code if enabled else '')
+        COLOR_CODES[name.lower()] = code if enabled else ''
+
 @dataclass
 class QSOState:
     """QSO状态管理"""
     sendcq: bool = False
     current_call: str = ""
-    tempo: int = 0
-    tempu: int = 0
     rx_count: int = 0
     tx_count: int = 0
     mega: int = 0
     current_freq: int = 0
     current_mode: str = ""
+    band_id: int = 0  # 当前波段编号（由状态包的频率确定）
+    tr_period: int = 0  # 状态包中的 T/R 周期（秒），0 表示按模式确定
+    logged_count: int = 0  # 完成的QSO数
+    abandoned_count: int = 0  # 对方没有回应而放弃的QSO数
     excluded_calls: set = None
     worked_calls: set = None
     
@@ -105,13 +141,16 @@ class ADIFProcessor:
         """生成ADIF格式数据"""
         adif_entries = []
         for qso in qsos:
-            adif_entry = ""
+            parts = []
             for field, content in qso.items():
+                if field.lower() == 'eor':
+                    continue
                 content = str(content).strip()
-                field_length = len(content)
-                adif_entry += f"<{field.upper()}:{field_length}>{content} "
-            adif_entry += "<eor>"
-            adif_entries.append(adif_entry)
+                # ADIF字段长度按字节计算
+                field_length = len(content.encode('utf-8'))
+                parts.append(f"<{field.upper()}:{field_length}>{content} ")
+            parts.append("<eor>")
+            adif_entries.append("".join(parts))
         return adif_entries
 
 class DXCCDatabase:
@@ -169,20 +208,7 @@ class TerminalUI:
     @staticmethod
     def colorize(text: str, color: str) -> str:
         """给文本添加颜色"""
-        color_map = {
-            'black': Colors.BLACK,
-            'red': Colors.RED,
-            'green': Colors.GREEN,
-            'yellow': Colors.YELLOW,
-            'blue': Colors.BLUE,
-            'magenta': Colors.MAGENTA,
-            'cyan': Colors.CYAN,
-            'white': Colors.WHITE,
-            'gray': Colors.GRAY,
-            'bright_green': Colors.BRIGHT_GREEN,
-            'blink_red': Colors.BLINK_RED
-        }
-        return f"{color_map.get(color, '')}{text}{Colors.RESET}"
+        return f"{COLOR_CODES.get(color, '')}{text}{COLOR_CODES['reset']}"
     
     @staticmethod
     def print_header():
@@ -196,10 +222,20 @@ class TerminalUI:
         print(" Looking for radio software wait ...")
     
     @staticmethod
-    def print_qso_line(time_str: str, snr: str, delta_f: str, mode: str, 
-                      status: str, message: str, dxcc_name: str, color: str = 'white'):
-        """打印QSO行"""
+    def format_qso_line(time_str: str, snr: str, delta_f: str, mode: str,
+                        status: str, message: str, dxcc_name: str, tag: str = '') -> str:
+        """QSO行的文本（tag 为需要等级等标记）"""
         line = f"{time_str:6} {snr:3} {delta_f:4} {mode:6} {status:2} {message:20} - {dxcc_name:20}"
+        if tag:
+            line += f" [{tag}]"
+        return line
+    
+    @staticmethod
+    def print_qso_line(time_str: str, snr: str, delta_f: str, mode: str, 
+                      status: str, message: str, dxcc_name: str, color: str = 'white',
+                      tag: str = ''):
+        """打印QSO行（tag 为需要等级等标记）"""
+        line = TerminalUI.format_qso_line(time_str, snr, delta_f, mode, status, message, dxcc_name, tag)
         print(TerminalUI.colorize(line, color))
 
 class WSJTXProtocol:
@@ -253,118 +289,121 @@ class WSJTXProtocol:
         except (ValueError, UnicodeDecodeError):
             mode = "FT8"  # 使用默认值
         
-        return {
+        status = {
             'software': software_id,
             'frequency': freq,
             'mode': mode,
-            'tx_enabled': False,  # 需要进一步解析
+            'tx_enabled': False,
             'transmitting': False,
-            'decoding': False
+            'decoding': False,
+            'de_call': '',
+            'de_grid': '',
         }
+        
+        # 其余字段：DX call、报告、发射模式、发射开关、DF、DE call/grid ... T/R 周期
+        try:
+            pos = (offset + mode_length) // 2
+            status['dx_call'], pos = self.read_utf8(data, pos)
+            _report, pos = self.read_utf8(data, pos)
+            _tx_mode, pos = self.read_utf8(data, pos)
+            status['tx_enabled'] = bool(data[pos])
+            status['transmitting'] = bool(data[pos + 1])
+            status['decoding'] = bool(data[pos + 2])
+            pos += 3 + 8  # Rx DF, Tx DF
+            status['de_call'], pos = self.read_utf8(data, pos)
+            status['de_grid'], pos = self.read_utf8(data, pos)
+            _dx_grid, pos = self.read_utf8(data, pos)
+            pos += 1  # Tx Watchdog
+            _sub_mode, pos = self.read_utf8(data, pos)
+            pos += 2 + 4  # Fast mode, Special op mode, Frequency tolerance
+            period = int.from_bytes(data[pos:pos + 4], 'big')
+            if len(data) >= pos + 4 and 0 < period < 0xffffffff:
+                status['tr_period'] = period
+        except (ValueError, IndexError):
+            pass  # 旧版本软件的状态包较短
+        return status
+    
+    @staticmethod
+    def read_utf8(data: bytes, pos: int) -> Tuple[str, int]:
+        """读取 utf8 字段（4字节长度 + 内容，0xffffffff 表示空），返回 (文本, 新位置)"""
+        if pos + 4 > len(data):
+            raise ValueError("truncated packet")
+        length = int.from_bytes(data[pos:pos + 4], 'big')
+        pos += 4
+        if length == 0xffffffff:
+            return "", pos
+        if pos + length > len(data):
+            raise ValueError("truncated packet")
+        return data[pos:pos + length].decode('utf-8', errors='replace'), pos + length
+    
+    @staticmethod
+    def write_utf8(text: str) -> bytes:
+        """写入 utf8 字段（4字节长度 + 内容）"""
+        data = text.encode('utf-8')
+        return len(data).to_bytes(4, 'big') + data
+    
+    def reply_template(self, client_id: str, mode: str, message: str) -> Tuple[bytes, int]:
+        """Reply 包模板（时间、信噪比、DT、DF 留空），返回 (模板, 这些字段的位置)"""
+        head = REPLY_HEADER + self.write_utf8(client_id)
+        return (head + bytes(20) + self.write_utf8(mode) + self.write_utf8(message) + b'\x00\x00',
+                len(head))
+    
+    @staticmethod
+    def patch_reply(template: bytes, offset: int, decode: Dict[str, Any]) -> bytes:
+        """把这条解码的时间、信噪比、DT、DF 和低置信度标志填入模板"""
+        packet = bytearray(template)
+        struct.pack_into('>IidI', packet, offset, decode.get('time', 0) & 0xffffffff, decode.get('snr', 0),
+                         decode.get('delta_time', 0.0), decode.get('delta_f', 0))
+        packet[-2] = bool(decode.get('low_confidence', False))
+        return bytes(packet)
+    
+    def build_reply_packet(self, decode: Dict[str, Any]) -> bytes:
+        """生成 Reply 包（类型4）：软件收到后按这条解码（CQ/QRZ）呼叫对方"""
+        reply = decode.get('reply')
+        if reply is not None:
+            _key, template, offset = reply    # 空闲时预先生成的模板
+        else:
+            template, offset = self.reply_template(decode.get('id', ''), decode.get('mode', '~'),
+                                                   decode.get('message', ''))
+        return self.patch_reply(template, offset, decode)
     
     def parse_decode_packet(self, data: bytes) -> Dict[str, Any]:
-        """解析解码数据包"""
-        hex_data = data.hex()
+        """解析解码数据包（类型2）"""
+        if len(data) < 12:
+            return {}
+        magic, _schema, packet_type = struct.unpack_from('>III', data)
         
-        # 验证数据包最小长度
-        if len(hex_data) < 64:  # 最小包头长度
+        # 支持多种magic number格式 (WSJT-X, JTDX, MSHV)
+        valid_magics = [0xadbccb00, 0xadbccbda, 0xdacbbcad]
+        if magic not in valid_magics or packet_type != 2:  # Decode packet
             return {}
         
         try:
-            magic = int(hex_data[0:8], 16)
-            version = int(hex_data[8:16], 16)
-            packet_type = int(hex_data[16:24], 16)
-            
-            # 支持多种magic number格式 (WSJT-X, JTDX, MSHV)
-            valid_magics = [0xadbccb00, 0xadbccbda, 0xdacbbcad]
-            if magic not in valid_magics:
-                return {}
-            
-            if packet_type != 2:  # Decode packet
-                return {}
-            
-            # 简化解析 - 基于实际JTDX包格式
-            offset = 24  # 跳过基础头部
-            
-            # 软件ID长度
-            if offset + 8 > len(hex_data):
-                return {}
-            id_length = int(hex_data[offset:offset+8], 16) * 2
-            offset += 8
-            
-            # 软件ID
-            if offset + id_length > len(hex_data):
+            # Id, New, Time, SNR, Delta time, Delta frequency, Mode, Message, Low confidence
+            software_id, pos = self.read_utf8(data, 12)
+            if pos + 21 > len(data):
                 return {}
-            software_id = bytes.fromhex(hex_data[offset:offset+id_length]).decode('utf-8', errors='replace')
-            offset += id_length
-            
-            # 新解码标志 (简化处理)
-            new_decode = 1
-            
-            # 时间戳 (简化处理)
-            time_ms = int(time.time() * 1000) % 86400000  # 当前时间的毫秒部分
-            
-            # SNR (简化处理，从包的后面部分提取)
-            snr = -15  # 默认值
-            
-            # 尝试从包中提取SNR信息
-            if len(hex_data) > offset + 16:
-                # 寻找可能的SNR字段
-                try:
-                    # 查找可能的负数值
-                    for i in range(offset, len(hex_data) - 8, 2):
-                        try:
-                            val = int.from_bytes(bytes.fromhex(hex_data[i:i+8]), byteorder='little', signed=True)
-                            if -30 <= val <= 30:  # 合理的SNR范围
-                                snr = val
-                                break
-                        except:
-                            continue
-                except:
-                    pass
-            
-            # 模式 (简化处理)
-            mode = "FT8"
-            if "FT8" in software_id.upper():
-                mode = "FT8"
-            elif "FT4" in software_id.upper():
-                mode = "FT4"
-            elif "JT65" in software_id.upper():
-                mode = "JT65"
-            
-            # 消息 (简化处理 - 模拟CQ消息)
-            message = "CQ TEST123 FN42"
-            
-            # 尝试从包中提取消息
-            try:
-                # 查找可能的文本数据
-                hex_str = hex_data[offset:]
-                for i in range(0, len(hex_str) - 20, 2):
-                    try:
-                        length = int(hex_str[i:i+8], 16)
-                        if 0 < length < 50 and i + 8 + length * 2 <= len(hex_str):
-                            msg_data = hex_str[i+8:i+8+length*2]
-                            msg = bytes.fromhex(msg_data).decode('utf-8', errors='replace')
-                            if msg and any(char.isalpha() for char in msg):
-                                message = msg.strip()
-                                break
-                    except:
-                        continue
-            except:
-                pass
-            
-            return {
-                'new_decode': bool(new_decode),
-                'time': time_ms,
-                'snr': snr,
-                'mode': mode,
-                'message': message.strip()
-            }
-            
-        except (ValueError, IndexError) as e:
+            new_decode = data[pos]
+            time_ms, snr, delta_time, delta_f = struct.unpack_from('>IidI', data, pos + 1)
+            mode, pos = self.read_utf8(data, pos + 21)
+            message, pos = self.read_utf8(data, pos)
+            low_confidence = pos < len(data) and data[pos] != 0
+        except (ValueError, struct.error) as e:
             # 处理任何解析错误
             print(f"解析错误: {e}")
             return {}
+        
+        return {
+            'id': software_id,
+            'new_decode': bool(new_decode),
+            'time': time_ms,
+            'snr': snr,
+            'delta_time': delta_time,
+            'delta_f': delta_f,
+            'mode': mode,               # 模式符号（~ FT8、+ FT4……），Reply 时原样发回
+            'message': message.strip(),
+            'low_confidence': low_confidence,
+        }
     
     def decode_wsjt_mode(self, mode_bytes: bytes) -> str:
         """解码WSJT-X模式符号"""
@@ -414,7 +453,35 @@ class Ultron:
         self.validator = CallsignValidator()
         self.protocol = WSJTXProtocol()
         self.ui = TerminalUI()
+        self.renderer = SlotRenderer(COLOR_CODES, DISPLAY_SORT)  # 每个时隙的解码行排序后一次写出
         self.log_file = Path("wsjtx_log.adi")
+        self.band_plan = BandPlan()
+        self.radios: Dict[str, Tuple[int, int, str]] = {}  # 软件ID -> (频率, 波段编号, 子波段)
+        self.dxcc_cache: Dict[str, Dict[str, str]] = {}  # 呼号 -> DXCC信息
+        
+        # 日志索引（只解析新增的QSO）和需要状态判断
+        self.log_index = LogIndex(self.log_file, "ultron_qso_index.bin",
+                                  lambda call: self.locate_call(call)['id'],
+                                  file_signature(self.dxcc_db.db_file))
+        self.needed = NeedEvaluator()
+        self.history = DecodeHistory()  # 解码历史（按日期分段）
+        self.qso = QSOMachine(MY_CALL, max_concurrent=MAX_CONCURRENT_QSOS)  # 进行中的QSO（按时隙计时）
+        # 同一时隙的候选，到决策时间选最好的；候补要活过所选电台的超时
+        self.scheduler = CandidateScheduler(MY_GRID, ttl=candidate_ttl(DEFAULT_PERIOD, self.qso.max_idle_slots))
+        self.timers = TimingWheel()  # 排除期限、QSO超时和周期性任务
+        self.state.excluded_calls = ExpiringSet(self.timers, EXCLUSION_TTL)  # 每个呼号各自到期
+        self.qso_timers: Dict[str, Timer] = {}  # 对方呼号 -> QSO截止时间的定时器
+        self.replies = ReplyQueue()  # 每个发射周期合并发出的 Reply
+        self.sock: Optional[socket.socket] = None
+        self.client_addr: Optional[Tuple[str, int]] = None  # 发送解码包的软件地址
+        self.latency = LatencyTracker()  # 接收 -> 解析/查找/决定/发送 的耗时
+        self.decisions = DecisionCache()  # 最近听到的电台预先算好的决定
+        self.ring: Optional[DecodeRing] = None  # 共享给本机其他程序的解码
+        if DECODE_RING:
+            try:
+                self.ring = DecodeRing(DECODE_RING)
+            except (OSError, ValueError) as e:
+                print(f"{Colors.YELLOW}Warning opening decode ring: {e}{Colors.RESET}")
         
         # 确保日志文件存在
         if not self.log_file.exists():
@@ -424,52 +491,93 @@ class Ultron:
         self.load_worked_calls()
     
     def load_worked_calls(self):
-        """加载已通联的呼号"""
+        """加载已通联的呼号（日志有新增时调用也只处理新增部分）"""
         try:
-            content = self.log_file.read_text(encoding='utf-8')
-            qsos = self.adif_processor.parse_adif(content)
-            for qso in qsos:
-                if 'call' in qso:
-                    self.state.worked_calls.add(qso['call'].upper())
+            self.log_index.refresh()
+            table = self.log_index.table
+            added = self.needed.sync(table)
+            if added:
+                self.decisions.invalidate()  # 需要等级变了
+            for row in range(len(table) - added, len(table)):
+                self.state.worked_calls.add(table.call(row))
         except Exception as e:
             print(f"{Colors.YELLOW}Warning loading log: {e}{Colors.RESET}")
     
+    def locate_call(self, call: str) -> Dict[str, str]:
+        """查找呼号的DXCC信息（按呼号缓存）"""
+        info = self.dxcc_cache.get(call)
+        if info is None:
+            info = self.dxcc_cache[call] = self.dxcc_db.locate_call(call)
+        return info
+    
     def process_decode(self, decode_data: Dict[str, Any]) -> None:
         """处理解码数据"""
         message = decode_data['message']
         snr = decode_data['snr']
         mode = decode_data['mode']
         
-        # 解析消息
-        parts = message.split()
-        if len(parts) < 2:
+        # 解析消息（后续各步骤共用）
+        msg = parse_message(message)
+        call = msg.from_call
+        if not call:
             return
         
-        # 呼号验证
-        if not self.validator.validate(parts[1]):
+        # 进行中的QSO：对方的回复推动状态
+        if self.qso:
+            self.handle_qso_event(self.qso.on_decode(msg, snr))
+        
+        # 当前波段：按发送解码的电台取缓存的波段编号
+        radio = self.radios.get(decode_data.get('id', ''))
+        if radio is not None:
+            self.state.band_id = radio[1]
+        
+        # 呼号验证、DXCC信息、需要等级（新DXCC/新波段/.../重复）：
+        # 通常在上一个时隙的空闲时间已经算好，没有或已作废时现在计算
+        mode_name = self.protocol.decode_wsjt_mode(mode.encode())
+        mid = mode_id(mode_name)
+        decision = self.decisions.get(call, self.state.band_id, mid, msg.grid)
+        if decision is None:
+            decision = self.decide(call, self.state.band_id, mid, msg.grid)
+        if not decision.valid:
             return
+        dxcc_info = decision.dxcc_info
+        eid = decision.eid
+        need = decision.need
+        decode_data['decision'] = decision
+        if msg.is_open:
+            key = (decode_data.get('id', ''), mode, message)
+            reply = decision.reply_for(key)
+            if reply is not None:
+                decode_data['reply'] = reply
+            else:
+                self.decisions.want_reply(decision, key)
+        self.latency.record('lookup', decode_data.get('received'), time.monotonic())
         
-        # 获取DXCC信息
-        dxcc_info = self.dxcc_db.locate_call(parts[1])
+        # 写入解码历史
+        try:
+            self.history.append(Decode(int(time.time()), snr, decode_data.get('delta_f', 0),
+                                       self.state.band_id, mid, eid, call, message))
+        except OSError as e:
+            print(f"{Colors.YELLOW}Warning writing decode history: {e}{Colors.RESET}")
         
         # 状态判断逻辑
         status = "   "
         color = "white"
         
         # 检查是否在排除列表
-        if parts[1] in self.state.excluded_calls:
+        if call in self.state.excluded_calls:
             status = "XX"
             color = "blue"
         # 检查信号强度
         elif snr <= SIGNAL_THRESHOLD:
             status = "Lo"
             color = "yellow"
-        # 检查是否已通联
-        elif parts[1] in self.state.worked_calls:
+        # 检查是否已通联（同波段同模式）
+        elif need == DUPE:
             status = "--"
             color = "red"
         # 检查是否是CQ或结束语
-        elif (parts[0] == "CQ" or parts[2] in ["73", "RR73", "RRR"]) and parts[1] not in self.state.worked_calls:
+        elif msg.is_open:
             if self.state.sendcq:
                 status = "->"
                 color = "white"
@@ -477,58 +585,269 @@ class Ultron:
                 status = ">>"
                 color = "green"
         
-        # 打印QSO行
-        time_str = datetime.datetime.utcnow().strftime("%H%M%S")
-        self.ui.print_qso_line(
-            time_str, str(snr), "0", mode, status, 
-            message[:20], dxcc_info['name'][:20], color
+        # QSO行放入本时隙的缓冲（时隙结束时排序后一起显示）
+        slot = decode_data.get('time', 0)
+        time_str = f"{slot // 3600000 % 24:02d}{slot // 60000 % 60:02d}{slot // 1000 % 60:02d}"
+        delta_f = decode_data.get('delta_f', 0)
+        if self.ring is not None:
+            self.ring.append(slot, snr, delta_f, decode_data.get('delta_time', 0.0), self.state.band_id, mid,
+                             need, status.strip(), call, message, dxcc_info['name'])
+        self.renderer.add(
+            self.ui.format_qso_line(time_str, str(snr), str(delta_f), mode_name, status,
+                                    message[:20], dxcc_info['name'][:20],
+                                    NEED_LABELS[need] if need != DUPE else ""),
+            color, snr, need, delta_f, slot
         )
         
         # 处理响应逻辑
-        self.handle_response_logic(parts, status, dxcc_info)
+        self.handle_response_logic(msg, status, dxcc_info, need, snr, decode_data)
     
     def process_status(self, status_data: Dict[str, Any]) -> None:
         """处理状态数据包"""
         software = status_data.get('software', 'Unknown')
         frequency = status_data.get('frequency', 0)
         mode = status_data.get('mode', 'Unknown')
+        _, band, sub_band = self.update_radio(software, frequency)
+        my_grid = self.scheduler.my_grid
+        if band != self.state.band_id or mode != self.state.current_mode:
+            self.decisions.invalidate()  # 预先计算的决定按新的波段/模式重新算
         
         # 显示状态信息
+        self.renderer.flush()
         print(self.ui.colorize(
-            f" -----< ULTRON : Status from {software} - {frequency/1000:.1f}kHz {mode}", 
+            f" -----< ULTRON : Status from {software} - {frequency/1000:.1f}kHz {BAND_NAMES[band]} {sub_band} {mode}", 
             "cyan"
         ))
         
         # 更新内部状态
         self.state.current_freq = frequency
         self.state.current_mode = mode
-    
-    def handle_response_logic(self, parts: List[str], status: str, dxcc_info: Dict[str, str]) -> None:
-        """处理响应逻辑"""
-        call = parts[1]
+        self.state.band_id = band
+        self.state.tr_period = status_data.get('tr_period', 0)
+        if not MY_CALL and status_data.get('de_call'):
+            self.qso.my_call = status_data['de_call'].upper()
+        if not MY_GRID and status_data.get('de_grid'):
+            self.scheduler.my_grid = grid4(status_data['de_grid'])
+        
+        if self.scheduler.my_grid != my_grid:
+            self.decisions.invalidate()  # 距离得分变了
         
-        # 如果状态是>>且未在发送CQ，则开始响应
-        if status == ">>" and not self.state.sendcq:
-            self.state.current_call = call
-            self.state.sendcq = True
-            self.state.tempo = int(time.time())
-            self.state.tempu = self.state.tempo + TIMEOUT_SECONDS
-            print(self.ui.colorize(f" -----< ULTRON : I see {call}", "bright_green"))
+        # WSJT-X 记录QSO后日志会增长，只处理新增部分
+        self.load_worked_calls()
+    
+    def update_radio(self, radio_id: str, frequency: int) -> Tuple[int, int, str]:
+        """更新电台的频率，频率变化时才重新计算波段"""
+        radio = self.radios.get(radio_id)
+        if radio is None or radio[0] != frequency:
+            band, sub_band = self.band_plan.resolve(frequency)
+            radio = (frequency, band, sub_band)
+            self.radios[radio_id] = radio
+        return radio
+    
+    def handle_response_logic(self, msg: Message, status: str, dxcc_info: Dict[str, str],
+                              need: int = NEW_CALL, snr: int = 0,
+                              decode: Optional[Dict[str, Any]] = None) -> None:
+        """处理响应逻辑：可以响应的电台先作为候选，到决策时间再选"""
+        call = msg.from_call
+        
+        # 如果状态是>>（还有空闲的QSO位置）且没有在和对方通联，则加入候选
+        if status == ">>" and not self.state.sendcq and call not in self.qso:
+            bid = self.state.band_id
+            decision = decode.get('decision') if decode else None
+            if decision is not None and decision.bid == bid:
+                # 预先算好的优先级和静态得分，只需加上这次的信噪比
+                self.scheduler.offer(call, msg.text, decision.eid, bid, need, snr, msg.grid,
+                                     decision.priority, time.time(), decode, decision.static_score)
+                return
+            eid = entity_id(dxcc_info.get('id', 'unknown'))
+            self.scheduler.offer(call, msg.text, eid, bid, need, snr, msg.grid,
+                                 self.candidate_priority(eid, bid), time.time(), decode)
+    
+    def decide(self, call: str, bid: int, mid: int, grid: str = '') -> Decision:
+        """计算并缓存电台的决定（呼号验证、DXCC、需要等级、优先级、静态得分）"""
+        generation = self.decisions.generation
+        if not self.validator.validate(call):
+            return self.decisions.put(Decision(call, bid, mid, grid, valid=False), generation)
+        dxcc_info = self.locate_call(call)
+        eid = entity_id(dxcc_info['id'])
+        need = self.needed.evaluate(call, eid, bid, mid, grid)
+        priority = self.candidate_priority(eid, bid)
+        return self.decisions.put(Decision(call, bid, mid, grid, True, dxcc_info, eid, need, priority,
+                                           self.scheduler.static_score(need, priority, grid)), generation)
+    
+    def prepare_decisions(self, budget: float = PREPARE_BUDGET) -> int:
+        """空闲时重新计算作废的决定、生成 Reply 模板（最多用 budget 秒），返回处理的电台数"""
+        cache = self.decisions
+        todo = cache.todo
+        if not todo or self.scheduler.deadline is not None:
+            return 0    # 没有要算的，或者候选决策还没做
+        bid = self.state.band_id
+        mid = mode_id(self.state.current_mode or "FT8")
+        stop = time.perf_counter() + budget
+        done = 0
+        while todo and time.perf_counter() < stop:
+            decision = cache.entries.get(todo.popleft())
+            if decision is None:
+                continue
+            if decision.generation != cache.generation:
+                decision = self.decide(decision.call, bid, mid, decision.grid)
+            key = decision.pending_reply
+            if key is not None and decision.reply_for(key) is None:
+                decision.reply = (key,) + self.protocol.reply_template(*key)
+            done += 1
+        cache.prepared += done
+        return done
     
-    def send_reply(self, call: str, message: str) -> None:
-        """发送回复消息"""
-        # 这里需要实现UDP发送逻辑
-        # 由于WSJT-X协议复杂，这里简化处理
-        print(self.ui.colorize(f" -----< ULTRON : Sending reply to {call}: {message}", "cyan"))
+    def candidate_priority(self, eid: int, bid: int) -> float:
+        """候选的额外优先级（子类按白名单计算）"""
+        return 0.0
+    
+    def dispatch_candidates(self, now: float) -> None:
+        """到决策时间且有空闲位置时，按得分响应候选"""
+        if not self.qso.busy and self.scheduler.due(now):
+            self.fill_slots(now)
+    
+    def fill_slots(self, now: float) -> None:
+        """用得分最高的候选（或候补）填满空闲的QSO位置"""
+        while not self.qso.busy:
+            candidate = self.scheduler.pick(now, self.state.excluded_calls)
+            if candidate is None:
+                break
+            self.answer(candidate, now)
+    
+    def answer(self, candidate: Candidate, now: float) -> None:
+        """开始响应候选电台"""
+        qso = self.qso.start(candidate.call, self.state.current_mode or "FT8", candidate.snr,
+                             period=self.state.tr_period or None)
+        if qso is None:
+            return
+        # 按实际的时隙长度（FT4、JT65 等）保证候补等得到放弃那一刻
+        self.scheduler.ttl = candidate_ttl(qso.period, self.qso.max_idle_slots)
+        if candidate.decode is not None:
+            mono = time.monotonic()
+            self.latency.record('decision', self.slot_received(candidate.decode, qso.period, mono), mono)
+        self.arm_qso_timer(qso)
+        self.state.current_call = candidate.call
+        self.state.sendcq = self.qso.busy
+        if candidate.decode is not None:
+            self.queue_reply(qso, candidate.decode)
+        self.renderer.flush()
+        waiting = f" (+{len(self.scheduler)} waiting)" if len(self.scheduler) else ""
+        active = f" [{len(self.qso)}/{self.qso.max_concurrent}]" if self.qso.max_concurrent > 1 else ""
+        print(self.ui.colorize(f" -----< ULTRON : I see {candidate.call}{waiting}{active}", "bright_green"))
+    
+    def handle_qso_event(self, qso: Optional[QSO]) -> None:
+        """QSO状态变化：进展、完成或放弃"""
+        if qso is None:
+            return
+        self.renderer.flush()
+        call = qso.call
+        if qso.phase == LOGGED:
+            print(self.ui.colorize(f" -----< ULTRON : QSO with {call} complete", "bright_green"))
+            self.state.logged_count += 1
+            self.scheduler.discard(call)
+        elif qso.phase == ABANDONED:
+            print(self.ui.colorize(f" -----< ULTRON : {call} Not respond to the call", "red"))
+            self.state.excluded_calls.add(call)
+            self.state.abandoned_count += 1
+        else:
+            print(self.ui.colorize(f" -----< ULTRON : {call} {PHASE_NAMES[qso.phase]} -> {self.qso.next_message(call)}", "cyan"))
+            self.arm_qso_timer(qso)
+            return
+        timer = self.qso_timers.pop(call, None)
+        if timer is not None:
+            timer.cancel()
+        self.state.sendcq = self.qso.busy
+        if self.state.current_call == call:
+            self.state.current_call = ""
+        # 空出的位置直接给下一个候补
+        self.fill_slots(time.time())
+    
+    def arm_qso_timer(self, qso: QSO) -> None:
+        """按QSO的截止时间设置定时器"""
+        timer = self.qso_timers.get(qso.call)
+        if timer is not None:
+            timer.cancel()
+        self.qso_timers[qso.call] = self.timers.schedule_at(qso.deadline, self.check_qso, qso.call)
+    
+    def check_qso(self, call: str) -> None:
+        """QSO截止时间到"""
+        self.qso_timers.pop(call, None)
+        for qso in self.qso.poll():
+            self.handle_qso_event(qso)
+    
+    @staticmethod
+    def slot_received(decode: Dict[str, Any], period: float, mono: float) -> Optional[float]:
+        """解码的接收时间（单调时钟）；不是刚结束的时隙收到的（例如候补）时返回 None"""
+        received = decode.get('received')
+        return received if received is not None and mono - received < period else None
+    
+    def queue_reply(self, qso: QSO, decode: Dict[str, Any]) -> None:
+        """Reply 放入本发射周期的队列，周期开始前一起发出"""
+        mono = time.monotonic()
+        # 目标发射时隙：刚收到的解码对应紧接着它的时隙，否则是现在还赶得上的时隙
+        received = self.slot_received(decode, qso.period, mono)
+        start = mono if received is None else received
+        slot = self.qso.slot_boundary(start - self.latency.deadline, qso.period)
+        # 候补几个时隙之后才响应，它的 Reply 不计入发送延迟
+        if self.replies.add(qso.call, dict(decode, slot=slot, received=received), slot, mono):
+            self.timers.schedule_at(self.replies.flush_at, self.flush_replies)
+    
+    def flush_replies(self) -> None:
+        """发出本周期合并的 Reply"""
+        for decode in self.replies.take():
+            self.send_reply(decode)
+    
+    def tick(self, now: float) -> float:
+        """处理到期的定时器和候选决策时间，返回下一次需要检查前的等待时间"""
+        self.timers.advance()
+        self.dispatch_candidates(now)
+        wait = self.scheduler.wait_time(now, 1.0)
+        left = self.qso.time_left()
+        if left is not None:
+            wait = min(wait, max(0.05, left))
+        if self.replies.flush_at is not None:
+            # 合并的 Reply 要在发射周期开始前发出
+            wait = min(wait, max(0.01, self.replies.flush_at - time.monotonic()))
+        return wait
+    
+    def send_reply(self, decode: Dict[str, Any]) -> None:
+        """向发送解码的软件发出 Reply 包"""
+        self.renderer.flush()
+        print(self.ui.colorize(f" -----< ULTRON : Sending reply to {decode.get('message', '')}", "cyan"))
+        if self.sock is None or self.client_addr is None:
+            return
+        try:
+            self.sock.sendto(self.protocol.build_reply_packet(decode), self.client_addr)
+            self.state.tx_count += 1
+        except OSError as e:
+            print(f"{Colors.YELLOW}Warning sending reply: {e}{Colors.RESET}")
+            return
+        sent = time.monotonic()
+        self.latency.record('send', decode.get('received'), sent)
+        late = self.latency.reply_sent(sent, decode.get('slot'))
+        if late is not None:
+            print(self.ui.colorize(f" -----< ULTRON : Reply missed the TX slot by {late:.2f}s "
+                                   f"({self.latency.deadline_misses} misses)", "red"))
+    
+    def print_latency(self) -> None:
+        """显示决策延迟汇总"""
+        self.renderer.flush()
+        print(self.ui.colorize(" -----< ULTRON : Decision latency", "cyan"))
+        for line in self.latency.report_lines() + [self.decisions.report_line()]:
+            print(self.ui.colorize(f"   {line}", "cyan"))
     
     def run(self):
         """主运行循环"""
+        # 输出不是终端（nohup、管道）时不输出颜色转义码
+        set_color(sys.stdout.isatty() and not os.environ.get('NO_COLOR'))
         self.ui.print_header()
         
         # 创建UDP socket
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.bind((UDP_LISTEN_IP, UDP_PORT))
         sock.settimeout(1.0)  # 1秒超时
+        self.sock = sock
         
         # 转发socket
         forward_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -541,6 +860,7 @@ class Ultron:
             while True:
                 try:
                     data, addr = sock.recvfrom(512)
+                    received = time.monotonic()
                     
                     # 转发数据
                     forward_sock.sendto(data, (UDP_FORWARD_IP, UDP_FORWARD_PORT))
@@ -564,33 +884,39 @@ class Ultron:
                     if packet_type == "00000002":  # Decode packet
                         decode_data = self.protocol.parse_decode_packet(data)
                         if decode_data:
+                            decode_data['received'] = received
+                            self.latency.record('parse', received, time.monotonic())
+                            self.client_addr = addr
                             self.process_decode(decode_data)
                     
-                    elif packet_type == "00000000":  # Status packet
+                    elif packet_type == "00000001":  # Status packet
                         status_data = self.protocol.parse_status_packet(data)
                         if status_data:
                             self.process_status(status_data)
                     
-                    # 每分钟清理排除列表
-                    current_minute = datetime.datetime.utcnow().minute
-                    if current_minute in [0, 30]:
-                        self.state.excluded_calls.clear()
+                    sock.settimeout(self.tick(time.time()))
                 
                 except socket.timeout:
-                    # 检查超时
-                    current_time = int(time.time())
-                    if self.state.sendcq and current_time > self.state.tempu:
-                        print(self.ui.colorize(f" -----< ULTRON : {self.state.current_call} Not respond to the call", "red"))
-                        self.state.excluded_calls.add(self.state.current_call)
-                        self.state.sendcq = False
-                        self.state.current_call = ""
-                        continue
+                    # 这一批解码结束：显示缓冲的解码行；检查QSO截止时间和候选决策时间，
+                    # 空闲时为下一批解码预先计算
+                    self.renderer.flush()
+                    wait = self.tick(time.time())
+                    if self.prepare_decisions():
+                        wait = min(wait, 0.05)
+                    sock.settimeout(wait)
                 
         except KeyboardInterrupt:
+            self.renderer.flush()
             print(self.ui.colorize("\n -----< ULTRON : Shutting down...", "yellow"))
         finally:
+            self.sock = None
             sock.close()
             forward_sock.close()
+            self.history.close()
+            if self.ring is not None:
+                self.ring.close()
+            if self.latency.replies or self.latency.stages['parse'].count:
+                self.print_latency()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+ULTRON Band Activity Heatmap
+Python Version
+
+按小时分桶的环形计数器：每个 实体×波段 保存最近 N 天每小时的解码次数。
+每次解码只更新一个计数（O(1)），跨小时时清空过期的桶。
+用于回答“实体X在这个时段通常能在15m上听到吗”，无需扫描历史。
+"""
+
+import os
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from ultron_bands import BAND_COUNT
+
+# 保留天数
+HEATMAP_DAYS = 28
+# 持久化文件格式标识
+HEATMAP_MAGIC = b'UAH1'
+# 计数上限（array 'H'）
+COUNT_MAX = 0xFFFF
+
+
+class ActivityHeatmap:
+    """实体 × 波段 × 小时 解码计数环"""
+
+    def __init__(self, days: int = HEATMAP_DAYS):
+        self.days = days
+        self.buckets = days * 24
+        self.rows: Dict[int, array] = {}                          # 实体×波段 -> 每小时计数
+        self.bucket_hours = array('q', [-1]) * self.buckets       # 每个桶对应的小时（epoch小时）
+        self.current_hour = -1
+
+    @staticmethod
+    def _hour(now: Optional[float]) -> int:
+        return int((time.time() if now is None else now) // 3600)
+
+    def _advance(self, hour: int) -> int:
+        """切换到新的小时，清空被复用的桶，返回桶编号"""
+        bucket = hour % self.buckets
+        if hour != self.current_hour:
+            if hour > self.current_hour:
+                self.current_hour = hour
+            if self.bucket_hours[bucket] != hour:
+                for row in self.rows.values():
+                    row[bucket] = 0
+                self.bucket_hours[bucket] = hour
+        return bucket
+
+    def record(self, eid: int, bid: int, now: Optional[float] = None, count: int = 1) -> None:
+        """记录解码"""
+        if not eid:
+            return
+        hour = self._hour(now)
+        if hour <= self.current_hour - self.buckets:
+            return  # 超出保留范围
+        bucket = self._advance(hour)
+        slot = eid * BAND_COUNT + bid
+        row = self.rows.get(slot)
+        if row is None:
+            row = self.rows[slot] = array('H', bytes(2 * self.buckets))
+        row[bucket] = min(COUNT_MAX, row[bucket] + count)
+
+    def record_slot(self, decodes: Iterable[Tuple[int, int]], now: Optional[float] = None) -> None:
+        """记录一个时隙的所有解码 [(实体, 波段)]"""
+        for eid, bid in decodes:
+            self.record(eid, bid, now)
+
+    def _valid_buckets(self, hour_of_day: int):
+        """某个钟点在保留范围内的桶"""
+        oldest = self.current_hour - self.buckets
+        for bucket in range(hour_of_day % 24, self.buckets, 24):
+            if self.bucket_hours[bucket] > oldest:
+                yield bucket
+
+    def probability(self, eid: int, bid: int, now: Optional[float] = None) -> float:
+        """在这个钟点（UTC）的历史天数中听到该实体的比例"""
+        row = self.rows.get(eid * BAND_COUNT + bid)
+        buckets = list(self._valid_buckets(self._hour(now) % 24))
+        if row is None or not buckets:
+            return 0.0
+        return sum(1 for b in buckets if row[b]) / len(buckets)
+
+    def hourly(self, eid: int, bid: int) -> list:
+        """按钟点（UTC 0-23）汇总的解码次数"""
+        row = self.rows.get(eid * BAND_COUNT + bid)
+        result = [0] * 24
+        if row is not None:
+            oldest = self.current_hour - self.buckets
+            for bucket, hour in enumerate(self.bucket_hours):
+                if hour > oldest:
+                    result[hour % 24] += row[bucket]
+        return result
+
+    def is_workable(self, eid: int, bid: int, now: Optional[float] = None, threshold: float = 0.3) -> bool:
+        """该实体在这个钟点通常能在该波段上听到"""
+        return self.probability(eid, bid, now) >= threshold
+
+    # ------------------------------------------------------------------
+    # 持久化
+
+    def save(self, path: Union[str, Path]) -> None:
+        """保存（只保存有计数的行，小端字节序，先写临时文件再替换）"""
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        rows = [(slot, row) for slot, row in self.rows.items() if any(row)]
+        with open(tmp, 'wb') as f:
+            f.write(HEATMAP_MAGIC)
+            f.write(struct.pack('<HqI', self.days, self.current_hour, len(rows)))
+            f.write(_little(self.bucket_hours))
+            for slot, row in rows:
+                f.write(struct.pack('<I', slot))
+                f.write(_little(row))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], days: int = HEATMAP_DAYS) -> 'ActivityHeatmap':
+        """载入；文件不存在、损坏或天数不同时返回空的热图"""
+        heatmap = cls(days)
+        try:
+            with open(path, 'rb') as f:
+                if f.read(4) != HEATMAP_MAGIC:
+                    return heatmap
+                saved_days, current_hour, count = struct.unpack('<HqI', f.read(14))
+                if saved_days != days:
+                    return heatmap
+                hours = _read_little(f, 'q', heatmap.buckets)
+                rows = {}
+                for _ in range(count):
+                    (slot,) = struct.unpack('<I', f.read(4))
+                    rows[slot] = _read_little(f, 'H', heatmap.buckets)
+        except (OSError, EOFError, struct.error):
+            return heatmap
+        heatmap.bucket_hours = hours
+        heatmap.current_hour = current_hour
+        heatmap.rows = rows
+        return heatmap
+
+
+def _little(values: array) -> bytes:
+    if sys.byteorder == 'little':
+        return values.tobytes()
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _read_little(f, typecode: str, count: int) -> array:
+    values = array(typecode)
+    values.fromfile(f, count)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
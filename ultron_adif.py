@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+ULTRON ADIF Tools - Streaming ADIF Reader/Writer
+Python Version
+
+流式ADIF读写工具，导出大型日志时内存占用恒定。
+字段长度按UTF-8字节计算（符合ADIF规范）。
+
+Usage:
+    python ultron_adif.py export wsjtx_log.adi out.adi --band 20m --from 20240101 --dxcc 339
+    python ultron_adif.py merge jtdx.adi wsjtx.adi mshv.adi -o wsjtx_log.adi
+"""
+
+import os
+import re
+import sys
+import json
+import heapq
+import bisect
+import itertools
+import hashlib
+import struct
+import argparse
+import datetime
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union, BinaryIO
+
+from ultron_bands import MODE_NAMES, qso_mode_id
+
+# ultron 本身通过 ultron_store 使用本模块，因此 ultron 只在函数内导入
+if TYPE_CHECKING:
+    from ultron import DXCCDatabase
+
+# 读取块大小
+CHUNK_SIZE = 1 << 20
+# 写入缓冲区大小
+WRITE_BUFFER_SIZE = 1 << 20
+
+# 去重时间窗口（秒）：开始时间相差不超过一半的同一呼号/波段/模式视为同一QSO
+DEDUP_WINDOW = 120
+# 内存中保留的指纹数量上限，超过后使用外部排序
+MAX_MEMORY_RECORDS = 1_000_000
+
+# ADIF标签: <NAME>, <NAME:LEN>, <NAME:LEN:TYPE>
+ADIF_TAG_RE = re.compile(rb'<([A-Za-z0-9_]+)(?::(\d+))?(?::[A-Za-z])?>')
+
+
+class ADIFReader:
+    """流式ADIF读取器"""
+
+    def __init__(self, path: Union[str, Path], chunk_size: int = CHUNK_SIZE):
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for qso, _ in self.records():
+            yield qso
+
+    def records(self, start: int = 0, complete_only: bool = False) -> Iterator[Tuple[Dict[str, str], int]]:
+        """
+        逐条读取QSO，返回 (qso, 该记录结束处的文件偏移)。
+        complete_only=True 时忽略末尾尚未写完（没有<EOR>）的记录。
+        """
+        if not self.path.exists():
+            return
+
+        names: Dict[bytes, str] = {}
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            base = start        # buf[0] 对应的文件偏移
+            buf = b''
+            current = {}
+
+            while True:
+                chunk = f.read(self.chunk_size)
+                buf += chunk
+                size = len(buf)
+                safe = 0        # 已完整解析到的位置
+
+                for match in ADIF_TAG_RE.finditer(buf):
+                    tag_start, pos = match.span()
+                    if tag_start < safe:
+                        # 字段值内部出现的 '<'
+                        continue
+                    tag, length = match.groups()
+                    name = names.get(tag)
+                    if name is None:
+                        name = names[tag] = tag.lower().decode('ascii')
+
+                    if length is not None:
+                        end = pos + int(length)
+                        if end > size and chunk:
+                            # 字段值被块边界截断，等待下一块
+                            break
+                        value = buf[pos:end].decode('utf-8', errors='replace').strip()
+                        if value:
+                            current[name] = value
+                        safe = end
+                    else:
+                        safe = pos
+                        if name == 'eor':
+                            if current:
+                                yield current, base + pos
+                            current = {}
+                        elif name == 'eoh':
+                            current = {}
+
+                if not chunk:
+                    break
+                base += safe
+                buf = buf[safe:]
+
+            # 没有<EOR>结尾的最后一条记录
+            if current and not complete_only:
+                yield current, base + len(buf)
+
+
+class LogCheckpoint:
+    """日志增量读取检查点: 已读取到的偏移 + 文件开头的摘要（检测日志被重写）"""
+
+    HEAD_BYTES = 4096
+
+    def __init__(self, offset: int = 0, head_len: int = 0, head: str = ''):
+        self.offset = offset
+        self.head_len = head_len
+        self.head = head
+
+    @staticmethod
+    def digest(path: Union[str, Path], length: int) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read(length)).hexdigest()
+
+    def valid_for(self, path: Union[str, Path]) -> bool:
+        """日志只是被追加（未被截断或重写）时返回True"""
+        path = Path(path)
+        try:
+            if path.stat().st_size < self.offset:
+                return False
+            return self.digest(path, self.head_len) == self.head
+        except OSError:
+            return False
+
+    def advance(self, path: Union[str, Path], offset: int) -> None:
+        """记录新的读取位置"""
+        self.offset = offset
+        if self.head_len < self.HEAD_BYTES:
+            self.head_len = min(self.HEAD_BYTES, offset)
+            self.head = self.digest(path, self.head_len)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {'offset': self.offset, 'head_len': self.head_len, 'head': self.head}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> 'LogCheckpoint':
+        return cls(int(data.get('offset', 0)), int(data.get('head_len', 0)), str(data.get('head', '')))
+
+
+class ADIFWriter:
+    """流式ADIF写入器"""
+
+    def __init__(self, target: Union[str, Path, BinaryIO], append: bool = False,
+                 header: bool = True, buffer_size: int = WRITE_BUFFER_SIZE):
+        self.count = 0
+        if hasattr(target, 'write'):
+            self._fh = target
+            self._owns = False
+            write_header = header
+        else:
+            path = Path(target)
+            write_header = header and not (append and path.exists() and path.stat().st_size > 0)
+            self._fh = open(path, 'ab' if append else 'wb', buffering=buffer_size)
+            self._owns = True
+
+        if write_header:
+            self.write_header()
+
+    def write_header(self) -> None:
+        """写入ADIF文件头（只写一次）"""
+        from ultron import VERSION
+        created = datetime.datetime.utcnow().strftime('%Y%m%d %H%M%S')
+        fields = (('ADIF_VER', '3.1.4'), ('PROGRAMID', 'ULTRON'),
+                  ('PROGRAMVERSION', VERSION), ('CREATED_TIMESTAMP', created))
+        self._fh.write(b'ULTRON ADIF Export\n')
+        self._fh.write(b''.join(encode_field(k, v) for k, v in fields))
+        self._fh.write(b'<EOH>\n')
+
+    def write(self, qso: Dict[str, str]) -> None:
+        """写入一条QSO记录"""
+        self._fh.write(encode_record(qso))
+        self.count += 1
+
+    def write_many(self, qsos: Iterable[Dict[str, str]]) -> int:
+        """写入多条QSO记录，返回写入数量"""
+        written = 0
+        for qso in qsos:
+            self.write(qso)
+            written += 1
+        return written
+
+    def close(self) -> None:
+        if self._owns:
+            self._fh.close()
+        else:
+            self._fh.flush()
+
+    def __enter__(self) -> 'ADIFWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def encode_field(field: str, content) -> bytes:
+    """编码单个ADIF字段，长度按字节计算"""
+    value = str(content).strip().encode('utf-8')
+    return b'<%s:%d>%s ' % (field.upper().encode('ascii'), len(value), value)
+
+
+def encode_record(qso: Dict[str, str]) -> bytes:
+    """编码一条完整的ADIF记录"""
+    parts = [encode_field(field, content) for field, content in qso.items() if field.lower() != 'eor']
+    parts.append(b'<EOR>\n')
+    return b''.join(parts)
+
+
+class QSOFilter:
+    """QSO导出过滤条件"""
+
+    def __init__(self, bands: Optional[Iterable[str]] = None, start_date: Optional[str] = None,
+                 end_date: Optional[str] = None, entities: Optional[Iterable[str]] = None,
+                 dxcc_db: Optional['DXCCDatabase'] = None):
+        self.bands: Optional[Set[str]] = {b.lower() for b in bands} if bands else None
+        self.start_date = start_date
+        self.end_date = end_date
+        self.entities: Optional[Set[str]] = {str(e) for e in entities} if entities else None
+        self.dxcc_db = dxcc_db
+        self._entity_cache: Dict[str, str] = {}
+
+    def entity_of(self, qso: Dict[str, str]) -> str:
+        """获取QSO的DXCC实体ID（优先使用日志中的DXCC字段）"""
+        if 'dxcc' in qso:
+            return qso['dxcc']
+        call = qso.get('call', '').upper()
+        entity = self._entity_cache.get(call)
+        if entity is None:
+            entity = self.dxcc_db.locate_call(call)['id'] if self.dxcc_db else 'unknown'
+            self._entity_cache[call] = entity
+        return entity
+
+    def match(self, qso: Dict[str, str]) -> bool:
+        if self.bands is not None and qso.get('band', '').lower() not in self.bands:
+            return False
+        if self.start_date or self.end_date:
+            date = qso.get('qso_date', '')
+            if self.start_date and date < self.start_date:
+                return False
+            if self.end_date and date > self.end_date:
+                return False
+        if self.entities is not None and self.entity_of(qso) not in self.entities:
+            return False
+        return True
+
+
+def export_adif(log_file: Union[str, Path], out_file: Union[str, Path],
+                qso_filter: Optional[QSOFilter] = None) -> int:
+    """从日志流式导出（可过滤）QSO，返回导出数量"""
+    reader = ADIFReader(log_file)
+    with ADIFWriter(out_file) as writer:
+        if qso_filter is None:
+            return writer.write_many(reader)
+        return writer.write_many(qso for qso in reader if qso_filter.match(qso))
+
+
+def qso_timestamp(qso: Dict[str, str]) -> int:
+    """QSO开始时间（UTC秒），无法解析时返回0"""
+    date = qso.get('qso_date', '')
+    time_on = (qso.get('time_on', '') + '000000')[:6]
+    if len(date) != 8 or not date.isdigit() or not time_on.isdigit():
+        return 0
+    ordinal = _ORDINALS.get(date)
+    if ordinal is None:
+        try:
+            ordinal = datetime.date(int(date[:4]), int(date[4:6]), int(date[6:])).toordinal()
+        except ValueError:
+            ordinal = 0
+        _ORDINALS[date] = ordinal
+    return ordinal * 86400 + int(time_on[:2]) * 3600 + int(time_on[2:4]) * 60 + int(time_on[4:])
+
+
+_ORDINALS: Dict[str, int] = {}
+
+
+def qso_fingerprint(qso: Dict[str, str]) -> bytes:
+    """QSO指纹: 呼号 + 波段 + 模式（时间单独比较）"""
+    mid = qso_mode_id(qso)
+    mode = MODE_NAMES[mid] if mid else qso.get('mode', '').upper()
+    return b'%s\x00%s\x00%s' % (
+        qso.get('call', '').upper().encode('utf-8'),
+        qso.get('band', '').lower().encode('utf-8'),
+        mode.encode('utf-8'))
+
+
+def is_duplicate(times: List[int], timestamp: int, window: int = DEDUP_WINDOW) -> bool:
+    """已保留的开始时间（已排序）中是否有与 timestamp 相差不超过 window/2 的"""
+    half = window // 2
+    i = bisect.bisect_left(times, timestamp - half)
+    return i < len(times) and times[i] <= timestamp + half
+
+
+def _write_run(entries: List[Tuple[bytes, int, int, bytes]], tmp_dir: Optional[str]) -> str:
+    """把一批 (指纹, 开始时间, 已写出标志, 记录) 排序后写入临时文件"""
+    entries.sort(key=lambda e: (e[0], e[1]))
+    fd, path = tempfile.mkstemp(prefix='ultron_merge_', suffix='.run', dir=tmp_dir)
+    with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        for key, timestamp, written, payload in entries:
+            f.write(_RUN_HEADER.pack(len(key), timestamp, written, len(payload)))
+            f.write(key)
+            f.write(payload)
+    return path
+
+
+def _read_run(path: str) -> Iterator[Tuple[bytes, int, int, bytes]]:
+    with open(path, 'rb', buffering=CHUNK_SIZE) as f:
+        while True:
+            header = f.read(_RUN_HEADER.size)
+            if not header:
+                return
+            key_len, timestamp, written, payload_len = _RUN_HEADER.unpack(header)
+            yield f.read(key_len), timestamp, written, f.read(payload_len)
+
+
+_RUN_HEADER = struct.Struct('>HqBI')
+
+
+def merge_logs(sources: Iterable[Union[str, Path]], out_file: Union[str, Path],
+               window: int = DEDUP_WINDOW, max_memory: int = MAX_MEMORY_RECORDS,
+               on_record: Optional[Callable[[Dict[str, str]], None]] = None,
+               tmp_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    合并多个ADIF日志并去重。
+
+    呼号、波段、模式相同且开始时间相差不超过 window/2 的记录是同一个QSO
+    （直接比较时间，不按窗口取整，跨过取整边界的副本也能识别）。
+    指纹和开始时间先保存在内存中；超过 max_memory 后改用外部排序:
+    已写出的和后续记录分批按 (指纹, 时间) 排序写入临时文件，最后多路归并去重。
+    on_record 对每条写出的QSO调用一次（用于更新已通联索引）。
+    """
+    out_path = Path(out_file)
+    partial = out_path.with_name(out_path.name + '.merging')
+    stats = {'read': 0, 'written': 0, 'duplicates': 0, 'runs': 0}
+    seen: Dict[bytes, List[int]] = {}       # 指纹 -> 已写出的开始时间（已排序）
+    stored = 0
+    runs: List[str] = []
+    batch: List[Tuple[bytes, int, int, bytes]] = []
+
+    try:
+        with ADIFWriter(partial) as writer:
+            for source in sources:
+                for qso in ADIFReader(source):
+                    stats['read'] += 1
+                    key = qso_fingerprint(qso)
+                    timestamp = qso_timestamp(qso)
+
+                    if not runs:
+                        times = seen.get(key)
+                        if times is not None and is_duplicate(times, timestamp, window):
+                            stats['duplicates'] += 1
+                            continue
+                        if stored < max_memory:
+                            bisect.insort(seen.setdefault(key, []), timestamp)
+                            stored += 1
+                            writer.write(qso)
+                            if on_record:
+                                on_record(qso)
+                            continue
+                        # 内存不足，已写出的指纹作为第一批
+                        runs.append(_write_run([(k, t, 1, b'') for k, times in seen.items() for t in times],
+                                               tmp_dir))
+                        seen.clear()
+
+                    batch.append((key, timestamp, 0, json.dumps(qso, ensure_ascii=False).encode('utf-8')))
+                    if len(batch) >= max_memory:
+                        runs.append(_write_run(batch, tmp_dir))
+                        batch = []
+
+            if runs:
+                if batch:
+                    runs.append(_write_run(batch, tmp_dir))
+                    batch = []
+                stats['runs'] = len(runs)
+
+                # 多路归并: 同一指纹的记录按时间相邻，已写出的先作为保留的时间
+                merged = heapq.merge(*(_read_run(path) for path in runs), key=lambda e: (e[0], e[1]))
+                for _key, group in itertools.groupby(merged, key=lambda e: e[0]):
+                    entries = list(group)
+                    kept = [timestamp for _k, timestamp, written, _p in entries if written]
+                    for _k, timestamp, written, payload in entries:
+                        if written:
+                            continue
+                        if is_duplicate(kept, timestamp, window):
+                            stats['duplicates'] += 1
+                            continue
+                        bisect.insort(kept, timestamp)
+                        qso = json.loads(payload)
+                        writer.write(qso)
+                        if on_record:
+                            on_record(qso)
+
+            stats['written'] = writer.count
+        os.replace(partial, out_path)
+    finally:
+        for path in runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if partial.exists():
+            partial.unlink()
+
+    return stats
+
+
+def main():
+    """主函数"""
+    from ultron import Colors, DXCCDatabase
+
+    parser = argparse.ArgumentParser(description='ULTRON ADIF Tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export = sub.add_parser('export', help='流式导出ADIF日志')
+    export.add_argument('log_file', help='源ADIF日志')
+    export.add_argument('out_file', help='导出文件')
+    export.add_argument('--band', action='append', help='波段过滤 (可多次指定)')
+    export.add_argument('--from', dest='start_date', help='起始日期 YYYYMMDD')
+    export.add_argument('--to', dest='end_date', help='结束日期 YYYYMMDD')
+    export.add_argument('--dxcc', action='append', help='DXCC实体ID过滤 (可多次指定)')
+
+    merge = sub.add_parser('merge', help='合并多个ADIF日志并去重')
+    merge.add_argument('sources', nargs='+', help='源ADIF日志')
+    merge.add_argument('-o', '--output', default='wsjtx_log.adi', help='合并后的日志')
+    merge.add_argument('--window', type=int, default=DEDUP_WINDOW, help='去重时间窗口（秒）')
+    merge.add_argument('--max-memory', type=int, default=MAX_MEMORY_RECORDS,
+                       help='内存中保留的指纹数量上限')
+    merge.add_argument('--log', default='wsjtx_log.adi', help='ULTRON 使用的日志（合并到这里时更新已通联索引）')
+    merge.add_argument('--index', default='ultron_qso_index.bin', help='已通联索引文件（空字符串表示不更新）')
+
+    args = parser.parse_args()
+
+    if args.command == 'merge':
+        # 合并结果直接送入已通联索引
+        from ultron_store import LogIndex, QSOTable, file_signature
+        dxcc_db = DXCCDatabase()
+        resolve = lambda call: dxcc_db.locate_call(call)['id']
+        table = QSOTable(resolve)
+        stats = merge_logs(args.sources, args.output, window=args.window,
+                           max_memory=args.max_memory, on_record=table.append)
+        print(f"{Colors.GREEN}Merged {stats['read']} QSOs -> {stats['written']} "
+              f"({stats['duplicates']} duplicates) into {args.output}{Colors.RESET}")
+        if stats['runs']:
+            print(f"{Colors.CYAN} -----< External sort used {stats['runs']} runs{Colors.RESET}")
+        print(f"{Colors.CYAN} -----< Worked calls: {len(table.pool)}, "
+              f"DXCC entities: {len(table.unique_entities())}{Colors.RESET}")
+        # 合并到 ULTRON 的日志时更新它的已通联索引（否则下次启动时检查点已过期）
+        if args.index and Path(args.output).resolve() == Path(args.log).resolve():
+            index = LogIndex(args.output, args.index, resolve, file_signature(dxcc_db.db_file))
+            index.replace(table)
+            index.save()
+            print(f"{Colors.CYAN} -----< Updated worked index {args.index}{Colors.RESET}")
+
+    elif args.command == 'export':
+        qso_filter = None
+        if args.band or args.start_date or args.end_date or args.dxcc:
+            qso_filter = QSOFilter(
+                bands=args.band, start_date=args.start_date, end_date=args.end_date,
+                entities=args.dxcc, dxcc_db=DXCCDatabase() if args.dxcc else None
+            )
+        count = export_adif(args.log_file, args.out_file, qso_filter)
+        print(f"{Colors.GREEN}Exported {count} QSOs to {args.out_file}{Colors.RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+ULTRON Band/Mode Tables
+Python Version
+
+波段和模式的小整数编号，供列式存储和决策路径使用；
+以及按IARU分区的波段计划（bisect 查找 拨号频率 -> 波段/子波段）。
+"""
+
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+# 波段编号（0 = 未知）
+BAND_NAMES = (
+    'unknown', '2190m', '630m', '160m', '80m', '60m', '40m', '30m', '20m',
+    '17m', '15m', '12m', '10m', '6m', '4m', '2m', '1.25m', '70cm',
+)
+BAND_IDS: Dict[str, int] = {name: i for i, name in enumerate(BAND_NAMES)}
+BAND_COUNT = len(BAND_NAMES)
+
+# DXCC Challenge 计分波段（160m-6m，不含60m）
+CHALLENGE_BANDS = tuple(BAND_IDS[name] for name in (
+    '160m', '80m', '40m', '30m', '20m', '17m', '15m', '12m', '10m', '6m',
+))
+
+# 模式编号（0 = 未知）
+MODE_NAMES = (
+    'unknown', 'FT8', 'FT4', 'JT65', 'JT9', 'Q65', 'MSK144', 'JT4', 'FST4',
+    'WSPR', 'CW', 'SSB', 'RTTY', 'PSK31',
+)
+MODE_IDS: Dict[str, int] = {name: i for i, name in enumerate(MODE_NAMES)}
+MODE_COUNT = len(MODE_NAMES)
+
+
+def band_id(name: str) -> int:
+    """波段名称 -> 波段编号"""
+    return BAND_IDS.get(name.strip().lower(), 0) if name else 0
+
+
+def mode_id(name: str) -> int:
+    """模式名称 -> 模式编号"""
+    return MODE_IDS.get(name.strip().upper(), 0) if name else 0
+
+
+def qso_mode_id(qso: Dict[str, str]) -> int:
+    """ADIF记录的模式编号（FT4在ADIF中是 MODE=MFSK SUBMODE=FT4）"""
+    return mode_id(qso.get('submode', '')) or mode_id(qso.get('mode', ''))
+
+
+# 波段边界（Hz），按IARU分区: 波段 -> (1区, 2区, 3区)
+BAND_EDGES = {
+    '2190m': ((135700, 137800),) * 3,
+    '630m': ((472000, 479000),) * 3,
+    '160m': ((1810000, 2000000), (1800000, 2000000), (1800000, 2000000)),
+    '80m': ((3500000, 3800000), (3500000, 4000000), (3500000, 3900000)),
+    '60m': ((5351500, 5366500), (5330000, 5410000), (5351500, 5366500)),
+    '40m': ((7000000, 7200000), (7000000, 7300000), (7000000, 7300000)),
+    '30m': ((10100000, 10150000),) * 3,
+    '20m': ((14000000, 14350000),) * 3,
+    '17m': ((18068000, 18168000),) * 3,
+    '15m': ((21000000, 21450000),) * 3,
+    '12m': ((24890000, 24990000),) * 3,
+    '10m': ((28000000, 29700000),) * 3,
+    '6m': ((50000000, 54000000),) * 3,
+    '4m': ((70000000, 70500000), None, None),
+    '2m': ((144000000, 146000000), (144000000, 148000000), (144000000, 148000000)),
+    '1.25m': (None, (222000000, 225000000), None),
+    '70cm': ((430000000, 440000000), (420000000, 450000000), (430000000, 440000000)),
+}
+
+# 子波段起点（Hz），参照IARU 1区HF波段计划; cw = 仅CW, narrow = 窄带/数字模式, all = 所有模式
+SUB_BANDS = (
+    (1810000, 'cw'), (1838000, 'narrow'), (1840000, 'all'),
+    (3500000, 'cw'), (3570000, 'narrow'), (3600000, 'all'),
+    (5351500, 'narrow'), (5354000, 'all'),
+    (7000000, 'cw'), (7040000, 'narrow'), (7060000, 'all'),
+    (10100000, 'cw'), (10130000, 'narrow'),
+    (14000000, 'cw'), (14070000, 'narrow'), (14099000, 'beacon'), (14101000, 'all'),
+    (18068000, 'cw'), (18095000, 'narrow'), (18109000, 'beacon'), (18111000, 'all'),
+    (21000000, 'cw'), (21070000, 'narrow'), (21149000, 'beacon'), (21151000, 'all'),
+    (24890000, 'cw'), (24915000, 'narrow'), (24929000, 'beacon'), (24931000, 'all'),
+    (28000000, 'cw'), (28070000, 'narrow'), (28190000, 'beacon'), (28225000, 'all'),
+    (50000000, 'cw'), (50100000, 'all'),
+)
+
+
+class BandPlan:
+    """波段计划：拨号频率 -> (波段编号, 子波段)，用 bisect 查找"""
+
+    def __init__(self, region: Optional[int] = None):
+        """region 为 1/2/3；None 时取三个分区的并集"""
+        ranges: List[Tuple[int, int, int]] = []
+        for name, edges in BAND_EDGES.items():
+            selected = [edges[region - 1]] if region else [e for e in edges if e]
+            if not selected or selected[0] is None:
+                continue
+            low = min(e[0] for e in selected)
+            high = max(e[1] for e in selected)
+            ranges.append((low, high, BAND_IDS[name]))
+        ranges.sort()
+        self.region = region
+        self.starts = [r[0] for r in ranges]
+        self.ends = [r[1] for r in ranges]
+        self.ids = [r[2] for r in ranges]
+        self.sub_starts = [start for start, _ in SUB_BANDS]
+        self.sub_names = [name for _, name in SUB_BANDS]
+
+    def band_id(self, freq_hz: int) -> int:
+        """频率（Hz）所在的波段编号，不在任何波段内返回0"""
+        i = bisect_right(self.starts, freq_hz) - 1
+        if i >= 0 and freq_hz <= self.ends[i]:
+            return self.ids[i]
+        return 0
+
+    def band(self, freq_hz: int) -> str:
+        """频率（Hz）所在的波段名称"""
+        return BAND_NAMES[self.band_id(freq_hz)]
+
+    def resolve(self, freq_hz: int) -> Tuple[int, str]:
+        """频率（Hz） -> (波段编号, 子波段名称)"""
+        bid = self.band_id(freq_hz)
+        if not bid:
+            return 0, ''
+        i = bisect_right(self.sub_starts, freq_hz) - 1
+        if i >= 0 and self.band_id(self.sub_starts[i]) == bid:
+            return bid, self.sub_names[i]
+        return bid, 'all'
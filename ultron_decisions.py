@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+ULTRON Decision Cache
+Python Version
+
+每个最近听到的电台预先算好的决定：呼号是否有效、DXCC信息、需要等级、
+白名单优先级、与信噪比无关的候选得分，以及可以直接发出的 Reply 包模板。
+同一个电台通常每两个时隙就会再解码一次，下一批解码到来时只需查表、
+再把时间/信噪比/DT/DF 填进模板。
+已通联记录、配置、波段/模式或本台网格变化时整体作废（代数加一，O(1)），
+作废的条目在时隙的空闲时间里重新计算。
+缓存只由主循环访问（没有锁）：其他线程（例如配置监视）要把变化交给主循环处理。
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+# 缓存的电台数上限（超过时去掉最久没有听到的）
+MAX_DECISIONS = 4096
+# 每次空闲时用于预先计算的时间（秒）
+PREPARE_BUDGET = 0.02
+
+
+class Decision:
+    """一个电台的预先计算结果"""
+
+    __slots__ = ('call', 'generation', 'bid', 'mid', 'grid', 'valid', 'dxcc_info', 'eid', 'need',
+                 'priority', 'static_score', 'reply', 'pending_reply')
+
+    def __init__(self, call: str, bid: int, mid: int, grid: str = '', valid: bool = True,
+                 dxcc_info: Optional[Dict[str, str]] = None, eid: int = 0, need: int = 0,
+                 priority: float = 0.0, static_score: float = 0.0):
+        self.call = call
+        self.generation = 0
+        self.bid = bid                      # 计算时的波段
+        self.mid = mid                      # 计算时的模式
+        self.grid = grid
+        self.valid = valid                  # 呼号格式有效
+        self.dxcc_info = dxcc_info
+        self.eid = eid
+        self.need = need
+        self.priority = priority            # 白名单优先级
+        self.static_score = static_score    # 与信噪比无关的候选得分
+        self.reply: Optional[Tuple[Tuple[str, str, str], bytes, int]] = None  # ((软件ID, 模式, 消息), 模板, 数值字段位置)
+        self.pending_reply: Optional[Tuple[str, str, str]] = None   # 需要生成模板的 (软件ID, 模式, 消息)
+
+    def reply_for(self, key: Tuple[str, str, str]) -> Optional[Tuple[Tuple[str, str, str], bytes, int]]:
+        """这条消息的 Reply 模板（还没有生成时返回 None）"""
+        reply = self.reply
+        return reply if reply is not None and reply[0] == key else None
+
+
+class DecisionCache:
+    """呼号 -> 预先计算的决定（按代数作废）"""
+
+    def __init__(self, max_entries: int = MAX_DECISIONS):
+        self.max_entries = max_entries
+        self.generation = 0
+        self.entries: Dict[str, Decision] = {}
+        self.todo: Deque[str] = deque()     # 空闲时需要（重新）计算的呼号
+        self.hits = 0
+        self.misses = 0
+        self.prepared = 0
+        self.owner = threading.get_ident()  # 建立缓存的线程（主循环）
+
+    def get(self, call: str, bid: int, mid: int, grid: str = '') -> Optional[Decision]:
+        """有效的决定（已作废、波段/模式/网格不同时返回 None）"""
+        decision = self.entries.get(call)
+        if (decision is None or decision.generation != self.generation or decision.bid != bid
+                or decision.mid != mid or decision.grid != grid):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return decision
+
+    def put(self, decision: Decision, generation: int) -> Decision:
+        """保存决定（generation 为开始计算时的代数，计算期间作废的结果不会被当作有效）"""
+        old = self.entries.pop(decision.call, None)
+        if old is not None and decision.reply is None:
+            decision.reply = old.reply
+            decision.pending_reply = old.pending_reply
+        decision.generation = generation
+        self.entries[decision.call] = decision
+        if len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+        return decision
+
+    def want_reply(self, decision: Decision, key: Tuple[str, str, str]) -> None:
+        """空闲时为这条消息生成 Reply 模板"""
+        if decision.pending_reply != key:
+            decision.pending_reply = key
+            self.todo.append(decision.call)
+
+    def invalidate(self) -> None:
+        """已通联记录或配置变化：所有决定作废，空闲时重新计算（只能在主循环中调用）"""
+        if threading.get_ident() != self.owner:
+            raise RuntimeError("DecisionCache.invalidate() called outside the thread that owns the cache")
+        self.generation += 1
+        self.todo = deque(self.entries)
+
+    def summary(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'generation': self.generation,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'prepared': self.prepared,
+        }
+
+    def report_line(self) -> str:
+        s = self.summary()
+        return (f"decision cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%}), "
+                f"{s['prepared']} prepared while idle, {s['entries']} stations")
+
+    def __len__(self) -> int:
+        return len(self.entries)
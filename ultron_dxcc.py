@@ -11,11 +11,29 @@ License: Creative Commons Attribution-NonCommercial-NoDerivatives 4.0 Internatio
 
 import json
 import os
-from typing import Dict, List, Set, Optional
+import threading
+import time
+from typing import Dict, List, Set, Optional, Tuple
 from dataclasses import dataclass, field
 from pathlib import Path
 
 from ultron import Ultron, Colors, TerminalUI
+from ultron_activity import ActivityHeatmap
+from ultron_bands import BAND_IDS, BAND_NAMES, band_id
+from ultron_message import Message
+from ultron_needed import NEW_BAND, NEW_CALL
+from ultron_recommend import ActivityTracker, Recommender
+from ultron_scheduler import whitelist_priority
+from ultron_store import LogIndex, QSOTable, SlotMatrix, entity_id, file_signature
+from ultron_watch import FileWatcher
+from ultron_whitelist import WHITELIST_CONFIG, CompiledWhitelist, load_whitelists, whitelist_files
+
+# 配置文件变化后等待的防抖时间（秒）
+RELOAD_DEBOUNCE = 0.5
+# 活动热图状态文件
+HEATMAP_FILE = "ultron_activity.bin"
+# 活动热图定期保存的间隔（秒）
+HEATMAP_SAVE_INTERVAL = 600.0
 
 @dataclass
 class DXCCConfig:
@@ -23,9 +41,22 @@ class DXCCConfig:
     whitelist_only: bool = False  # 0 = 优先模式, 1 = 仅白名单
     dxcc_whitelist: Dict[str, str] = field(default_factory=dict)
     band_whitelist: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    compiled: CompiledWhitelist = field(default_factory=CompiledWhitelist)  # 编译后的查找表
+    
+    @classmethod
+    def build(cls, config_file: str = "dxcc_config.py", whitelist_dir: str = ".",
+              strict: bool = False) -> 'DXCCConfig':
+        """加载配置文件和白名单文件，编译成完整的配置"""
+        config = cls()
+        config.load_from_file(config_file, strict)
+        # dxcc_config.py 的字典和 dxcc_whitelist_*.json 编译成一张查找表
+        config.compiled = CompiledWhitelist.load(
+            whitelist_dir, config.dxcc_whitelist, config.band_whitelist, strict
+        )
+        return config
     
-    def load_from_file(self, config_file: str = "dxcc_config.py"):
-        """从配置文件加载"""
+    def load_from_file(self, config_file: str = "dxcc_config.py", strict: bool = False):
+        """从配置文件加载（strict=True 时加载失败抛出异常）"""
         if not os.path.exists(config_file):
             return
         
@@ -45,21 +76,28 @@ class DXCCConfig:
                 self.band_whitelist = config_module.band_whitelist
                 
         except Exception as e:
+            if strict:
+                raise
             print(f"{Colors.YELLOW}Warning: Could not load DXCC config: {e}{Colors.RESET}")
 
 class DXCCAnalyzer:
     """DXCC分析器"""
     
-    def __init__(self, dxcc_db, log_file: str = "wsjtx_log.adi"):
+    def __init__(self, dxcc_db, log_file: str = "wsjtx_log.adi", state_file: str = "ultron_qso_index.bin",
+                 index: Optional[LogIndex] = None):
         self.dxcc_db = dxcc_db
         self.log_file = Path(log_file)
         self.worked_dxcc = {}  # {dxcc_id: name}
         self.worked_dxcc_by_band = {}  # {band: {dxcc_id: name}}
+        # 列式存储，每个呼号只查找一次DXCC；只解析上次之后新增的QSO
+        self.index = index or LogIndex(self.log_file, state_file,
+                                       lambda call: self.dxcc_db.locate_call(call)['id'],
+                                       file_signature(getattr(dxcc_db, 'db_file', '')))
+        self.table = QSOTable()
+        self.matrix = SlotMatrix()
     
     def analyze_log(self) -> Dict[str, any]:
         """分析日志文件"""
-        from ultron import ADIFProcessor
-        
         if not self.log_file.exists():
             return {
                 'worked_dxcc': {},
@@ -69,33 +107,20 @@ class DXCCAnalyzer:
             }
         
         try:
-            content = self.log_file.read_text(encoding='utf-8')
-            adif_processor = ADIFProcessor()
-            qsos = adif_processor.parse_adif(content)
+            self.index.refresh()
+            self.table = self.index.table
+            self.matrix = SlotMatrix(self.table)
             
-            for qso in qsos:
-                if 'call' not in qso:
-                    continue
-                
-                call = qso['call'].upper()
-                band = qso.get('band', 'unknown')
-                
-                # 查找DXCC信息
-                dxcc_info = self.dxcc_db.locate_call(call)
-                if dxcc_info['id'] != 'unknown':
-                    dxcc_id = dxcc_info['id']
-                    dxcc_name = dxcc_info['name']
-                    
-                    # 添加到已通联列表
-                    self.worked_dxcc[dxcc_id] = dxcc_name
-                    
-                    # 按波段记录
-                    if band not in self.worked_dxcc_by_band:
-                        self.worked_dxcc_by_band[band] = {}
-                    self.worked_dxcc_by_band[band][dxcc_id] = dxcc_name
+            all_dxcc = self.get_all_dxcc()
+            self.worked_dxcc_by_band = {
+                BAND_NAMES[bid]: {str(eid): all_dxcc.get(str(eid), 'unknown') for eid in entities}
+                for bid, entities in self.matrix.entities_by_band().items()
+            }
+            self.worked_dxcc = {}
+            for entities in self.worked_dxcc_by_band.values():
+                self.worked_dxcc.update(entities)
             
             # 计算未通联的DXCC
-            all_dxcc = self.get_all_dxcc()
             unworked_dxcc = {k: v for k, v in all_dxcc.items() if k not in self.worked_dxcc}
             
             return {
@@ -118,23 +143,29 @@ class DXCCAnalyzer:
         """获取所有DXCC实体"""
         all_dxcc = {}
         for entry in self.dxcc_db.database:
-            all_dxcc[entry.get('id', 'unknown')] = entry.get('name', 'unknown')
+            all_dxcc[str(entry.get('id', 'unknown'))] = entry.get('name', 'unknown')
         return all_dxcc
     
-    def generate_recommendations(self, analysis_result: Dict[str, any]) -> Dict[str, List[str]]:
-        """生成推荐白名单"""
-        unworked = analysis_result['unworked_dxcc']
+    def generate_recommendations(self, analysis_result: Dict[str, any],
+                                 activity: Optional[ActivityTracker] = None,
+                                 whitelists: Optional[Dict] = None,
+                                 heatmap: Optional[ActivityHeatmap] = None) -> Dict[str, List[str]]:
+        """生成推荐白名单（按得分排序）"""
+        if whitelists is None:
+            whitelists = load_whitelists()
+        all_ids = [entity_id(k) for k in self.get_all_dxcc()]
+        recommender = Recommender(whitelists, self.matrix, activity, all_ids, heatmap)
         
         recommendations = {
-            'dxcc_whitelist': list(unworked.keys())[:10],  # 前10个未通联的DXCC
+            'dxcc_whitelist': [str(eid) for eid, _ in recommender.top_new(10)],  # 得分最高的10个未通联DXCC
             'band_recommendations': {}
         }
         
-        # 按波段推荐
-        for band, worked_list in analysis_result['worked_dxcc_by_band'].items():
-            unworked_in_band = {k: v for k, v in unworked.items() if k not in worked_list}
-            if unworked_in_band:
-                recommendations['band_recommendations'][band] = list(unworked_in_band.keys())[:5]
+        # 按波段推荐：白名单波段和已通联的波段
+        bands = [b for b in whitelists if b in BAND_IDS]
+        bands += [b for b in analysis_result['worked_dxcc_by_band'] if b not in bands]
+        for band, top in recommender.recommend(bands, 5).items():
+            recommendations['band_recommendations'][band] = [str(eid) for eid, _ in top]
         
         return recommendations
 
@@ -144,93 +175,189 @@ class UltronDXCC(Ultron):
     def __init__(self):
         super().__init__()
         self.dxcc_config = DXCCConfig()
-        self.dxcc_analyzer = DXCCAnalyzer(self.dxcc_db)
+        self.dxcc_analyzer = DXCCAnalyzer(self.dxcc_db, index=self.log_index)
+        self.activity = ActivityTracker()  # 最近解码活跃度，供推荐使用
+        self.heatmap = ActivityHeatmap.load(HEATMAP_FILE)  # 按钟点的历史活动
+        self.timers.every(HEATMAP_SAVE_INTERVAL, self.save_heatmap)
+        self.config_file = "dxcc_config.py"
+        self.config_watcher: Optional[FileWatcher] = None
+        self.config_lock = threading.Lock()
+        self.pending_config: Optional[Tuple[Optional[DXCCConfig], Set[Path], float, Optional[str]]] = None  # 监视线程编译好的配置
+        self.reload_status = {
+            'watcher': 'off',
+            'reloads': 0,
+            'failures': 0,
+            'last_reload': None,
+            'last_latency_ms': None,
+            'last_error': None,
+        }
         self.load_dxcc_configuration()
     
+    @property
+    def whitelist(self) -> CompiledWhitelist:
+        return self.dxcc_config.compiled
+    
     def load_dxcc_configuration(self):
         """加载DXCC配置"""
-        self.dxcc_config.load_from_file("dxcc_config.py")
+        self.dxcc_config = DXCCConfig.build(self.config_file)
         
         print(f"{Colors.CYAN} -----< ULTRON DXCC Enhanced: Loaded configuration{Colors.RESET}")
         print(f"{Colors.CYAN} -----< Whitelist Only Mode: {'ON' if self.dxcc_config.whitelist_only else 'OFF'}{Colors.RESET}")
         print(f"{Colors.CYAN} -----< DXCC Whitelist Count: {len(self.dxcc_config.dxcc_whitelist)}{Colors.RESET}")
         print(f"{Colors.CYAN} -----< Band Whitelist Count: {len(self.dxcc_config.band_whitelist)}{Colors.RESET}")
+        print(f"{Colors.CYAN} -----< Compiled Whitelist Entities: {self.whitelist.count}{Colors.RESET}")
     
-    def is_dxcc_in_whitelist(self, dxcc_id: str, band: str = None) -> bool:
-        """检查DXCC是否在白名单中"""
-        if not dxcc_id or dxcc_id == 'unknown':
+    def config_files(self) -> List[Path]:
+        """需要监视的配置文件"""
+        return [Path(self.config_file), Path(WHITELIST_CONFIG)] + list(whitelist_files(".").values())
+    
+    def config_changed(self, changed: Optional[Set[Path]] = None) -> None:
+        """
+        监视线程调用：在后台编译新配置，放进待应用的位置。
+        替换配置和作废预先计算的决定由主循环的 tick() 完成（不和解码处理同时修改）。
+        """
+        start = time.perf_counter()
+        try:
+            config, error = DXCCConfig.build(self.config_file, strict=True), None
+        except Exception as e:
+            config, error = None, str(e)
+        latency = (time.perf_counter() - start) * 1000
+        with self.config_lock:
+            self.pending_config = (config, set(changed or ()), latency, error)
+    
+    def apply_pending_config(self) -> Optional[bool]:
+        """
+        主循环调用：应用监视线程编译好的配置（正在进行的QSO不受影响）。
+        失败时保留原配置。没有待应用的配置时返回 None。
+        """
+        with self.config_lock:
+            pending, self.pending_config = self.pending_config, None
+        if pending is None:
+            return None
+        config, changed, latency, error = pending
+        self.renderer.flush()
+        if config is None:
+            self.reload_status['failures'] += 1
+            self.reload_status['last_error'] = error
+            print(f"{Colors.RED} -----< ULTRON DXCC : Config reload failed, keeping previous configuration: {error}{Colors.RESET}")
             return False
         
-        # 检查全局白名单
-        if dxcc_id in self.dxcc_config.dxcc_whitelist:
-            return True
-        
-        # 检查波段白名单
-        if band and band in self.dxcc_config.band_whitelist:
-            if dxcc_id in self.dxcc_config.band_whitelist[band]:
-                return True
-        
-        return False
+        self.dxcc_config = config
+        self.decisions.invalidate()  # 白名单优先级变了
+        self.reload_status.update(
+            reloads=self.reload_status['reloads'] + 1,
+            last_reload=time.time(),
+            last_latency_ms=round(latency, 1),
+            last_error=None,
+        )
+        if self.config_watcher is not None:
+            # 白名单配置可能增减了文件
+            self.config_watcher.set_paths(self.config_files())
+        names = ", ".join(sorted(p.name for p in changed)) if changed else "all"
+        print(f"{Colors.CYAN} -----< ULTRON DXCC : Reloaded configuration ({names}) in {latency:.1f} ms, "
+              f"{config.compiled.count} whitelisted entities{Colors.RESET}")
+        return True
+    
+    def reload_dxcc_configuration(self, changed: Optional[Set[Path]] = None) -> bool:
+        """在主线程中立即重新加载配置"""
+        self.config_changed(changed)
+        return bool(self.apply_pending_config())
+    
+    def tick(self, now: float) -> float:
+        """先应用监视线程编译好的配置，再处理定时器和候选"""
+        self.apply_pending_config()
+        return super().tick(now)
+    
+    def start_config_watcher(self) -> None:
+        """启动配置文件监视"""
+        if self.config_watcher is not None:
+            return
+        self.config_watcher = FileWatcher(self.config_files(), self.config_changed,
+                                          debounce=RELOAD_DEBOUNCE)
+        self.config_watcher.start()
+        self.reload_status['watcher'] = self.config_watcher.backend
+        print(f"{Colors.CYAN} -----< ULTRON DXCC : Watching configuration files ({self.config_watcher.backend}){Colors.RESET}")
+    
+    def stop_config_watcher(self) -> None:
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+            self.config_watcher = None
+            self.reload_status['watcher'] = 'off'
+    
+    def process_status(self, status_data: dict) -> None:
+        """处理状态数据包，附带配置重新加载的失败信息"""
+        super().process_status(status_data)
+        if self.reload_status['last_error']:
+            print(f"{Colors.YELLOW} -----< ULTRON DXCC : Config reload failing "
+                  f"({self.reload_status['failures']}x): {self.reload_status['last_error']}{Colors.RESET}")
+    
+    def run(self):
+        """主运行循环（同时监视配置文件）"""
+        self.start_config_watcher()
+        try:
+            super().run()
+        finally:
+            self.stop_config_watcher()
+            self.save_heatmap()
+    
+    def save_heatmap(self) -> None:
+        """保存活动热图"""
+        try:
+            self.heatmap.save(HEATMAP_FILE)
+        except OSError as e:
+            print(f"{Colors.YELLOW} -----< ULTRON DXCC : Cannot save activity heatmap: {e}{Colors.RESET}")
+    
+    def is_dxcc_in_whitelist(self, dxcc_id: str, band: str = None) -> bool:
+        """检查DXCC是否在白名单中"""
+        bid = band_id(band) if band else 0
+        return bool(self.whitelist.band_mask[entity_id(dxcc_id)] >> bid & 1)
     
     def has_worked_dxcc_on_band(self, dxcc_id: str, band: str) -> bool:
         """检查是否在特定波段通联过该DXCC"""
-        if not self.log_file.exists():
-            return False
-        
-        try:
-            from ultron import ADIFProcessor
-            content = self.log_file.read_text(encoding='utf-8')
-            adif_processor = ADIFProcessor()
-            qsos = adif_processor.parse_adif(content)
-            
-            for qso in qsos:
-                if 'call' not in qso:
-                    continue
-                
-                call = qso['call'].upper()
-                qso_band = qso.get('band', 'unknown')
-                
-                if qso_band == band:
-                    dxcc_info = self.dxcc_db.locate_call(call)
-                    if dxcc_info['id'] == dxcc_id:
-                        return True
-            
-            return False
-            
-        except Exception as e:
-            print(f"{Colors.YELLOW}Warning checking DXCC band status: {e}{Colors.RESET}")
-            return False
+        return bool(self.needed.entity_bands[entity_id(dxcc_id)] >> band_id(band) & 1)
     
-    def handle_response_logic(self, parts: list, status: str, dxcc_info: dict) -> None:
+    def handle_response_logic(self, msg: Message, status: str, dxcc_info: dict,
+                              need: int = NEW_CALL, snr: int = 0, decode: Optional[dict] = None) -> None:
         """重写响应逻辑，加入DXCC白名单判断"""
-        call = parts[1]
+        call = msg.from_call
         dxcc_id = dxcc_info.get('id', 'unknown')
+        config = self.dxcc_config  # 本次判断使用同一份配置
         
-        # 获取当前波段（简化处理，实际需要解析状态包）
-        current_band = "20m"  # 需要根据实际频率确定
+        # 当前波段（由状态包的频率确定）
+        bid = self.state.band_id
+        eid = entity_id(dxcc_id)
+        
+        self.activity.record(eid, bid)
+        self.heatmap.record(eid, bid)
         
         # 检查是否在白名单中
-        in_whitelist = self.is_dxcc_in_whitelist(dxcc_id, current_band)
-        worked_on_band = self.has_worked_dxcc_on_band(dxcc_id, current_band)
+        in_whitelist = config.compiled.contains(eid, bid)
+        worked_on_band = need > NEW_BAND  # 需要等级已包含该波段是否通联过
         
         # 白名单优先模式
-        if not self.dxcc_config.whitelist_only:
-            # 优先响应白名单，但也会响应其他
+        if not config.whitelist_only:
+            # 优先响应白名单（候选得分中加上白名单优先级），但也会响应其他
             if in_whitelist and not worked_on_band and status == ">>":
-                super().handle_response_logic(parts, status, dxcc_info)
+                super().handle_response_logic(msg, status, dxcc_info, need, snr, decode)
             elif status == ">>" and call not in self.state.excluded_calls:
-                super().handle_response_logic(parts, status, dxcc_info)
+                super().handle_response_logic(msg, status, dxcc_info, need, snr, decode)
         else:
             # 仅响应白名单
             if in_whitelist and not worked_on_band and status == ">>":
-                super().handle_response_logic(parts, status, dxcc_info)
+                super().handle_response_logic(msg, status, dxcc_info, need, snr, decode)
+    
+    def candidate_priority(self, eid: int, bid: int) -> float:
+        """白名单中的实体在候选排序中优先"""
+        return whitelist_priority(self.dxcc_config.compiled, eid, bid)
     
     def analyze_and_recommend(self):
         """分析日志并生成推荐"""
         print(f"{Colors.CYAN}==== DXCC Analysis ===={Colors.RESET}")
         
         analysis = self.dxcc_analyzer.analyze_log()
-        recommendations = self.dxcc_analyzer.generate_recommendations(analysis)
+        recommendations = self.dxcc_analyzer.generate_recommendations(analysis, self.activity,
+                                                                  heatmap=self.heatmap)
+        names = self.dxcc_analyzer.get_all_dxcc()
         
         # 打印分析结果
         print(f"\n{Colors.GREEN}已通联的DXCC实体: {analysis['total_worked']} 个{Colors.RESET}")
@@ -239,8 +366,7 @@ class UltronDXCC(Ultron):
         # 打印推荐白名单
         print(f"\n{Colors.CYAN}推荐的DXCC白名单:{Colors.RESET}")
         for dxcc_id in recommendations['dxcc_whitelist']:
-            name = analysis['unworked_dxcc'].get(dxcc_id, 'Unknown')
-            print(f"  {dxcc_id}: {name}")
+            print(f"  {dxcc_id}: {names.get(dxcc_id, 'Unknown')}")
         
         # 打印波段推荐
         if recommendations['band_recommendations']:
@@ -248,8 +374,7 @@ class UltronDXCC(Ultron):
             for band, dxcc_list in recommendations['band_recommendations'].items():
                 print(f"\n{band}波段:")
                 for dxcc_id in dxcc_list:
-                    name = analysis['unworked_dxcc'].get(dxcc_id, 'Unknown')
-                    print(f"  {dxcc_id}: {name}")
+                    print(f"  {dxcc_id}: {names.get(dxcc_id, 'Unknown')}")
 
 def main():
     """主函数"""
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+ULTRON Decode History
+Python Version
+
+只追加的解码日志：按UTC日期分段（ultron_history/YYYYMMDD.udh），每条记录是定长头加
+呼号和消息。每个分段在内存中有 呼号/实体 索引和 时间/波段 列，查询从最新的分段开始，
+只访问匹配的记录，例如“最近一次在10m听到VP8是什么时候”。
+写入一条记录只是一次 os.write（原子追加），不影响每个数据包的处理时间。
+每个分段的索引保存在旁边的 .udx 文件中：再次查询时直接读入索引、数据用 mmap 映射，
+不必读完整个分段逐条重建；同时载入的分段数有上限（最久没有用到的先释放）。
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+HISTORY_DIR = "ultron_history"
+SEGMENT_SUFFIX = '.udh'
+SEGMENT_MAGIC = b'UDH1'
+INDEX_SUFFIX = '.udx'
+INDEX_MAGIC = b'UDX1'
+# 同时载入的分段数上限
+MAX_SEGMENTS = 31
+
+# 索引文件头：magic 已索引的数据长度 记录数 呼号数 实体数
+INDEX_HEADER = struct.Struct('<4sIIII')
+INDEX_CALL = struct.Struct('<BI')
+INDEX_ENTITY = struct.Struct('<HI')
+
+# 时间 信噪比 音频频率 波段 模式 实体 呼号长度 消息长度
+RECORD = struct.Struct('<IhHBBHBB')
+
+
+class Decode(NamedTuple):
+    """一条解码记录"""
+    time: int        # UTC 时间戳（秒）
+    snr: int
+    freq: int        # 音频频率（Hz）
+    band: int        # 波段编号
+    mode: int        # 模式编号
+    entity: int      # DXCC 实体编号
+    call: str
+    message: str
+
+
+def segment_name(timestamp: float) -> str:
+    """时间戳所在的分段名（UTC日期）"""
+    return time.strftime('%Y%m%d', time.gmtime(timestamp))
+
+
+def encode_decode(decode: Decode) -> bytes:
+    """编码一条记录"""
+    call = decode.call.encode('ascii', 'replace')[:255]
+    message = decode.message.encode('utf-8', 'replace')[:255]
+    return RECORD.pack(int(decode.time), max(-32768, min(32767, decode.snr)),
+                       max(0, min(65535, decode.freq)), decode.band, decode.mode,
+                       decode.entity, len(call), len(message)) + call + message
+
+
+class HistorySegment:
+    """一个分段的数据和索引"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.data: Union[bytearray, mmap.mmap] = bytearray()
+        self.offsets = array('I')                   # 记录编号 -> 文件偏移
+        self.times = array('I')
+        self.bands = bytearray()
+        self.entities = array('H')
+        self.by_call: Dict[bytes, array] = {}       # 呼号 -> 记录编号
+        self.by_entity: Dict[int, array] = {}       # 实体 -> 记录编号
+        self.end = len(SEGMENT_MAGIC)               # 最后一条完整记录之后的偏移
+        self.unrecognized = False                   # 文件存在但不是可识别的分段格式
+        self.saved_end = 0                          # 索引文件对应的数据长度
+
+    @property
+    def index_path(self) -> Path:
+        return self.path.with_suffix(INDEX_SUFFIX)
+
+    @classmethod
+    def load(cls, path: Path) -> 'HistorySegment':
+        """载入分段：有匹配的索引文件时映射数据，否则读入并重建索引（末尾不完整的记录被忽略）"""
+        segment = cls(path)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return segment
+        with f:
+            if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+                segment.unrecognized = os.fstat(f.fileno()).st_size > 0
+                return segment
+            size = os.fstat(f.fileno()).st_size
+            if segment._load_index(size):
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                # 最后一条已索引的记录对不上时（文件被改写过）重建
+                if not segment.offsets or RECORD.unpack_from(data, segment.offsets[-1])[0] == segment.times[-1]:
+                    segment.data = data
+                    segment._index_from(segment.end)    # 索引保存之后追加的记录
+                    return segment
+                data.close()
+                segment._reset_index()
+                segment.end = len(SEGMENT_MAGIC)
+                segment.saved_end = 0
+            f.seek(0)
+            segment.data = bytearray(f.read())
+        segment._index_from(len(SEGMENT_MAGIC))
+        return segment
+
+    def _load_index(self, size: int) -> bool:
+        """读入索引文件（数据比索引记录的短时无效）"""
+        try:
+            with open(self.index_path, 'rb') as f:
+                raw = f.read()
+        except OSError:
+            return False
+        try:
+            magic, end, rows, calls, entities = INDEX_HEADER.unpack_from(raw)
+            if magic != INDEX_MAGIC or end > size:
+                return False
+            pos = INDEX_HEADER.size
+            for column, width in ((self.offsets, 4), (self.times, 4), (self.entities, 2)):
+                column.frombytes(raw[pos:pos + rows * width])
+                pos += rows * width
+            self.bands = bytearray(raw[pos:pos + rows])
+            pos += rows
+            for _ in range(calls):
+                call_len, count = INDEX_CALL.unpack_from(raw, pos)
+                pos += INDEX_CALL.size
+                call = raw[pos:pos + call_len]
+                pos += call_len
+                self.by_call[call] = array('I', raw[pos:pos + count * 4])
+                pos += count * 4
+            for _ in range(entities):
+                entity, count = INDEX_ENTITY.unpack_from(raw, pos)
+                pos += INDEX_ENTITY.size
+                self.by_entity[entity] = array('I', raw[pos:pos + count * 4])
+                pos += count * 4
+        except (struct.error, ValueError):
+            return self._reset_index()
+        if sys.byteorder == 'big':
+            for column in [self.offsets, self.times, self.entities, *self.by_call.values(),
+                           *self.by_entity.values()]:
+                column.byteswap()
+        if not (len(self.offsets) == len(self.times) == len(self.entities) == len(self.bands) == rows):
+            return self._reset_index()
+        self.end = self.saved_end = end
+        return True
+
+    def _reset_index(self) -> bool:
+        self.offsets, self.times, self.entities = array('I'), array('I'), array('H')
+        self.bands = bytearray()
+        self.by_call, self.by_entity = {}, {}
+        return False
+
+    def save_index(self) -> None:
+        """索引有新增记录时写回索引文件"""
+        if self.end == self.saved_end or not self.offsets:
+            return
+        columns = [self.offsets, self.times, self.entities]
+        calls = [(call, rows) for call, rows in self.by_call.items()]
+        entities = list(self.by_entity.items())
+        if sys.byteorder == 'big':
+            columns = [array(c.typecode, c) for c in columns]
+            calls = [(call, array('I', rows)) for call, rows in calls]
+            entities = [(entity, array('I', rows)) for entity, rows in entities]
+            for column in columns + [rows for _, rows in calls] + [rows for _, rows in entities]:
+                column.byteswap()
+        parts = [INDEX_HEADER.pack(INDEX_MAGIC, self.end, len(self.offsets), len(calls), len(entities))]
+        parts += [column.tobytes() for column in columns]
+        parts.append(bytes(self.bands))
+        for call, rows in calls:
+            parts += [INDEX_CALL.pack(len(call), len(rows)), call, rows.tobytes()]
+        for entity, rows in entities:
+            parts += [INDEX_ENTITY.pack(entity, len(rows)), rows.tobytes()]
+        temp = self.index_path.with_name(self.index_path.name + '.tmp')
+        try:
+            with open(temp, 'wb') as f:
+                f.write(b''.join(parts))
+            os.replace(temp, self.index_path)
+        except OSError:
+            return                                  # 下次载入时重建
+        self.saved_end = self.end
+
+    def writable(self) -> bytearray:
+        """追加前把映射的数据读入内存"""
+        if not isinstance(self.data, bytearray):
+            data = self.data
+            self.data = bytearray(data[:self.end])
+            data.close()
+        return self.data
+
+    def close(self) -> None:
+        """保存索引并释放映射"""
+        self.save_index()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+            self.data = bytearray()
+
+    def _index_from(self, offset: int) -> None:
+        data = self.data
+        size = len(data)
+        unpack = RECORD.unpack_from
+        header = RECORD.size
+        offsets, times, bands, entities = self.offsets, self.times, self.bands, self.entities
+        by_call, by_entity = self.by_call, self.by_entity
+        row = len(offsets)
+        while offset + header <= size:
+            t, _snr, _freq, band, _mode, entity, call_len, msg_len = unpack(data, offset)
+            start = offset + header
+            end = start + call_len + msg_len
+            if end > size:
+                break
+            offsets.append(offset)
+            times.append(t)
+            bands.append(band)
+            entities.append(entity)
+            call = bytes(data[start:start + call_len])
+            rows = by_call.get(call)
+            if rows is None:
+                rows = by_call[call] = array('I')
+            rows.append(row)
+            if entity:
+                rows = by_entity.get(entity)
+                if rows is None:
+                    rows = by_entity[entity] = array('I')
+                rows.append(row)
+            row += 1
+            offset = end
+        self.end = offset
+
+    def append(self, records: bytes) -> None:
+        """记录已写入文件后更新内存中的数据和索引"""
+        data = self.writable()
+        offset = len(data)
+        data += records
+        self._index_from(offset)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def record(self, row: int) -> Decode:
+        """读取一条记录"""
+        offset = self.offsets[row]
+        t, snr, freq, band, mode, entity, call_len, msg_len = RECORD.unpack_from(self.data, offset)
+        start = offset + RECORD.size
+        call = self.data[start:start + call_len].decode('ascii', 'replace')
+        message = self.data[start + call_len:start + call_len + msg_len].decode('utf-8', 'replace')
+        return Decode(t, snr, freq, band, mode, entity, call, message)
+
+    def rows(self, call: Optional[str] = None, entity: Optional[int] = None,
+             band: Optional[int] = None, since: Optional[float] = None,
+             until: Optional[float] = None) -> Iterator[int]:
+        """匹配的记录编号（从新到旧）"""
+        if call is not None:
+            candidates: Iterable[int] = self.by_call.get(call.encode('ascii', 'replace'), ())
+        elif entity is not None:
+            candidates = self.by_entity.get(entity, ())
+        else:
+            candidates = range(len(self.offsets))
+        times, bands, entities = self.times, self.bands, self.entities
+        for row in reversed(candidates):
+            t = times[row]
+            if until is not None and t > until:
+                continue
+            if since is not None and t < since:
+                continue
+            if band is not None and bands[row] != band:
+                continue
+            if entity is not None and entities[row] != entity:
+                continue
+            yield row
+
+
+class DecodeHistory:
+    """按日期分段的解码历史"""
+
+    def __init__(self, directory: Union[str, Path] = HISTORY_DIR):
+        self.directory = Path(directory)
+        self.segments: 'OrderedDict[str, HistorySegment]' = OrderedDict()   # 已载入的分段（最近用到的在后）
+        self._fd = -1
+        self._open_name: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # 写入
+
+    def append(self, decode: Decode) -> None:
+        """追加一条解码"""
+        name = segment_name(decode.time)
+        segment = self._writable(name)
+        record = encode_decode(decode)
+        os.write(self._fd, record)
+        segment.append(record)
+
+    def extend(self, decodes: Iterable[Decode]) -> int:
+        """批量追加（导入历史数据用），每个分段一次写入，返回条数"""
+        count = 0
+        batch: List[bytes] = []
+        name = None
+        day = -1
+
+        def flush():
+            if batch:
+                segment = self._writable(name)
+                records = b''.join(batch)
+                os.write(self._fd, records)
+                segment.append(records)
+                batch.clear()
+
+        for decode in decodes:
+            if decode.time // 86400 != day:
+                flush()
+                day = decode.time // 86400
+                name = segment_name(decode.time)
+            batch.append(encode_decode(decode))
+            count += 1
+            if len(batch) >= 4096:
+                flush()
+        flush()
+        return count
+
+    def _writable(self, name: str) -> HistorySegment:
+        """打开分段用于追加（截掉末尾不完整的记录）"""
+        segment = self.segment(name)
+        if self._open_name != name:
+            self.close_file()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / (name + SEGMENT_SUFFIX)
+            if segment.unrecognized:
+                # 无法识别（例如更新版本的格式）的文件改名保留，不覆盖
+                os.replace(path, path.with_name(f"{path.name}.unrecognized-{int(time.time())}"))
+                segment = self.segments[name] = HistorySegment(path)
+            data = segment.writable()
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            size = os.fstat(fd).st_size
+            if not data:  # 新分段
+                os.ftruncate(fd, 0)
+                os.write(fd, SEGMENT_MAGIC)
+                data += SEGMENT_MAGIC
+            elif size > segment.end:
+                os.ftruncate(fd, segment.end)
+                del data[segment.end:]
+            self._fd = fd
+            self._open_name = name
+        return segment
+
+    def close_file(self) -> None:
+        """关闭正在追加的分段文件"""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+            self._open_name = None
+
+    def close(self) -> None:
+        """关闭文件，保存所有载入分段的索引"""
+        self.close_file()
+        for segment in self.segments.values():
+            segment.close()
+        self.segments.clear()
+
+    # ------------------------------------------------------------------
+    # 查询
+
+    def segment_names(self) -> List[str]:
+        """所有分段名（从旧到新）"""
+        names = {p.stem for p in self.directory.glob('*' + SEGMENT_SUFFIX)}
+        names.update(self.segments)
+        return sorted(names)
+
+    def segment(self, name: str) -> HistorySegment:
+        """载入分段（最多缓存 MAX_SEGMENTS 个，最久没有用到的先释放）"""
+        segment = self.segments.get(name)
+        if segment is not None:
+            self.segments.move_to_end(name)
+            return segment
+        segment = self.segments[name] = HistorySegment.load(self.directory / (name + SEGMENT_SUFFIX))
+        for old in list(self.segments):
+            if len(self.segments) <= MAX_SEGMENTS:
+                break
+            if old != self._open_name:
+                self.segments.pop(old).close()
+        return segment
+
+    def query(self, call: Optional[str] = None, entity: Optional[int] = None,
+              band: Optional[int] = None, since: Optional[float] = None,
+              until: Optional[float] = None, limit: Optional[int] = None) -> Iterator[Decode]:
+        """按 呼号/实体/波段/时间 查询，从新到旧"""
+        first = segment_name(since) if since is not None else None
+        last = segment_name(until) if until is not None else None
+        count = 0
+        for name in reversed(self.segment_names()):
+            if last is not None and name > last:
+                continue
+            if first is not None and name < first:
+                break
+            segment = self.segment(name)
+            for row in segment.rows(call, entity, band, since, until):
+                yield segment.record(row)
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+    def last_heard(self, call: Optional[str] = None, entity: Optional[int] = None,
+                   band: Optional[int] = None) -> Optional[Decode]:
+        """最近一次听到（例如 last_heard(entity=141, band=10m)）"""
+        return next(self.query(call, entity, band, limit=1), None)
+
+    def count(self, call: Optional[str] = None, entity: Optional[int] = None,
+              band: Optional[int] = None, since: Optional[float] = None,
+              until: Optional[float] = None) -> int:
+        """匹配的记录数"""
+        total = 0
+        first = segment_name(since) if since is not None else None
+        last = segment_name(until) if until is not None else None
+        for name in self.segment_names():
+            if (first is not None and name < first) or (last is not None and name > last):
+                continue
+            total += sum(1 for _ in self.segment(name).rows(call, entity, band, since, until))
+        return total
+
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+ULTRON Console Log Importer
+Python Version
+
+把 ULTRON 控制台输出（nohup.out）导入解码历史和活动热图。
+按块读取（默认4MB），整块去掉ANSI颜色码和回车后用预编译的正则解析：
+  解码行   024815  -14  1852  FT8     ## LU1AEE JA2MSP -11    - JAPAN                [10m] [WL]
+  状态行   -----< ULTRON : JTDX = 0-0000-0000-3293-0
+           -----< ULTRON : Status from JTDX - 28074.0kHz 10m narrow FT8
+  时隙汇总 -----< ULTRON : 2025-11-21 02:48:14 --------------- 0026 Decodeds -----------
+解码行只有时分秒，日期取自其后的时隙汇总行。
+"""
+
+import argparse
+import calendar
+import datetime
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from ultron_bands import BAND_IDS, mode_id
+from ultron_history import Decode, DecodeHistory
+from ultron_message import parse_message
+
+# 每次读取的块大小
+CHUNK_SIZE = 4 << 20
+# 没有时隙汇总行时最多缓存的解码行数
+MAX_PENDING = 10000
+
+ANSI_RE = re.compile(rb'\x1b\[[0-9;]*[A-Za-z]')
+DECODE_RE = re.compile(
+    rb'^(\d\d)(\d\d)(\d\d) +(-?\d+) +(\d+) +(\S+) +(##|FL|XX|Lo|--|>>|->)? *(.+?) +- (.*?)(?: +\[(\d+c?m)\])?(?: +\[[^\]]*\])* *$'
+)
+SUMMARY_RE = re.compile(rb'ULTRON : (\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d) -+ (\d+) Decodeds')
+STATUS_RE = re.compile(rb'ULTRON : (?:Status from (.+?) - [\d.]+kHz (\d+c?m)\b|(\S+) = [\d-]+$)')
+
+# 等待日期的解码行：(当天秒数, 信噪比, 音频频率, 波段, 模式, 实体, 呼号, 消息)
+PendingLine = Tuple[int, int, int, int, int, int, str, str]
+
+
+def read_lines(path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """按块读取文件，整块去掉ANSI码和回车，逐行返回（bytes）"""
+    rest = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            chunk = rest + chunk
+            cut = chunk.rfind(b'\n') + 1
+            if cut == 0:
+                rest = chunk
+                continue
+            rest = chunk[cut:]
+            yield from ANSI_RE.sub(b'', chunk[:cut]).replace(b'\r', b'').split(b'\n')
+    if rest:
+        yield ANSI_RE.sub(b'', rest).replace(b'\r', b'')
+
+
+class ConsoleImporter:
+    """控制台日志解析器"""
+
+    def __init__(self, names: Optional[Mapping[str, int]] = None,
+                 resolve: Optional[Callable[[str], int]] = None,
+                 default_date: Optional[datetime.date] = None):
+        """
+        names: 显示的DXCC名称 -> 实体编号（优先使用）
+        resolve: 呼号 -> 实体编号（名称查不到时使用）
+        default_date: 文件中还没有时隙汇总行时使用的日期
+        """
+        self.names = {name.upper()[:20].strip(): eid for name, eid in (names or {}).items()}
+        self.resolve = resolve
+        self.entities: Dict[str, int] = {}          # 呼号 -> 实体编号
+        self.day_start = self._day_start(default_date) if default_date else None
+        self.last_time: Optional[int] = None     # 最近一条时隙汇总的时间戳
+        self.band = 0                            # 状态行中的当前波段
+        self.pending: List[PendingLine] = []
+        self.stats = {'lines': 0, 'decodes': 0, 'slots': 0, 'status': 0, 'skipped': 0}
+
+    @staticmethod
+    def _day_start(date: datetime.date) -> int:
+        return calendar.timegm(date.timetuple())
+
+    def _entity(self, call: str, country: bytes) -> int:
+        """实体编号：先按显示的名称，再按呼号（按呼号缓存）"""
+        eid = self.entities.get(call)
+        if eid is None:
+            eid = self.names.get(country.decode('utf-8', 'replace').upper().strip(), 0)
+            if not eid and self.resolve is not None:
+                eid = self.resolve(call)
+            self.entities[call] = eid
+        return eid
+
+    def _resolve_pending(self, reference: Optional[int]) -> Iterator[Decode]:
+        """给缓存的解码行加上日期；reference 是时隙汇总的时间戳（None 表示按上一个日期推算）"""
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        previous = self.last_time
+        if reference is not None:
+            day = reference - reference % 86400
+        elif previous is not None:
+            day = previous - previous % 86400
+        elif self.day_start is not None:
+            day = self.day_start
+        else:
+            self.stats['skipped'] += len(pending)
+            return
+        t = day
+        for seconds, snr, freq, band, mode, eid, call, message in pending:
+            t = day + seconds
+            if reference is not None:
+                if t > reference + 60:
+                    t -= 86400              # 解码行在汇总之前，晚于汇总的属于前一天
+            elif previous is not None and t < previous - 3600:
+                t += 86400                  # 没有汇总行时跨过了午夜
+            yield Decode(t, snr, freq, band, mode, eid, call, message)
+        self.stats['decodes'] += len(pending)
+        if reference is None:
+            self.last_time = t
+
+    def parse(self, lines: Iterable[bytes]) -> Iterator[Decode]:
+        """解析行（bytes），按时间顺序返回解码记录"""
+        decode_match = DECODE_RE.match
+        summary_search = SUMMARY_RE.search
+        status_search = STATUS_RE.search
+        stats = self.stats
+        for line in lines:
+            stats['lines'] += 1
+            if not line:
+                continue
+            m = decode_match(line)
+            if m is not None:
+                hh, mm, ss, snr, freq, mode, _status, message, country, band = m.groups()
+                text = message.decode('utf-8', 'replace')
+                call = parse_message(text).from_call
+                if not call:
+                    stats['skipped'] += 1
+                    continue
+                bid = self.band if band is None else BAND_IDS.get(band.decode('ascii'), 0)
+                self.pending.append((int(hh) * 3600 + int(mm) * 60 + int(ss), int(snr), int(freq),
+                                     bid, mode_id(mode.decode('ascii', 'replace')),
+                                     self._entity(call, country), call, text))
+                if len(self.pending) >= MAX_PENDING:
+                    yield from self._resolve_pending(None)
+                continue
+            if b'ULTRON' not in line:
+                continue
+            m = summary_search(line)
+            if m is not None:
+                year, month, day, hh, mm, ss, _count = (int(g) for g in m.groups())
+                t = calendar.timegm((year, month, day, hh, mm, ss, 0, 0, 0))
+                yield from self._resolve_pending(t)
+                self.last_time = t
+                stats['slots'] += 1
+                continue
+            m = status_search(line)
+            if m is not None:
+                stats['status'] += 1
+                if m.group(2) is not None:
+                    self.band = BAND_IDS.get(m.group(2).decode('ascii'), self.band)
+
+    def finish(self) -> Iterator[Decode]:
+        """文件结束：处理没有汇总行的最后一个时隙"""
+        yield from self._resolve_pending(None)
+
+    def read(self, path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Iterator[Decode]:
+        """解析整个文件"""
+        yield from self.parse(read_lines(path, chunk_size))
+        yield from self.finish()
+
+
+def import_console_log(path: Union[str, Path], history: Optional[DecodeHistory] = None,
+                       heatmap=None, importer: Optional[ConsoleImporter] = None) -> Dict[str, int]:
+    """把控制台日志导入解码历史和/或活动热图，返回统计"""
+    importer = importer or ConsoleImporter()
+    decodes = importer.read(path)
+    if heatmap is not None:
+        decodes = _record_heatmap(decodes, heatmap)
+    if history is not None:
+        history.extend(decodes)
+    else:
+        for _ in decodes:
+            pass
+    return importer.stats
+
+
+def _record_heatmap(decodes: Iterator[Decode], heatmap) -> Iterator[Decode]:
+    for decode in decodes:
+        heatmap.record(decode.entity, decode.band, decode.time)
+        yield decode
+
+
+def main():
+    """主函数"""
+    from ultron import Colors, DXCCDatabase
+    from ultron_activity import ActivityHeatmap
+    from ultron_store import entity_id
+
+    parser = argparse.ArgumentParser(description='Import ULTRON console output (nohup.out) into decode history')
+    parser.add_argument('logs', nargs='+', help='控制台日志文件')
+    parser.add_argument('--history', default='ultron_history', help='解码历史目录')
+    parser.add_argument('--heatmap', default='ultron_activity.bin', help='活动热图文件（空字符串表示不更新）')
+    parser.add_argument('--date', help='文件开头没有时隙汇总行时使用的日期 YYYY-MM-DD（默认为文件修改日期）')
+    parser.add_argument('--dry-run', action='store_true', help='只解析不写入')
+    args = parser.parse_args()
+
+    dxcc_db = DXCCDatabase()
+    names = {str(entry.get('name', '')): entity_id(entry.get('id')) for entry in dxcc_db.database}
+    history = None if args.dry_run else DecodeHistory(args.history)
+    heatmap = None
+    if args.heatmap and not args.dry_run:
+        heatmap = ActivityHeatmap.load(args.heatmap)
+
+    try:
+        for log in args.logs:
+            if args.date:
+                default_date = datetime.date.fromisoformat(args.date)
+            else:
+                default_date = datetime.datetime.fromtimestamp(os.path.getmtime(log), datetime.timezone.utc).date()
+            importer = ConsoleImporter(names, lambda call: entity_id(dxcc_db.locate_call(call)['id']),
+                                       default_date)
+            started = datetime.datetime.now()
+            stats = import_console_log(log, history, heatmap, importer)
+            elapsed = (datetime.datetime.now() - started).total_seconds()
+            size = os.path.getsize(log) / (1 << 20)
+            print(f"{Colors.GREEN}{log}: {stats['decodes']} decodes, {stats['slots']} slots, "
+                  f"{stats['status']} status lines ({stats['skipped']} skipped) "
+                  f"- {size:.1f} MB in {elapsed:.2f}s{Colors.RESET}")
+    finally:
+        if history is not None:
+            history.close()
+    if heatmap is not None:
+        heatmap.save(args.heatmap)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+ULTRON Decision Latency
+Python Version
+
+测量每条解码从收到数据包到做出回复决定（和发出 Reply）用了多长时间。
+每条解码在 接收、解析、查找、决定、发送 各记一个单调时钟时间，
+各阶段相对接收的耗时记入 HDR 风格的直方图（对数分段、每段32格线性细分，
+相对误差约3%，记录 O(1)、内存固定）。
+Reply 在发射时隙开始后超过 SLOT_DEADLINE 秒才发出时，对方已经听不到完整的发射，
+记为一次时隙超时并告警。
+"""
+
+from array import array
+from typing import Dict, List, Optional
+
+# 各阶段（相对收到数据包的时间）
+STAGES = ('parse', 'lookup', 'decision', 'send')
+
+# Reply 在发射时隙开始后多少秒内发出才有用
+SLOT_DEADLINE = 1.5
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS          # 每段的线性细分格数
+LINEAR = SUB_BUCKETS * 2                    # 小于 64 微秒的值每微秒一格
+MAX_MICROS = (1 << 30) - 1                  # 约 17.9 分钟，更大的值按最大值记
+BUCKETS = LINEAR + SUB_BUCKETS * (MAX_MICROS.bit_length() - SUB_BUCKET_BITS - 1)
+
+
+def bucket_index(micros: int) -> int:
+    """微秒值所在的格"""
+    if micros < LINEAR:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    return LINEAR + (shift - 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+
+def bucket_high(index: int) -> int:
+    """格内的最大值（微秒）"""
+    if index < LINEAR:
+        return index
+    shift, sub = divmod(index - LINEAR, SUB_BUCKETS)
+    return ((sub + SUB_BUCKETS + 1) << (shift + 1)) - 1
+
+
+class LatencyHistogram:
+    """延迟直方图（微秒精度，按秒记录和报告）"""
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0          # 微秒
+        self.min = 0
+        self.max = 0
+
+    def record(self, seconds: float) -> None:
+        micros = min(MAX_MICROS, max(0, int(seconds * 1e6)))
+        self.counts[bucket_index(micros)] += 1
+        if not self.count or micros < self.min:
+            self.min = micros
+        if micros > self.max:
+            self.max = micros
+        self.count += 1
+        self.total += micros
+
+    def percentile(self, p: float) -> float:
+        """p（0-100）分位数（秒，取所在格的最大值，不会低估）"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(self.count * p / 100.0 + 0.999999))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= rank:
+                    return min(bucket_high(index), self.max) / 1e6
+        return self.max / 1e6
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count / 1e6 if self.count else 0.0
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        if not other.count:
+            return
+        for index, n in enumerate(other.counts):
+            if n:
+                self.counts[index] += n
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def reset(self) -> None:
+        self.counts = array('Q', bytes(8 * BUCKETS))
+        self.count = self.total = self.min = self.max = 0
+
+    def summary(self) -> Dict[str, float]:
+        """计数和各分位数（毫秒）"""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.mean * 1e3, 3),
+            'p50_ms': round(self.percentile(50) * 1e3, 3),
+            'p90_ms': round(self.percentile(90) * 1e3, 3),
+            'p99_ms': round(self.percentile(99) * 1e3, 3),
+            'max_ms': round(self.max / 1e3, 3),
+        }
+
+
+class LatencyTracker:
+    """各阶段的延迟直方图和时隙超时计数"""
+
+    def __init__(self, deadline: float = SLOT_DEADLINE):
+        self.deadline = deadline
+        self.stages: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in STAGES}
+        self.replies = 0
+        self.deadline_misses = 0
+        self.worst_miss = 0.0       # 最晚的一次超过时隙开始多少秒
+
+    def record(self, stage: str, received: Optional[float], now: float) -> None:
+        """记录 stage 阶段相对接收时间 received 的耗时（received 为 None 时不记录）"""
+        if received is not None:
+            self.stages[stage].record(now - received)
+
+    def reply_sent(self, sent: float, slot_start: Optional[float]) -> Optional[float]:
+        """记录一次 Reply；超过时隙截止时间时返回超出发射时隙开始的秒数"""
+        self.replies += 1
+        if slot_start is None:
+            return None
+        late = sent - slot_start
+        if late <= self.deadline:
+            return None
+        self.deadline_misses += 1
+        self.worst_miss = max(self.worst_miss, late)
+        return late
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            'stages': {stage: hist.summary() for stage, hist in self.stages.items()},
+            'replies': self.replies,
+            'deadline_misses': self.deadline_misses,
+            'deadline_s': self.deadline,
+            'worst_miss_s': round(self.worst_miss, 3),
+        }
+
+    def report_lines(self) -> List[str]:
+        """终端显示用的汇总表"""
+        lines = [f"{'stage':<10}{'count':>8}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)"]
+        for stage, hist in self.stages.items():
+            s = hist.summary()
+            lines.append(f"{stage:<10}{s['count']:>8}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}"
+                         f"{s['p90_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+        lines.append(f"replies {self.replies}, slot deadline misses {self.deadline_misses} "
+                     f"(> {self.deadline:.1f}s into TX slot)")
+        return lines
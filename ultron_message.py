@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+ULTRON Message Classifier
+Python Version
+
+把 FT8/FT4 解码消息解析为结构化结果：类型（CQ、带修饰的CQ、呼叫应答、报告、
+R+报告、RRR、RR73、73、自由文本）、收发双方呼号、网格和信号报告。
+只用字符串比较和查表（不用正则），呼号经 sys.intern 驻留；相同的消息文本
+（同一个电台每个时隙重复的CQ）直接返回缓存的结果。
+显示、需要等级、QSO状态机和解码历史共用同一次解析。
+"""
+
+import sys
+from typing import Dict, Optional
+
+# 消息类型
+FREE_TEXT = 0       # 自由文本或无法识别
+CQ = 1              # CQ K1ABC FN42
+CQ_MODIFIED = 2     # CQ DX K1ABC FN42 / CQ POTA K1ABC FN42 / CQ 290 K1ABC
+CALL = 3            # K1ABC BA1ABC OM89（呼叫应答，网格可省略）
+REPORT = 4          # K1ABC BA1ABC -10
+R_REPORT = 5        # K1ABC BA1ABC R-10
+RRR = 6             # K1ABC BA1ABC RRR
+RR73 = 7            # K1ABC BA1ABC RR73
+SEVENTY_THREE = 8   # K1ABC BA1ABC 73
+
+KIND_NAMES = ('FREE', 'CQ', 'CQ-MOD', 'CALL', 'REPORT', 'R-REPORT', 'RRR', 'RR73', '73')
+
+# 结束语（对方的QSO已结束，可以呼叫）
+SIGNOFF_KINDS = frozenset((RRR, RR73, SEVENTY_THREE))
+CQ_KINDS = frozenset((CQ, CQ_MODIFIED))
+# 可以接受呼叫的消息：CQ 或 结束语
+OPEN_KINDS = CQ_KINDS | SIGNOFF_KINDS
+
+# 第三个字段为固定词时的类型
+_ACKS: Dict[str, int] = {'RRR': RRR, 'RR73': RR73, '73': SEVENTY_THREE}
+
+# 未解出的哈希呼号
+HASH_UNKNOWN = '<...>'
+
+# 解析结果缓存（超过上限时整体清空）
+MAX_CACHE = 8192
+_cache: Dict[str, 'Message'] = {}
+
+_intern = sys.intern
+
+
+class Message:
+    """解析后的消息（只读）"""
+
+    __slots__ = ('kind', 'to_call', 'from_call', 'grid', 'report', 'modifier', 'text')
+
+    def __init__(self, kind: int, text: str, to_call: str = '', from_call: str = '',
+                 grid: str = '', report: Optional[int] = None, modifier: str = ''):
+        self.kind = kind
+        self.text = text
+        self.to_call = to_call          # 对方呼叫的电台（CQ 时为空）
+        self.from_call = from_call      # 发送消息的电台
+        self.grid = grid                # 4位网格
+        self.report = report            # 信号报告（dB）
+        self.modifier = modifier        # CQ 修饰（DX、POTA、NA、290……）
+
+    @property
+    def kind_name(self) -> str:
+        return KIND_NAMES[self.kind]
+
+    @property
+    def is_cq(self) -> bool:
+        return self.kind in CQ_KINDS
+
+    @property
+    def is_open(self) -> bool:
+        """发送方正在CQ或刚结束QSO，可以呼叫"""
+        return self.kind in OPEN_KINDS
+
+    def __repr__(self) -> str:
+        return (f"Message({self.kind_name}, to={self.to_call!r}, from={self.from_call!r}, "
+                f"grid={self.grid!r}, report={self.report!r}, modifier={self.modifier!r})")
+
+
+def is_callsign(token: str) -> bool:
+    """粗略判断是否像呼号（含字母和数字，可带 / 和 <> ；<...> 为未解出的哈希呼号）"""
+    if token == HASH_UNKNOWN:
+        return True
+    n = len(token)
+    if n < 3 or n > 13:
+        return False
+    has_digit = has_alpha = False
+    for ch in token:
+        if '0' <= ch <= '9':
+            has_digit = True
+        elif 'A' <= ch <= 'Z':
+            has_alpha = True
+        elif ch not in '/<>.':
+            return False
+    return has_digit and has_alpha
+
+
+def parse_grid(token: str) -> str:
+    """4位网格（RR73 不是网格），否则返回空字符串"""
+    if (len(token) == 4 and 'A' <= token[0] <= 'R' and 'A' <= token[1] <= 'R'
+            and '0' <= token[2] <= '9' and '0' <= token[3] <= '9' and token != 'RR73'):
+        return token
+    return ''
+
+
+def parse_report(token: str) -> Optional[int]:
+    """信号报告 -10 / +05，否则返回 None"""
+    if len(token) == 3 and token[0] in '+-' and token[1:].isdigit():
+        return int(token)
+    return None
+
+
+def _call(token: str) -> str:
+    if token[0] == '<' and token[-1] == '>' and token != HASH_UNKNOWN:
+        token = token[1:-1]
+    return _intern(token)
+
+
+def _parse(text: str) -> Message:
+    tokens = text.upper().split()
+    n = len(tokens)
+    if n < 2:
+        return Message(FREE_TEXT, text)
+    first = tokens[0]
+
+    if first == 'CQ' or first == 'QRZ':
+        if n >= 3 and not is_callsign(tokens[1]) and is_callsign(tokens[2]):
+            grid = parse_grid(tokens[3]) if n > 3 else ''
+            return Message(CQ_MODIFIED, text, from_call=_call(tokens[2]), grid=grid,
+                           modifier=_intern(tokens[1]))
+        if not is_callsign(tokens[1]):
+            return Message(FREE_TEXT, text)
+        grid = parse_grid(tokens[2]) if n > 2 else ''
+        return Message(CQ, text, from_call=_call(tokens[1]), grid=grid)
+
+    if n > 3 or not is_callsign(first) or not is_callsign(tokens[1]):
+        return Message(FREE_TEXT, text)
+    to_call = _call(first)
+    from_call = _call(tokens[1])
+    if n == 2:
+        return Message(CALL, text, to_call, from_call)
+
+    token = tokens[2]
+    kind = _ACKS.get(token)
+    if kind is not None:
+        return Message(kind, text, to_call, from_call)
+    report = parse_report(token)
+    if report is not None:
+        return Message(REPORT, text, to_call, from_call, report=report)
+    if token[0] == 'R':
+        report = parse_report(token[1:])
+        if report is not None:
+            return Message(R_REPORT, text, to_call, from_call, report=report)
+    grid = parse_grid(token)
+    if grid:
+        return Message(CALL, text, to_call, from_call, grid=grid)
+    return Message(FREE_TEXT, text, to_call, from_call)
+
+
+def parse_message(text: str) -> Message:
+    """解析解码消息（结果可能是缓存的同一个对象，不要修改）"""
+    message = _cache.get(text)
+    if message is None:
+        if len(_cache) >= MAX_CACHE:
+            _cache.clear()
+        message = _cache[text] = _parse(text.strip())
+    return message
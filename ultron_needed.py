@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+ULTRON Needed-Status Evaluator
+Python Version
+
+判断解码到的电台对我们的价值：新DXCC、新波段、新模式、新网格、新呼号或重复。
+已通联/已确认的状态预先编成位掩码（每个实体一个波段掩码和一个模式掩码，
+每个网格一个波段掩码，每个呼号一个 波段×模式 掩码），每次判断只有几次数组/字典访问，
+与日志大小无关。显示（状态栏）和响应逻辑共用同一个结果。
+"""
+
+from array import array
+from typing import Dict, Optional
+
+from ultron_bands import MODE_COUNT
+from ultron_store import ENTITY_SLOTS, QSOTable
+
+# 需要等级（数值越小越需要）
+NEW_DXCC = 0
+NEW_BAND = 1
+NEW_MODE = 2
+NEW_GRID = 3
+NEW_CALL = 4
+DUPE = 5
+
+NEED_LABELS = ('NEW DXCC', 'NEW BAND', 'NEW MODE', 'NEW GRID', 'NEW CALL', 'DUPE')
+NEED_COLORS = ('blink_red', 'magenta', 'cyan', 'yellow', 'green', 'red')
+
+
+class NeedEvaluator:
+    """需要状态判断"""
+
+    def __init__(self, require_confirmed: bool = False):
+        """require_confirmed=True 时实体的波段/模式只有确认后才算完成"""
+        self.require_confirmed = require_confirmed
+        self.reset()
+
+    def reset(self) -> None:
+        """清空所有已通联状态"""
+        self.entity_bands = array('I', bytes(4 * ENTITY_SLOTS))       # 已通联波段掩码
+        self.entity_modes = array('I', bytes(4 * ENTITY_SLOTS))       # 已通联模式掩码
+        self.confirmed_bands = array('I', bytes(4 * ENTITY_SLOTS))    # 已确认波段掩码
+        self.confirmed_modes = array('I', bytes(4 * ENTITY_SLOTS))    # 已确认模式掩码
+        self.grid_bands: Dict[str, int] = {}                          # 网格 -> 波段掩码
+        self.call_slots: Dict[str, int] = {}                          # 呼号 -> 波段×模式掩码
+        self._table: Optional[QSOTable] = None
+        self._rows = 0
+
+    def add(self, call: str, eid: int, bid: int, mid: int, grid: str = '', confirmed: bool = False) -> None:
+        """记录一次QSO"""
+        band_bit = 1 << bid
+        mode_bit = 1 << mid
+        if eid:
+            self.entity_bands[eid] |= band_bit
+            self.entity_modes[eid] |= mode_bit
+            if confirmed:
+                self.confirmed_bands[eid] |= band_bit
+                self.confirmed_modes[eid] |= mode_bit
+        if grid:
+            self.grid_bands[grid] = self.grid_bands.get(grid, 0) | band_bit
+        if call:
+            self.call_slots[call] = self.call_slots.get(call, 0) | (1 << (bid * MODE_COUNT + mid))
+
+    def sync(self, table: QSOTable) -> int:
+        """把QSO表中新增的行加入（表被重建时从头开始），返回新增行数"""
+        if table is not self._table:
+            self.reset()
+            self._table = table
+        start = self._rows
+        names = table.pool.names
+        grids = table.grid_names
+        for row in range(start, len(table)):
+            self.add(names[table.calls[row]], table.entities[row], table.bands[row],
+                     table.modes[row], grids[table.grids[row]], table.confirmed[row])
+        self._rows = len(table)
+        return self._rows - start
+
+    def worked_call(self, call: str) -> bool:
+        """呼号是否在任何波段/模式通联过"""
+        return call in self.call_slots
+
+    def evaluate(self, call: str, eid: int, bid: int, mid: int, grid: str = '') -> int:
+        """返回需要等级（NEW_DXCC ... DUPE）"""
+        if eid:
+            if self.require_confirmed:
+                bands = self.confirmed_bands[eid]
+                modes = self.confirmed_modes[eid]
+            else:
+                bands = self.entity_bands[eid]
+                modes = self.entity_modes[eid]
+            if not bands:
+                return NEW_DXCC
+            if not bands >> bid & 1:
+                return NEW_BAND
+            if not modes >> mid & 1:
+                return NEW_MODE
+        if grid and not self.grid_bands.get(grid, 0) >> bid & 1:
+            return NEW_GRID
+        if not self.call_slots.get(call, 0) >> (bid * MODE_COUNT + mid) & 1:
+            return NEW_CALL
+        return DUPE
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+ULTRON QSO State Machine
+Python Version
+
+一次QSO的状态：呼叫 -> 收到报告 -> 收到R报告 -> RR73/73 -> 已记录。
+状态由解码推动；每次有进展后截止时间设为“下一个时隙边界 + N个时隙”，
+用单调时钟计时，按模式的时隙长度（FT8 15秒、FT4 7.5秒……）对齐。
+超过截止时间没有进展的QSO正好在N个时隙后放弃。
+可以同时进行多个QSO（JTDX 多重应答、WSJT-X Fox 模式），每个QSO各自的状态机
+按对方呼号索引；发出的 Reply 按发射周期合并，每个周期只发一批、每个呼号一条。
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+from ultron_message import (R_REPORT as MSG_R_REPORT, REPORT as MSG_REPORT, RR73 as MSG_RR73,
+                            RRR as MSG_RRR, SEVENTY_THREE, Message, parse_message)
+
+# QSO状态
+CALLING = 0     # 已呼叫对方，等待报告
+REPORT = 1      # 收到报告，发送 R+报告
+R_REPORT = 2    # 收到 R+报告，发送 RR73
+SIGNOFF = 3     # 收到 RR73/RRR，发送 73
+LOGGED = 4      # 完成
+ABANDONED = 5   # 对方没有回应
+
+PHASE_NAMES = ('CALLING', 'REPORT', 'R-REPORT', 'RR73', 'LOGGED', 'ABANDONED')
+
+# 各模式的时隙长度（秒）
+SLOT_PERIODS: Dict[str, float] = {
+    'FT8': 15.0, 'FT4': 7.5, 'MSK144': 15.0, 'JT65': 60.0, 'JT9': 60.0,
+    'JT4': 60.0, 'Q65': 60.0, 'FST4': 60.0, 'WSPR': 120.0,
+}
+DEFAULT_PERIOD = 15.0
+
+# 没有进展时最多等待的时隙数（FT8 下为 60 秒）
+MAX_IDLE_SLOTS = 4
+# 收到 RR73 后再等一个时隙（发送 73）就算完成
+SIGNOFF_SLOTS = 1
+# 默认同时进行的QSO数
+MAX_CONCURRENT = 1
+# Reply 在发射周期开始前多少秒发出
+REPLY_LEAD = 0.5
+
+# 对方消息类型 -> QSO状态
+MESSAGE_PHASES: Dict[int, int] = {
+    MSG_REPORT: REPORT, MSG_R_REPORT: R_REPORT, MSG_RRR: SIGNOFF, MSG_RR73: SIGNOFF,
+    SEVENTY_THREE: LOGGED,
+}
+
+
+def slot_period(mode: str) -> float:
+    """模式的时隙长度"""
+    return SLOT_PERIODS.get(mode.strip().upper() if mode else '', DEFAULT_PERIOD)
+
+
+@dataclass
+class QSO:
+    """正在进行的QSO"""
+    call: str
+    mode: str
+    period: float
+    phase: int = CALLING
+    started: float = 0.0        # 单调时钟
+    deadline: float = 0.0       # 单调时钟
+    report_received: str = ''
+    snr: int = 0                # 对方信号（我们发送的报告）
+
+    @property
+    def phase_name(self) -> str:
+        return PHASE_NAMES[self.phase]
+
+
+class QSOMachine:
+    """QSO状态机（最多 max_concurrent 个QSO同时进行）"""
+
+    def __init__(self, my_call: str = '', max_idle_slots: int = MAX_IDLE_SLOTS,
+                 clock_offset: Optional[float] = None, max_concurrent: int = MAX_CONCURRENT):
+        """clock_offset 为 UTC时间 - 单调时钟，用于把单调时钟对齐到时隙边界"""
+        self.my_call = my_call.upper()
+        self.max_idle_slots = max_idle_slots
+        self.max_concurrent = max(1, max_concurrent)
+        self.clock_offset = time.time() - time.monotonic() if clock_offset is None else clock_offset
+        self.qsos: Dict[str, QSO] = {}      # 对方呼号 -> 进行中的QSO
+
+    @property
+    def busy(self) -> bool:
+        """没有空闲的QSO位置"""
+        return len(self.qsos) >= self.max_concurrent
+
+    @property
+    def free_slots(self) -> int:
+        return max(0, self.max_concurrent - len(self.qsos))
+
+    def __contains__(self, call: object) -> bool:
+        return call in self.qsos
+
+    def __len__(self) -> int:
+        return len(self.qsos)
+
+    def get(self, call: str) -> Optional[QSO]:
+        return self.qsos.get(call)
+
+    def slot_boundary(self, mono: float, period: float) -> float:
+        """mono 之后（含）的下一个时隙边界（单调时钟）"""
+        utc = mono + self.clock_offset
+        return math.ceil(utc / period - 1e-9) * period - self.clock_offset
+
+    def _extend(self, qso: QSO, mono: float, slots: int) -> None:
+        qso.deadline = self.slot_boundary(mono, qso.period) + slots * qso.period
+
+    def start(self, call: str, mode: str = 'FT8', snr: int = 0, mono: Optional[float] = None,
+              period: Optional[float] = None) -> Optional[QSO]:
+        """开始呼叫对方（period 为软件报告的时隙长度，None 时按模式确定）；没有空位时返回 None"""
+        qso = self.qsos.get(call)
+        if qso is not None:
+            return qso
+        if self.busy:
+            return None
+        mono = time.monotonic() if mono is None else mono
+        qso = QSO(call, mode, period or slot_period(mode), started=mono, snr=snr)
+        self._extend(qso, mono, self.max_idle_slots)
+        self.qsos[call] = qso
+        return qso
+
+    def on_decode(self, message: Union[Message, str], snr: int = 0,
+                  mono: Optional[float] = None) -> Optional[QSO]:
+        """处理一条解码（已解析的消息或文本），状态有变化时返回该QSO（qso.phase 为新状态）"""
+        if not self.qsos:
+            return None
+        if isinstance(message, str):
+            message = parse_message(message)
+        qso = self.qsos.get(message.from_call)
+        if qso is None:
+            return None
+        if message.to_call != self.my_call or not self.my_call:
+            return None             # 对方在和别人通联
+        mono = time.monotonic() if mono is None else mono
+        qso.snr = snr
+
+        phase = MESSAGE_PHASES.get(message.kind, qso.phase)
+        if message.report is not None:
+            qso.report_received = f"{message.report:+03d}"
+        if phase < qso.phase:
+            return None             # 对方重复之前的消息（没收到我们的回复）
+        if phase == LOGGED:
+            del self.qsos[qso.call]
+            qso.phase = LOGGED
+            return qso
+        changed = phase != qso.phase
+        qso.phase = phase
+        self._extend(qso, mono, SIGNOFF_SLOTS if phase == SIGNOFF else self.max_idle_slots)
+        return qso if changed else None
+
+    def poll(self, mono: Optional[float] = None) -> List[QSO]:
+        """检查截止时间，返回结束的QSO（phase 为 LOGGED 或 ABANDONED）"""
+        if not self.qsos:
+            return []
+        mono = time.monotonic() if mono is None else mono
+        done = [qso for qso in self.qsos.values() if mono >= qso.deadline]
+        for qso in done:
+            del self.qsos[qso.call]
+            qso.phase = LOGGED if qso.phase == SIGNOFF else ABANDONED
+        return done
+
+    def time_left(self, mono: Optional[float] = None) -> Optional[float]:
+        """距离最近的截止时间的秒数"""
+        if not self.qsos:
+            return None
+        mono = time.monotonic() if mono is None else mono
+        return max(0.0, min(qso.deadline for qso in self.qsos.values()) - mono)
+
+    def abandon(self, call: str) -> Optional[QSO]:
+        """放弃和 call 的QSO"""
+        qso = self.qsos.pop(call, None)
+        if qso is not None:
+            qso.phase = ABANDONED
+        return qso
+
+    def next_message(self, call: str, my_grid: str = '') -> str:
+        """和 call 的QSO在当前状态下应发送的消息"""
+        qso = self.qsos.get(call)
+        if qso is None:
+            return ''
+        report = f"{qso.snr:+03d}"
+        if qso.phase == CALLING:
+            tail = my_grid[:4] if my_grid else report
+        elif qso.phase == REPORT:
+            tail = 'R' + report
+        elif qso.phase == R_REPORT:
+            tail = 'RR73'
+        else:
+            tail = '73'
+        return f"{qso.call} {self.my_call} {tail}"
+
+
+class ReplyQueue:
+    """按发射周期合并要发出的 Reply：同一周期内每个呼号只保留最新的一条，周期开始前一次发出"""
+
+    def __init__(self, lead: float = REPLY_LEAD):
+        self.lead = lead                    # 在时隙边界前多少秒发出
+        self.pending: Dict[str, Any] = {}   # 呼号 -> 回复内容（按加入顺序）
+        self.flush_at: Optional[float] = None
+
+    def add(self, call: str, reply: Any, boundary: float, now: float) -> bool:
+        """加入一条回复，boundary 为下一个发射周期开始的时间；需要安排发送时返回 True"""
+        self.pending.pop(call, None)
+        self.pending[call] = reply
+        if self.flush_at is not None:
+            return False
+        self.flush_at = max(now, boundary - self.lead)
+        return True
+
+    def take(self) -> List[Any]:
+        """取出本周期所有回复"""
+        replies = list(self.pending.values())
+        self.pending.clear()
+        self.flush_at = None
+        return replies
+
+    def __len__(self) -> int:
+        return len(self.pending)
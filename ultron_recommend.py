@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+ULTRON Whitelist Recommendation Engine
+Python Version
+
+按得分推荐目标实体：白名单优先级/得分 + 实体稀有度 + 波段上最近的解码活跃度
+（以及可选的按钟点活动热图），
+已通联的 实体×波段 不再推荐。每个波段用堆取前K名（O(N log K)），可以每个时隙重算。
+"""
+
+import heapq
+import math
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from ultron_bands import BAND_COUNT, BAND_IDS, BAND_NAMES, band_id
+from ultron_store import ENTITY_SLOTS, SlotMatrix
+from ultron_whitelist import GLOBAL_KEY
+
+if TYPE_CHECKING:
+    from ultron_activity import ActivityHeatmap
+
+# 白名单优先级权重
+PRIORITY_WEIGHT = {'high': 3.0, 'medium': 1.5, 'low': 0.5}
+
+# 各项得分权重
+WHITELIST_WEIGHT = 1.0
+RARITY_WEIGHT = 4.0
+ACTIVITY_WEIGHT = 3.0
+HEATMAP_WEIGHT = 2.0
+NEW_ENTITY_BONUS = 5.0
+
+# 活跃度半衰期（秒）
+ACTIVITY_HALF_LIFE = 900.0
+
+
+class ActivityTracker:
+    """最近解码活跃度：每个 实体×波段 一个按时间指数衰减的计数"""
+
+    def __init__(self, half_life: float = ACTIVITY_HALF_LIFE):
+        self.half_life = half_life
+        self.levels: Dict[int, Tuple[float, float]] = {}  # slot -> (计数, 更新时间)
+        self.by_band: Dict[int, Set[int]] = {}
+
+    def record(self, eid: int, bid: int, now: Optional[float] = None) -> None:
+        """记录一次解码"""
+        if not eid:
+            return
+        now = time.time() if now is None else now
+        slot = eid * BAND_COUNT + bid
+        self.levels[slot] = (self._decay(slot, now) + 1.0, now)
+        self.by_band.setdefault(bid, set()).add(eid)
+
+    def _decay(self, slot: int, now: float) -> float:
+        value, updated = self.levels.get(slot, (0.0, now))
+        return value * 0.5 ** ((now - updated) / self.half_life)
+
+    def level(self, eid: int, bid: int, now: Optional[float] = None) -> float:
+        """当前活跃度"""
+        return self._decay(eid * BAND_COUNT + bid, time.time() if now is None else now)
+
+    def active(self, bid: int) -> Set[int]:
+        """在该波段上解码到过的实体"""
+        return self.by_band.get(bid, set())
+
+
+class Recommender:
+    """白名单推荐引擎"""
+
+    def __init__(self, whitelists: Dict[str, Dict[int, Dict[str, object]]], matrix: SlotMatrix,
+                 activity: Optional[ActivityTracker] = None, entities: Iterable[int] = (),
+                 heatmap: Optional['ActivityHeatmap'] = None):
+        self.whitelists = whitelists
+        self.matrix = matrix
+        self.activity = activity
+        self.heatmap = heatmap
+        self.global_list = whitelists.get(GLOBAL_KEY, {})
+
+        # 实体稀有度：日志中QSO越少越稀有
+        totals = matrix.entity_totals()
+        self.rarity = [1.0 / (1.0 + totals[eid]) for eid in range(ENTITY_SLOTS)]
+        self.worked_any = bytes(1 if totals[eid] else 0 for eid in range(ENTITY_SLOTS))
+
+        self.candidates: Set[int] = set(entities)
+        for entries in whitelists.values():
+            self.candidates.update(entries)
+        self.candidates.discard(0)
+
+    @staticmethod
+    def whitelist_score(info: Optional[Dict[str, object]]) -> float:
+        if not info:
+            return 0.0
+        try:
+            score = float(info.get('score', 0) or 0)
+        except (TypeError, ValueError):
+            score = 0.0
+        return score * PRIORITY_WEIGHT.get(info.get('priority'), 1.0)
+
+    def score(self, eid: int, bid: int, now: Optional[float] = None) -> Optional[float]:
+        """实体在该波段上的得分；已通联返回None"""
+        if self.matrix.qsos(eid, bid):
+            return None
+        band_list = self.whitelists.get(BAND_NAMES[bid], {})
+        score = WHITELIST_WEIGHT * max(self.whitelist_score(band_list.get(eid)),
+                                       self.whitelist_score(self.global_list.get(eid)))
+        score += RARITY_WEIGHT * self.rarity[eid]
+        if not self.worked_any[eid]:
+            score += NEW_ENTITY_BONUS
+        if self.activity is not None:
+            score += ACTIVITY_WEIGHT * math.log1p(self.activity.level(eid, bid, now))
+        if self.heatmap is not None:
+            score += HEATMAP_WEIGHT * self.heatmap.probability(eid, bid, now)
+        return score
+
+    def top(self, band, k: int = 5, now: Optional[float] = None) -> List[Tuple[int, float]]:
+        """某波段得分最高的K个实体 [(实体, 得分)]"""
+        bid = band if isinstance(band, int) else band_id(band)
+        candidates = self.candidates
+        if self.activity is not None:
+            candidates = candidates | self.activity.active(bid)
+        scored = ((s, eid) for eid in candidates
+                  for s in (self.score(eid, bid, now),) if s is not None)
+        return [(eid, s) for s, eid in heapq.nlargest(k, scored)]
+
+    def top_new(self, k: int = 10, now: Optional[float] = None) -> List[Tuple[int, float]]:
+        """尚未在任何波段通联的实体中得分最高的K个（取各波段中的最高分）"""
+        bands = [BAND_IDS[name] for name in self.whitelists if name in BAND_IDS] or [0]
+        scored = ((max(self.score(eid, bid, now) for bid in bands), eid)
+                  for eid in self.candidates if not self.worked_any[eid])
+        return [(eid, s) for s, eid in heapq.nlargest(k, scored)]
+
+    def recommend(self, bands: Iterable, k: int = 5, now: Optional[float] = None) -> Dict[str, List[Tuple[int, float]]]:
+        """每个波段的前K名 {波段名: [(实体, 得分)]}"""
+        result = {}
+        for band in bands:
+            bid = band if isinstance(band, int) else band_id(band)
+            if bid:
+                top = self.top(bid, k, now)
+                if top:
+                    result[BAND_NAMES[bid]] = top
+        return result
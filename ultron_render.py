@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+ULTRON Slot Renderer
+Python Version
+
+按时隙缓冲的终端输出：一个时隙的解码行先收集起来，时隙结束（或需要显示
+其他信息）时按信噪比、需要等级或频率排序，一次写出并 flush。
+慢速 SSH 连接或 nohup 重定向时不会每条解码阻塞一次接收循环。
+颜色转义码由调用方预先建好（输出不是终端时为空字符串）。
+"""
+
+import sys
+from typing import Dict, List, Optional, TextIO, Tuple
+
+# 排序方式
+SORT_ORDERS = ('arrival', 'snr', 'need', 'freq')
+# 缓冲的行数上限，超过时立即写出
+MAX_LINES = 1000
+
+
+class SlotRenderer:
+    """一个时隙的解码行缓冲"""
+
+    def __init__(self, codes: Dict[str, str], sort: str = 'snr', stream: Optional[TextIO] = None,
+                 max_lines: int = MAX_LINES):
+        """codes 为 颜色名 -> 转义码（含 'reset'），stream 为 None 时写到当前的 sys.stdout"""
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"unknown sort order {sort!r} (expected one of {', '.join(SORT_ORDERS)})")
+        self.codes = codes
+        self.sort = sort
+        self.stream = stream
+        self.max_lines = max_lines
+        self.lines: List[Tuple[tuple, str]] = []
+        self.slot: Optional[int] = None
+        self.writes = 0
+
+    def _key(self, snr: int, need: int, delta_f: int) -> tuple:
+        seq = len(self.lines)
+        if self.sort == 'snr':
+            return (-snr, seq)
+        if self.sort == 'need':
+            return (need, -snr, seq)
+        if self.sort == 'freq':
+            return (delta_f, seq)
+        return (seq,)
+
+    def add(self, line: str, color: str = 'white', snr: int = 0, need: int = 0, delta_f: int = 0,
+            slot: Optional[int] = None) -> None:
+        """加入一行；slot（解码包的时间）变化时先写出上一个时隙"""
+        if slot is not None and slot != self.slot:
+            if self.lines:
+                self.flush()
+            self.slot = slot
+        codes = self.codes
+        prefix = codes.get(color, '')
+        self.lines.append((self._key(snr, need, delta_f),
+                           f"{prefix}{line}{codes.get('reset', '')}\n" if prefix else line + '\n'))
+        if len(self.lines) >= self.max_lines:
+            self.flush()
+
+    def flush(self) -> int:
+        """排序后一次写出所有缓冲的行，返回行数"""
+        lines = self.lines
+        if not lines:
+            return 0
+        if self.sort != 'arrival':
+            lines.sort()
+        stream = self.stream or sys.stdout
+        stream.write(''.join(text for _key, text in lines))
+        stream.flush()
+        self.lines = []
+        self.writes += 1
+        return len(lines)
+
+    def __len__(self) -> int:
+        return len(self.lines)
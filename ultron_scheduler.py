@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+ULTRON Candidate Scheduler
+Python Version
+
+收集一个时隙内所有可以响应的电台（>>），到决策时间再选得分最高的一个，
+其余的保留为候补：所选电台不回应时直接换下一个，不必等下一个时隙。
+得分 = 需要等级 + 白名单优先级 + 信噪比 + 距离 - 时间衰减，用堆维护。
+"""
+
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from ultron_needed import DUPE
+from ultron_qso import DEFAULT_PERIOD, MAX_IDLE_SLOTS
+from ultron_store import grid4
+
+# 收到第一个候选后等待同一批解码的时间（秒）
+DECISION_WINDOW = 0.5
+
+# 得分权重
+NEED_WEIGHT = 20.0          # 每个需要等级
+WHITELIST_BONUS = 5.0       # 在该波段的白名单中
+HIGH_PRIORITY_BONUS = 5.0   # 白名单高优先级
+WHITELIST_SCORE_WEIGHT = 0.5
+SNR_WEIGHT = 0.2            # 每dB
+SNR_RANGE = (-24, 10)
+DISTANCE_WEIGHT = 0.25      # 每1000km
+AGE_WEIGHT = 0.1            # 每秒
+
+
+def candidate_ttl(period: float, max_idle_slots: int = MAX_IDLE_SLOTS) -> float:
+    """候选的有效时间（秒）：所选电台从下一个时隙边界起等 max_idle_slots 个时隙才放弃，
+    忙的时候不再收候选，所以候补要比这段时间多活一个时隙以上"""
+    return (max_idle_slots + 2) * period
+
+
+# 默认模式（FT8）下候选的有效时间
+CANDIDATE_TTL = candidate_ttl(DEFAULT_PERIOD)
+
+
+def grid_position(grid: str) -> Optional[Tuple[float, float]]:
+    """4位网格中心的 (纬度, 经度)"""
+    grid = grid4(grid)
+    if not grid:
+        return None
+    lon = (ord(grid[0]) - 65) * 20 - 180 + int(grid[2]) * 2 + 1
+    lat = (ord(grid[1]) - 65) * 10 - 90 + int(grid[3]) + 0.5
+    return lat, lon
+
+
+def grid_distance(a: str, b: str) -> float:
+    """两个网格之间的大圆距离（km），网格无效时返回0"""
+    pa, pb = grid_position(a), grid_position(b)
+    if pa is None or pb is None:
+        return 0.0
+    lat1, lon1 = map(math.radians, pa)
+    lat2, lon2 = map(math.radians, pb)
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(min(1.0, math.sqrt(h)))
+
+
+def whitelist_priority(whitelist, eid: int, bid: int) -> float:
+    """编译后白名单（CompiledWhitelist）给出的优先级得分"""
+    if not whitelist.contains(eid, bid):
+        return 0.0
+    priority = WHITELIST_BONUS + WHITELIST_SCORE_WEIGHT * whitelist.score[eid]
+    if whitelist.is_high(eid, bid):
+        priority += HIGH_PRIORITY_BONUS
+    return priority
+
+
+@dataclass
+class Candidate:
+    """可以响应的电台"""
+    call: str
+    message: str
+    eid: int
+    bid: int
+    need: int
+    snr: int
+    grid: str
+    priority: float
+    received: float
+    score: float = 0.0      # 不含时间衰减的得分
+    version: int = 0
+    decode: Optional[Dict[str, Any]] = None     # 原始解码字段（用于 Reply 包）
+
+
+class CandidateScheduler:
+    """候选调度器"""
+
+    def __init__(self, my_grid: str = '', decision_window: float = DECISION_WINDOW,
+                 ttl: float = CANDIDATE_TTL):
+        self.my_grid = grid4(my_grid)
+        self.decision_window = decision_window
+        self.ttl = ttl
+        self.candidates: Dict[str, Candidate] = {}
+        self.heap: List[Tuple[float, int, str, int]] = []   # (-排序键, 序号, 呼号, 版本)
+        self.deadline: Optional[float] = None
+        self._seq = 0
+
+    def static_score(self, need: int, priority: float, grid: str) -> float:
+        """得分中与信噪比无关的部分（可以在空闲时预先计算）"""
+        score = NEED_WEIGHT * (DUPE - need) + priority
+        if self.my_grid and grid:
+            score += DISTANCE_WEIGHT * grid_distance(self.my_grid, grid) / 1000.0
+        return score
+
+    @staticmethod
+    def snr_score(snr: int) -> float:
+        return SNR_WEIGHT * min(SNR_RANGE[1], max(SNR_RANGE[0], snr))
+
+    def score(self, candidate: Candidate) -> float:
+        """不含时间衰减的得分"""
+        return self.static_score(candidate.need, candidate.priority, candidate.grid) + self.snr_score(candidate.snr)
+
+    def current_score(self, candidate: Candidate, now: float) -> float:
+        """当前得分（越旧越低）"""
+        return candidate.score - AGE_WEIGHT * (now - candidate.received)
+
+    def offer(self, call: str, message: str, eid: int, bid: int, need: int, snr: int,
+              grid: str = '', priority: float = 0.0, now: float = 0.0,
+              decode: Optional[Dict[str, Any]] = None, static: Optional[float] = None) -> Candidate:
+        """加入（或更新）一个候选；同一呼号再次解码时刷新时间和得分（static 为预先算好的 static_score）"""
+        old = self.candidates.get(call)
+        candidate = Candidate(call, message, eid, bid, need, snr, grid or (old.grid if old else ''),
+                              priority, now, version=old.version + 1 if old else 0, decode=decode)
+        if static is not None and candidate.grid == grid:
+            candidate.score = static + self.snr_score(snr)
+        else:
+            candidate.score = self.score(candidate)
+        self.candidates[call] = candidate
+        # 线性时间衰减下排序键与当前时间无关：score - w*(now - received) 的排序等同于 score + w*received
+        self._seq += 1
+        heapq.heappush(self.heap, (-(candidate.score + AGE_WEIGHT * now), self._seq, call, candidate.version))
+        if self.deadline is None:
+            self.deadline = now + self.decision_window
+        if len(self.heap) > 4 * len(self.candidates) + 64:
+            self._compact()
+        return candidate
+
+    def _compact(self) -> None:
+        self.heap = [entry for entry in self.heap
+                     if entry[2] in self.candidates and self.candidates[entry[2]].version == entry[3]]
+        heapq.heapify(self.heap)
+
+    def discard(self, call: str) -> None:
+        """移除候选（已通联或已排除）"""
+        self.candidates.pop(call, None)
+
+    def due(self, now: float) -> bool:
+        """是否到了决策时间"""
+        return self.deadline is not None and now >= self.deadline
+
+    def wait_time(self, now: float, default: float) -> float:
+        """距离决策时间的秒数（用作socket超时）"""
+        if self.deadline is None:
+            return default
+        return min(default, max(0.05, self.deadline - now))
+
+    def pick(self, now: float, excluded: Collection[str] = ()) -> Optional[Candidate]:
+        """取出得分最高的有效候选，其余保留为候补"""
+        self.deadline = None
+        heap = self.heap
+        while heap:
+            _, _, call, version = heapq.heappop(heap)
+            candidate = self.candidates.get(call)
+            if candidate is None or candidate.version != version:
+                continue
+            del self.candidates[call]
+            if now - candidate.received > self.ttl or call in excluded:
+                continue
+            return candidate
+        return None
+
+    def ranked(self, now: float) -> List[Tuple[Candidate, float]]:
+        """所有有效候选及当前得分（从高到低，用于显示）"""
+        alive = [c for c in self.candidates.values() if now - c.received <= self.ttl]
+        return sorted(((c, self.current_score(c, now)) for c in alive), key=lambda item: -item[1])
+
+    def __len__(self) -> int:
+        return len(self.candidates)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+ULTRON Shared Decode Ring
+Python Version
+
+本机其他程序（PHP网页界面、日志程序、自己的脚本）读取实时解码用的共享内存环形缓冲：
+ULTRON 把每条解码写成定长记录放进内存映射文件（ultron_decodes.ring），文件头里是
+最新的序号。读取方只映射同一个文件，按序号往后读，每条记录不需要系统调用，
+也不需要再转发一份UDP或反复读取整个JSON文件。
+一个写入方、任意多个读取方：记录首尾各有一份序号，读到的首尾序号不一致
+（正在被覆盖）或读得太慢被写入方追上时，跳过并计入 lost。
+jtdx_shared_data.json 由兼容任务按需生成：只在有新解码时、最多每个时隙写一次。
+
+用法：
+    python ultron_shm.py tail                     # 显示新的解码
+    python ultron_shm.py json --interval 15       # 按需更新 jtdx_shared_data.json
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Union
+
+from ultron_bands import BAND_NAMES, MODE_NAMES
+from ultron_needed import DUPE, NEED_LABELS
+
+RING_FILE = "ultron_decodes.ring"
+RING_MAGIC = b'UDR1'
+# 环形缓冲的记录数
+RING_CAPACITY = 4096
+
+# 文件头：magic 记录长度 保留 容量（16字节），然后是最新序号（偏移16，8字节），补齐到64字节
+HEADER = struct.Struct('<4sHHI')
+HEAD = struct.Struct('<Q')
+HEAD_OFFSET = 16
+HEADER_SIZE = 64
+
+# 序号 时隙时间(ms) 时间戳 信噪比 音频频率 DT(0.1s) 波段 模式 需要等级 状态 呼号 消息 DXCC名称 ... 序号
+RECORD = struct.Struct('<QIIhHhBBB2s16s40s32s5xQ')
+TAIL_OFFSET = RECORD.size - 8
+
+# jtdx_shared_data.json 中保留的解码数（与 jtdx_shared_data.php 一致）
+SHARED_DATA_DECODES = 100
+
+
+class RingDecode(NamedTuple):
+    """环形缓冲中的一条解码"""
+    seq: int
+    slot: int        # 解码包的时间（当天UTC毫秒）
+    time: int        # UTC 时间戳（秒）
+    snr: int
+    delta_f: int     # 音频频率（Hz）
+    delta_t: float
+    band: int        # 波段编号
+    mode: int        # 模式编号
+    need: int        # 需要等级
+    status: str      # 显示的状态（>> XX Lo -- ->）
+    call: str
+    message: str
+    dxcc: str
+
+
+def _text(value: bytes) -> str:
+    return value.rstrip(b'\0').decode('utf-8', 'replace')
+
+
+class DecodeRing:
+    """写入方（ULTRON）"""
+
+    def __init__(self, path: Union[str, Path] = RING_FILE, capacity: int = RING_CAPACITY):
+        self.path = Path(path)
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity * RECORD.size
+        # 文件头一致时继续使用（序号接着增加，读取方不受重启影响），否则重新建立
+        header = None
+        if self.path.exists() and self.path.stat().st_size == size:
+            with open(self.path, 'rb') as f:
+                header = HEADER.unpack(f.read(HEADER.size))
+        if header != (RING_MAGIC, RECORD.size, 0, capacity):
+            temp = self.path.with_name(self.path.name + '.tmp')
+            with open(temp, 'wb') as f:
+                f.write(HEADER.pack(RING_MAGIC, RECORD.size, 0, capacity).ljust(HEADER_SIZE, b'\0'))
+                f.truncate(size)
+            os.replace(temp, self.path)     # 正在读旧文件的读取方重新打开即可
+        self.file = open(self.path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.seq = HEAD.unpack_from(self.map, HEAD_OFFSET)[0]
+
+    def append(self, slot: int, snr: int, delta_f: int, delta_t: float, band: int, mode: int, need: int,
+               status: str, call: str, message: str, dxcc: str, timestamp: Optional[float] = None) -> int:
+        """写入一条解码，返回序号"""
+        seq = self.seq + 1
+        offset = HEADER_SIZE + (seq % self.capacity) * RECORD.size
+        record = RECORD.pack(
+            seq, slot, int(timestamp if timestamp is not None else time.time()),
+            max(-32768, min(32767, snr)), max(0, min(65535, delta_f)),
+            max(-32768, min(32767, round(delta_t * 10))), band, mode, need,
+            status.encode('ascii', 'replace')[:2], call.encode('ascii', 'replace')[:16],
+            message.encode('utf-8', 'replace')[:40], dxcc.encode('utf-8', 'replace')[:32], seq)
+        mm = self.map
+        # 先作废尾部序号，写完内容后再写尾部序号和文件头
+        mm[offset + TAIL_OFFSET:offset + RECORD.size] = b'\0' * 8
+        mm[offset:offset + TAIL_OFFSET] = record[:TAIL_OFFSET]
+        mm[offset + TAIL_OFFSET:offset + RECORD.size] = record[TAIL_OFFSET:]
+        HEAD.pack_into(mm, HEAD_OFFSET, seq)
+        self.seq = seq
+        return seq
+
+    def close(self) -> None:
+        self.map.close()
+        self.file.close()
+
+
+class DecodeRingReader:
+    """读取方：从 start 之后的序号开始读（默认只读以后的新解码）"""
+
+    def __init__(self, path: Union[str, Path] = RING_FILE, start: Optional[int] = None):
+        self.path = Path(path)
+        self.lost = 0
+        self.map: Optional[mmap.mmap] = None
+        self._open()
+        self.seq = self.head() if start is None else max(0, start)
+
+    def _open(self) -> None:
+        with open(self.path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size, _, self.capacity = HEADER.unpack_from(self.map)
+        if magic != RING_MAGIC or record_size != RECORD.size:
+            self.map.close()
+            raise ValueError(f"{self.path} is not a decode ring")
+
+    def head(self) -> int:
+        """最新写入的序号"""
+        return HEAD.unpack_from(self.map, HEAD_OFFSET)[0]
+
+    def poll(self, limit: Optional[int] = None) -> List[RingDecode]:
+        """读出上次以来的新解码（不超过 limit 条）"""
+        head = self.head()
+        if head < self.seq:
+            self.seq = 0                    # 写入方重建了缓冲
+        if head - self.seq > self.capacity:
+            self.lost += head - self.seq - self.capacity
+            self.seq = head - self.capacity
+        if limit is not None:
+            head = min(head, self.seq + limit)
+        mm = self.map
+        capacity = self.capacity
+        decodes = []
+        for seq in range(self.seq + 1, head + 1):
+            offset = HEADER_SIZE + (seq % capacity) * RECORD.size
+            fields = RECORD.unpack(mm[offset:offset + RECORD.size])
+            if fields[0] != seq or fields[-1] != seq:
+                self.lost += 1              # 读的时候已被覆盖
+                continue
+            decodes.append(RingDecode(seq, fields[1], fields[2], fields[3], fields[4], fields[5] / 10,
+                                      fields[6], fields[7], fields[8], _text(fields[9]), _text(fields[10]),
+                                      _text(fields[11]), _text(fields[12])))
+        self.seq = head
+        return decodes
+
+    def reopened(self) -> bool:
+        """写入方重建了文件时重新映射（只在空闲时检查）"""
+        try:
+            if os.stat(self.path).st_ino == self.inode:
+                return False
+            self.map.close()
+            self._open()
+        except (OSError, ValueError):
+            return False
+        self.seq = 0
+        return True
+
+    def follow(self, interval: float = 0.05) -> Iterator[RingDecode]:
+        """持续读出新解码"""
+        idle = 0.0
+        while True:
+            decodes = self.poll()
+            if decodes:
+                idle = 0.0
+                yield from decodes
+                continue
+            time.sleep(interval)
+            idle += interval
+            if idle >= 1.0:
+                idle = 0.0
+                self.reopened()
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+def shared_data_decode(decode: RingDecode) -> Dict[str, Any]:
+    """jtdx_shared_data.json 中一条解码的格式（与网页界面使用的字段一致）"""
+    slot = decode.slot
+    return {
+        'time': f"{slot // 3600000 % 24:02d}:{slot // 60000 % 60:02d}:{slot // 1000 % 60:02d}",
+        'snr': decode.snr,
+        'deltaF': decode.delta_f,
+        'mode': MODE_NAMES[decode.mode] if decode.mode < len(MODE_NAMES) else 'FT8',
+        'status': decode.status,
+        'message': decode.message,
+        'call': decode.call,
+        'dxcc': decode.dxcc,
+        'band': BAND_NAMES[decode.band] if decode.band < len(BAND_NAMES) else 'unknown',
+        'priority_reason': NEED_LABELS[decode.need] if decode.need < DUPE else '',
+        'timestamp': decode.time,
+    }
+
+
+def materialize_shared_data(reader: DecodeRingReader, path: Union[str, Path] = 'jtdx_shared_data.json',
+                            limit: int = SHARED_DATA_DECODES) -> int:
+    """把新解码合并进 jtdx_shared_data.json（没有新解码时不写），返回新解码数"""
+    decodes = reader.poll()
+    if not decodes:
+        return 0
+    path = Path(path)
+    try:
+        data = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        data = {}
+    data.setdefault('status', {})
+    data.setdefault('config', {})
+    rows = [shared_data_decode(decode) for decode in reversed(decodes[-limit:])]
+    data['decodes'] = (rows + list(data.get('decodes') or []))[:limit]   # 最新的在前
+    data['status']['decoded_count'] = len(data['decodes'])
+    temp = path.with_name(path.name + '.tmp')
+    temp.write_text(json.dumps(data, indent=4, ensure_ascii=False), encoding='utf-8')
+    os.replace(temp, path)                  # 读取方不会读到写了一半的文件
+    return len(decodes)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Read the ULTRON shared decode ring')
+    parser.add_argument('command', choices=('tail', 'json'), help='tail: 显示新的解码; json: 按需更新 jtdx_shared_data.json')
+    parser.add_argument('--ring', default=RING_FILE, help='环形缓冲文件')
+    parser.add_argument('--output', default='jtdx_shared_data.json', help='json 命令写入的文件')
+    parser.add_argument('--interval', type=float, default=15.0, help='json 命令检查新解码的间隔（秒）')
+    parser.add_argument('--all', action='store_true', help='从缓冲中最早的解码开始读')
+    args = parser.parse_args()
+
+    reader = DecodeRingReader(args.ring, start=0 if args.all else None)
+    try:
+        if args.command == 'tail':
+            for decode in reader.follow():
+                slot = decode.slot
+                print(f"{slot // 3600000 % 24:02d}{slot // 60000 % 60:02d}{slot // 1000 % 60:02d} "
+                      f"{decode.snr:>3} {decode.delta_f:>4} {decode.status:2} {decode.message:<20} - {decode.dxcc}",
+                      flush=True)
+        else:
+            while True:
+                count = materialize_shared_data(reader, args.output)
+                if count:
+                    print(f"{args.output}: {count} new decodes ({reader.lost} lost)", flush=True)
+                time.sleep(args.interval)
+                if not count:
+                    reader.reopened()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+ULTRON Band Simulator
+Python Version
+
+离线的波段模拟器，用于给QSO引擎做压力测试。
+按DXCC数据库（没有 base.json 时用内置的前缀表）生成电台，各实体有活跃度权重、
+网格和信噪比分布；每个时隙产生 200 条以上的解码（CQ、带修饰的CQ、电台之间的QSO），
+打包成真实的 WSJT-X 解码包（类型2）。
+收到我们的 Reply 后，被呼叫的电台按设定的概率回应报告、再发 RR73。
+可以在同一进程里驱动 Ultron / UltronDXCC / HamRadioManager，或者通过回环UDP
+驱动正在运行的 ULTRON；时隙按状态包的 T/R 周期计时，周期小于15秒即为加速运行。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import math
+import os
+import random
+import select
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ultron_message import parse_message
+
+# WSJT-X 包头
+MAGIC = 0xadbccbda
+SCHEMA = 2
+CLIENT_ID = "WSJT-X"
+
+# 模式 -> 解码包中的模式符号
+MODE_SYMBOLS = {'FT8': '~', 'FT4': '+', 'JT65': '#', 'JT9': '@', 'Q65': ':', 'MSK144': '&'}
+
+# 正常速度下的时隙长度（秒），加速运行时各时间参数按 周期/15 缩放
+REAL_PERIOD = 15
+# 解码在时隙结束前多少秒送出（WSJT-X 在 14 秒左右解完）
+DECODE_LEAD = 1.0
+# 每个时隙中电台之间QSO的消息占比，其余是CQ
+QSO_SHARE = 0.4
+# 带修饰的CQ占比
+CQ_MODIFIED_SHARE = 0.1
+CQ_MODIFIERS = ('DX', 'POTA', 'NA', 'EU', 'AS', 'TEST')
+# CQ的电台下一个时隙继续CQ的概率（同一个电台往往连续出现很多个时隙）
+CQ_REPEAT = 0.85
+# 对方回应报告后没有收到 RR73 时最多重复的次数
+MAX_REPEATS = 3
+SNR_RANGE = (-24, 20)
+
+# 内置的DXCC前缀表（base.json 的格式），附活跃度权重、平均信噪比和常见网格
+BUILTIN_ENTITIES = (
+    # id, 前缀, 名称, 国旗, 权重, 平均信噪比, 网格
+    ('291', 'K W N AA AB AC AD AE AF AG AI AJ AK', 'United States', 'us', 30, -8,
+     ('FN42', 'EM73', 'DM79', 'CN87', 'EN52')),
+    ('1', 'VE VA', 'Canada', 'ca', 4, -10, ('FN25', 'EN82', 'DO21')),
+    ('339', 'JA JE JF JG JH JI JJ JK JL JM JN JO JR JS', 'Japan', 'jp', 18, -6, ('PM95', 'QM06', 'PM74')),
+    ('230', 'DL DJ DK DA DB DC DD DF DG DH DM DO', 'Fed. Rep. of Germany', 'de', 10, -12,
+     ('JO62', 'JN58', 'JO31')),
+    ('318', 'BA BD BG BH BI BY', 'China', 'cn', 8, -2, ('OM89', 'OL72', 'PM01')),
+    ('281', 'EA EB EC ED EE EF EG EH', 'Spain', 'es', 5, -14, ('IN80', 'JN11')),
+    ('227', 'F', 'France', 'fr', 4, -14, ('JN18', 'IN88')),
+    ('223', 'G M 2E', 'England', 'gb', 4, -14, ('IO91', 'IO83')),
+    ('248', 'I IK IZ IW IU', 'Italy', 'it', 4, -14, ('JN45', 'JN61')),
+    ('54', 'UA RA RK RN RV RW RX RZ', 'European Russia', 'ru', 5, -12, ('KO85', 'LO45')),
+    ('15', 'UA9 UA0 R9 R0', 'Asiatic Russia', 'ru', 2, -10, ('NO14', 'PO02')),
+    ('137', 'HL DS', 'Republic of Korea', 'kr', 4, -4, ('PM37', 'PM38')),
+    ('386', 'BV BM BN BU BX', 'Taiwan', 'tw', 2, -4, ('PL05', 'PL04')),
+    ('327', 'YB YC YD YE YF YG YH', 'Indonesia', 'id', 2, -10, ('OI33', 'OI42')),
+    ('375', 'DU DV DW DY DZ', 'Philippines', 'ph', 2, -8, ('PK04', 'PK14')),
+    ('150', 'VK', 'Australia', 'au', 3, -12, ('QF56', 'QG62')),
+    ('170', 'ZL', 'New Zealand', 'nz', 1, -16, ('RF70', 'RF80')),
+    ('108', 'PY PU', 'Brazil', 'br', 2, -16, ('GG66', 'GG87')),
+    ('100', 'LU LW', 'Argentina', 'ar', 1, -18, ('GF05', 'FF97')),
+    ('462', 'ZS', 'South Africa', 'za', 1, -18, ('KG33', 'KF05')),
+    ('141', 'VP8', 'Falkland Islands', 'fk', 0.05, -20, ('GD18',)),
+    ('250', 'ZD7', 'St. Helena', 'sh', 0.05, -20, ('IH74',)),
+    ('24', '3Y', 'Bouvet', 'bv', 0.02, -21, ('JD15',)),
+)
+
+# 模拟电台对我们的QSO所处的阶段
+ANSWERING = 0       # 收到 Reply，下一个时隙回应报告
+REPORTED = 1        # 已回应报告，等待发 RR73
+
+_LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def builtin_database() -> List[Dict[str, str]]:
+    """内置前缀表（base.json 的格式）"""
+    return [{'id': eid, 'licencia': prefixes, 'name': name, 'flag': flag}
+            for eid, prefixes, name, flag, *_ in BUILTIN_ENTITIES]
+
+
+def write_utf8(text: str) -> bytes:
+    data = text.encode('utf-8')
+    return len(data).to_bytes(4, 'big') + data
+
+
+def read_utf8(data: bytes, pos: int) -> Tuple[str, int]:
+    length = struct.unpack_from('>I', data, pos)[0]
+    pos += 4
+    if length == 0xffffffff:
+        return "", pos
+    if pos + length > len(data):
+        raise ValueError("truncated packet")
+    return data[pos:pos + length].decode('utf-8', errors='replace'), pos + length
+
+
+def build_decode_packet(message: str, snr: int, delta_time: float = 0.0, delta_f: int = 1500,
+                        time_ms: int = 0, mode: str = '~', client_id: str = CLIENT_ID,
+                        low_confidence: bool = False) -> bytes:
+    """WSJT-X 解码包（类型2）"""
+    return (struct.pack('>III', MAGIC, SCHEMA, 2) + write_utf8(client_id) + b'\x01'
+            + struct.pack('>IidI', time_ms, snr, delta_time, delta_f)
+            + write_utf8(mode) + write_utf8(message) + bytes([low_confidence, 0]))
+
+
+def build_status_packet(frequency: int, mode: str, de_call: str, de_grid: str,
+                        tr_period: int = REAL_PERIOD, client_id: str = CLIENT_ID) -> bytes:
+    """WSJT-X 状态包（类型1），带 DE call/grid 和 T/R 周期"""
+    return (struct.pack('>III', MAGIC, SCHEMA, 1) + write_utf8(client_id)
+            + struct.pack('>Q', frequency) + write_utf8(mode)
+            + write_utf8('') + write_utf8('') + write_utf8(mode)     # DX call、报告、发射模式
+            + bytes([1, 0, 1]) + struct.pack('>II', 1500, 1500)      # 发射开关、正在发射、正在解码、Rx/Tx DF
+            + write_utf8(de_call) + write_utf8(de_grid) + write_utf8('')
+            + b'\x00' + write_utf8('') + b'\x00\x00'                 # Tx Watchdog、子模式、快速模式、特殊模式
+            + struct.pack('>II', 0, tr_period) + write_utf8('Default'))
+
+
+def parse_reply_packet(data: bytes) -> Dict[str, Any]:
+    """解析 Reply 包（类型4），不是 Reply 包时返回空字典"""
+    try:
+        magic, _schema, packet_type = struct.unpack_from('>III', data)
+        if magic != MAGIC or packet_type != 4:
+            return {}
+        client_id, pos = read_utf8(data, 12)
+        time_ms, snr, delta_time, delta_f = struct.unpack_from('>IidI', data, pos)
+        mode, pos = read_utf8(data, pos + 20)
+        message, pos = read_utf8(data, pos)
+    except (ValueError, struct.error):
+        return {}
+    return {'id': client_id, 'time': time_ms, 'snr': snr, 'delta_time': delta_time,
+            'delta_f': delta_f, 'mode': mode, 'message': message}
+
+
+def slot_boundary(mono: float, period: float, clock_offset: float) -> float:
+    """mono 之后（含）的下一个时隙边界（单调时钟，按UTC对齐）"""
+    utc = mono + clock_offset
+    return math.ceil(utc / period - 1e-9) * period - clock_offset
+
+
+class Station:
+    """模拟的电台"""
+
+    __slots__ = ('call', 'grid', 'eid', 'snr')
+
+    def __init__(self, call: str, grid: str, eid: str, snr: float):
+        self.call = call
+        self.grid = grid
+        self.eid = eid
+        self.snr = snr          # 平均信噪比
+
+
+class Population:
+    """按DXCC实体的活跃度权重生成的电台"""
+
+    def __init__(self, rng: random.Random, size: int = 2000,
+                 database: Optional[List[Dict[str, str]]] = None):
+        self.rng = rng
+        self.stations: List[Station] = []
+        self.by_call: Dict[str, Station] = {}
+        entities = self._entities(database)
+        weights = [entity[2] for entity in entities]
+        while len(self.stations) < size:
+            eid, prefixes, _weight, snr_mean, grids = rng.choices(entities, weights)[0]
+            call = self._call(rng.choice(prefixes))
+            if call in self.by_call:
+                continue
+            grid = rng.choice(grids) if grids else self._grid()
+            station = Station(call, grid, eid, rng.gauss(snr_mean, 5.0))
+            self.stations.append(station)
+            self.by_call[call] = station
+
+    def _entities(self, database: Optional[List[Dict[str, str]]]) -> List[Tuple]:
+        """(id, 前缀, 权重, 平均信噪比, 网格)：有数据库时每个实体随机权重（少数实体很活跃）"""
+        if not database:
+            return [(eid, prefixes.split(), weight, snr, grids)
+                    for eid, prefixes, _name, _flag, weight, snr, grids in BUILTIN_ENTITIES]
+        entities = []
+        for entry in database:
+            prefixes = [p for p in str(entry.get('licencia', '')).split()
+                        if p.isalnum() and len(p) <= 4]
+            if prefixes:
+                entities.append((str(entry.get('id', 'unknown')), prefixes,
+                                 self.rng.paretovariate(1.2), self.rng.gauss(-12, 4), ()))
+        return entities
+
+    def _call(self, prefix: str) -> str:
+        rng = self.rng
+        # 以字母结尾的前缀加一位数字（不用 9/0，避免落到另一个实体的 UA9/R0 之类的前缀）
+        digit = '' if prefix[-1].isdigit() else rng.choice('12345678')
+        return prefix + digit + ''.join(rng.choice(_LETTERS) for _ in range(rng.randint(1, 3)))
+
+    def _grid(self) -> str:
+        rng = self.rng
+        return (rng.choice(_LETTERS[:18]) + rng.choice(_LETTERS[:18])
+                + str(rng.randint(0, 9)) + str(rng.randint(0, 9)))
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+
+class BandSimulator:
+    """每个时隙产生一批解码，并按概率回应我们的 Reply"""
+
+    def __init__(self, population: Population, my_call: str, my_grid: str = '',
+                 decodes: int = 200, answer_prob: float = 0.6, rr73_prob: float = 0.8,
+                 mode: str = 'FT8', period: int = REAL_PERIOD, seed: Optional[int] = None):
+        self.population = population
+        self.my_call = my_call.upper()
+        self.my_grid = my_grid
+        self.decodes = decodes
+        self.answer_prob = answer_prob
+        self.rr73_prob = rr73_prob
+        self.mode = mode
+        self.symbol = MODE_SYMBOLS.get(mode, '~')
+        self.period = period
+        self.rng = random.Random(seed)
+        self.pairs: List[List] = []             # 电台之间的QSO：[CQ方, 应答方, 步骤, 报告]
+        self.ours: Dict[str, List[int]] = {}    # 和我们的QSO：呼号 -> [阶段, 重复次数]
+        self.calling: Dict[str, Tuple[Station, str]] = {}   # 正在CQ的电台：呼号 -> (电台, CQ消息)
+        self.stats = {'slots': 0, 'decodes': 0, 'replies': 0, 'answered': 0, 'ignored': 0,
+                      'rr73': 0, 'gave_up': 0, 'unknown_replies': 0}
+
+    def snr(self, station: Station) -> int:
+        low, high = SNR_RANGE
+        return max(low, min(high, int(round(self.rng.gauss(station.snr, 3.0)))))
+
+    def report(self, station: Station) -> str:
+        """对方给我们的报告"""
+        return f"{max(-24, min(20, self.snr(station) + self.rng.randint(-3, 3))):+03d}"
+
+    def on_reply(self, message: str) -> bool:
+        """收到我们的 Reply（被回复的解码消息）；对方会回应时返回 True"""
+        self.stats['replies'] += 1
+        call = parse_message(message).from_call
+        if call not in self.population.by_call:
+            self.stats['unknown_replies'] += 1
+            return False
+        if call in self.ours:
+            return True             # 重复的 Reply
+        if self.rng.random() >= self.answer_prob:
+            self.stats['ignored'] += 1
+            return False
+        self.ours[call] = [ANSWERING, 0]
+        self.stats['answered'] += 1
+        return True
+
+    def _our_messages(self, busy: set) -> List[Tuple[Station, str]]:
+        """各电台回应我们的消息"""
+        messages = []
+        for call, state in list(self.ours.items()):
+            station = self.population.by_call[call]
+            busy.add(call)
+            if state[0] == ANSWERING:
+                state[0] = REPORTED
+                messages.append((station, f"{self.my_call} {call} {self.report(station)}"))
+            elif self.rng.random() < self.rr73_prob:
+                del self.ours[call]
+                self.stats['rr73'] += 1
+                messages.append((station, f"{self.my_call} {call} RR73"))
+            elif state[1] < MAX_REPEATS:
+                state[1] += 1       # 没收到我们的 R+报告，重复报告
+                messages.append((station, f"{self.my_call} {call} {self.report(station)}"))
+            else:
+                del self.ours[call]
+                self.stats['gave_up'] += 1
+        return messages
+
+    def _pair_messages(self, busy: set) -> List[Tuple[Station, str]]:
+        """电台之间正在进行的QSO各发一条"""
+        messages = []
+        active = []
+        for pair in self.pairs:
+            cq, other, step, report = pair
+            if step == 0:
+                messages.append((other, f"{cq.call} {other.call} {other.grid}"))
+            elif step == 1:
+                messages.append((cq, f"{other.call} {cq.call} {report}"))
+            elif step == 2:
+                messages.append((other, f"{cq.call} {other.call} R{report}"))
+            elif step == 3:
+                messages.append((cq, f"{other.call} {cq.call} RR73"))
+            else:
+                messages.append((other, f"{cq.call} {other.call} 73"))
+            pair[2] += 1
+            busy.add(cq.call)
+            busy.add(other.call)
+            if pair[2] <= 4:
+                active.append(pair)
+        self.pairs = active
+        return messages
+
+    def _idle_station(self, busy: set) -> Station:
+        stations = self.population.stations
+        for _ in range(8):
+            station = self.rng.choice(stations)
+            if station.call not in busy:
+                break
+        busy.add(station.call)
+        return station
+
+    def slot_messages(self) -> List[Tuple[Station, str]]:
+        """一个时隙的所有消息"""
+        rng = self.rng
+        busy = {self.my_call}
+        messages = self._our_messages(busy)
+        messages += self._pair_messages(busy)
+        total = max(1, int(rng.gauss(self.decodes, self.decodes * 0.05)))
+        while len(self.pairs) < total * QSO_SHARE and len(messages) < total:
+            # 新开始的QSO：应答方呼叫一个CQ的电台
+            cq, other = self._idle_station(busy), self._idle_station(busy)
+            self.pairs.append([cq, other, 1, self.report(other)])
+            messages.append((other, f"{cq.call} {other.call} {other.grid}"))
+        for call, cq in list(self.calling.items()):
+            if call in busy or len(messages) >= total or rng.random() >= CQ_REPEAT:
+                del self.calling[call]
+            else:
+                busy.add(call)
+                messages.append(cq)
+        while len(messages) < total:
+            station = self._idle_station(busy)
+            if rng.random() < CQ_MODIFIED_SHARE:
+                cq = (station, f"CQ {rng.choice(CQ_MODIFIERS)} {station.call} {station.grid}")
+            else:
+                cq = (station, f"CQ {station.call} {station.grid}")
+            self.calling[station.call] = cq
+            messages.append(cq)
+        rng.shuffle(messages)
+        return messages
+
+    def slot(self, slot_start_utc: float) -> List[bytes]:
+        """一个时隙的解码包（slot_start_utc 为该时隙开始的UTC时间）"""
+        rng = self.rng
+        time_ms = int((slot_start_utc % 86400) * 1000)
+        packets = []
+        for station, message in self.slot_messages():
+            packets.append(build_decode_packet(
+                message, self.snr(station), round(rng.gauss(0.2, 0.3), 1), rng.randint(200, 2900),
+                time_ms, self.symbol))
+        self.stats['slots'] += 1
+        self.stats['decodes'] += len(packets)
+        return packets
+
+    def status_packet(self, frequency: int = 14074000) -> bytes:
+        return build_status_packet(frequency, self.mode, self.my_call, self.my_grid, self.period)
+
+    def report_lines(self) -> List[str]:
+        s = self.stats
+        return [f"slots {s['slots']}, decodes {s['decodes']} ({s['decodes'] / max(1, s['slots']):.0f}/slot), "
+                f"population {len(self.population)}",
+                f"replies {s['replies']}: answered {s['answered']}, ignored {s['ignored']}, "
+                f"RR73 {s['rr73']}, gave up {s['gave_up']}, unknown {s['unknown_replies']}"]
+
+
+class SlotClock:
+    """时隙计时：解码在每个时隙结束前 DECODE_LEAD 秒（按周期缩放）送出"""
+
+    def __init__(self, period: float):
+        self.period = period
+        self.scale = period / REAL_PERIOD
+        self.clock_offset = time.time() - time.monotonic()
+        now = time.monotonic()
+        self.boundary = slot_boundary(now + DECODE_LEAD * self.scale + 0.05, period, self.clock_offset)
+
+    @property
+    def emit_at(self) -> float:
+        return self.boundary - DECODE_LEAD * self.scale
+
+    def next(self) -> float:
+        """本时隙开始的UTC时间，并前进到下一个时隙"""
+        start = self.boundary - self.period + self.clock_offset
+        self.boundary += self.period
+        return start
+
+
+class Throughput:
+    """处理每个时隙这批解码所用的时间"""
+
+    def __init__(self):
+        self.busy = 0.0
+        self.decodes = 0
+        self.worst_batch = 0.0
+
+    def add(self, elapsed: float, decodes: int) -> None:
+        self.busy += elapsed
+        self.decodes += decodes
+        self.worst_batch = max(self.worst_batch, elapsed)
+
+    def report_line(self) -> str:
+        rate = self.decodes / self.busy if self.busy else 0.0
+        return f"processing {self.decodes} decodes took {self.busy:.2f}s ({rate:.0f} decodes/s), " \
+               f"worst slot batch {self.worst_batch * 1e3:.1f} ms"
+
+
+def collect_replies(sock: socket.socket, simulator: BandSimulator, timeout: float = 0.0) -> int:
+    """读取已到达的 Reply 包"""
+    count = 0
+    while True:
+        ready, _, _ = select.select([sock], [], [], timeout)
+        if not ready:
+            return count
+        timeout = 0.0
+        data, _addr = sock.recvfrom(2048)
+        reply = parse_reply_packet(data)
+        if reply:
+            simulator.on_reply(reply['message'])
+            count += 1
+
+
+def scale_target(target, period: float) -> None:
+    """加速运行时按比例缩短决策窗口、时隙截止时间和 Reply 提前量"""
+    scale = period / REAL_PERIOD
+    target.scheduler.decision_window *= scale
+    target.latency.deadline *= scale
+    target.replies.lead *= scale
+
+
+def drive_ultron(simulator: BandSimulator, target, slots: int, throughput: Throughput) -> None:
+    """在同一进程里驱动 Ultron/UltronDXCC：解码直接交给 process_decode，Reply 经回环UDP送回模拟器"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    target.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    target.client_addr = sock.getsockname()
+    scale_target(target, simulator.period)
+    target.process_status(target.protocol.parse_status_packet(simulator.status_packet()))
+
+    clock = SlotClock(simulator.period)
+
+    def wait_until(deadline: float) -> None:
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            wait = target.tick(time.time())
+            if target.prepare_decisions():
+                wait = min(wait, 0.05)
+            collect_replies(sock, simulator, min(wait, deadline - now))
+
+    try:
+        for _ in range(slots):
+            wait_until(clock.emit_at)
+            collect_replies(sock, simulator)
+            packets = simulator.slot(clock.next())
+            started = time.monotonic()
+            for packet in packets:
+                received = time.monotonic()
+                decode = target.protocol.parse_decode_packet(packet)
+                if decode:
+                    decode['received'] = received
+                    target.latency.record('parse', received, time.monotonic())
+                    target.process_decode(decode)
+            target.tick(time.time())
+            throughput.add(time.monotonic() - started, len(packets))
+        # 等最后的 Reply 和 QSO 截止时间
+        wait_until(clock.emit_at)
+        collect_replies(sock, simulator)
+    finally:
+        target.sock.close()
+        target.sock = None
+        sock.close()
+
+
+def drive_udp(simulator: BandSimulator, address: Tuple[str, int], slots: int) -> None:
+    """通过回环UDP驱动正在运行的 ULTRON（Reply 发回本模拟器的地址）"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    clock = SlotClock(simulator.period)
+    try:
+        sock.sendto(simulator.status_packet(), address)
+        for _ in range(slots):
+            while time.monotonic() < clock.emit_at:
+                collect_replies(sock, simulator, clock.emit_at - time.monotonic())
+            for packet in simulator.slot(clock.next()):
+                sock.sendto(packet, address)
+            sock.sendto(simulator.status_packet(), address)
+        while time.monotonic() < clock.emit_at:
+            collect_replies(sock, simulator, clock.emit_at - time.monotonic())
+    finally:
+        sock.close()
+
+
+async def drive_manager(simulator: BandSimulator, manager, slots: int, throughput: Throughput) -> None:
+    """在同一进程里驱动 rdma 的 HamRadioManager"""
+    address = ('127.0.0.1', 0)
+    clock = SlotClock(simulator.period)
+    await manager._process_packet(simulator.status_packet(), address, time.monotonic())
+    for _ in range(slots):
+        while time.monotonic() < clock.emit_at:
+            await manager._check_timeouts()
+            await asyncio.sleep(min(0.1, clock.emit_at - time.monotonic()))
+        packets = simulator.slot(clock.next())
+        started = time.monotonic()
+        for packet in packets:
+            await manager._process_packet(packet, address, time.monotonic())
+        await manager._check_timeouts()
+        throughput.add(time.monotonic() - started, len(packets))
+
+
+def prepare_workdir(workdir: Optional[str]) -> Path:
+    """在单独的目录中运行（不写入真实的日志和解码历史），复制 DXCC 数据库和白名单配置"""
+    source = Path(__file__).parent
+    path = Path(workdir or tempfile.mkdtemp(prefix='ultron_sim_'))
+    path.mkdir(parents=True, exist_ok=True)
+    for pattern in ('base.json', 'dxcc_config.py', 'dxcc_whitelist_*.json'):
+        for file in source.glob(pattern):
+            if not (path / file.name).exists():
+                shutil.copy(file, path / file.name)
+    os.chdir(path)
+    return path
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Offline band simulator for load-testing the ULTRON QSO engine')
+    parser.add_argument('--target', choices=('ultron', 'dxcc', 'rdma', 'udp'), default='ultron',
+                        help='ultron/dxcc/rdma 在同一进程中运行，udp 发给正在运行的 ULTRON')
+    parser.add_argument('--slots', type=int, default=20, help='模拟的时隙数')
+    parser.add_argument('--decodes', type=int, default=200, help='每个时隙的解码数')
+    parser.add_argument('--period', type=int, default=REAL_PERIOD,
+                        help='T/R 周期（秒），小于15为加速运行')
+    parser.add_argument('--population', type=int, default=2000, help='电台数')
+    parser.add_argument('--answer', type=float, default=0.6, help='对方回应我们 Reply 的概率')
+    parser.add_argument('--rr73', type=float, default=0.8, help='每个时隙对方发出 RR73 的概率')
+    parser.add_argument('--my-call', default='BG1SIM', help='本台呼号（通过状态包告诉目标）')
+    parser.add_argument('--my-grid', default='OM89', help='本台网格')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--host', default='127.0.0.1', help='udp 目标地址')
+    parser.add_argument('--port', type=int, default=2237, help='udp 目标端口')
+    parser.add_argument('--workdir', help='运行目录（默认为临时目录）')
+    parser.add_argument('--verbose', action='store_true', help='显示目标的输出')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    throughput = Throughput()
+    simulator = target = None
+    output = None if args.verbose else open(os.devnull, 'w')
+    started = time.monotonic()
+    try:
+        if args.target == 'udp':
+            simulator = BandSimulator(Population(rng, args.population), args.my_call, args.my_grid,
+                                      args.decodes, args.answer, args.rr73, period=args.period, seed=args.seed)
+            drive_udp(simulator, (args.host, args.port), args.slots)
+        else:
+            workdir = prepare_workdir(args.workdir)
+            print(f" -----< ULTRON SIM : working directory {workdir}")
+            with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+                if args.target == 'rdma':
+                    sys.path.insert(0, str(Path(__file__).parent / 'rdma' / 'src'))
+                    from rdma.config import LoggingConfig
+                    from rdma.ham_radio import HamRadioManager
+                    from rdma.logging import setup_logging
+                    level = 'INFO' if args.verbose else 'WARNING'
+                    target = HamRadioManager({}, setup_logging(LoggingConfig(level=level), 'rdma.simulator'))
+                elif args.target == 'dxcc':
+                    from ultron_dxcc import UltronDXCC
+                    target = UltronDXCC()
+                else:
+                    from ultron import Ultron
+                    target = Ultron()
+                database = target.dxcc_db.database
+                if not database:
+                    target.dxcc_db.database = builtin_database()
+                simulator = BandSimulator(Population(rng, args.population, database),
+                                          args.my_call, args.my_grid, args.decodes, args.answer, args.rr73,
+                                          period=args.period, seed=args.seed)
+                if args.target == 'rdma':
+                    asyncio.run(drive_manager(simulator, target, args.slots, throughput))
+                else:
+                    drive_ultron(simulator, target, args.slots, throughput)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output:
+            output.close()
+        if target is not None and hasattr(target, 'history'):
+            target.history.close()
+
+    print(f" -----< ULTRON SIM : {args.target}, T/R {args.period}s, "
+          f"{time.monotonic() - started:.1f}s wall time")
+    if simulator is None:
+        return
+    for line in simulator.report_lines():
+        print(f"   {line}")
+    if throughput.decodes:
+        print(f"   {throughput.report_line()}")
+    if target is not None:
+        state = getattr(target, 'state', None)
+        if state is not None:
+            print(f"   target: {state.tx_count} replies sent, {state.logged_count} QSOs logged, "
+                  f"{state.abandoned_count} abandoned")
+        for line in target.latency.report_lines():
+            print(f"   {line}")
+        if hasattr(target, 'decisions'):
+            print(f"   {target.decisions.report_line()}")
+
+
+if __name__ == "__main__":
+    main()
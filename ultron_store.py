@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+ULTRON Columnar QSO Store
+Python Version
+
+列式QSO存储：每个QSO约16字节（日期、时间、波段、模式、实体、呼号索引），
+呼号使用驻留字符串池。过滤和分组在C层完成（bytes.translate / compress / count）。
+"""
+
+import json
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+from itertools import compress
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from ultron_adif import ADIFReader, LogCheckpoint
+from ultron_bands import BAND_COUNT, MODE_COUNT, band_id, qso_mode_id
+
+# 实体编号上限（DXCC实体ID < 1024）
+ENTITY_SLOTS = 1024
+
+# 持久化文件格式标识
+STATE_MAGIC = b'UQT2'
+
+# 视为已确认的QSL字段
+QSL_FIELDS = ('qsl_rcvd', 'lotw_qsl_rcvd', 'eqsl_qsl_rcvd')
+
+
+def entity_id(value) -> int:
+    """DXCC实体ID -> 整数编号（0 = 未知）"""
+    try:
+        eid = int(value)
+    except (TypeError, ValueError):
+        return 0
+    return eid if 0 < eid < ENTITY_SLOTS else 0
+
+
+def file_signature(path: Union[str, Path]) -> str:
+    """文件签名（大小+修改时间），用于判断解析用的数据库是否变化"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ''
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _date_int(value: str) -> int:
+    return int(value) if value and value.isdigit() else 0
+
+
+def grid4(value: str) -> str:
+    """网格坐标取前4位（如 FN42），无效时返回空字符串"""
+    value = value[:4].upper() if value else ''
+    if len(value) == 4 and 'A' <= value[0] <= 'R' and 'A' <= value[1] <= 'R' and value[2:].isdigit():
+        return value
+    return ''
+
+
+def qso_confirmed(qso: Dict[str, str]) -> bool:
+    """QSO是否已确认（QSL/LoTW/eQSL）"""
+    return any(qso.get(name, '').upper() in ('Y', 'V') for name in QSL_FIELDS)
+
+
+class CallPool:
+    """呼号驻留池，每个呼号只保存一次并缓存其实体编号"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.entities = array('H')
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, call: str, resolve: Optional[Callable[[str], object]] = None) -> int:
+        idx = self.index.get(call)
+        if idx is None:
+            idx = len(self.names)
+            self.index[call] = idx
+            self.names.append(call)
+            self.entities.append(entity_id(resolve(call)) if resolve else 0)
+        return idx
+
+
+class QSOTable:
+    """列式QSO表"""
+
+    def __init__(self, resolve_entity: Optional[Callable[[str], object]] = None):
+        self.resolve_entity = resolve_entity
+        self.pool = CallPool()
+        self.dates = array('I')      # YYYYMMDD
+        self.times = array('I')      # HHMMSS
+        self.bands = bytearray()     # 波段编号
+        self.modes = bytearray()     # 模式编号
+        self.entities = array('H')   # DXCC实体编号
+        self.calls = array('I')      # 呼号池索引
+        self.grids = array('H')      # 网格索引（0 = 无）
+        self.confirmed = bytearray() # 1 = 已确认
+        self.grid_names: List[str] = ['']
+        self.grid_index: Dict[str, int] = {'': 0}
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    def append(self, qso: Dict[str, str]) -> None:
+        """追加一条ADIF记录"""
+        call = qso.get('call', '').upper()
+        if not call:
+            return
+        idx = self.pool.intern(call, self.resolve_entity)
+        eid = entity_id(qso['dxcc']) if 'dxcc' in qso else self.pool.entities[idx]
+        self.dates.append(_date_int(qso.get('qso_date', '')))
+        self.times.append(_date_int(qso.get('time_on', '')[:6]))
+        self.bands.append(band_id(qso.get('band', '')))
+        self.modes.append(qso_mode_id(qso))
+        self.entities.append(eid)
+        self.calls.append(idx)
+        grid = grid4(qso.get('gridsquare', ''))
+        gidx = self.grid_index.get(grid)
+        if gidx is None:
+            gidx = self.grid_index[grid] = len(self.grid_names)
+            self.grid_names.append(grid)
+        self.grids.append(gidx)
+        self.confirmed.append(qso_confirmed(qso))
+
+    def extend(self, qsos: Iterable[Dict[str, str]]) -> int:
+        """追加多条ADIF记录，返回追加数量"""
+        before = len(self)
+        for qso in qsos:
+            self.append(qso)
+        return len(self) - before
+
+    def call(self, row: int) -> str:
+        return self.pool.names[self.calls[row]]
+
+    def grid(self, row: int) -> str:
+        return self.grid_names[self.grids[row]]
+
+    # ------------------------------------------------------------------
+    # 持久化
+
+    def _columns(self) -> tuple:
+        return (self.dates, self.times, self.entities, self.calls, self.grids, self.pool.entities)
+
+    def save(self, path: Union[str, Path], meta: Optional[Dict[str, object]] = None) -> None:
+        """保存到二进制文件（先写临时文件再替换）"""
+        path = Path(path)
+        header = json.dumps({
+            'meta': meta or {},
+            'byteorder': sys.byteorder,
+            'rows': len(self),
+            'names': self.pool.names,
+            'grids': self.grid_names,
+        }, ensure_ascii=False).encode('utf-8')
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(STATE_MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for column in self._columns():
+                column.tofile(f)
+            f.write(self.bands)
+            f.write(self.modes)
+            f.write(self.confirmed)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path],
+             resolve_entity: Optional[Callable[[str], object]] = None) -> Tuple['QSOTable', Dict[str, object]]:
+        """从二进制文件载入，返回 (表, meta)；文件损坏时抛出 ValueError"""
+        table = cls(resolve_entity)
+        with open(path, 'rb') as f:
+            if f.read(4) != STATE_MAGIC:
+                raise ValueError(f"不是QSO表文件: {path}")
+            try:
+                (length,) = struct.unpack('<I', f.read(4))
+                header = json.loads(f.read(length).decode('utf-8'))
+                rows = header['rows']
+                names = header['names']
+                grids = header['grids']
+                for column, count in zip(table._columns(), (rows, rows, rows, rows, rows, len(names))):
+                    column.fromfile(f, count)
+                    if header['byteorder'] != sys.byteorder:
+                        column.byteswap()
+                table.bands = bytearray(f.read(rows))
+                table.modes = bytearray(f.read(rows))
+                table.confirmed = bytearray(f.read(rows))
+            except (EOFError, KeyError, struct.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise ValueError(f"QSO表文件损坏: {path}: {e}")
+        if len(table.bands) != rows or len(table.modes) != rows or len(table.confirmed) != rows:
+            raise ValueError(f"QSO表文件损坏: {path}")
+        table.pool.names = names
+        table.pool.index = {call: i for i, call in enumerate(names)}
+        table.grid_names = grids
+        table.grid_index = {grid: i for i, grid in enumerate(grids)}
+        return table, header['meta']
+
+    # ------------------------------------------------------------------
+    # 过滤
+
+    @staticmethod
+    def _byte_mask(column: bytearray, wanted: Iterable[int]) -> bytes:
+        table = bytearray(256)
+        for value in wanted:
+            table[value] = 1
+        return column.translate(table)
+
+    @staticmethod
+    def _and(a: bytes, b: bytes) -> bytes:
+        return (int.from_bytes(a, 'little') & int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+    def mask(self, bands: Optional[Iterable[Union[int, str]]] = None,
+             modes: Optional[Iterable[int]] = None,
+             entities: Optional[Iterable[int]] = None,
+             start_date: Optional[int] = None, end_date: Optional[int] = None) -> bytes:
+        """生成行掩码（每行一个0/1字节）"""
+        result = None
+        parts = []
+        if bands is not None:
+            ids = [b if isinstance(b, int) else band_id(b) for b in bands]
+            parts.append(self._byte_mask(self.bands, ids))
+        if modes is not None:
+            parts.append(self._byte_mask(self.modes, modes))
+        if entities is not None:
+            wanted = frozenset(entities)
+            parts.append(bytes(map(wanted.__contains__, self.entities)))
+        if start_date is not None:
+            parts.append(bytes(map(int(start_date).__le__, self.dates)))
+        if end_date is not None:
+            parts.append(bytes(map(int(end_date).__ge__, self.dates)))
+
+        for part in parts:
+            result = part if result is None else self._and(result, part)
+        return result if result is not None else b'\x01' * len(self)
+
+    def select(self, column, mask: Optional[bytes] = None) -> list:
+        """按掩码取出某列"""
+        return list(column) if mask is None else list(compress(column, mask))
+
+    # ------------------------------------------------------------------
+    # 分组统计
+
+    def count_by_band(self, mask: Optional[bytes] = None) -> List[int]:
+        """每个波段的QSO数量（按波段编号索引）"""
+        column = self.bands if mask is None else bytes(compress(self.bands, mask))
+        return [column.count(bid) for bid in range(BAND_COUNT)]
+
+    def group_count(self, column, mask: Optional[bytes] = None) -> Counter:
+        """按某列分组计数"""
+        return Counter(column if mask is None else compress(column, mask))
+
+    def unique_entities(self, mask: Optional[bytes] = None) -> Set[int]:
+        """已通联的实体编号集合（不含未知）"""
+        result = set(self.entities if mask is None else compress(self.entities, mask))
+        result.discard(0)
+        return result
+
+    def unique_entities_by_band(self, mask: Optional[bytes] = None) -> Dict[int, Set[int]]:
+        """每个波段已通联的实体编号集合"""
+        result = {}
+        for bid, count in enumerate(self.count_by_band(mask)):
+            if not count:
+                continue
+            band_mask = self._byte_mask(self.bands, (bid,))
+            if mask is not None:
+                band_mask = self._and(band_mask, mask)
+            entities = set(compress(self.entities, band_mask))
+            entities.discard(0)
+            if entities:
+                result[bid] = entities
+        return result
+
+
+class SlotMatrix:
+    """
+    实体 × 波段、实体 × 模式 的QSO计数矩阵。
+    由QSO表一次扫描生成（按 (实体, 波段, 模式) 分组计数），各种报表都是矩阵上的归约。
+    """
+
+    def __init__(self, table: Optional[QSOTable] = None, mask: Optional[bytes] = None):
+        self.band_counts = array('I', bytes(4 * ENTITY_SLOTS * BAND_COUNT))
+        self.mode_counts = array('I', bytes(4 * ENTITY_SLOTS * MODE_COUNT))
+        if table is not None:
+            self.add_table(table, mask)
+
+    def add_table(self, table: QSOTable, mask: Optional[bytes] = None) -> None:
+        """把QSO表（可带行掩码）累加到矩阵"""
+        columns = (table.entities, table.bands, table.modes)
+        if mask is not None:
+            columns = tuple(compress(column, mask) for column in columns)
+        for (eid, bid, mid), count in Counter(zip(*columns)).items():
+            self.add(eid, bid, mid, count)
+
+    def add(self, eid: int, bid: int, mid: int, count: int = 1) -> None:
+        self.band_counts[eid * BAND_COUNT + bid] += count
+        self.mode_counts[eid * MODE_COUNT + mid] += count
+
+    def qsos(self, eid: int, bid: int) -> int:
+        return self.band_counts[eid * BAND_COUNT + bid]
+
+    def band_row(self, eid: int) -> array:
+        """某实体在各波段的QSO数量"""
+        return self.band_counts[eid * BAND_COUNT:(eid + 1) * BAND_COUNT]
+
+    def worked_bands(self, eid: int, bands: Optional[Iterable[int]] = None) -> List[int]:
+        """某实体已通联的波段编号"""
+        row = self.band_row(eid)
+        return [bid for bid in (range(BAND_COUNT) if bands is None else bands) if row[bid]]
+
+    def entities_by_band(self) -> Dict[int, Set[int]]:
+        """每个波段已通联的实体编号集合（不含未知实体）"""
+        result: Dict[int, Set[int]] = {}
+        counts = self.band_counts
+        for bid in range(BAND_COUNT):
+            column = counts[BAND_COUNT + bid::BAND_COUNT]
+            entities = {eid for eid, n in enumerate(column, 1) if n}
+            if entities:
+                result[bid] = entities
+        return result
+
+    def band_totals(self) -> List[int]:
+        """每个波段的QSO数量"""
+        counts = self.band_counts
+        return [sum(counts[bid::BAND_COUNT]) for bid in range(BAND_COUNT)]
+
+    def mode_totals(self) -> List[Tuple[int, int]]:
+        """每个模式的 (QSO数量, 实体数量)"""
+        counts = self.mode_counts
+        result = []
+        for mid in range(MODE_COUNT):
+            column = counts[MODE_COUNT + mid::MODE_COUNT]
+            result.append((sum(column) + counts[mid], len(column) - column.count(0)))
+        return result
+
+    def entity_totals(self) -> array:
+        """每个实体的QSO数量"""
+        counts = self.mode_counts
+        return array('I', (sum(counts[i:i + MODE_COUNT]) for i in range(0, len(counts), MODE_COUNT)))
+
+    def slot_count(self, bands: Iterable[int]) -> int:
+        """波段点数（实体 × 波段，DXCC Challenge 计分方式）"""
+        counts = self.band_counts
+        return sum(ENTITY_SLOTS - 1 - counts[BAND_COUNT + bid::BAND_COUNT].count(0) for bid in bands)
+
+    def missing_slots(self, bands: Iterable[int]) -> List[Tuple[int, int, int]]:
+        """
+        已通联实体在指定波段上缺少的点，返回 (实体, 波段, 该实体已通联的波段数)，
+        按已通联波段数从多到少排序（越接近完成越靠前）。
+        """
+        bands = list(bands)
+        result = []
+        for eid in range(1, ENTITY_SLOTS):
+            row = self.band_row(eid)
+            worked = [bid for bid in bands if row[bid]]
+            if worked and len(worked) < len(bands):
+                result.extend((eid, bid, len(worked)) for bid in bands if not row[bid])
+        result.sort(key=lambda slot: -slot[2])
+        return result
+
+
+class LogIndex:
+    """
+    持久化的日志索引：QSOTable + 日志检查点。
+    每次 refresh() 只解析上次之后追加的QSO；日志被重写或解析数据库变化时重建。
+    """
+
+    def __init__(self, log_file: Union[str, Path], state_file: Union[str, Path],
+                 resolve_entity: Optional[Callable[[str], object]] = None, signature: str = ''):
+        self.log_file = Path(log_file)
+        self.state_file = Path(state_file)
+        self.resolve_entity = resolve_entity
+        self.signature = signature
+        self.table = QSOTable(resolve_entity)
+        self.checkpoint = LogCheckpoint()
+        self.loaded = False
+        self.dirty = False
+
+    def _load(self) -> None:
+        self.loaded = True
+        try:
+            table, meta = QSOTable.load(self.state_file, self.resolve_entity)
+        except (OSError, ValueError):
+            return
+        checkpoint = LogCheckpoint.from_dict(meta.get('checkpoint', {}))
+        if meta.get('signature') != self.signature or not checkpoint.valid_for(self.log_file):
+            return
+        self.table = table
+        self.checkpoint = checkpoint
+
+    def refresh(self, save: bool = True) -> int:
+        """读取日志中新增的QSO，返回新增数量"""
+        if not self.loaded:
+            self._load()
+        if not self.log_file.exists():
+            return 0
+        if not self.checkpoint.valid_for(self.log_file):
+            # 日志被截断或重写
+            self.table = QSOTable(self.resolve_entity)
+            self.checkpoint = LogCheckpoint()
+
+        added = 0
+        offset = self.checkpoint.offset
+        for qso, offset in ADIFReader(self.log_file).records(offset, complete_only=True):
+            self.table.append(qso)
+            added += 1
+        if offset != self.checkpoint.offset:
+            self.checkpoint.advance(self.log_file, offset)
+            self.dirty = True
+        if save:
+            self.save()
+        return added
+
+    def replace(self, table: QSOTable) -> None:
+        """日志被整体重写（例如合并）后直接使用已建好的表，检查点指向新文件的末尾"""
+        self.loaded = True
+        self.table = table
+        self.checkpoint = LogCheckpoint()
+        if self.log_file.exists():
+            self.checkpoint.advance(self.log_file, self.log_file.stat().st_size)
+        self.dirty = True
+
+    def save(self) -> None:
+        """有变化时写回状态文件"""
+        if not self.dirty:
+            return
+        self.table.save(self.state_file, {
+            'log': str(self.log_file),
+            'signature': self.signature,
+            'checkpoint': self.checkpoint.to_dict(),
+        })
+        self.dirty = False
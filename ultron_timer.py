@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+ULTRON Timing Wheel
+Python Version
+
+分层时间轮：4层，每层64格，刻度0.1秒（第0层6.4秒，第1层约7分钟，第2层约7.3小时，
+第3层约19天）。加入和取消定时器都是 O(1)，每个刻度只处理到期的那一格，
+高层的格子在低层转完一圈时下放。
+用于每个呼号各自的排除期限、QSO超时和周期性任务。
+"""
+
+import math
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Set
+
+TICK = 0.1
+WHEEL_BITS = 6
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+LEVELS = 4
+
+# 没有回应的电台默认排除30分钟
+EXCLUSION_TTL = 1800.0
+
+
+class Timer:
+    """定时器（由 TimingWheel.schedule 创建）"""
+
+    __slots__ = ('wheel', 'expires', 'callback', 'args', 'interval', 'bucket')
+
+    def __init__(self, wheel: 'TimingWheel', expires: int, callback: Callable, args: tuple, interval: int):
+        self.wheel = wheel
+        self.expires = expires          # 到期刻度
+        self.callback = callback
+        self.args = args
+        self.interval = interval        # 周期（刻度），0 表示一次性
+        self.bucket: Optional[Set['Timer']] = None
+
+    @property
+    def active(self) -> bool:
+        return self.bucket is not None
+
+    def cancel(self) -> None:
+        """取消（O(1)）"""
+        if self.bucket is not None:
+            self.bucket.discard(self)
+            self.bucket = None
+            self.wheel.count -= 1
+
+
+class TimingWheel:
+    """分层时间轮（默认使用单调时钟）"""
+
+    def __init__(self, tick: float = TICK, clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self.wheels: List[List[Set[Timer]]] = [[set() for _ in range(WHEEL_SIZE)] for _ in range(LEVELS)]
+        self.overflow: Set[Timer] = set()           # 超出最高层范围的定时器
+        self.current = self._ticks(clock())
+        self.count = 0
+
+    def _ticks(self, when: float) -> int:
+        return int(when / self.tick)
+
+    def _expiry(self, when: float) -> int:
+        """到期刻度（向上取整，定时器不会提前触发）"""
+        return math.ceil(when / self.tick - 1e-9)
+
+    def _place(self, timer: Timer) -> None:
+        delta = timer.expires - self.current
+        for level in range(LEVELS):
+            if delta < 1 << (WHEEL_BITS * (level + 1)):
+                bucket = self.wheels[level][(timer.expires >> (WHEEL_BITS * level)) & WHEEL_MASK]
+                break
+        else:
+            bucket = self.overflow
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def _add(self, expires: int, callback: Callable, args: tuple, interval: int = 0) -> Timer:
+        # 当前刻度已经处理过，最早在下一个刻度触发
+        timer = Timer(self, max(expires, self.current + 1), callback, args, interval)
+        self._place(timer)
+        self.count += 1
+        return timer
+
+    def schedule_at(self, when: float, callback: Callable, *args: Any) -> Timer:
+        """在时钟 when 时调用 callback(*args)"""
+        return self._add(self._expiry(when), callback, args)
+
+    def schedule(self, delay: float, callback: Callable, *args: Any) -> Timer:
+        """delay 秒后调用 callback(*args)"""
+        return self._add(self._expiry(self.clock() + delay), callback, args)
+
+    def every(self, interval: float, callback: Callable, *args: Any) -> Timer:
+        """每 interval 秒调用一次 callback(*args)"""
+        ticks = max(1, int(round(interval / self.tick)))
+        return self._add(self._ticks(self.clock()) + ticks, callback, args, ticks)
+
+    def _cascade(self, level: int) -> None:
+        """把第 level 层当前格的定时器下放到低层"""
+        index = (self.current >> (WHEEL_BITS * level)) & WHEEL_MASK
+        bucket = self.wheels[level][index]
+        if bucket:
+            self.wheels[level][index] = set()
+            for timer in bucket:
+                self._place(timer)
+        if index == 0:
+            if level + 1 < LEVELS:
+                self._cascade(level + 1)
+            elif self.overflow:
+                overflow, self.overflow = self.overflow, set()
+                for timer in overflow:
+                    self._place(timer)
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """推进到时钟 now（默认为当前时间），调用所有到期的定时器，返回调用次数"""
+        target = self._ticks(self.clock() if now is None else now)
+        fired = 0
+        while self.current < target:
+            if not self.count:
+                self.current = target           # 空闲时直接跳过
+                break
+            self.current += 1
+            index = self.current & WHEEL_MASK
+            if index == 0:
+                self._cascade(1)
+            # 逐个从格中取出：回调可以取消同一格的定时器
+            bucket = self.wheels[0][index]
+            while bucket:
+                timer = bucket.pop()
+                timer.bucket = None
+                if timer.interval:
+                    timer.expires += timer.interval
+                    self._place(timer)
+                else:
+                    self.count -= 1
+                try:
+                    timer.callback(*timer.args)
+                except BaseException:
+                    # 其余到期的定时器留在格中，下次推进时重新处理这个刻度
+                    self.current -= 1
+                    raise
+                fired += 1
+        return fired
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class ExpiringSet:
+    """成员各自到期的集合（例如每个呼号各自的排除期限）"""
+
+    def __init__(self, wheel: TimingWheel, ttl: float = EXCLUSION_TTL):
+        self.wheel = wheel
+        self.ttl = ttl
+        self.timers: Dict[Hashable, Timer] = {}
+
+    def add(self, item: Hashable, ttl: Optional[float] = None) -> None:
+        """加入（已存在时重新计时）"""
+        timer = self.timers.get(item)
+        if timer is not None:
+            timer.cancel()
+        self.timers[item] = self.wheel.schedule(self.ttl if ttl is None else ttl, self._expire, item)
+
+    def _expire(self, item: Hashable) -> None:
+        self.timers.pop(item, None)
+
+    def discard(self, item: Hashable) -> None:
+        timer = self.timers.pop(item, None)
+        if timer is not None:
+            timer.cancel()
+
+    def clear(self) -> None:
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+
+    def __contains__(self, item: object) -> bool:
+        return item in self.timers
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self.timers))
+
+    def __len__(self) -> int:
+        return len(self.timers)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+ULTRON Config File Watcher
+Python Version
+
+监视配置文件变化：Linux 上使用 inotify（ctypes），其它平台轮询 mtime。
+变化经过防抖后在后台线程中回调。
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+# inotify 常量
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """载入 libc 的 inotify 函数，不可用时返回None"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """文件监视器：变化在 debounce 秒内不再发生后调用 callback(变化的文件集合)"""
+
+    def __init__(self, paths: Iterable[os.PathLike], callback: Callable[[Set[Path]], None],
+                 debounce: float = 0.5, poll_interval: float = 1.0, use_inotify: bool = True):
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.paths: Set[Path] = set()
+        self.signatures: Dict[Path, Tuple[int, int]] = {}
+        self.backend = 'poll'
+        self._libc = _load_inotify() if use_inotify else None
+        self._fd = -1
+        self._watches: Dict[int, Path] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.set_paths(paths)
+
+    @staticmethod
+    def _signature(path: Path) -> Tuple[int, int]:
+        try:
+            st = path.stat()
+        except OSError:
+            return (-1, -1)
+        return (st.st_mtime_ns, st.st_size)
+
+    def set_paths(self, paths: Iterable[os.PathLike]) -> None:
+        """更新监视的文件列表"""
+        with self._lock:
+            self.paths = {Path(p).resolve() for p in paths}
+            self.signatures = {p: self._signature(p) for p in self.paths}
+            if self._fd >= 0:
+                self._add_watches()
+
+    def _add_watches(self) -> None:
+        # 监视目录而不是文件，这样可以看到“写临时文件再改名”的替换
+        watched = set(self._watches.values())
+        for directory in {p.parent for p in self.paths} - watched:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = directory
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                with self._lock:
+                    self._add_watches()
+                self.backend = 'inotify'
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ultron-config-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.poll_interval, self.debounce) + 1)
+            self._thread = None
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+            self._watches.clear()
+
+    def _read_events(self, timeout: float) -> Set[Path]:
+        """读取inotify事件，返回被修改的监视文件"""
+        changed = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            directory = self._watches.get(wd)
+            if directory is not None and name:
+                path = directory / os.fsdecode(name)
+                if path in self.paths:
+                    changed.add(path)
+        return changed
+
+    def _poll(self) -> Set[Path]:
+        """比较mtime/大小，返回变化的文件"""
+        changed = set()
+        with self._lock:
+            for path in self.paths:
+                signature = self._signature(path)
+                if signature != self.signatures.get(path):
+                    self.signatures[path] = signature
+                    changed.add(path)
+        return changed
+
+    def _run(self) -> None:
+        pending: Set[Path] = set()
+        deadline = 0.0
+        while not self._stop.is_set():
+            if self._fd >= 0:
+                timeout = max(0.0, deadline - time.monotonic()) if pending else self.poll_interval
+                changed = self._read_events(timeout)
+            else:
+                self._stop.wait(min(self.poll_interval, self.debounce) if pending else self.poll_interval)
+                changed = self._poll()
+
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                deadline = now + self.debounce
+            elif pending and now >= deadline:
+                batch, pending = pending, set()
+                try:
+                    self.callback(batch)
+                except Exception as e:  # 回调失败不能停止监视
+                    print(f" -----< ULTRON : Config watcher callback failed: {e}")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+ULTRON DXCC Whitelist Files
+Python Version
+
+读取 dxcc_whitelist_config.json 列出的白名单文件
+（dxcc_whitelist_global.json、dxcc_whitelist_<band>.json），
+并编译成按实体编号索引的不可变查找表。
+"""
+
+import json
+from array import array
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Union
+
+from ultron_bands import BAND_COUNT, BAND_IDS
+from ultron_store import ENTITY_SLOTS, entity_id
+
+WHITELIST_CONFIG = 'dxcc_whitelist_config.json'
+WHITELIST_PREFIX = 'dxcc_whitelist_'
+GLOBAL_KEY = 'global'
+
+# 全局白名单覆盖所有波段
+ALL_BANDS = (1 << BAND_COUNT) - 1
+
+
+def load_whitelist_config(directory: Union[str, Path] = '.') -> Dict[str, object]:
+    """读取 dxcc_whitelist_config.json"""
+    try:
+        with open(Path(directory) / WHITELIST_CONFIG, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return config if isinstance(config, dict) else {}
+
+
+def whitelist_files(directory: Union[str, Path] = '.') -> Dict[str, Path]:
+    """白名单文件 {'global' | 波段: 路径}"""
+    directory = Path(directory)
+    names = load_whitelist_config(directory).get('files')
+    if not isinstance(names, list):
+        names = [p.name for p in directory.glob(WHITELIST_PREFIX + '*.json')]
+
+    files = {}
+    for name in names:
+        if not name.startswith(WHITELIST_PREFIX) or not name.endswith('.json'):
+            continue
+        key = name[len(WHITELIST_PREFIX):-len('.json')]
+        if key == 'config':
+            continue
+        files[key] = directory / name
+    return files
+
+
+def load_whitelist_file(path: Union[str, Path], strict: bool = False) -> Dict[int, Dict[str, object]]:
+    """读取一个白名单文件，键为实体编号；strict=True 时文件损坏抛出 ValueError"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        if strict:
+            raise ValueError(f"{path}: {e}")
+        return {}
+    if not isinstance(data, dict):
+        if strict:
+            raise ValueError(f"{path}: not a JSON object")
+        return {}
+
+    result = {}
+    for key, info in data.items():
+        eid = entity_id(key)
+        if eid:
+            result[eid] = info if isinstance(info, dict) else {'name': str(info)}
+    return result
+
+
+def load_whitelists(directory: Union[str, Path] = '.', strict: bool = False) -> Dict[str, Dict[int, Dict[str, object]]]:
+    """读取所有白名单文件 {'global' | 波段: {实体编号: 信息}}"""
+    return {key: load_whitelist_file(path, strict) for key, path in whitelist_files(directory).items()}
+
+
+def entity_continents(whitelists: Dict[str, Dict[int, Dict[str, object]]]) -> Dict[int, str]:
+    """实体编号 -> 大洲（忽略 unknown）"""
+    result = {}
+    for entries in whitelists.values():
+        for eid, info in entries.items():
+            continent = info.get('continent')
+            if continent and continent != 'unknown' and eid not in result:
+                result[eid] = continent
+    return result
+
+
+class CompiledWhitelist:
+    """
+    编译后的白名单：每个实体一个波段位掩码、一个高优先级位掩码和一个得分。
+    构建后不再修改，重新加载时整体替换引用即可（赋值是原子的）。
+    """
+
+    __slots__ = ('band_mask', 'high_mask', 'score', 'count')
+
+    def __init__(self):
+        self.band_mask = array('I', bytes(4 * ENTITY_SLOTS))
+        self.high_mask = array('I', bytes(4 * ENTITY_SLOTS))
+        self.score = array('f', bytes(4 * ENTITY_SLOTS))
+        self.count = 0
+
+    @classmethod
+    def build(cls, whitelists: Mapping[str, Mapping[int, Mapping[str, object]]],
+              dxcc_whitelist: Optional[Mapping[str, str]] = None,
+              band_whitelist: Optional[Mapping[str, Mapping[str, str]]] = None) -> 'CompiledWhitelist':
+        """
+        编译白名单文件（load_whitelists 的结果）以及 dxcc_config.py 中的
+        dxcc_whitelist / band_whitelist 字典。
+        """
+        compiled = cls()
+        sources = [(key, entries.items()) for key, entries in whitelists.items()]
+        if dxcc_whitelist:
+            sources.append((GLOBAL_KEY, ((entity_id(k), {}) for k in dxcc_whitelist)))
+        for band, entries in (band_whitelist or {}).items():
+            sources.append((band, ((entity_id(k), {}) for k in entries)))
+
+        for key, entries in sources:
+            if key == GLOBAL_KEY:
+                bits = ALL_BANDS
+            elif key.lower() in BAND_IDS:
+                bits = 1 << BAND_IDS[key.lower()]
+            else:
+                continue
+            for eid, info in entries:
+                if not eid:
+                    continue
+                compiled.band_mask[eid] |= bits
+                if info.get('priority') == 'high':
+                    compiled.high_mask[eid] |= bits
+                try:
+                    score = float(info.get('score', 0) or 0)
+                except (TypeError, ValueError):
+                    score = 0.0
+                compiled.score[eid] = max(compiled.score[eid], score)
+
+        compiled.count = ENTITY_SLOTS - compiled.band_mask.count(0)
+        return compiled
+
+    @classmethod
+    def load(cls, directory: Union[str, Path] = '.',
+             dxcc_whitelist: Optional[Mapping[str, str]] = None,
+             band_whitelist: Optional[Mapping[str, Mapping[str, str]]] = None,
+             strict: bool = False) -> 'CompiledWhitelist':
+        """读取目录中的白名单文件并编译"""
+        return cls.build(load_whitelists(directory, strict), dxcc_whitelist, band_whitelist)
+
+    def contains(self, eid: int, bid: int) -> bool:
+        """实体在该波段是否在白名单中"""
+        return bool(self.band_mask[eid] >> bid & 1)
+
+    def is_high(self, eid: int, bid: int) -> bool:
+        """实体在该波段是否为高优先级"""
+        return bool(self.high_mask[eid] >> bid & 1)